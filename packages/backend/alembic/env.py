@@ -16,6 +16,16 @@ from app.db.base_class import Base
 # We explicitly import all models here so that Base.metadata knows about them.
 from app.schemas.user import User
 from app.schemas.log import Log
+from app.models.threat import FrozenThreat
+from app.models.anchor import LogAnchor
+from app.models.checkpoint import ChainCheckpoint
+from app.models.blob import LogBlob
+from app.models.archive import LogArchive
+from app.models.rollup import AnalyticsRollup, StageLatencyRollup
+from app.models.sketch import ThreatSketch
+from app.models.revocation import AuthRevocation
+from app.models.api_key import ApiKey
+from app.models.job import BackgroundJob
 
 # this is the Alembic Config object
 config = context.config
@@ -0,0 +1,43 @@
+"""Create frozen threats table
+
+Revision ID: 9b1f3c7d2e4a
+Revises: 4408c3d98edf
+Create Date: 2026-10-19 09:12:41.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b1f3c7d2e4a'
+down_revision: Union[str, None] = '4408c3d98edf'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('frozen_threats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('prompt_hash', sa.String(), nullable=False),
+    sa.Column('embedding', sa.LargeBinary(), nullable=False),
+    sa.Column('attack_type', sa.String(), nullable=False),
+    sa.Column('reasoning', sa.Text(), nullable=True),
+    sa.Column('hit_count', sa.Integer(), nullable=False),
+    sa.Column('first_seen', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('last_seen', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_frozen_threats_id'), 'frozen_threats', ['id'], unique=False)
+    op.create_index(op.f('ix_frozen_threats_prompt_hash'), 'frozen_threats', ['prompt_hash'], unique=True)
+    op.create_index(op.f('ix_frozen_threats_is_active'), 'frozen_threats', ['is_active'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_frozen_threats_is_active'), table_name='frozen_threats')
+    op.drop_index(op.f('ix_frozen_threats_prompt_hash'), table_name='frozen_threats')
+    op.drop_index(op.f('ix_frozen_threats_id'), table_name='frozen_threats')
+    op.drop_table('frozen_threats')
@@ -0,0 +1,48 @@
+"""Create log archives table
+
+Revision ID: a4c9e2f7b1d5
+Revises: f7a4c2e9d1b3
+Create Date: 2026-10-19 19:05:12.418730
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c9e2f7b1d5'
+down_revision: Union[str, None] = 'f7a4c2e9d1b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('log_archives',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('partition_name', sa.String(), nullable=False),
+    sa.Column('range_start', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('range_end', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('first_log_id', sa.Integer(), nullable=False),
+    sa.Column('last_log_id', sa.Integer(), nullable=False),
+    sa.Column('log_count', sa.BigInteger(), nullable=False),
+    sa.Column('first_previous_log_hash', sa.String(), nullable=True),
+    sa.Column('last_log_hash', sa.String(), nullable=False),
+    sa.Column('file_name', sa.String(), nullable=False),
+    sa.Column('file_sha256', sa.String(length=64), nullable=False),
+    sa.Column('file_size', sa.BigInteger(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('partition_name')
+    )
+    op.create_index(op.f('ix_log_archives_id'), 'log_archives', ['id'], unique=False)
+    op.create_index(op.f('ix_log_archives_first_log_id'), 'log_archives', ['first_log_id'], unique=True)
+    op.create_index(op.f('ix_log_archives_last_log_id'), 'log_archives', ['last_log_id'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_log_archives_last_log_id'), table_name='log_archives')
+    op.drop_index(op.f('ix_log_archives_first_log_id'), table_name='log_archives')
+    op.drop_index(op.f('ix_log_archives_id'), table_name='log_archives')
+    op.drop_table('log_archives')
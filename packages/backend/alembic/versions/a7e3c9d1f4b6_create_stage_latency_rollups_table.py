@@ -0,0 +1,32 @@
+"""Create stage latency rollups table
+
+Revision ID: a7e3c9d1f4b6
+Revises: d2f6b8a3c1e7
+Create Date: 2026-10-19 23:14:52.630918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7e3c9d1f4b6'
+down_revision: Union[str, None] = 'd2f6b8a3c1e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('stage_latency_rollups',
+    sa.Column('bucket_size', sa.String(), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('stage', sa.String(), nullable=False),
+    sa.Column('sketch', sa.JSON(), nullable=False),
+    sa.PrimaryKeyConstraint('bucket_size', 'bucket_start', 'stage')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('stage_latency_rollups')
@@ -0,0 +1,124 @@
+"""Partition logs table by created_at
+
+Revision ID: b8d3f1a6c4e2
+Revises: a4c9e2f7b1d5
+Create Date: 2026-10-19 19:11:47.902615
+
+Converts `logs` into a table range-partitioned by created_at in place,
+without copying or rewriting existing rows, so the gateway keeps appending
+throughout (PostgreSQL only):
+
+1. NOT VALID check constraints (created_at is set, and before the first
+   partition boundary) are added and then validated, which only takes a
+   SHARE UPDATE EXCLUSIVE lock.
+2. The indexes the partitioned table needs are built CONCURRENTLY.
+3. In one short transaction the table is renamed to `logs_legacy`, its
+   primary key is swapped for the prebuilt (id, created_at) index, a
+   partitioned `logs` takes its place, and the old table is attached as the
+   partition for everything before the boundary. The validated constraints
+   let ATTACH skip its scan, and the new parent's primary key and indexes
+   adopt the prebuilt ones.
+4. Partitions for the following periods are created ahead of time.
+
+The primary key becomes (id, created_at), as PostgreSQL requires unique
+indexes to include the partition key. log_hash and previous_log_hash stay
+unique on existing rows; new rows rely on the chain lock, which already
+serialises every append. created_at now defaults to clock_timestamp(),
+taken under that lock, so it rises with id.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.config import settings
+from app.crud import crud_partition
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d3f1a6c4e2'
+down_revision: Union[str, None] = 'a4c9e2f7b1d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    # Leave at least an hour of headroom so no append lands past the boundary before the swap.
+    boundary = crud_partition.next_period_start(
+        datetime.now(timezone.utc) + timedelta(hours=1), settings.LOG_PARTITION_INTERVAL
+    ).isoformat()
+
+    with op.get_context().autocommit_block():
+        op.execute("UPDATE logs SET created_at = now() WHERE created_at IS NULL")
+        op.execute("ALTER TABLE logs ADD CONSTRAINT logs_created_at_not_null CHECK (created_at IS NOT NULL) NOT VALID")
+        op.execute(f"ALTER TABLE logs ADD CONSTRAINT logs_created_at_before_partitions CHECK (created_at < '{boundary}') NOT VALID")
+        op.execute("ALTER TABLE logs VALIDATE CONSTRAINT logs_created_at_not_null")
+        op.execute("ALTER TABLE logs VALIDATE CONSTRAINT logs_created_at_before_partitions")
+        # Uses the validated constraint instead of scanning the table.
+        op.execute("ALTER TABLE logs ALTER COLUMN created_at SET NOT NULL")
+
+        op.execute("CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS logs_legacy_id_created_at_key ON logs (id, created_at)")
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS logs_legacy_log_hash_idx ON logs (log_hash)")
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS logs_legacy_previous_log_hash_idx ON logs (previous_log_hash)")
+
+    op.execute("ALTER TABLE logs RENAME TO logs_legacy")
+    # ATTACH only adopts a constraint index for the parent's primary key, so
+    # promote the prebuilt (id, created_at) index to the partition's primary key.
+    op.execute(
+        "ALTER TABLE logs_legacy DROP CONSTRAINT logs_pkey, "
+        "ADD CONSTRAINT logs_legacy_pkey PRIMARY KEY USING INDEX logs_legacy_id_created_at_key"
+    )
+    op.execute("ALTER INDEX ix_logs_id RENAME TO logs_legacy_id_idx")
+    op.execute("ALTER INDEX ix_logs_verdict RENAME TO logs_legacy_verdict_idx")
+    op.execute("ALTER INDEX ix_logs_log_hash RENAME TO logs_legacy_log_hash_key")
+    op.execute("ALTER INDEX ix_logs_previous_log_hash RENAME TO logs_legacy_previous_log_hash_key")
+
+    op.execute("""
+        CREATE TABLE logs (
+            id INTEGER NOT NULL DEFAULT nextval('logs_id_seq'::regclass),
+            request_data JSON NOT NULL,
+            response_data JSON NOT NULL,
+            verdict VARCHAR NOT NULL,
+            log_hash VARCHAR NOT NULL,
+            previous_log_hash VARCHAR,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT clock_timestamp(),
+            CONSTRAINT logs_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("ALTER SEQUENCE logs_id_seq OWNED BY logs.id")
+    op.execute(f"ALTER TABLE logs ATTACH PARTITION logs_legacy FOR VALUES FROM (MINVALUE) TO ('{boundary}')")
+    op.execute("ALTER TABLE logs_legacy DROP CONSTRAINT logs_created_at_not_null, DROP CONSTRAINT logs_created_at_before_partitions")
+
+    # Each matches an index already on logs_legacy, which is attached rather than rebuilt.
+    op.create_index(op.f('ix_logs_id'), 'logs', ['id'], unique=False)
+    op.create_index(op.f('ix_logs_verdict'), 'logs', ['verdict'], unique=False)
+    op.create_index(op.f('ix_logs_log_hash'), 'logs', ['log_hash'], unique=False)
+    op.create_index(op.f('ix_logs_previous_log_hash'), 'logs', ['previous_log_hash'], unique=False)
+
+    crud_partition.ensure_partitions(
+        op.get_bind(), interval=settings.LOG_PARTITION_INTERVAL, premake=settings.LOG_PARTITION_PREMAKE
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    # Copies the rows still in the database back into a plain table; archived partitions stay archived.
+    op.execute("ALTER TABLE logs RENAME TO logs_partitioned")
+    op.execute("ALTER TABLE logs_partitioned RENAME CONSTRAINT logs_pkey TO logs_partitioned_pkey")
+    op.execute("CREATE TABLE logs (LIKE logs_partitioned INCLUDING DEFAULTS)")
+    op.execute("INSERT INTO logs SELECT * FROM logs_partitioned ORDER BY id")
+    op.execute("ALTER SEQUENCE logs_id_seq OWNED BY logs.id")
+    op.execute("DROP TABLE logs_partitioned")
+
+    op.alter_column('logs', 'created_at', nullable=True, server_default=sa.text('now()'))
+    op.create_primary_key('logs_pkey', 'logs', ['id'])
+    op.create_index(op.f('ix_logs_id'), 'logs', ['id'], unique=False)
+    op.create_index(op.f('ix_logs_log_hash'), 'logs', ['log_hash'], unique=True)
+    op.create_index(op.f('ix_logs_previous_log_hash'), 'logs', ['previous_log_hash'], unique=True)
+    op.create_index(op.f('ix_logs_verdict'), 'logs', ['verdict'], unique=False)
@@ -0,0 +1,46 @@
+"""Create log anchors table
+
+Revision ID: c3e8a1f5b7d2
+Revises: 9b1f3c7d2e4a
+Create Date: 2026-10-19 14:03:27.530912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3e8a1f5b7d2'
+down_revision: Union[str, None] = '9b1f3c7d2e4a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('log_anchors',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('first_log_id', sa.Integer(), nullable=False),
+    sa.Column('last_log_id', sa.Integer(), nullable=False),
+    sa.Column('leaf_count', sa.Integer(), nullable=False),
+    sa.Column('merkle_root', sa.String(), nullable=False),
+    sa.Column('anchor_hash', sa.String(), nullable=False),
+    sa.Column('previous_anchor_hash', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_log_anchors_id'), 'log_anchors', ['id'], unique=False)
+    op.create_index(op.f('ix_log_anchors_first_log_id'), 'log_anchors', ['first_log_id'], unique=True)
+    op.create_index(op.f('ix_log_anchors_last_log_id'), 'log_anchors', ['last_log_id'], unique=True)
+    op.create_index(op.f('ix_log_anchors_anchor_hash'), 'log_anchors', ['anchor_hash'], unique=True)
+    op.create_index(op.f('ix_log_anchors_previous_anchor_hash'), 'log_anchors', ['previous_anchor_hash'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_log_anchors_previous_anchor_hash'), table_name='log_anchors')
+    op.drop_index(op.f('ix_log_anchors_anchor_hash'), table_name='log_anchors')
+    op.drop_index(op.f('ix_log_anchors_last_log_id'), table_name='log_anchors')
+    op.drop_index(op.f('ix_log_anchors_first_log_id'), table_name='log_anchors')
+    op.drop_index(op.f('ix_log_anchors_id'), table_name='log_anchors')
+    op.drop_table('log_anchors')
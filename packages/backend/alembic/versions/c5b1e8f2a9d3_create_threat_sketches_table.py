@@ -0,0 +1,33 @@
+"""Create threat sketches table
+
+Revision ID: c5b1e8f2a9d3
+Revises: a7e3c9d1f4b6
+Create Date: 2026-10-20 00:31:08.947215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5b1e8f2a9d3'
+down_revision: Union[str, None] = 'a7e3c9d1f4b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('threat_sketches',
+    sa.Column('window_start', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('threat_type', sa.String(), nullable=False),
+    sa.Column('field', sa.String(), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('window_start', 'threat_type', 'field')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('threat_sketches')
@@ -0,0 +1,39 @@
+"""Create analytics rollups table
+
+Revision ID: d2f6b8a3c1e7
+Revises: b8d3f1a6c4e2
+Create Date: 2026-10-19 21:42:37.205814
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2f6b8a3c1e7'
+down_revision: Union[str, None] = 'b8d3f1a6c4e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing logs are rolled up afterwards with POST /analytics/rollups/backfill.
+    op.create_table('analytics_rollups',
+    sa.Column('bucket_size', sa.String(), nullable=False),
+    sa.Column('bucket_start', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('verdict', sa.String(), nullable=False),
+    sa.Column('request_count', sa.BigInteger(), nullable=False),
+    sa.Column('cache_hits', sa.BigInteger(), nullable=False),
+    sa.Column('frozen_threats', sa.BigInteger(), nullable=False),
+    sa.Column('prompt_injections', sa.BigInteger(), nullable=False),
+    sa.Column('policy_failures', sa.BigInteger(), nullable=False),
+    sa.Column('possible_hallucinations', sa.BigInteger(), nullable=False),
+    sa.Column('claims_contradicted', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('bucket_size', 'bucket_start', 'verdict')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('analytics_rollups')
@@ -0,0 +1,41 @@
+"""Create background jobs table
+
+Revision ID: d9a3e6b1c7f4
+Revises: f2c7a9e4b8d1
+Create Date: 2026-10-19 15:02:41.810362
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9a3e6b1c7f4'
+down_revision: Union[str, None] = 'f2c7a9e4b8d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('background_jobs',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('params', sa.JSON(), nullable=False),
+    sa.Column('result', sa.JSON(), nullable=True),
+    sa.Column('message', sa.Text(), nullable=True),
+    sa.Column('progress', sa.BigInteger(), nullable=False),
+    sa.Column('total', sa.BigInteger(), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('heartbeat_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_background_jobs_kind'), 'background_jobs', ['kind'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_background_jobs_kind'), table_name='background_jobs')
+    op.drop_table('background_jobs')
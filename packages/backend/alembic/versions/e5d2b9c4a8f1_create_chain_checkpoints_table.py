@@ -0,0 +1,38 @@
+"""Create chain checkpoints table
+
+Revision ID: e5d2b9c4a8f1
+Revises: c3e8a1f5b7d2
+Create Date: 2026-10-19 16:41:05.274388
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5d2b9c4a8f1'
+down_revision: Union[str, None] = 'c3e8a1f5b7d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('chain_checkpoints',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('last_log_id', sa.Integer(), nullable=False),
+    sa.Column('last_log_hash', sa.String(), nullable=False),
+    sa.Column('logs_verified', sa.BigInteger(), nullable=False),
+    sa.Column('signature', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_chain_checkpoints_id'), 'chain_checkpoints', ['id'], unique=False)
+    op.create_index(op.f('ix_chain_checkpoints_last_log_id'), 'chain_checkpoints', ['last_log_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_chain_checkpoints_last_log_id'), table_name='chain_checkpoints')
+    op.drop_index(op.f('ix_chain_checkpoints_id'), table_name='chain_checkpoints')
+    op.drop_table('chain_checkpoints')
@@ -0,0 +1,41 @@
+"""Create auth revocations table
+
+Revision ID: e9c4a2d7b5f1
+Revises: c5b1e8f2a9d3
+Create Date: 2026-10-20 01:12:44.305118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e9c4a2d7b5f1'
+down_revision: Union[str, None] = 'c5b1e8f2a9d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('auth_revocations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('jti', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_auth_revocations_id'), 'auth_revocations', ['id'], unique=False)
+    op.create_index(op.f('ix_auth_revocations_user_id'), 'auth_revocations', ['user_id'], unique=False)
+    op.create_index(op.f('ix_auth_revocations_jti'), 'auth_revocations', ['jti'], unique=False)
+    op.create_index(op.f('ix_auth_revocations_expires_at'), 'auth_revocations', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_auth_revocations_expires_at'), table_name='auth_revocations')
+    op.drop_index(op.f('ix_auth_revocations_jti'), table_name='auth_revocations')
+    op.drop_index(op.f('ix_auth_revocations_user_id'), table_name='auth_revocations')
+    op.drop_index(op.f('ix_auth_revocations_id'), table_name='auth_revocations')
+    op.drop_table('auth_revocations')
@@ -0,0 +1,29 @@
+"""Add unfrozen by to frozen threats
+
+Revision ID: f2c7a9e4b8d1
+Revises: b6f1d8e3a2c7
+Create Date: 2026-10-19 14:12:05.204713
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c7a9e4b8d1'
+down_revision: Union[str, None] = 'b6f1d8e3a2c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('frozen_threats', sa.Column('unfrozen_by_user_id', sa.Integer(), nullable=True))
+    op.add_column('frozen_threats', sa.Column('unfrozen_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('frozen_threats') as batch_op:
+        batch_op.drop_column('unfrozen_at')
+        batch_op.drop_column('unfrozen_by_user_id')
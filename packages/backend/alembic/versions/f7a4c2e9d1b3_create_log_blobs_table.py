@@ -0,0 +1,33 @@
+"""Create log blobs table
+
+Revision ID: f7a4c2e9d1b3
+Revises: e5d2b9c4a8f1
+Create Date: 2026-10-19 18:22:49.603517
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7a4c2e9d1b3'
+down_revision: Union[str, None] = 'e5d2b9c4a8f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('log_blobs',
+    sa.Column('hash', sa.String(length=64), nullable=False),
+    sa.Column('codec', sa.String(), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('hash')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('log_blobs')
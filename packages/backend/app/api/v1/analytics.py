@@ -1,11 +1,20 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, Field
 
 
-from . import deps 
-from app.crud import crud_analytics
-from app.schemas.user import User 
+from . import deps
+from app.core.config import settings
+from app.crud import crud_analytics, crud_sketch
+from app.db.session import AsyncSessionLocal
+from app.models.user import User
+from app.services.admission import admission_controller
+from app.services.analytics_backfill import rollup_backfiller
+from app.services.live_metrics import live_broadcaster, live_metrics
+from app.services.threat_sketches import threat_sketch_tracker
 
 class AnalyticsSummaryResponse(BaseModel):
     total_requests: int = Field(..., example=150)
@@ -13,6 +22,90 @@ class AnalyticsSummaryResponse(BaseModel):
     allowed_requests: int = Field(..., example=138)
     block_rate_percentage: float = Field(..., example=8.0)
 
+
+class TimeseriesPoint(BaseModel):
+    bucket_start: datetime
+    verdicts: Dict[str, int] = Field(..., example={"ALLOWED": 138, "BLOCKED": 12})
+    request_count: int = Field(..., example=150)
+    cache_hits: int = Field(..., example=40)
+    frozen_threats: int = Field(..., example=3)
+    prompt_injections: int = Field(..., example=9)
+    policy_failures: int = Field(..., example=2)
+    possible_hallucinations: int = Field(..., example=5)
+    claims_contradicted: int = Field(..., example=1)
+
+
+class TimeseriesResponse(BaseModel):
+    bucket: str = Field(..., example="hour")
+    start: datetime
+    end: datetime
+    points: List[TimeseriesPoint]
+
+
+class StageLatency(BaseModel):
+    count: int = Field(..., example=1200)
+    mean_ms: float = Field(..., example=640.2)
+    p50_ms: float = Field(..., example=512.0)
+    p95_ms: float = Field(..., example=1480.5)
+    p99_ms: float = Field(..., example=2210.3)
+    max_ms: float = Field(..., example=3105.9)
+
+
+class StageLatencyResponse(BaseModel):
+    start: datetime
+    end: datetime
+    relative_accuracy: float = Field(..., example=0.01)
+    stages: Dict[str, StageLatency]
+
+
+class TopSource(BaseModel):
+    value: str = Field(..., example="203.0.113.7")
+    count: int = Field(..., example=412)
+
+
+class TopSourcesResponse(BaseModel):
+    threat_type: str = Field(..., example="blocked")
+    field: str = Field(..., example="source_ip")
+    start: datetime
+    end: datetime
+    total: int = Field(..., example=9_812)
+    error_bound: float = Field(..., example=13.0, description="Counts may be overestimated by up to this much.")
+    sources: List[TopSource]
+
+
+class DistinctSourcesResponse(BaseModel):
+    threat_type: str = Field(..., example="blocked")
+    field: str = Field(..., example="user_id")
+    start: datetime
+    end: datetime
+    distinct: int = Field(..., example=37)
+    relative_error: float = Field(..., example=0.016)
+
+
+class RollupBackfillJobResponse(BaseModel):
+    id: str
+    status: str = Field(..., example="running")
+    logs_processed: int = Field(..., example=1_250_000)
+    since: datetime | None = None
+    until: datetime | None = None
+    rebuilt_from: datetime | None = None
+    rebuilt_until: datetime | None = None
+    message: str | None = None
+    started_at: float
+    finished_at: float | None = None
+
+    class Config:
+        from_attributes = True
+
+
+class AdmissionStatsResponse(BaseModel):
+    limit: int = Field(..., example=48, description="Gateway requests this worker lets in flight.")
+    in_flight: int = Field(..., example=45)
+    queued: Dict[str, int] = Field(..., example={"tenant": 3, "batch": 12, "best_effort": 0})
+    throughput_per_second: float = Field(..., example=3.9)
+    latency_seconds: Optional[float] = Field(None, example=7.2)
+    shed: Dict[str, int] = Field(..., example={"queue_full:best_effort": 120, "queue_delay:batch": 4})
+
 router = APIRouter()
 
 @router.get(
@@ -20,15 +113,266 @@ router = APIRouter()
     response_model=AnalyticsSummaryResponse,
     tags=["Analytics"]
 )
-def get_summary(
-    db: Session = Depends(deps.get_db),
+async def get_summary(
+    db: AsyncSession = Depends(deps.get_async_db),
     current_user: User = Depends(deps.get_current_user) # Secure this endpoint
 ):
     """
     Retrieves a summary of gateway analytics.
-    
+
     Provides key metrics like total requests, blocked requests, and block rate,
     calculated from the immutable log data. This endpoint requires authentication.
     """
-    summary_data = crud_analytics.get_analytics_summary(db=db)
-    return AnalyticsSummaryResponse(**summary_data)
\ No newline at end of file
+    summary_data = await crud_analytics.get_analytics_summary(db=db)
+    return AnalyticsSummaryResponse(**summary_data)
+
+
+@router.get(
+    "/analytics/timeseries",
+    response_model=TimeseriesResponse,
+    tags=["Analytics"]
+)
+async def get_timeseries(
+    bucket: Literal["minute", "hour", "day"] = "hour",
+    start: datetime | None = None,
+    end: datetime | None = None,
+    verdict: str | None = None,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Request counts and critic outcomes per minute, hour or day, read from the
+    analytics rollups. `end` defaults to now and `start` to 24 hours before
+    it; timestamps without a timezone are taken as UTC.
+    """
+    end = crud_analytics.as_utc(end) if end else datetime.now(timezone.utc)
+    start = crud_analytics.as_utc(start) if start else end - timedelta(days=1)
+    if start >= end:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="`start` must be before `end`.")
+    points = (end - crud_analytics.bucket_start(start, bucket)) / crud_analytics.TIMESERIES_BUCKETS[bucket]
+    if points > settings.ANALYTICS_TIMESERIES_MAX_POINTS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"The range spans over {settings.ANALYTICS_TIMESERIES_MAX_POINTS} {bucket} buckets; use a larger bucket or a shorter range.",
+        )
+    series = await crud_analytics.get_timeseries(db, bucket=bucket, start=start, end=end, verdict=verdict)
+    return TimeseriesResponse(bucket=bucket, start=start, end=end, points=series)
+
+
+@router.get(
+    "/analytics/latency",
+    response_model=StageLatencyResponse,
+    tags=["Analytics"]
+)
+async def get_stage_latency(
+    start: datetime | None = None,
+    end: datetime | None = None,
+    stage: List[str] | None = Query(None, description="Only these stages (repeatable); all by default."),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    p50/p95/p99 latency per gateway stage over a time window, to the minute.
+    Merged from the per-minute and per-hour DDSketch rollups, so every
+    percentile is within ANALYTICS_LATENCY_SKETCH_ACCURACY of the exact value
+    without reading a single log. `end` defaults to now and `start` to an hour
+    before it. `total` covers each request up to its log append.
+    """
+    end = crud_analytics.as_utc(end) if end else datetime.now(timezone.utc)
+    start = crud_analytics.as_utc(start) if start else end - timedelta(hours=1)
+    if start >= end:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="`start` must be before `end`.")
+    sketches = await crud_analytics.get_stage_latency(db, start=start, end=end, stages=stage)
+    return StageLatencyResponse(
+        start=start,
+        end=end,
+        relative_accuracy=settings.ANALYTICS_LATENCY_SKETCH_ACCURACY,
+        stages={
+            name: StageLatency(
+                count=sketch.count,
+                mean_ms=sketch.mean,
+                p50_ms=sketch.quantile(0.5),
+                p95_ms=sketch.quantile(0.95),
+                p99_ms=sketch.quantile(0.99),
+                max_ms=sketch.max,
+            )
+            for name, sketch in sorted(sketches.items()) if sketch.count
+        },
+    )
+
+
+def _sketch_window(start: datetime | None, end: datetime | None):
+    # Defaults to today (UTC) so far.
+    end = crud_analytics.as_utc(end) if end else datetime.now(timezone.utc)
+    start = crud_analytics.as_utc(start) if start else crud_analytics.bucket_start(end, "day")
+    if start >= end:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="`start` must be before `end`.")
+    return start, end
+
+
+@router.get(
+    "/analytics/threats/types",
+    response_model=List[str],
+    tags=["Analytics"]
+)
+async def list_threat_types(
+    start: datetime | None = None,
+    end: datetime | None = None,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    The threat types with recorded sources in the window (default: today,
+    UTC): "all", "blocked", "attack:<attack type>", "policy_violation" and
+    "possible_hallucination". Attack types are instruction_hijacking,
+    prompt_leaking, malicious_role_playing, code_injection, other or unknown.
+    """
+    start, end = _sketch_window(start, end)
+    return await crud_sketch.list_threat_types(db, start=crud_analytics.bucket_start(start, "hour"), end=end)
+
+
+@router.get(
+    "/analytics/threats/top-sources",
+    response_model=TopSourcesResponse,
+    tags=["Analytics"]
+)
+async def get_top_sources(
+    threat_type: str = "blocked",
+    field: Literal["source_ip", "user_id"] = "source_ip",
+    k: int = Query(10, ge=1),
+    start: datetime | None = None,
+    end: datetime | None = None,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    The heaviest client IPs or users among requests of one threat type, e.g.
+    the top attacking IPs today. Read from the hourly Count-Min sketches:
+    counts never undercount, and overcount by at most `error_bound`. The
+    window is widened to whole hours; `k` is capped at THREAT_SKETCH_TOP_K.
+    """
+    start, end = _sketch_window(start, end)
+    sketch = await threat_sketch_tracker.query(db, start=start, end=end, threat_type=threat_type, field=field)
+    return TopSourcesResponse(
+        threat_type=threat_type,
+        field=field,
+        start=start,
+        end=end,
+        total=sketch.cms.total,
+        error_bound=round(sketch.cms.error_bound, 2),
+        sources=[TopSource(value=value, count=count) for value, count in sketch.top.ranked()[:k]],
+    )
+
+
+@router.get(
+    "/analytics/threats/distinct-sources",
+    response_model=DistinctSourcesResponse,
+    tags=["Analytics"]
+)
+async def get_distinct_sources(
+    threat_type: str = "blocked",
+    field: Literal["source_ip", "user_id"] = "user_id",
+    start: datetime | None = None,
+    end: datetime | None = None,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    How many distinct client IPs or users sent requests of one threat type,
+    e.g. distinct users blocked today. Estimated from the hourly HyperLogLogs,
+    within `relative_error` (one standard error). The window is widened to
+    whole hours.
+    """
+    start, end = _sketch_window(start, end)
+    sketch = await threat_sketch_tracker.query(db, start=start, end=end, threat_type=threat_type, field=field)
+    return DistinctSourcesResponse(
+        threat_type=threat_type,
+        field=field,
+        start=start,
+        end=end,
+        distinct=sketch.hll.estimate(),
+        relative_error=round(sketch.hll.relative_error, 4),
+    )
+
+
+@router.post(
+    "/analytics/rollups/backfill",
+    response_model=RollupBackfillJobResponse,
+    status_code=202,
+    tags=["Analytics"]
+)
+async def start_rollup_backfill(
+    since: datetime | None = None,
+    until: datetime | None = None,
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Rebuilds the analytics rollups from the logs in the background, e.g. for
+    logs written before rollups existed. Covers every closed hour from `since`
+    (default: the oldest log) up to `until` (default: the current hour).
+    """
+    return RollupBackfillJobResponse.model_validate(await rollup_backfiller.start_job(since=since, until=until))
+
+
+@router.get(
+    "/analytics/rollups/backfill/{job_id}",
+    response_model=RollupBackfillJobResponse,
+    tags=["Analytics"]
+)
+def get_rollup_backfill(
+    job_id: str,
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Reports the progress or result of a rollup backfill.
+    """
+    job = rollup_backfiller.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Backfill job {job_id} not found.")
+    return RollupBackfillJobResponse.model_validate(job)
+
+
+@router.get("/analytics/admission", response_model=AdmissionStatsResponse, tags=["Analytics"])
+async def get_admission_stats(current_user: User = Depends(deps.get_current_user)):
+    """
+    This worker's gateway admission state: the adaptive in-flight limit, the
+    queues by priority, and how many requests were shed and why.
+    """
+    return admission_controller.stats()
+
+
+@router.websocket("/analytics/live")
+async def live_analytics(websocket: WebSocket, token: str = Query(...)):
+    """
+    Pushes per-second gateway counters and stage latencies, summed over every
+    worker on this host, from in-memory ring buffers; no database reads after
+    the login check. Browsers cannot set headers on a WebSocket, so the access
+    token goes in the `token` query parameter.
+
+    The first message is a snapshot of the last LIVE_ANALYTICS_SNAPSHOT_SECONDS
+    seconds; then every tick sends a delta with the seconds completed since.
+    Each second is `{"t": epoch, "c": {counter: n}, "l": {stage: [calls, mean ms]}}`
+    with zero counters and idle stages left out.
+    """
+    try:
+        async with AsyncSessionLocal() as db:
+            await deps.get_user_from_token(db, token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    queue = live_broadcaster.subscribe()
+    try:
+        end = live_broadcaster.next_second
+        await websocket.send_json({
+            "type": "snapshot",
+            "tick_seconds": live_broadcaster.tick,
+            "seconds": live_metrics.read(end - settings.LIVE_ANALYTICS_SNAPSHOT_SECONDS, end),
+        })
+        while True:
+            await websocket.send_json(await queue.get())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        live_broadcaster.unsubscribe(queue)
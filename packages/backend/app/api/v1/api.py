@@ -4,9 +4,13 @@ from . import logs
 from . import auth
 from . import gateway
 from . import analytics 
+from . import threats
+from . import api_keys
 
 api_router = APIRouter()
 api_router.include_router(gateway.router, tags=["Gateway V2"])
 api_router.include_router(auth.router, tags=["Authentication"])
 api_router.include_router(logs.router, prefix="/logs", tags=["Logs"])
-api_router.include_router(analytics.router) 
\ No newline at end of file
+api_router.include_router(analytics.router) 
+api_router.include_router(threats.router, prefix="/threats", tags=["Threats"])
+api_router.include_router(api_keys.router, prefix="/api-keys", tags=["API Keys"])
\ No newline at end of file
@@ -0,0 +1,97 @@
+from datetime import datetime
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import deps
+from app.crud import crud_api_key
+from app.models.api_key import API_KEY_SCOPES
+from app.models.user import User
+from app.services.api_keys import api_key_authenticator
+
+
+class ApiKeyCreate(BaseModel):
+    name: str = Field(..., min_length=1, max_length=100, example="log-shipper")
+    scopes: List[str] = Field(..., min_length=1, example=["logs:write"])
+    rate_limit_per_minute: int | None = Field(None, ge=1, example=600)
+
+
+class ApiKeyResponse(BaseModel):
+    id: int
+    name: str
+    prefix: str
+    scopes: List[str]
+    rate_limit_per_minute: int | None = None
+    is_active: bool
+    created_at: datetime | None = None
+    last_used_at: datetime | None = None
+
+    class Config:
+        from_attributes = True
+
+
+class ApiKeyCreated(ApiKeyResponse):
+    key: str = Field(..., description="The API key. It is only shown once.")
+
+
+router = APIRouter()
+
+@router.post("/", response_model=ApiKeyCreated, status_code=status.HTTP_201_CREATED)
+async def create_api_key(
+    key_in: ApiKeyCreate,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Creates an API key for a machine client, acting as the current user.
+    Send it in the X-API-Key header.
+    """
+    unknown = sorted(set(key_in.scopes) - set(API_KEY_SCOPES))
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown scopes: {', '.join(unknown)}. Valid scopes: {', '.join(API_KEY_SCOPES)}.",
+        )
+    db_key, api_key = await crud_api_key.create_api_key(
+        db,
+        user_id=current_user.id,
+        name=key_in.name,
+        scopes=sorted(set(key_in.scopes)),
+        rate_limit_per_minute=key_in.rate_limit_per_minute,
+    )
+    # Usable on this worker at once; the others pick it up on their next refresh.
+    await api_key_authenticator.refresh()
+    return ApiKeyCreated(**ApiKeyResponse.model_validate(db_key).model_dump(), key=api_key)
+
+
+@router.get("/", response_model=List[ApiKeyResponse])
+async def list_api_keys(
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Lists the current user's API keys, newest first.
+    """
+    return await crud_api_key.list_api_keys(db, user_id=current_user.id)
+
+
+@router.delete("/{key_id}", response_model=ApiKeyResponse)
+async def revoke_api_key(
+    key_id: int,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Revokes one of the current user's API keys.
+    """
+    db_key = await crud_api_key.get_api_key(db, key_id=key_id)
+    if not db_key or db_key.user_id != current_user.id:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"API key with ID {key_id} not found."
+        )
+    db_key = await crud_api_key.revoke_api_key(db, api_key=db_key)
+    await api_key_authenticator.refresh()
+    return db_key
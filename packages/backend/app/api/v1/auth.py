@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 
 from app.crud import crud_user
@@ -9,42 +11,109 @@ from app.models.token import Token
 from app.schemas.user import User as SQLAlchemyUser
 from app.api.v1 import deps
 from app.core import security
+from app.services.login_throttle import login_throttle
+from app.services.password_hasher import PasswordHasherSaturated, password_hasher
+from app.services.principal_cache import principal_cache
 
 
 router = APIRouter()
 
+
+def _hasher_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many sign-ins in progress. Please try again shortly.",
+        headers={"Retry-After": "1"},
+    )
+
+
 @router.post("/signup", response_model=PydanticUser, status_code=status.HTTP_201_CREATED)
-def register_user(
+async def register_user(
     *,
-    db: Session = Depends(deps.get_db),
+    db: AsyncSession = Depends(deps.get_async_db),
     user_in: UserCreate,
 ) -> SQLAlchemyUser:
-    user = crud_user.get_user_by_email(db, email=user_in.email)
+    user = await crud_user.get_user_by_email(db, email=user_in.email)
     if user:
         raise HTTPException(
             status_code=400,
             detail="A user with this email already exists in the system.",
         )
-    user = crud_user.create_user(db=db, obj_in=user_in)
+    # bcrypt is deliberately slow; keep it off the event loop and the shared thread pool.
+    try:
+        hashed_password = await password_hasher.hash(user_in.password)
+    except PasswordHasherSaturated:
+        raise _hasher_busy()
+    user = await crud_user.create_user(db=db, obj_in=user_in, hashed_password=hashed_password)
     return user
 
 
 @router.post("/login", response_model=Token)
-def login_for_access_token(
-    db: Session = Depends(deps.get_db), form_data: OAuth2PasswordRequestForm = Depends()
+async def login_for_access_token(
+    http_request: Request,
+    db: AsyncSession = Depends(deps.get_async_db),
+    form_data: OAuth2PasswordRequestForm = Depends(),
 ):
-    user = crud_user.get_user_by_email(db, email=form_data.username)
-    if not user or not security.verify_password(
-        form_data.password, user.hashed_password
-    ):
+    ip = deps.client_ip(http_request)
+    retry_after = login_throttle.retry_after(form_data.username, ip)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed login attempts. Please try again later.",
+            headers={"Retry-After": str(int(retry_after) + 1)},
+        )
+
+    user = await crud_user.get_user_by_email(db, email=form_data.username)
+    verified, new_hash = False, None
+    if user:
+        try:
+            verified, new_hash = await password_hasher.verify(form_data.password, user.hashed_password)
+        except PasswordHasherSaturated:
+            raise _hasher_busy()
+    if not verified:
+        login_throttle.record_failure(form_data.username, ip)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
+
+    login_throttle.reset(form_data.username)
+    if new_hash:
+        # The stored hash predates the current bcrypt cost; upgrade it while we have the password.
+        await crud_user.update_password_hash(db, user=user, hashed_password=new_hash)
     access_token = security.create_access_token(subject=user.id)
     return {
         "access_token": access_token,
         "token_type": "bearer",
-    }
\ No newline at end of file
+    }
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: PydanticUser = Depends(deps.get_current_user),
+    token: str = Depends(deps.reusable_oauth2),
+) -> None:
+    """Revokes the bearer token the request was made with."""
+    token_data = deps.decode_token(token)
+    if token_data.jti is None:
+        raise HTTPException(status_code=400, detail="This token cannot be revoked; it expires on its own.")
+    if token_data.exp is None:
+        # A revocation is kept until the token expires, so one without an expiry cannot be tracked.
+        raise HTTPException(status_code=400, detail="This token has no expiry and cannot be revoked.")
+    expires_at = datetime.fromtimestamp(token_data.exp, timezone.utc)
+    await principal_cache.revoke_token(db, user_id=current_user.id, jti=token_data.jti, expires_at=expires_at)
+
+
+@router.post("/deactivate", status_code=status.HTTP_204_NO_CONTENT)
+async def deactivate_account(
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: PydanticUser = Depends(deps.get_current_user),
+) -> None:
+    """
+    Deactivates the caller's own account. Their tokens and API keys stop
+    working in this worker at once, and in the others on their next sync.
+    """
+    user = await crud_user.get_user(db, user_id=current_user.id)
+    await principal_cache.set_user_active(db, user=user, is_active=False)
@@ -1,21 +1,29 @@
-from typing import Generator
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
+from datetime import datetime, timezone
+from typing import AsyncGenerator, Generator, Optional
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import APIKeyHeader, OAuth2PasswordBearer
 from jose import jwt
 from pydantic import ValidationError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # --- CORRECTED, SPECIFIC IMPORTS ---
 from app.core import security
 from app.core.config import settings
-from app.db.session import SessionLocal
+from app.db.session import AsyncSessionLocal, SessionLocal
 from app.crud import crud_user
 from app.models.token import TokenPayload
-from app.schemas.user import User  
+from app.models.user import User
+from app.services.api_keys import ApiKeyPrincipal, api_key_authenticator
+from app.services.principal_cache import principal_cache, token_id
+from app.services.rate_limiter import RateLimitExceeded, rate_limiter
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/login"
 )
+optional_oauth2 = OAuth2PasswordBearer(
+    tokenUrl=f"{settings.API_V1_STR}/login", auto_error=False
+)
+api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
 def get_db() -> Generator:
     try:
@@ -24,9 +32,14 @@ def get_db() -> Generator:
     finally:
         db.close()
 
-def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(reusable_oauth2)
-) -> User:  # <-- Now we can just use 'User'
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async database sessions need the asyncpg (PostgreSQL) or aiosqlite (SQLite) driver.")
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def decode_token(token: str) -> TokenPayload:
+    """Verifies a bearer token's signature and expiry and returns its claims."""
     try:
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
@@ -38,10 +51,145 @@ def get_current_user(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
-    
-   
-    user = db.query(User).filter(User.id == token_data.sub).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found.")
-    
-    return user
\ No newline at end of file
+    if token_data.sub is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Could not validate credentials",
+        )
+    return token_data
+
+
+async def get_user_from_token(db: AsyncSession, token: str) -> User:
+    """
+    Resolves a bearer token to its user. Shared by `get_current_user` and the
+    WebSocket endpoints, which cannot use the OAuth2 header dependency.
+    Principals come from the principal cache when the same token was seen recently.
+    """
+    token_data = decode_token(token)
+    await principal_cache.maybe_sync(db)
+    if principal_cache.is_revoked(token_data.jti):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Token has been revoked",
+        )
+
+    key = (token_data.sub, token_id(token, token_data.jti))
+    principal = principal_cache.get(key)
+    if principal is None:
+        user = await crud_user.get_user(db, user_id=token_data.sub)
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found.")
+        principal = User.model_validate(user)
+        expires_at = datetime.fromtimestamp(token_data.exp, timezone.utc) if token_data.exp else None
+        principal_cache.put(key, principal, expires_at)
+
+    if not principal.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return principal
+
+
+async def get_current_user(
+    db: AsyncSession = Depends(get_async_db), token: str = Depends(reusable_oauth2)
+) -> User:
+    return await get_user_from_token(db, token)
+
+
+def get_api_key(api_key: str | None = Depends(api_key_header)) -> ApiKeyPrincipal | None:
+    """
+    The API key sent in the X-API-Key header, if any, after checking it
+    against the in-memory key table and counting the request against the
+    key's rate limit.
+    """
+    if not api_key:
+        return None
+    principal = api_key_authenticator.authenticate(api_key)
+    if principal is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid API key",
+            headers={"WWW-Authenticate": "ApiKey"},
+        )
+    requests_per_minute = principal.rate_limit_per_minute or settings.RATE_LIMIT_API_KEY_REQUESTS_PER_MINUTE
+    if settings.RATE_LIMIT_ENABLED and requests_per_minute:
+        try:
+            rate_limiter.check_requests(f"req:api_key:{principal.id}", requests_per_minute)
+        except RateLimitExceeded as e:
+            raise rate_limit_error(e)
+    return principal
+
+
+def rate_limit_error(e: RateLimitExceeded) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail=e.detail, headers=e.headers)
+
+
+def require_scope(principal: ApiKeyPrincipal, scope: str) -> None:
+    if scope not in principal.scopes:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"This API key does not have the '{scope}' scope",
+        )
+
+
+def get_current_user_or_api_key(scope: str):
+    """
+    A dependency for endpoints open to both users and machine clients:
+    resolves an API key with `scope` to its owner, and otherwise requires a
+    bearer token like `get_current_user`.
+    """
+    async def dependency(
+        api_key: ApiKeyPrincipal | None = Depends(get_api_key),
+        db: AsyncSession = Depends(get_async_db),
+        token: str | None = Depends(optional_oauth2),
+    ) -> User:
+        if api_key is not None:
+            require_scope(api_key, scope)
+            return api_key.user
+        if not token:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Not authenticated",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        return await get_user_from_token(db, token)
+    return dependency
+
+
+async def get_optional_user_id(
+    token: str | None = Depends(optional_oauth2),
+    api_key: ApiKeyPrincipal | None = Depends(get_api_key),
+    db: AsyncSession = Depends(get_async_db),
+) -> str | None:
+    """
+    The user ID of a valid API key with the "gateway" scope or bearer token,
+    if one was sent; None otherwise.
+    Bearer tokens are only checked for their signature and against the revoked
+    tokens in the principal cache, without a user lookup, for endpoints that
+    stay open to anonymous callers but record who called them (and admit them
+    with tenant priority). A revoked token counts as anonymous.
+    """
+    if api_key is not None:
+        require_scope(api_key, "gateway")
+        return str(api_key.user_id)
+    if not token:
+        return None
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[security.ALGORITHM])
+        token_data = TokenPayload(**payload)
+    except (jwt.JWTError, ValidationError):
+        return None
+    await principal_cache.maybe_sync(db)
+    if principal_cache.is_revoked(token_data.jti):
+        return None
+    return str(token_data.sub) if token_data.sub is not None else None
+
+
+def client_ip(http_request: Request) -> Optional[str]:
+    """
+    The caller's IP: the first X-Forwarded-For hop if TRUST_FORWARDED_FOR is
+    set, otherwise the address of the connection.
+    """
+    if settings.TRUST_FORWARDED_FOR:
+        forwarded = http_request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return http_request.client.host if http_request.client else None
@@ -5,14 +5,18 @@
 
 
 import asyncio
-from fastapi import APIRouter, HTTPException, status, Depends
+import hashlib
+import math
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request, Response, status, Depends
 from pydantic import BaseModel, Field
 from typing import List, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from . import deps
 # from app.schemas.user import User
+from app.core.config import settings
 from app.crud import crud_log
-from app.models import log as log_models
+from app.schemas import log as log_schemas
 
 from app.services.ai_critics import (
     check_prompt_injection,
@@ -24,10 +28,17 @@ from app.services.ai_critics import (
     PolicyCriticResponse,
     ClaimExtractorResponse,
     VerificationResponse,
-    HallucinationVerdict
+    HallucinationVerdict,
+    get_model_async,
 )
 from app.services.tools import web_search
-from app.services.ai_critics import model as primary_llm
+from app import services
+from app.services.embedding_service import embedding_service
+from app.services.live_metrics import StageTimings, live_metrics
+from app.services.log_sequencer import log_sequencer
+from app.services.api_keys import ApiKeyPrincipal
+from app.services.rate_limiter import RateLimitExceeded, RateLimitTicket, rate_limiter
+from app.services.admission import Overloaded, Priority, admission_controller
 
 
 class GatewayRequest(BaseModel):
@@ -48,91 +59,354 @@ class GatewayResponse(BaseModel):
     outbound_check: PolicyCriticResponse
     hallucination_check: HallucinationVerdict
     rumor_verifier: Optional[RumorVerifierResult] = None
+    cached: bool = Field(default=False, description="True if this response was served from the semantic cache.")
 
 class UnprotectedResponse(BaseModel):
     llm_response: str
 
+# --- Semantic Cache & Threat Freezing Helpers ---
+
+def policy_namespace(policy: str) -> str:
+    """
+    Maps a policy to its cache namespace, so an answer cached under one policy
+    is never served under another.
+    """
+    return hashlib.sha256(policy.encode("utf-8")).hexdigest()[:32]
+
+
+async def embed_prompt(prompt: str) -> Optional[List[float]]:
+    """
+    Embeds a prompt for the semantic cache and threat index. Fails open
+    (returns None) so an embedding outage only disables those two stages.
+    """
+    if not (settings.SEMANTIC_CACHE_ENABLED or settings.THREAT_FREEZING_ENABLED):
+        return None
+    try:
+        return await embedding_service.embed(prompt)
+    except Exception as e:
+        print(f"Error embedding prompt: {e}")
+        return None
+
+
+def llm_token_usage(llm_response) -> Optional[dict]:
+    """
+    The primary LLM's token counts, for models that report them (LangChain's
+    `usage_metadata`); None otherwise.
+    """
+    usage = getattr(llm_response, "usage_metadata", None)
+    if not usage:
+        return None
+    return {key: usage[key] for key in ("input_tokens", "output_tokens", "total_tokens") if key in usage}
+
+
+def admit_request(
+    http_request: Request,
+    response: Response,
+    prompt: str,
+    user_id: Optional[str],
+    api_key: Optional[ApiKeyPrincipal],
+) -> Optional[RateLimitTicket]:
+    """
+    Charges a gateway request to its API key, user and IP rate limits and its
+    tenant's LLM token quota, and sets the rate-limit headers. Raises 429
+    when a limit is exceeded.
+    """
+    if not settings.RATE_LIMIT_ENABLED:
+        return None
+    callers = []
+    if api_key is not None:
+        callers.append(("api_key", str(api_key.id)))
+    if user_id:
+        callers.append(("user", user_id))
+    ip = deps.client_ip(http_request)
+    if ip:
+        callers.append(("ip", ip))
+    try:
+        ticket = rate_limiter.admit(callers, prompt)
+    except RateLimitExceeded as e:
+        raise deps.rate_limit_error(e)
+    response.headers.update(ticket.headers)
+    return ticket
+
+
+def request_priority(
+    http_request: Request,
+    user_id: Optional[str] = Depends(deps.get_optional_user_id),
+    api_key: Optional[ApiKeyPrincipal] = Depends(deps.get_api_key),
+) -> Priority:
+    """
+    The admission class of a /nova-chat request. Authenticated callers can
+    mark work that can wait with `X-Request-Priority: batch`.
+    """
+    if user_id is None and api_key is None:
+        return Priority.BEST_EFFORT
+    if http_request.headers.get("X-Request-Priority", "").lower() == "batch":
+        return Priority.BATCH
+    return Priority.TENANT
+
+
+@asynccontextmanager
+async def admission_slot(priority: Priority):
+    """Holds an admission slot for the enclosed block, or raises 503 when the request is shed."""
+    if not settings.ADMISSION_CONTROL_ENABLED:
+        yield
+        return
+    try:
+        async with admission_controller.admit(priority):
+            yield
+    except Overloaded as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"The gateway is overloaded ({e.reason}). Please retry later.",
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+
+
+async def admit_protected(priority: Priority = Depends(request_priority)):
+    async with admission_slot(priority):
+        yield
+
+
+async def admit_unprotected():
+    async with admission_slot(Priority.BEST_EFFORT):
+        yield
+
+
+def settle_llm_tokens(ticket: Optional[RateLimitTicket], token_usage: Optional[dict]) -> None:
+    """Corrects the request's estimated LLM tokens with the usage the model reported."""
+    if ticket is not None:
+        rate_limiter.settle(ticket, token_usage.get("total_tokens") if token_usage else None)
+
+
+def gateway_response_from_log(cached_log) -> GatewayResponse:
+    """
+    Rebuilds the full GatewayResponse, including every critic verdict, from a
+    logged transaction.
+    """
+    data = cached_log.response_data
+    rumor_verifier = data.get("rumor_verifier")
+    return GatewayResponse(
+        llm_response=data["llm_response"],
+        inbound_check=SecurityCriticResponse(**data["inbound_check"]),
+        outbound_check=PolicyCriticResponse(**data["outbound_check"]),
+        hallucination_check=HallucinationVerdict(**data["hallucination_check"]),
+        rumor_verifier=RumorVerifierResult(**rumor_verifier) if rumor_verifier else None,
+        cached=True,
+    )
+
+
+async def lookup_cached_log(db: AsyncSession, request: GatewayRequest, prompt_embedding: List[float]):
+    """
+    Looks the prompt up in the semantic cache. Cache entries point at the
+    immutable log of the original transaction, which holds the response and
+    all of its verdicts.
+    """
+    if not settings.SEMANTIC_CACHE_ENABLED:
+        return None
+    try:
+        entry_id = await services.get_cache_manager().check_cache(
+            prompt_embedding,
+            similarity_threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+            namespace=policy_namespace(request.policy),
+        )
+        if entry_id is None:
+            return None
+        cached_log = await crud_log.get_log_async(db=db, log_id=int(entry_id))
+        if not cached_log or cached_log.verdict != "ALLOWED":
+            return None
+        request_data, response_data = await crud_log.get_log_payloads_async(db=db, log=cached_log)
+        # Defence in depth: the namespace is a hash, so also compare the policy text.
+        if request_data.get("policy") != request.policy:
+            return None
+        return log_schemas.Log.model_validate(cached_log).model_copy(
+            update={"request_data": request_data, "response_data": response_data}
+        )
+    except Exception as e:
+        print(f"Error during semantic cache lookup: {e}")
+        return None
+
+
+async def check_frozen_threats(prompt_embedding: List[float]):
+    """
+    Checks the prompt against the index of frozen attacks. Fails open.
+    """
+    if not settings.THREAT_FREEZING_ENABLED:
+        return None
+    try:
+        return await services.get_threat_manager().check_threat(prompt_embedding)
+    except Exception as e:
+        print(f"Error during frozen threat lookup: {e}")
+        return None
+
+
 # --- API Router ---
 router = APIRouter()
 
 @router.post("/unprotected-chat", response_model=UnprotectedResponse, tags=["Gateway V2"])
 async def unprotected_chat(
     request: GatewayRequest,
+    http_request: Request,
+    response: Response,
+    user_id: Optional[str] = Depends(deps.get_optional_user_id),
+    api_key: Optional[ApiKeyPrincipal] = Depends(deps.get_api_key),
+    _: None = Depends(admit_unprotected),
 ):
     """
     An unprotected endpoint that directly calls the primary LLM without any security checks.
+    It is still rate limited, and admitted after every other class under load.
     """
+    primary_llm = await get_model_async()
     if not primary_llm:
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Primary Language Model client not configured.")
+    ticket = admit_request(http_request, response, request.prompt, user_id, api_key)
 
     try:
         llm_response = await primary_llm.ainvoke(request.prompt)
         llm_text_response = llm_response.content
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error calling primary LLM: {e}")
+    settle_llm_tokens(ticket, llm_token_usage(llm_response))
 
     return UnprotectedResponse(llm_response=llm_text_response)
 
 @router.post("/nova-chat", response_model=GatewayResponse, tags=["Gateway V2"])
 async def nova_chat(
     request: GatewayRequest,
-    db: Session = Depends(deps.get_db)
+    background_tasks: BackgroundTasks,
+    http_request: Request,
+    response: Response,
+    db: AsyncSession = Depends(deps.get_async_db),
+    user_id: Optional[str] = Depends(deps.get_optional_user_id),
+    api_key: Optional[ApiKeyPrincipal] = Depends(deps.get_api_key),
+    _: None = Depends(admit_protected),
     # current_user: User = Depends(deps.get_current_user)
 ):
     """
     The main V2 endpoint for the Nova gateway.
     This is the master orchestration pipeline:
+    0. Frozen Threat & Semantic Cache Lookups (vector index only, no LLM calls)
     1. V1 Inbound Security Check (Prompt Injection)
     2. Core LLM Call
     3. V2 Parallel Critics (Claim Extraction & Hallucination Check)
     4. V2 Web Search & Verification (if a claim is found)
     5. V1 Outbound Policy Check
     6. V2 Immutable Logging of all results
+    7. Semantic Cache Population (in the background, after the response is sent)
     """
+    primary_llm = await get_model_async()
     if not primary_llm:
         raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Primary Language Model client not configured.")
+    # Charged the prompt's estimated LLM tokens now, settled once the model reports its usage.
+    ticket = admit_request(http_request, response, request.prompt, user_id, api_key)
+
+    # Per-stage timings go into the log (`timings_ms`) and the live analytics.
+    timings = StageTimings(live_metrics)
+    # Who sent the request, for the threat-source analytics and security briefings.
+    request_data = {
+        "prompt": request.prompt,
+        "policy": request.policy,
+        "source_ip": deps.client_ip(http_request),
+        "user_id": user_id,
+    }
+
+    # --- 0. Frozen Threat & Semantic Cache Lookups ---
+    with timings.stage("embedding"):
+        prompt_embedding = await embed_prompt(request.prompt)
+    if prompt_embedding is not None:
+        with timings.stage("threat_lookup"):
+            threat_match = await check_frozen_threats(prompt_embedding)
+        if threat_match:
+            reason = f"Matched a frozen {threat_match.attack_type} attack (threat {threat_match.threat_id})."
+            log_entry = log_schemas.LogCreate(
+                request_data=request_data,
+                response_data={
+                    "detail": f"Prompt rejected. Reason: {reason}",
+                    "frozen_threat_id": threat_match.threat_id,
+                    "attack_type": threat_match.attack_type,
+                    "similarity": threat_match.similarity,
+                    "timings_ms": timings.finish(),
+                },
+                verdict="BLOCKED"
+            )
+            await log_sequencer.append(log_entry)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Prompt rejected. Reason: {reason}"
+            )
+
+        with timings.stage("cache_lookup"):
+            cached_log = await lookup_cached_log(db, request, prompt_embedding)
+        if cached_log:
+            # The original's timings and token counts describe that request, not this one.
+            response_data = {key: value for key, value in cached_log.response_data.items() if key != "token_usage"}
+            log_entry = log_schemas.LogCreate(
+                request_data=request_data,
+                response_data={**response_data, "cached_from_log_id": cached_log.id, "timings_ms": timings.finish()},
+                verdict="ALLOWED"
+            )
+            await log_sequencer.append(log_entry)
+            settle_llm_tokens(ticket, {"total_tokens": 0})
+            return gateway_response_from_log(cached_log)
 
     # --- 1. Inbound Check: Prompt Injection ---
-    security_check = await check_prompt_injection(request.prompt)
+    with timings.stage("inbound_check"):
+        security_check = await check_prompt_injection(request.prompt)
     if security_check.verdict == "MALICIOUS":
-        log_entry = log_models.LogCreate(
-            request_data={"prompt": request.prompt, "policy": request.policy},
-            response_data={"detail": f"Prompt rejected. Reason: {security_check.reasoning}"},
+        log_entry = log_schemas.LogCreate(
+            request_data=request_data,
+            response_data={
+                "detail": f"Prompt rejected. Reason: {security_check.reasoning}",
+                "attack_type": security_check.attack_type,
+                "timings_ms": timings.finish(),
+            },
             verdict="BLOCKED"
         )
-        crud_log.create_log(db=db, log_in=log_entry)
+        await log_sequencer.append(log_entry)
+        # Freeze the attack so near-identical variants are blocked without an LLM call.
+        if prompt_embedding is not None and settings.THREAT_FREEZING_ENABLED:
+            await services.get_threat_manager().add_to_threat_db(
+                prompt_embedding,
+                attack_type=security_check.attack_type,
+                reasoning=security_check.reasoning,
+                prompt=request.prompt,
+            )
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Prompt rejected. Reason: {security_check.reasoning}"
         )
 
     try:
-        llm_response = await primary_llm.ainvoke(request.prompt)
+        with timings.stage("llm"):
+            llm_response = await primary_llm.ainvoke(request.prompt)
         llm_text_response = llm_response.content
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error calling primary LLM: {e}")
+    token_usage = llm_token_usage(llm_response)
+    settle_llm_tokens(ticket, token_usage)
 
     # --- 3. Parallel Critics: Run Claim Extractor & Hallucination Check concurrently ---
     claim_extraction_task = extract_verifiable_claim(llm_text_response)
     hallucination_check_task = check_for_hallucinations(llm_text_response)
 
     claim_response, hallucination_verdict = await asyncio.gather(
-        claim_extraction_task,
-        hallucination_check_task
+        timings.run("claim_extraction", claim_extraction_task),
+        timings.run("hallucination_check", hallucination_check_task)
     )
 
     # --- 4. Web Search & Verification Flow (The "Chain of Investigation") ---
     rumor_verifier_data = None
     if claim_response and claim_response.claim:
         claim_text = claim_response.claim
-        source_snippets = await web_search(claim_text)
+        with timings.stage("web_search"):
+            source_snippets = await web_search(claim_text)
         
         if source_snippets:
             # Call the real Synthesizing Verifier agent
-            verification_result = await verify_claim_with_sources(
-                claim=claim_text, 
-                sources=source_snippets
-            )
+            with timings.stage("claim_verification"):
+                verification_result = await verify_claim_with_sources(
+                    claim=claim_text, 
+                    sources=source_snippets
+                )
             
             # Populate our response model with the verified, structured data
             rumor_verifier_data = RumorVerifierResult(
@@ -143,26 +417,39 @@ async def nova_chat(
             )
 
     # --- 5. Outbound Check: Custom Policy ---
-    policy_check = await check_custom_policy(text_to_check=llm_text_response, policy=request.policy)
+    with timings.stage("policy_check"):
+        policy_check = await check_custom_policy(text_to_check=llm_text_response, policy=request.policy)
     final_response_text = llm_text_response
     if policy_check.verdict == "FAIL":
         final_response_text = f"[POLICY WARNING: {policy_check.reasoning}] {llm_text_response}"
 
     # --- 6. Final Immutable Logging ---
-    log_entry = log_models.LogCreate(
-        request_data={"prompt": request.prompt, "policy": request.policy},
+    log_entry = log_schemas.LogCreate(
+        request_data=request_data,
         response_data={
             "llm_response": final_response_text,
             "inbound_check": security_check.model_dump(),
             "outbound_check": policy_check.model_dump(),
             "hallucination_check": hallucination_verdict.model_dump(),
             "rumor_verifier": rumor_verifier_data.model_dump() if rumor_verifier_data else None,
+            "timings_ms": timings.finish(),
+            "token_usage": token_usage,
         },
         verdict="ALLOWED"
     )
-    crud_log.create_log(db=db, log_in=log_entry)
+    with timings.stage("logging"):
+        db_log = await log_sequencer.append(log_entry)
+
+    # --- 7. Populate the Semantic Cache once the response has been sent ---
+    if prompt_embedding is not None:
+        background_tasks.add_task(
+            services.get_cache_manager().add_to_cache,
+            str(db_log.id),
+            prompt_embedding,
+            namespace=policy_namespace(request.policy),
+        )
 
-    # --- 7. Send Final Enriched Response ---
+    # --- 8. Send Final Enriched Response ---
     return GatewayResponse(
         llm_response=final_response_text,
         inbound_check=security_check,
@@ -1,13 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from pydantic import BaseModel, Field
 
-from app.crud import crud_log
+from app.crud import crud_anchor, crud_archive, crud_blob, crud_log
 from . import deps
-from app.models import log as log_models
 from app.schemas import log as log_schemas
-from app.schemas.user import User
-from app.core.security import calculate_log_hash
+from app.models.user import User
+from app.core.config import settings
+from app.core.merkle import inclusion_proof, verify_inclusion
+from app.services.chain_verifier import chain_verifier
+from app.services.log_export import EXPORT_FORMATS, ExportFilters, arrow_available, stream_arrow, stream_ndjson
+from app.services.log_sequencer import log_sequencer
 
 # This response model is good, no changes needed
 class VerificationResponse(BaseModel):
@@ -16,6 +23,60 @@ class VerificationResponse(BaseModel):
     logs_checked: int = Field(..., example=150)
 
 
+class VerificationJobResponse(BaseModel):
+    id: str
+    full: bool
+    status: str = Field(..., example="running")
+    logs_checked: int = Field(..., example=1_250_000)
+    logs_total: int | None = Field(None, example=310_000_000)
+    message: str | None = None
+    broken_log_id: int | None = None
+    started_at: float
+    finished_at: float | None = None
+
+    class Config:
+        from_attributes = True
+
+
+class AnchorResponse(BaseModel):
+    id: int
+    first_log_id: int
+    last_log_id: int
+    leaf_count: int
+    merkle_root: str
+    anchor_hash: str
+    previous_anchor_hash: str | None = None
+    created_at: datetime | None = None
+
+    class Config:
+        from_attributes = True
+
+
+class InclusionProofResponse(BaseModel):
+    """Everything needed to check one log entry against its anchor, without other rows."""
+    log_id: int
+    log_hash: str
+    previous_log_hash: str | None = None
+    leaf_index: int = Field(..., example=41)
+    tree_size: int = Field(..., example=1024)
+    audit_path: List[str] = Field(..., description="Sibling hashes from the leaf up to the Merkle root.")
+    anchor: AnchorResponse
+
+
+class ProofVerificationRequest(BaseModel):
+    log_hash: str
+    leaf_index: int
+    tree_size: int
+    audit_path: List[str]
+    merkle_root: str
+    anchor_id: int | None = Field(None, description="If set, the root must also match this stored anchor.")
+
+
+class ProofVerificationResponse(BaseModel):
+    valid: bool
+    message: str = Field(..., example="Log entry is included in the anchored batch.")
+
+
 router = APIRouter()
 
 @router.get(
@@ -33,66 +94,179 @@ def get_audit_report(
     """
     log_entry = crud_log.get_log(db=db, log_id=log_id)
     if not log_entry:
+        archive = crud_archive.get_archive_for_log(db=db, log_id=log_id)
+        if archive:
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail=f"Log with ID {log_id} was archived to {archive.file_name}."
+            )
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Log with ID {log_id} not found."
         )
-    return log_entry
+    # Large payload strings are stored as blob references; return the full content.
+    try:
+        request_data, response_data = crud_log.get_log_payloads(db=db, log=log_entry)
+    except crud_blob.BlobIntegrityError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"The payload of log {log_id} cannot be restored: {e}"
+        )
+    report = log_schemas.Log.model_validate(log_entry)
+    return report.model_copy(update={"request_data": request_data, "response_data": response_data})
+
+
+@router.get("/export", tags=["Logs"])
+def export_logs(
+    format: str = Query("ndjson", pattern="^(ndjson|arrow)$"),
+    start_id: int | None = None,
+    end_id: int | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    verdict: str | None = None,
+    chunk_size: int = Query(settings.LOG_EXPORT_CHUNK_SIZE, ge=1, le=100_000),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Streams a filtered range of the audit log as NDJSON or an Arrow IPC stream.
+    Rows are read through a server-side cursor and written chunk by chunk, so
+    memory use does not depend on the size of the range. Every chunk carries
+    its chain hashes and can be verified by the receiver on its own.
+    """
+    if format == "arrow" and not arrow_available():
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail="Arrow export requires the 'pyarrow' package.")
+
+    filters = ExportFilters(start_id=start_id, end_id=end_id, since=since, until=until, verdict=verdict)
+    stream = stream_arrow if format == "arrow" else stream_ndjson
+    extension = "arrows" if format == "arrow" else "ndjson"
+    return StreamingResponse(
+        stream(filters, chunk_size),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="nova-logs.{extension}"'},
+    )
+
+
+@router.get("/{log_id}/proof", response_model=InclusionProofResponse, tags=["Logs"])
+def get_inclusion_proof(
+    log_id: int,
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Returns an O(log n) Merkle inclusion proof for a single log entry.
+    """
+    anchor = crud_anchor.get_anchor_for_log(db=db, log_id=log_id)
+    if not anchor:
+        if not crud_log.get_log(db=db, log_id=log_id):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Log with ID {log_id} not found.")
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Log with ID {log_id} has not been anchored yet.")
+
+    batch = crud_anchor.get_batch_log_hashes(db=db, anchor=anchor)
+    if len(batch) != anchor.leaf_count:
+        # Part of the batch has been archived; a proof over the rest would not match the anchored root.
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail=f"Log with ID {log_id} is in an anchor batch that has been archived; no inclusion proof can be built.",
+        )
+    ids = [row.id for row in batch]
+    if log_id not in ids:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Log with ID {log_id} not found.")
+    leaf_index = ids.index(log_id)
+    log_entry = crud_log.get_log(db=db, log_id=log_id)
+
+    return InclusionProofResponse(
+        log_id=log_id,
+        log_hash=log_entry.log_hash,
+        previous_log_hash=log_entry.previous_log_hash,
+        leaf_index=leaf_index,
+        tree_size=len(batch),
+        audit_path=inclusion_proof([row.log_hash for row in batch], leaf_index),
+        anchor=AnchorResponse.model_validate(anchor),
+    )
+
+
+@router.post("/verify-proof/", response_model=ProofVerificationResponse, tags=["Logs"])
+def verify_inclusion_proof(
+    proof: ProofVerificationRequest,
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Checks an inclusion proof. Reads at most the one anchor row named in the request.
+    """
+    if proof.anchor_id is not None:
+        anchor = crud_anchor.get_anchor(db=db, anchor_id=proof.anchor_id)
+        if not anchor or anchor.merkle_root != proof.merkle_root or anchor.leaf_count != proof.tree_size:
+            return ProofVerificationResponse(valid=False, message="Merkle root does not match the stored anchor.")
+
+    if not verify_inclusion(proof.log_hash, proof.leaf_index, proof.tree_size, proof.audit_path, proof.merkle_root):
+        return ProofVerificationResponse(valid=False, message="Inclusion proof is invalid.")
+    return ProofVerificationResponse(valid=True, message="Log entry is included in the anchored batch.")
+
+
+@router.get("/anchors/", response_model=List[AnchorResponse], tags=["Logs"])
+def list_log_anchors(
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Lists Merkle anchors in chain order.
+    """
+    return crud_anchor.list_anchors(db=db, skip=skip, limit=limit)
 
 
 @router.post("/", response_model=log_schemas.Log, status_code=201)
-def create_log_entry(
+async def create_log_entry(
     *,
-    db: Session = Depends(deps.get_db),
     log_in: log_schemas.LogCreate,  # EDIT: Use Pydantic schema for input
-    current_user: User = Depends(deps.get_current_user) # EDIT: Secure this endpoint
+    current_user: User = Depends(deps.get_current_user_or_api_key("logs:write")) # EDIT: Secure this endpoint
 ):
     """
     Create a new cryptographically-chained log entry.
+    Machine clients can authenticate with an API key with the "logs:write" scope.
     """
-    return crud_log.create_log(db=db, log_in=log_in)
+    return await log_sequencer.append(log_in)
 
 
 @router.get("/verify-chain/", response_model=VerificationResponse)
 def verify_log_chain(
-    db: Session = Depends(deps.get_db),
+    full: bool = False,
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Verifies the integrity of the immutable log chain.
+    By default only logs appended since the last signed checkpoint are checked;
+    pass `full=true` to re-verify from the genesis block. For large tables, prefer
+    the background job at POST /verify-chain/jobs/.
+    """
+    outcome = chain_verifier.verify(full=full)
+    if not outcome.ok:
+        raise HTTPException(status_code=500, detail=outcome.message)
+    return VerificationResponse(status="ok", message=outcome.message, logs_checked=outcome.logs_checked)
+
+
+@router.post("/verify-chain/jobs/", response_model=VerificationJobResponse, status_code=202)
+async def start_verification_job(
+    full: bool = False,
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Starts a chain verification in the background. Poll the returned job for progress.
+    """
+    return VerificationJobResponse.model_validate(await chain_verifier.start_job(full=full))
+
+
+@router.get("/verify-chain/jobs/{job_id}", response_model=VerificationJobResponse)
+def get_verification_job(
+    job_id: str,
     current_user: User = Depends(deps.get_current_user)
 ):
     """
-    Verifies the integrity of the entire immutable log chain.
-    """
-    # EDIT: Use an iterator instead of .all() to save memory
-    logs_query = db.query(log_models.Log).order_by(log_models.Log.id.asc())
-    
-    previous_log_hash = None
-    logs_checked = 0
-    is_first_log = True
-
-    for current_log in logs_query:
-        if is_first_log:
-            # Check the genesis block (first log)
-            if current_log.previous_log_hash is not None:
-                raise HTTPException(status_code=500, detail="Chain broken: Genesis block has a previous_log_hash.")
-            is_first_log = False
-        else:
-            # Check the chain link
-            if previous_log_hash != current_log.previous_log_hash:
-                raise HTTPException(status_code=500, detail=f"Chain link broken at log ID {current_log.id}.")
-
-        # Verify the data integrity of the current log
-        log_data_for_hash = {
-            "request_data": current_log.request_data,
-            "response_data": current_log.response_data,
-            "verdict": current_log.verdict
-        }
-        recalculated_hash = calculate_log_hash(log_data_for_hash, current_log.previous_log_hash)
-        if recalculated_hash != current_log.log_hash:
-            raise HTTPException(status_code=500, detail=f"Data tampering detected at log ID {current_log.id}.")
-
-        previous_log_hash = current_log.log_hash
-        logs_checked += 1
-    
-    if logs_checked == 0:
-        return VerificationResponse(status="ok", message="Log chain is empty.", logs_checked=0)
-
-    return VerificationResponse(status="ok", message="Log chain integrity verified.", logs_checked=logs_checked)
\ No newline at end of file
+    Reports the progress or result of a background chain verification.
+    """
+    job = chain_verifier.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Verification job {job_id} not found.")
+    return VerificationJobResponse.model_validate(job)
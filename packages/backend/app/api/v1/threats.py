@@ -0,0 +1,59 @@
+from datetime import datetime
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from pydantic import BaseModel, Field
+
+from . import deps
+from app.crud import crud_threat
+from app.models.user import User
+from app import services
+
+class FrozenThreatResponse(BaseModel):
+    id: int
+    attack_type: str = Field(..., example="Instruction Hijacking")
+    reasoning: str | None = None
+    hit_count: int = Field(..., example=42)
+    first_seen: datetime | None = None
+    last_seen: datetime | None = None
+    is_active: bool
+    unfrozen_by_user_id: int | None = None
+    unfrozen_at: datetime | None = None
+
+    class Config:
+        from_attributes = True
+
+
+router = APIRouter()
+
+@router.get("/", response_model=List[FrozenThreatResponse], tags=["Threats"])
+def list_frozen_threats(
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(deps.get_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Lists frozen attack signatures, most recently seen first.
+    """
+    return crud_threat.list_threats(db=db, skip=skip, limit=limit)
+
+
+@router.post("/{threat_id}/unfreeze", response_model=FrozenThreatResponse, tags=["Threats"])
+async def unfreeze_threat(
+    threat_id: int,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Unfreezes an attack signature so matching prompts reach the security critic again.
+    The caller is recorded on the threat for the audit trail.
+    """
+    if not await services.get_threat_manager().unfreeze(threat_id, user_id=current_user.id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Frozen threat with ID {threat_id} not found."
+        )
+    return await crud_threat.get_threat_async(db=db, threat_id=threat_id)
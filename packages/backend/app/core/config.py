@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 # --- THIS IS THE FOOLPROOF PATH LOGIC ---
@@ -23,6 +24,13 @@ class Settings(BaseSettings):
 
     # Database settings
     DATABASE_URL: str
+    # Pool of the async (asyncpg) engine that serves request handlers and log writes.
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 10.0
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    # Prepared statements cached per connection; set 0 behind PgBouncer in transaction mode.
+    DB_STATEMENT_CACHE_SIZE: int = 500
 
     # Application settings
     PROJECT_NAME: str
@@ -35,5 +43,206 @@ class Settings(BaseSettings):
     # --- ADD THIS LINE ---
     USE_MOCK_SERVICES: bool = False
 
+    # --- Vertex AI Vector Search (real CacheManager) ---
+    # Left unset, the services switch falls back to the in-process cache.
+    GCP_PROJECT_ID: Optional[str] = None
+    GCP_REGION: Optional[str] = None
+    VECTOR_SEARCH_ENDPOINT_ID: Optional[str] = None
+    VECTOR_SEARCH_DEPLOYED_INDEX_ID: Optional[str] = None
+    # Index resource for upserts; defaults to the index behind VECTOR_SEARCH_DEPLOYED_INDEX_ID.
+    VECTOR_SEARCH_INDEX_ID: Optional[str] = None
+    VECTOR_SEARCH_TIMEOUT_SECONDS: float = 0.5  # Slower lookups count as a cache miss
+    VECTOR_SEARCH_MAX_BATCH_SIZE: int = 32
+    VECTOR_SEARCH_BATCH_WAIT_MS: float = 5.0
+    VECTOR_SEARCH_UPSERT_BATCH_SIZE: int = 100
+    VECTOR_SEARCH_UPSERT_FLUSH_SECONDS: float = 1.0
+    VECTOR_SEARCH_UPSERT_TIMEOUT_SECONDS: float = 10.0
+    VECTOR_SEARCH_THREADS: int = 8
+
+    # --- In-process Semantic Cache ---
+    SEMANTIC_CACHE_CAPACITY: int = 100_000
+    SEMANTIC_CACHE_EVICTION_POLICY: str = "lru"  # "lru" or "lfu"
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95
+    # Set a directory to snapshot the in-process cache to disk and warm-start from it.
+    SEMANTIC_CACHE_SNAPSHOT_DIR: Optional[str] = None
+    SEMANTIC_CACHE_SNAPSHOT_INTERVAL_SECONDS: float = 300.0
+    # "float32" (exact), or a compressed codec: "float16", "int8" or "pq" (product quantisation)
+    SEMANTIC_CACHE_STORAGE: str = "float32"
+    # Exact float32 vectors for re-ranking compressed matches are kept in a memory-mapped file here.
+    # Required for "int8" and "pq": without it the threshold would be applied to approximate
+    # scores, so prompts just either side of it would be served or missed on quantisation error.
+    SEMANTIC_CACHE_RERANK_DIR: Optional[str] = None
+    SEMANTIC_CACHE_RERANK_CANDIDATES: int = 32
+    SEMANTIC_CACHE_PQ_SUBSPACES: int = 96
+    SEMANTIC_CACHE_PQ_TRAIN_SIZE: int = 4096
+
+    # --- Embeddings ---
+    # "google" (Gemini API), "sentence-transformers" (local CPU model) or "hashing" (local stub)
+    EMBEDDING_BACKEND: str = "google"
+    EMBEDDING_MODEL: str = "models/text-embedding-004"
+    EMBEDDING_LOCAL_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBEDDING_DIM: int = 512  # Only used by the local hashing embedder
+    EMBEDDING_BATCH_SIZE: int = 32
+    EMBEDDING_BATCH_WAIT_MS: float = 5.0
+    EMBEDDING_CACHE_SIZE: int = 10_000
+
+    # --- Startup ---
+    # LangChain, the Gemini client and the embedder are loaded on first use.
+    # With pre-warm on, the app loads them, and builds the critic chains, in
+    # the background as it starts, so the first requests do not wait for them.
+    LLM_PREWARM: bool = True
+
+    # --- Background Jobs ---
+    # Chain verifications and rollup backfills report progress to the background_jobs
+    # table this often; a running job silent for BACKGROUND_JOB_STALE_SECONDS is taken
+    # to have died with its worker, and another can be started.
+    BACKGROUND_JOB_HEARTBEAT_SECONDS: float = 5.0
+    BACKGROUND_JOB_STALE_SECONDS: float = 60.0
+
+    # --- Immutable Log Chain ---
+    # Appends are group-committed: up to LOG_BATCH_SIZE entries per transaction.
+    LOG_BATCH_SIZE: int = 256
+    LOG_BATCH_WAIT_MS: float = 2.0
+    # Logs are sealed into Merkle anchors of LOG_ANCHOR_BATCH_SIZE entries (or fewer, once
+    # the oldest unanchored entry is LOG_ANCHOR_MAX_AGE_SECONDS old).
+    LOG_ANCHOR_ENABLED: bool = True
+    LOG_ANCHOR_BATCH_SIZE: int = 1024
+    LOG_ANCHOR_MAX_AGE_SECONDS: float = 60.0
+    LOG_ANCHOR_INTERVAL_SECONDS: float = 10.0
+    # Chain verification: ids per range, processes for multi-range runs, rows per cursor fetch.
+    LOG_VERIFY_CHUNK_SIZE: int = 1_000_000
+    LOG_VERIFY_WORKERS: int = 4
+    LOG_VERIFY_YIELD_PER: int = 5_000
+    # Payload strings of at least LOG_BLOB_MIN_BYTES are stored once, compressed, in log_blobs.
+    LOG_BLOBS_ENABLED: bool = True
+    LOG_BLOB_MIN_BYTES: int = 256
+    LOG_BLOB_ZSTD_LEVEL: int = 3
+    # Rows per chunk (and per server-side cursor fetch) in streaming exports.
+    LOG_EXPORT_CHUNK_SIZE: int = 1_000
+    # On PostgreSQL, logs are range-partitioned by created_at, one partition per "day" or "month",
+    # with LOG_PARTITION_PREMAKE future partitions created ahead of time.
+    LOG_PARTITION_INTERVAL: str = "month"
+    LOG_PARTITION_PREMAKE: int = 2
+    LOG_PARTITION_MAINTENANCE_INTERVAL_SECONDS: float = 3600.0
+    # Partitions older than LOG_RETENTION_DAYS move to gzipped NDJSON files in LOG_ARCHIVE_DIR.
+    # 0 keeps every log in the database.
+    LOG_RETENTION_DAYS: int = 0
+    LOG_ARCHIVE_DIR: str = "log_archives"
+
+    # --- Analytics ---
+    # Per-minute and per-hour counters, updated as logs are appended.
+    ANALYTICS_ROLLUPS_ENABLED: bool = True
+    ANALYTICS_TIMESERIES_MAX_POINTS: int = 10_000
+    # Relative error of the per-stage latency percentiles. Buckets written at
+    # another setting are skipped until the rollups are backfilled.
+    ANALYTICS_LATENCY_SKETCH_ACCURACY: float = 0.01
+
+    # --- Live Analytics ---
+    # Per-second counters and stage latencies, pushed to dashboards over the
+    # /analytics/live WebSocket every tick.
+    LIVE_ANALYTICS_WINDOW_SECONDS: int = 300
+    LIVE_ANALYTICS_TICK_SECONDS: float = 1.0
+    LIVE_ANALYTICS_SNAPSHOT_SECONDS: int = 60
+    # Workers on one host share their counters through this memory-mapped file
+    # (keep it on tmpfs). Empty keeps the counters per process.
+    LIVE_ANALYTICS_SHARED_FILE: str = "/dev/shm/nova-live-analytics"
+    LIVE_ANALYTICS_MAX_WORKERS: int = 64
+
+    # --- Threat Source Sketches ---
+    # Heavy hitters (Count-Min Sketch + top-k) and distinct counts (HyperLogLog)
+    # of client IPs and user IDs per threat type and hour.
+    THREAT_SKETCHES_ENABLED: bool = True
+    THREAT_SKETCH_FLUSH_INTERVAL_SECONDS: float = 10.0
+    THREAT_SKETCH_WIDTH: int = 2048
+    THREAT_SKETCH_DEPTH: int = 4
+    THREAT_SKETCH_TOP_K: int = 20
+    THREAT_SKETCH_HLL_PRECISION: int = 12
+    THREAT_SKETCH_RETENTION_DAYS: int = 90
+    # Take the client IP from the first X-Forwarded-For hop. Only enable behind
+    # a proxy that sets it, or clients can spoof their address.
+    TRUST_FORWARDED_FOR: bool = False
+
+    # --- Auth ---
+    # Authenticated users are cached per (user id, token id) for up to the TTL.
+    AUTH_PRINCIPAL_CACHE_TTL_SECONDS: float = 60.0
+    AUTH_PRINCIPAL_CACHE_SIZE: int = 10_000
+    # How often each worker picks up token revocations and user deactivations
+    # made by other workers.
+    AUTH_REVOCATION_SYNC_SECONDS: float = 5.0
+    # bcrypt cost. Stored hashes at another cost are rehashed on the next login.
+    AUTH_BCRYPT_ROUNDS: int = 12
+    # Password hashing runs in its own process pool (0 = one process per core).
+    # Requests beyond AUTH_HASH_QUEUE_LIMIT waiting hashes are rejected with 503.
+    AUTH_HASH_WORKERS: int = 0
+    AUTH_HASH_QUEUE_LIMIT: int = 64
+    # Failed logins allowed per account and per client IP within the window.
+    AUTH_LOGIN_MAX_FAILURES_PER_ACCOUNT: int = 5
+    AUTH_LOGIN_MAX_FAILURES_PER_IP: int = 50
+    AUTH_LOGIN_FAILURE_WINDOW_SECONDS: float = 300.0
+
+    # --- API Keys ---
+    # Each worker reloads changed API keys, and writes their last-used times,
+    # this often. Revoked keys keep working for up to this long on other workers.
+    # Per-key request limits are enforced with the gateway rate limits below.
+    API_KEY_REFRESH_SECONDS: float = 5.0
+
+    # --- Rate Limiting ---
+    # Token buckets per API key, user and client IP on the gateway, holding a
+    # minute's worth of each limit. 0 disables a limit. API keys use their own
+    # rate_limit_per_minute when set.
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_API_KEY_REQUESTS_PER_MINUTE: int = 600
+    RATE_LIMIT_USER_REQUESTS_PER_MINUTE: int = 120
+    RATE_LIMIT_IP_REQUESTS_PER_MINUTE: int = 60
+    RATE_LIMIT_API_KEY_LLM_TOKENS_PER_MINUTE: int = 200_000
+    RATE_LIMIT_USER_LLM_TOKENS_PER_MINUTE: int = 100_000
+    RATE_LIMIT_IP_LLM_TOKENS_PER_MINUTE: int = 20_000
+    # Sliding 24-hour LLM token quota per tenant (user, else IP).
+    RATE_LIMIT_LLM_TOKENS_PER_DAY: int = 2_000_000
+    # Charged up front on top of the prompt's estimated tokens, then corrected
+    # with the usage the model reports.
+    RATE_LIMIT_ESTIMATED_COMPLETION_TOKENS: int = 512
+    # "memory" keeps state per worker; "shared" keeps it in a memory-mapped
+    # table shared by the workers on one host (keep the file on tmpfs).
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_SHARED_FILE: str = "/dev/shm/nova-rate-limits"
+    RATE_LIMIT_SHARED_SLOTS: int = 65536
+
+    # --- Admission Control ---
+    # Bounds the gateway requests in flight at the smoothed completion rate
+    # times the target latency (at least MIN, at most MAX); the rest wait by
+    # priority (authenticated, then batch, then anonymous and /unprotected-chat)
+    # or are shed with a 503. Waiters are dropped once queueing delay has
+    # stayed above QUEUE_TARGET_MS for QUEUE_INTERVAL_MS.
+    ADMISSION_CONTROL_ENABLED: bool = True
+    ADMISSION_TARGET_LATENCY_SECONDS: float = 10.0
+    ADMISSION_MIN_LIMIT: int = 16
+    ADMISSION_MAX_LIMIT: int = 1024
+    ADMISSION_MAX_QUEUE: int = 256
+    ADMISSION_MAX_QUEUE_WAIT_SECONDS: float = 5.0
+    ADMISSION_QUEUE_TARGET_MS: float = 500.0
+    ADMISSION_QUEUE_INTERVAL_MS: float = 2000.0
+
+    # --- Dynamic Threat Freezing ---
+    THREAT_FREEZING_ENABLED: bool = True
+    THREAT_SIMILARITY_THRESHOLD: float = 0.92
+    THREAT_TTL_DAYS: int = 30
+    THREAT_SYNC_INTERVAL_SECONDS: float = 30.0
+    THREAT_INDEX_CAPACITY: int = 100_000
+
+    # --- Qdrant (HNSW) Semantic Cache ---
+    # Set QDRANT_URL for the docker-compose service, or QDRANT_PATH for embedded mode.
+    # Embedded mode (QDRANT_PATH, or ":memory:" when neither is set) scans every point
+    # on each query and ignores the HNSW settings below; they only apply to a server.
+    QDRANT_URL: Optional[str] = None
+    QDRANT_PATH: Optional[str] = None
+    QDRANT_COLLECTION: str = "semantic_cache"
+    QDRANT_DISTANCE: str = "cosine"  # "cosine", "dot", "euclid" or "manhattan"
+    QDRANT_HNSW_M: int = 16
+    QDRANT_HNSW_EF_CONSTRUCT: int = 128
+    QDRANT_HNSW_EF: int = 64
+    QDRANT_UPSERT_BATCH_SIZE: int = 256
+
 # Create the single, reusable instance of the settings.
 settings = Settings()
\ No newline at end of file
@@ -0,0 +1,115 @@
+import math
+from typing import Any, Dict, Optional
+
+# DDSketch (Masson, Rim & Lee, VLDB 2019): a mergeable quantile sketch with a
+# relative-error guarantee. Positive values fall into logarithmic bins
+# (gamma^(i-1), gamma^i], so any quantile it returns is within
+# `relative_accuracy` of the true value. Two sketches with the same accuracy
+# merge by adding their bin counts, which is what lets per-minute rollups be
+# combined into percentiles over any window.
+
+DEFAULT_MAX_BINS = 2048
+
+
+class DDSketch:
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = DEFAULT_MAX_BINS):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1.")
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0  # Values <= 0, e.g. a stage that took under a clock tick.
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def _index(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _collapse(self) -> None:
+        # Fold the lowest bins together; only the smallest quantiles lose accuracy.
+        indexes = sorted(self.bins)
+        excess = len(indexes) - self.max_bins
+        if excess > 0:
+            folded = sum(self.bins.pop(i) for i in indexes[:excess + 1])
+            self.bins[indexes[excess]] = folded
+
+    def add(self, value: float, count: int = 1) -> None:
+        if value > 0:
+            index = self._index(value)
+            self.bins[index] = self.bins.get(index, 0) + count
+            if len(self.bins) > self.max_bins:
+                self._collapse()
+        else:
+            self.zero_count += count
+        self.count += count
+        self.sum += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "DDSketch") -> None:
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracies.")
+        if not other.count:
+            return
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        if len(self.bins) > self.max_bins:
+            self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """The value at quantile `q` (0 to 1), or None for an empty sketch."""
+        if not 0 <= q <= 1:
+            raise ValueError("q must be between 0 and 1.")
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                # The midpoint of the bin, in relative terms.
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    # --- Serialisation ---
+
+    def to_dict(self) -> Dict[str, Any]:
+        """A compact JSON form: bin indexes and counts as two parallel lists."""
+        indexes = sorted(self.bins)
+        return {
+            "a": self.relative_accuracy,
+            "k": indexes,
+            "c": [self.bins[i] for i in indexes],
+            "z": self.zero_count,
+            "n": self.count,
+            "s": self.sum,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DDSketch":
+        sketch = cls(relative_accuracy=data["a"])
+        sketch.bins = dict(zip(data["k"], data["c"]))
+        sketch.zero_count = data["z"]
+        sketch.count = data["n"]
+        sketch.sum = data["s"]
+        sketch.min = data["min"]
+        sketch.max = data["max"]
+        return sketch
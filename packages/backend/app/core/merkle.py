@@ -0,0 +1,95 @@
+import hashlib
+from typing import List
+
+# Merkle trees over log hashes, following the RFC 6962 (Certificate
+# Transparency) construction. Leaves and interior nodes are hashed with
+# different prefixes so a leaf can never be passed off as a subtree.
+
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+
+def leaf_hash(log_hash: str) -> bytes:
+    """Hashes a log entry's hex `log_hash` into a Merkle leaf."""
+    return hashlib.sha256(LEAF_PREFIX + bytes.fromhex(log_hash)).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def _split_point(size: int) -> int:
+    """The largest power of two strictly smaller than `size`."""
+    return 1 << ((size - 1).bit_length() - 1)
+
+
+def _root(leaves: List[bytes]) -> bytes:
+    if len(leaves) == 1:
+        return leaves[0]
+    k = _split_point(len(leaves))
+    return node_hash(_root(leaves[:k]), _root(leaves[k:]))
+
+
+def merkle_root(log_hashes: List[str]) -> str:
+    """Returns the hex Merkle root of a non-empty list of log hashes, in chain order."""
+    if not log_hashes:
+        raise ValueError("Cannot compute the Merkle root of an empty batch.")
+    return _root([leaf_hash(h) for h in log_hashes]).hex()
+
+
+def inclusion_proof(log_hashes: List[str], index: int) -> List[str]:
+    """
+    Returns the audit path for the leaf at `index`: the hex sibling hashes from
+    the leaf up to the root, O(log n) of them.
+    """
+    if not 0 <= index < len(log_hashes):
+        raise IndexError(f"Leaf index {index} is outside a tree of size {len(log_hashes)}.")
+    leaves = [leaf_hash(h) for h in log_hashes]
+    path = []
+    while len(leaves) > 1:
+        k = _split_point(len(leaves))
+        if index < k:
+            path.append(_root(leaves[k:]))
+            leaves = leaves[:k]
+        else:
+            path.append(_root(leaves[:k]))
+            leaves, index = leaves[k:], index - k
+    # Built top-down; verifiers consume it bottom-up.
+    return [sibling.hex() for sibling in reversed(path)]
+
+
+def verify_inclusion(log_hash: str, index: int, tree_size: int, proof: List[str], root: str) -> bool:
+    """
+    Checks that `log_hash` is leaf `index` of the tree of `tree_size` leaves
+    with the given root, using only the audit path (RFC 9162, section 2.1.3.2).
+    """
+    if not 0 <= index < tree_size:
+        return False
+    try:
+        node = leaf_hash(log_hash)
+        siblings = [bytes.fromhex(sibling) for sibling in proof]
+        expected_root = bytes.fromhex(root)
+    except ValueError:
+        return False
+
+    fn, sn = index, tree_size - 1
+    for sibling in siblings:
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            node = node_hash(sibling, node)
+            if not fn & 1:
+                while fn and not fn & 1:
+                    fn >>= 1
+                    sn >>= 1
+        else:
+            node = node_hash(node, sibling)
+        fn >>= 1
+        sn >>= 1
+    return sn == 0 and node == expected_root
+
+
+def anchor_hash(merkle_root_hex: str, first_log_id: int, last_log_id: int, previous_anchor_hash: str | None) -> str:
+    """Chains an anchor to its predecessor: SHA-256 over the previous anchor hash, the range and the root."""
+    block = f"{previous_anchor_hash or ''}:{first_log_id}:{last_log_id}:{merkle_root_hex}".encode("utf-8")
+    return hashlib.sha256(block).hexdigest()
@@ -1,14 +1,25 @@
 import hashlib
+import hmac
 import json
+import secrets
+import uuid
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict
+from typing import Any, Dict, Tuple
 
 from jose import jwt
 from passlib.context import CryptContext
 
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Pinning min and max rounds to the configured cost makes `needs_update` flag
+# hashes made at any other cost, so they are upgraded on the next login.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.AUTH_BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.AUTH_BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.AUTH_BCRYPT_ROUNDS,
+)
 
 ALGORITHM = "HS256"
 
@@ -24,7 +35,8 @@ def create_access_token(subject: str | Any, expires_delta: timedelta | None = No
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
     
-    to_encode = {"exp": expire, "sub": str(subject)}
+    # `jti` identifies the token for revocation and the principal cache.
+    to_encode = {"exp": expire, "iat": datetime.now(timezone.utc), "sub": str(subject), "jti": uuid.uuid4().hex}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -36,6 +48,14 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, str | None]:
+    """
+    Verifies a plain password, and also returns a new hash if the stored one
+    uses an outdated scheme or cost (None otherwise).
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
 def get_password_hash(password: str) -> str:
     """
     Hashes a plain password.
@@ -43,6 +63,33 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+API_KEY_PREFIX = "nova"
+
+
+def generate_api_key() -> Tuple[str, str, str]:
+    """
+    Generates a new API key. Returns the key to hand out once, and its
+    public lookup prefix and secret.
+    """
+    prefix = secrets.token_hex(6)
+    secret = secrets.token_urlsafe(32)
+    return f"{API_KEY_PREFIX}_{prefix}_{secret}", prefix, secret
+
+
+def split_api_key(api_key: str) -> Tuple[str, str] | None:
+    """The (prefix, secret) of a well-formed API key; None otherwise."""
+    parts = api_key.split("_", 2)
+    if len(parts) != 3 or parts[0] != API_KEY_PREFIX:
+        return None
+    return parts[1], parts[2]
+
+
+def hash_api_key_secret(secret: str, salt: str) -> str:
+    """
+    The stored form of an API key's secret: HMAC-SHA256 keyed with the row's salt.
+    """
+    return hmac.new(salt.encode("utf-8"), secret.encode("utf-8"), hashlib.sha256).hexdigest()
+
 
 def calculate_log_hash(
     log_data: Dict[str, Any], previous_log_hash: str | None
@@ -69,4 +116,11 @@ def calculate_log_hash(
     
     block_to_hash = (previous_log_hash or "").encode('utf-8') + canonical_string
 
-    return hashlib.sha256(block_to_hash).hexdigest()
\ No newline at end of file
+    return hashlib.sha256(block_to_hash).hexdigest()
+
+def sign_chain_checkpoint(last_log_id: int, last_log_hash: str, logs_verified: int) -> str:
+    """
+    Returns the hex HMAC-SHA256 of a chain checkpoint, keyed with SECRET_KEY.
+    """
+    message = f"{last_log_id}:{last_log_hash}:{logs_verified}".encode('utf-8')
+    return hmac.new(settings.SECRET_KEY.encode('utf-8'), message, hashlib.sha256).hexdigest()
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import math
+import zlib
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# Mergeable streaming sketches for the threat-source analytics. Items are
+# hashed with BLAKE2b rather than Python's per-process randomised hash(), so
+# sketches built by different workers (or on different days) line up bucket
+# for bucket and merge by plain array arithmetic.
+
+
+def _hash64(item: str, salt: bytes = b"") -> int:
+    return int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=8, salt=salt).digest(), "big")
+
+
+class CountMinSketch:
+    """
+    Count-Min Sketch (Cormode & Muthukrishnan): `depth` rows of `width`
+    counters. An item's estimate is the minimum of its counters, which never
+    undercounts and overcounts by at most e/width * total with probability
+    1 - e^-depth. Sketches of the same shape merge by addition.
+    """
+    def __init__(self, width: int = 2048, depth: int = 4):
+        if not 1 <= depth <= 8:
+            raise ValueError("depth must be between 1 and 8.")
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total = 0
+
+    def _columns(self, item: str) -> np.ndarray:
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=8 * self.depth).digest()
+        return np.frombuffer(digest, dtype=">u8").astype(np.uint64) % np.uint64(self.width)
+
+    def add(self, item: str, count: int = 1) -> int:
+        """Counts `item` and returns its new estimate."""
+        columns = self._columns(item)
+        rows = np.arange(self.depth)
+        self.table[rows, columns] += count
+        self.total += count
+        return int(self.table[rows, columns].min())
+
+    def estimate(self, item: str) -> int:
+        return int(self.table[np.arange(self.depth), self._columns(item)].min())
+
+    @property
+    def error_bound(self) -> float:
+        """The additive overcount an estimate stays under with probability 1 - e^-depth."""
+        return math.e / self.width * self.total
+
+    def merge(self, other: "CountMinSketch") -> None:
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Cannot merge Count-Min Sketches of different shapes.")
+        self.table += other.table
+        self.total += other.total
+
+
+class TopK:
+    """
+    The `k` heaviest items seen, ranked by their Count-Min estimates. Holds
+    at most `k` candidates, so memory stays bounded whatever the stream.
+    """
+    def __init__(self, k: int = 20):
+        self.k = k
+        self.items: Dict[str, int] = {}
+
+    def offer(self, item: str, estimate: int) -> None:
+        if item in self.items or len(self.items) < self.k:
+            self.items[item] = estimate
+            return
+        weakest = min(self.items, key=self.items.get)
+        if estimate > self.items[weakest]:
+            del self.items[weakest]
+            self.items[item] = estimate
+
+    def ranked(self) -> List[Tuple[str, int]]:
+        return sorted(self.items.items(), key=lambda kv: (-kv[1], kv[0]))
+
+
+class HyperLogLog:
+    """
+    HyperLogLog (Flajolet et al.) with 2^precision one-byte registers: a
+    distinct count with a standard error of about 1.04 / sqrt(2^precision),
+    with linear counting for small cardinalities. Merges by register maximum.
+    """
+    def __init__(self, precision: int = 12):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16.")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, item: str) -> None:
+        value = _hash64(item, salt=b"hll")
+        index = value >> (64 - self.precision)
+        rest = value & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def estimate(self) -> int:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / float(np.sum(np.exp2(-self.registers.astype(np.float64))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(len(self.registers))
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLogs of different precisions.")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+
+class SourceSketch:
+    """
+    Everything kept about one stream of sources (e.g. the client IPs of one
+    threat type in one hour): a Count-Min Sketch with a top-k list for the
+    heavy hitters, and a HyperLogLog for the distinct count.
+    """
+    def __init__(self, width: int = 2048, depth: int = 4, k: int = 20, precision: int = 12):
+        self.cms = CountMinSketch(width, depth)
+        self.top = TopK(k)
+        self.hll = HyperLogLog(precision)
+
+    def add(self, item: str, count: int = 1) -> None:
+        self.top.offer(item, self.cms.add(item, count))
+        self.hll.add(item)
+
+    def merge(self, other: "SourceSketch") -> None:
+        self.cms.merge(other.cms)
+        self.hll.merge(other.hll)
+        # Re-rank the union of both candidate lists against the merged counts.
+        candidates = set(self.top.items) | set(other.top.items)
+        self.top.items = {}
+        for item in candidates:
+            self.top.offer(item, self.cms.estimate(item))
+
+    def to_bytes(self) -> bytes:
+        """A zlib-compressed JSON header, then the CMS table and HLL registers."""
+        header = json.dumps({
+            "w": self.cms.width,
+            "d": self.cms.depth,
+            "n": self.cms.total,
+            "k": self.top.k,
+            "p": self.hll.precision,
+            "top": self.top.ranked(),
+        }).encode("utf-8")
+        return zlib.compress(header + b"\n" + self.cms.table.astype("<i8").tobytes() + self.hll.registers.tobytes())
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SourceSketch":
+        raw = zlib.decompress(data)
+        header_end = raw.index(b"\n")
+        header = json.loads(raw[:header_end])
+        sketch = cls(header["w"], header["d"], header["k"], header["p"])
+        table_size = 8 * header["w"] * header["d"]
+        body = raw[header_end + 1:]
+        sketch.cms.table = np.frombuffer(body[:table_size], dtype="<i8").astype(np.int64).reshape(header["d"], header["w"])
+        sketch.cms.total = header["n"]
+        sketch.hll.registers = np.frombuffer(body[table_size:], dtype=np.uint8).copy()
+        sketch.top.items = {item: count for item, count in header["top"]}
+        return sketch
@@ -1,23 +1,226 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Tuple
+
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
-from app.schemas import log as log_schemas
+from app.core.config import settings
+from app.core.ddsketch import DDSketch
+from app.models import log as log_models
+from app.models.rollup import ROLLUP_COUNTERS, AnalyticsRollup, StageLatencyRollup
+
+# Bucket sizes stored in analytics_rollups, and those the time series can be read at.
+ROLLUP_BUCKETS = {"minute": timedelta(minutes=1), "hour": timedelta(hours=1)}
+TIMESERIES_BUCKETS = {**ROLLUP_BUCKETS, "day": timedelta(days=1)}
+
+RollupKey = Tuple[str, datetime, str]  # (bucket_size, bucket_start, verdict or stage)
+
+
+def as_utc(value: datetime) -> datetime:
+    # SQLite returns naive timestamps; they are stored in UTC.
+    return value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def bucket_start(moment: datetime, bucket_size: str) -> datetime:
+    """The start of the UTC minute, hour or day containing `moment`."""
+    moment = as_utc(moment).replace(second=0, microsecond=0)
+    if bucket_size == "minute":
+        return moment
+    moment = moment.replace(minute=0)
+    return moment if bucket_size == "hour" else moment.replace(hour=0)
+
+
+def log_counters(verdict: str, response_data: Dict[str, Any] | None) -> Dict[str, int]:
+    """
+    The counters one log adds to its buckets, read from the critic verdicts
+    the gateway stores in response_data.
+    """
+    data = response_data or {}
+
+    def critic(key: str) -> str | None:
+        value = data.get(key)
+        return value.get("verdict") if isinstance(value, dict) else None
+
+    frozen = "frozen_threat_id" in data
+    return {
+        "request_count": 1,
+        "cache_hits": int("cached_from_log_id" in data),
+        "frozen_threats": int(frozen),
+        # Every other block comes from the inbound prompt-injection check.
+        "prompt_injections": int(verdict == "BLOCKED" and not frozen),
+        "policy_failures": int(critic("outbound_check") == "FAIL"),
+        "possible_hallucinations": int(critic("hallucination_check") == "POSSIBLE_HALLUCINATION"),
+        "claims_contradicted": int(critic("rumor_verifier") == "CONTRADICTED"),
+    }
+
+
+def aggregate_rollups(
+    rows: Iterable[Tuple[datetime, str, Dict[str, Any]]],
+    into: Dict[RollupKey, Dict[str, int]] | None = None,
+) -> Dict[RollupKey, Dict[str, int]]:
+    """
+    Sums (created_at, verdict, response_data) rows into minute and hour
+    buckets, adding to `into` if given.
+    """
+    rollups = into if into is not None else {}
+    for created_at, verdict, response_data in rows:
+        counters = log_counters(verdict, response_data)
+        for bucket_size in ROLLUP_BUCKETS:
+            key = (bucket_size, bucket_start(created_at, bucket_size), verdict)
+            totals = rollups.get(key)
+            if totals is None:
+                totals = rollups[key] = dict.fromkeys(ROLLUP_COUNTERS, 0)
+            for name, value in counters.items():
+                totals[name] += value
+    return rollups
+
+
+def log_timings(response_data: Dict[str, Any] | None) -> Dict[str, float]:
+    """The per-stage timings (milliseconds) the gateway stores in response_data."""
+    timings = (response_data or {}).get("timings_ms")
+    if not isinstance(timings, dict):
+        return {}
+    return {stage: value for stage, value in timings.items() if isinstance(value, (int, float))}
 
-def get_analytics_summary(db: Session):
+
+def aggregate_latency(
+    rows: Iterable[Tuple[datetime, str, Dict[str, Any]]],
+    into: Dict[RollupKey, DDSketch] | None = None,
+) -> Dict[RollupKey, DDSketch]:
+    """
+    Adds the stage timings of (created_at, verdict, response_data) rows to one
+    sketch per minute and hour bucket and stage, adding to `into` if given.
+    """
+    sketches = into if into is not None else {}
+    for created_at, _, response_data in rows:
+        for stage, value in log_timings(response_data).items():
+            for bucket_size in ROLLUP_BUCKETS:
+                key = (bucket_size, bucket_start(created_at, bucket_size), stage)
+                sketch = sketches.get(key)
+                if sketch is None:
+                    sketch = sketches[key] = DDSketch(settings.ANALYTICS_LATENCY_SKETCH_ACCURACY)
+                sketch.add(value)
+    return sketches
+
+
+def _upsert_rollups(dialect_name: str, rollups: Dict[RollupKey, Dict[str, int]]):
+    """INSERT ... ON CONFLICT DO UPDATE that adds the counters to existing buckets."""
+    insert = sqlite.insert if dialect_name == "sqlite" else postgresql.insert
+    stmt = insert(AnalyticsRollup).values([
+        {"bucket_size": size, "bucket_start": start, "verdict": verdict, **counters}
+        for (size, start, verdict), counters in rollups.items()
+    ])
+    return stmt.on_conflict_do_update(
+        index_elements=["bucket_size", "bucket_start", "verdict"],
+        set_={name: getattr(AnalyticsRollup, name) + stmt.excluded[name] for name in ROLLUP_COUNTERS},
+    )
+
+
+def _existing_sketches(sketches: Dict[RollupKey, DDSketch]):
+    return select(StageLatencyRollup).where(
+        tuple_(StageLatencyRollup.bucket_size, StageLatencyRollup.bucket_start, StageLatencyRollup.stage).in_(list(sketches))
+    )
+
+
+def _merge_sketches(sketches: Dict[RollupKey, DDSketch], existing: Iterable[StageLatencyRollup]) -> None:
+    for row in existing:
+        key = (row.bucket_size, bucket_start(row.bucket_start, row.bucket_size), row.stage)
+        stored = DDSketch.from_dict(row.sketch)
+        # A sketch kept at an older accuracy setting cannot be merged; the new one replaces it.
+        if key in sketches and stored.relative_accuracy == sketches[key].relative_accuracy:
+            sketches[key].merge(stored)
+
+
+def _upsert_sketches(dialect_name: str, sketches: Dict[RollupKey, DDSketch]):
+    """INSERT ... ON CONFLICT DO UPDATE that overwrites the stored sketches with already merged ones."""
+    insert = sqlite.insert if dialect_name == "sqlite" else postgresql.insert
+    stmt = insert(StageLatencyRollup).values([
+        {"bucket_size": size, "bucket_start": start, "stage": stage, "sketch": sketch.to_dict()}
+        for (size, start, stage), sketch in sketches.items()
+    ])
+    return stmt.on_conflict_do_update(
+        index_elements=["bucket_size", "bucket_start", "stage"],
+        set_={"sketch": stmt.excluded.sketch},
+    )
+
+
+def _log_rows(logs: List[log_models.Log]):
+    return [(log.created_at, log.verdict, log.response_data) for log in logs]
+
+
+def record_rollups(db: Session, logs: List[log_models.Log]) -> None:
+    """
+    Adds freshly flushed logs to their rollup buckets and latency sketches
+    (the caller commits). Runs under the log chain lock, so concurrent writers
+    never race on a bucket, and a sketch can be read, merged and written back.
+    """
+    if not logs:
+        return
+    dialect_name = db.get_bind().dialect.name
+    rows = _log_rows(logs)
+    db.execute(_upsert_rollups(dialect_name, aggregate_rollups(rows)))
+    sketches = aggregate_latency(rows)
+    if sketches:
+        _merge_sketches(sketches, db.scalars(_existing_sketches(sketches)))
+        db.execute(_upsert_sketches(dialect_name, sketches))
+
+
+async def record_rollups_async(db: AsyncSession, logs: List[log_models.Log]) -> None:
+    """
+    Async `record_rollups`.
+    """
+    if not logs:
+        return
+    dialect_name = db.get_bind().dialect.name
+    rows = _log_rows(logs)
+    await db.execute(_upsert_rollups(dialect_name, aggregate_rollups(rows)))
+    sketches = aggregate_latency(rows)
+    if sketches:
+        _merge_sketches(sketches, await db.scalars(_existing_sketches(sketches)))
+        await db.execute(_upsert_sketches(dialect_name, sketches))
+
+
+def replace_rollups(
+    db: Session,
+    *,
+    start: datetime,
+    end: datetime,
+    rollups: Dict[RollupKey, Dict[str, int]],
+    sketches: Dict[RollupKey, DDSketch],
+) -> None:
+    """
+    Replaces every rollup bucket and latency sketch starting in [start, end)
+    with `rollups` and `sketches`, in one transaction. Used by the backfill,
+    for buckets no new log can land in.
+    """
+    dialect_name = db.get_bind().dialect.name
+    db.execute(delete(AnalyticsRollup).where(AnalyticsRollup.bucket_start >= start, AnalyticsRollup.bucket_start < end))
+    db.execute(delete(StageLatencyRollup).where(StageLatencyRollup.bucket_start >= start, StageLatencyRollup.bucket_start < end))
+    if rollups:
+        db.execute(_upsert_rollups(dialect_name, rollups))
+    if sketches:
+        db.execute(_upsert_sketches(dialect_name, sketches))
+    db.commit()
+
+
+async def get_analytics_summary(db: AsyncSession):
     """
     Queries the database to generate a summary of gateway analytics.
-    
-    This function performs efficient, database-level aggregations to
-    calculate key metrics from the logs table.
-    """
-    # Use SQLAlchemy's `func` to perform SQL functions like COUNT.
-    # The .scalar() method returns a single value instead of a full row.
-    total_requests = db.query(func.count(log_schemas.Log.id)).scalar() or 0
-    
-    blocked_requests = db.query(func.count(log_schemas.Log.id)).filter(
-        log_schemas.Log.verdict == "BLOCKED"
-    ).scalar() or 0
-    
+
+    Sums the hourly rollups, so the cost grows with the number of hours
+    covered rather than the number of logs.
+    """
+    rows = (await db.execute(
+        select(AnalyticsRollup.verdict, func.sum(AnalyticsRollup.request_count))
+        .where(AnalyticsRollup.bucket_size == "hour")
+        .group_by(AnalyticsRollup.verdict)
+    )).all()
+    counts = {verdict: int(count or 0) for verdict, count in rows}
+    total_requests = sum(counts.values())
+    blocked_requests = counts.get("BLOCKED", 0)
+
     # Calculate the percentage of blocked requests, handling the case of zero total requests.
     block_rate = (blocked_requests / total_requests * 100) if total_requests > 0 else 0
 
@@ -26,4 +229,78 @@ def get_analytics_summary(db: Session):
         "blocked_requests": blocked_requests,
         "allowed_requests": total_requests - blocked_requests,
         "block_rate_percentage": round(block_rate, 2)
-    }
\ No newline at end of file
+    }
+
+
+async def get_timeseries(
+    db: AsyncSession, *, bucket: str, start: datetime, end: datetime, verdict: str | None = None
+) -> List[Dict[str, Any]]:
+    """
+    Returns one point per `bucket` ("minute", "hour" or "day") from the one
+    containing `start` up to `end`, empty buckets included. Minute series read
+    the minute rollups; hour and day series read the hourly ones.
+    """
+    source = "minute" if bucket == "minute" else "hour"
+    first = bucket_start(start, bucket)
+    query = select(AnalyticsRollup).where(
+        AnalyticsRollup.bucket_size == source,
+        AnalyticsRollup.bucket_start >= first,
+        AnalyticsRollup.bucket_start < end,
+    )
+    if verdict is not None:
+        query = query.where(AnalyticsRollup.verdict == verdict)
+
+    points: Dict[datetime, Dict[str, Any]] = {}
+    step, moment = TIMESERIES_BUCKETS[bucket], first
+    while moment < end:
+        points[moment] = {"bucket_start": moment, "verdicts": {}, **dict.fromkeys(ROLLUP_COUNTERS, 0)}
+        moment += step
+
+    for row in await db.scalars(query):
+        point = points.get(bucket_start(row.bucket_start, bucket))
+        if point is None:
+            continue
+        for name in ROLLUP_COUNTERS:
+            point[name] += getattr(row, name)
+        point["verdicts"][row.verdict] = point["verdicts"].get(row.verdict, 0) + row.request_count
+    return list(points.values())
+
+
+def _ceil_hour(moment: datetime) -> datetime:
+    floor = bucket_start(moment, "hour")
+    return floor if floor == moment else floor + ROLLUP_BUCKETS["hour"]
+
+
+async def get_stage_latency(
+    db: AsyncSession, *, start: datetime, end: datetime, stages: List[str] | None = None
+) -> Dict[str, DDSketch]:
+    """
+    Merges the latency sketches of every minute in [start, end) into one
+    sketch per stage. Whole hours inside the window are read from the hourly
+    sketches and only the ragged ends from the minute ones, so a window costs
+    O(hours + 120) rows per stage however many logs it covers.
+    """
+    start, end = bucket_start(start, "minute"), as_utc(end)
+    first_hour, last_hour = _ceil_hour(start), bucket_start(end, "hour")
+    if first_hour < last_hour:
+        spans = [("minute", start, first_hour), ("hour", first_hour, last_hour), ("minute", last_hour, end)]
+    else:
+        spans = [("minute", start, end)]
+
+    merged: Dict[str, DDSketch] = {}
+    for bucket_size, span_start, span_end in spans:
+        if span_start >= span_end:
+            continue
+        query = select(StageLatencyRollup).where(
+            StageLatencyRollup.bucket_size == bucket_size,
+            StageLatencyRollup.bucket_start >= span_start,
+            StageLatencyRollup.bucket_start < span_end,
+        )
+        if stages:
+            query = query.where(StageLatencyRollup.stage.in_(stages))
+        for row in await db.scalars(query):
+            stored = DDSketch.from_dict(row.sketch)
+            sketch = merged.setdefault(row.stage, DDSketch(settings.ANALYTICS_LATENCY_SKETCH_ACCURACY))
+            if stored.relative_accuracy == sketch.relative_accuracy:
+                sketch.merge(stored)
+    return merged
@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.merkle import anchor_hash, merkle_root
+from app.models import log as log_models
+from app.models.anchor import LogAnchor
+
+# Key of the PostgreSQL advisory lock that serialises anchoring ("NVMA" in ASCII).
+LOG_ANCHOR_LOCK_KEY = 0x4E564D41
+
+
+def get_anchor(db: Session, anchor_id: int) -> LogAnchor | None:
+    """
+    Fetches a single anchor by its primary key.
+    """
+    return db.query(LogAnchor).filter(LogAnchor.id == anchor_id).first()
+
+
+def get_last_anchor(db: Session) -> LogAnchor | None:
+    """
+    Fetches the most recent anchor.
+    """
+    return db.query(LogAnchor).order_by(LogAnchor.id.desc()).first()
+
+
+def get_anchor_for_log(db: Session, log_id: int) -> LogAnchor | None:
+    """
+    Fetches the anchor whose batch contains `log_id`, or None if it is not anchored yet.
+    """
+    return (
+        db.query(LogAnchor)
+        .filter(LogAnchor.first_log_id <= log_id, LogAnchor.last_log_id >= log_id)
+        .first()
+    )
+
+
+def list_anchors(db: Session, *, skip: int = 0, limit: int = 100) -> List[LogAnchor]:
+    """
+    Lists anchors in chain order.
+    """
+    return db.query(LogAnchor).order_by(LogAnchor.id.asc()).offset(skip).limit(limit).all()
+
+
+def get_batch_log_hashes(db: Session, anchor: LogAnchor) -> List[Tuple[int, str]]:
+    """
+    Returns (id, log_hash) for every log covered by `anchor`, in chain order.
+    """
+    return (
+        db.query(log_models.Log.id, log_models.Log.log_hash)
+        .filter(log_models.Log.id >= anchor.first_log_id, log_models.Log.id <= anchor.last_log_id)
+        .order_by(log_models.Log.id.asc())
+        .all()
+    )
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite returns naive timestamps; they are stored in UTC.
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def create_pending_anchors(db: Session, *, batch_size: int, max_age_seconds: float) -> List[LogAnchor]:
+    """
+    Anchors every complete batch of `batch_size` unanchored logs, plus a final
+    partial batch once its oldest log is older than `max_age_seconds`.
+    Runs under an advisory lock on PostgreSQL so workers never anchor the same range twice.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": LOG_ANCHOR_LOCK_KEY})
+
+    last_anchor = get_last_anchor(db)
+    last_log_id = last_anchor.last_log_id if last_anchor else 0
+    previous_anchor_hash = last_anchor.anchor_hash if last_anchor else None
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=max_age_seconds)
+
+    anchors = []
+    while True:
+        batch = (
+            db.query(log_models.Log.id, log_models.Log.log_hash, log_models.Log.created_at)
+            .filter(log_models.Log.id > last_log_id)
+            .order_by(log_models.Log.id.asc())
+            .limit(batch_size)
+            .all()
+        )
+        if not batch:
+            break
+        if len(batch) < batch_size and (batch[0].created_at is None or _as_utc(batch[0].created_at) > cutoff):
+            break
+
+        root = merkle_root([row.log_hash for row in batch])
+        first_log_id, last_log_id = batch[0].id, batch[-1].id
+        current_anchor_hash = anchor_hash(root, first_log_id, last_log_id, previous_anchor_hash)
+        anchors.append(LogAnchor(
+            first_log_id=first_log_id,
+            last_log_id=last_log_id,
+            leaf_count=len(batch),
+            merkle_root=root,
+            anchor_hash=current_anchor_hash,
+            previous_anchor_hash=previous_anchor_hash,
+        ))
+        previous_anchor_hash = current_anchor_hash
+        if len(batch) < batch_size:
+            break
+
+    if anchors:
+        db.add_all(anchors)
+    db.commit()
+    return anchors
@@ -0,0 +1,93 @@
+import secrets
+from datetime import datetime
+from typing import Dict, List, Sequence, Tuple
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from app.core import security
+from app.models.api_key import ApiKey
+from app.schemas.user import User
+
+
+async def create_api_key(
+    db: AsyncSession, *, user_id: int, name: str, scopes: Sequence[str], rate_limit_per_minute: int | None = None
+) -> Tuple[ApiKey, str]:
+    """
+    Creates an API key. Returns the row and the key itself, which is not
+    stored and cannot be shown again.
+    """
+    api_key, prefix, secret = security.generate_api_key()
+    salt = secrets.token_hex(16)
+    db_obj = ApiKey(
+        user_id=user_id,
+        name=name,
+        prefix=prefix,
+        salt=salt,
+        key_hash=security.hash_api_key_secret(secret, salt),
+        scopes=list(scopes),
+        rate_limit_per_minute=rate_limit_per_minute,
+        is_active=True,
+    )
+    db.add(db_obj)
+    await db.commit()
+    await db.refresh(db_obj)
+    return db_obj, api_key
+
+
+async def get_api_key(db: AsyncSession, *, key_id: int) -> ApiKey | None:
+    return await db.get(ApiKey, key_id)
+
+
+async def list_api_keys(db: AsyncSession, *, user_id: int) -> List[ApiKey]:
+    """
+    Lists a user's API keys (active and revoked), newest first.
+    """
+    return list(await db.scalars(select(ApiKey).where(ApiKey.user_id == user_id).order_by(ApiKey.id.desc())))
+
+
+async def revoke_api_key(db: AsyncSession, *, api_key: ApiKey) -> ApiKey:
+    """
+    Deactivates an API key; the row is kept for the audit trail.
+    """
+    api_key.is_active = False
+    api_key.updated_at = func.now()
+    await db.commit()
+    await db.refresh(api_key)
+    return api_key
+
+
+def get_api_keys_changed_since(db: Session, *, since: datetime | None = None) -> List[Tuple[ApiKey, User]]:
+    """
+    API keys changed at or after `since` (all of them if None), with their owners.
+    """
+    query = select(ApiKey, User).join(User, User.id == ApiKey.user_id)
+    if since is not None:
+        query = query.where(ApiKey.updated_at >= since)
+    return [(api_key, user) for api_key, user in db.execute(query)]
+
+
+def record_last_used(db: Session, last_used: Dict[int, datetime]) -> None:
+    """
+    Writes the last-used times of many keys in one statement. Does not bump
+    `updated_at`, so it does not make workers reload the keys.
+    """
+    if not last_used:
+        return
+    db.connection().execute(
+        update(ApiKey.__table__)
+        .where(ApiKey.__table__.c.id == bindparam("key_id"))
+        .values(last_used_at=bindparam("used_at")),
+        [{"key_id": key_id, "used_at": used_at} for key_id, used_at in last_used.items()],
+    )
+    db.commit()
+
+
+def touch_user_api_keys(db: AsyncSession, *, user_id: int):
+    """
+    Marks (without committing) a user's keys as changed, so workers reload
+    them along with the user's new state, e.g. after deactivation.
+    """
+    return db.execute(update(ApiKey).where(ApiKey.user_id == user_id).values(updated_at=func.now()))
@@ -0,0 +1,74 @@
+import hashlib
+from pathlib import Path
+from typing import List
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.archive import LogArchive
+
+
+def get_archive(db: Session, archive_id: int) -> LogArchive | None:
+    """
+    Fetches a single archive record by its primary key.
+    """
+    return db.query(LogArchive).filter(LogArchive.id == archive_id).first()
+
+
+def get_archive_for_partition(db: Session, partition_name: str) -> LogArchive | None:
+    """
+    Fetches the archive made from a partition, if it was archived.
+    """
+    return db.query(LogArchive).filter(LogArchive.partition_name == partition_name).first()
+
+
+def get_archive_for_log(db: Session, log_id: int) -> LogArchive | None:
+    """
+    Fetches the archive whose range contains `log_id`, or None if the log was never archived.
+    """
+    return (
+        db.query(LogArchive)
+        .filter(LogArchive.first_log_id <= log_id, LogArchive.last_log_id >= log_id)
+        .first()
+    )
+
+
+def list_archives(db: Session, *, after_log_id: int = 0) -> List[LogArchive]:
+    """
+    Lists archives holding logs with ids above `after_log_id`, in chain order.
+    """
+    return (
+        db.query(LogArchive)
+        .filter(LogArchive.last_log_id > after_log_id)
+        .order_by(LogArchive.first_log_id.asc())
+        .all()
+    )
+
+
+def create_archive(db: Session, **fields) -> LogArchive:
+    """
+    Records an archived partition.
+    """
+    db_archive = LogArchive(**fields)
+    db.add(db_archive)
+    db.commit()
+    db.refresh(db_archive)
+    return db_archive
+
+
+def archive_path(file_name: str) -> Path:
+    """
+    Resolves an archive file name against LOG_ARCHIVE_DIR.
+    """
+    return Path(settings.LOG_ARCHIVE_DIR) / file_name
+
+
+def file_sha256(path: Path) -> str:
+    """
+    Hashes an archive file in 1 MiB blocks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
@@ -0,0 +1,216 @@
+import hashlib
+import zlib
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.blob import LogBlob
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional; fall back to the standard library.
+    zstandard = None
+
+# Payload strings are replaced by {BLOB_REF_KEY: "<sha256>"} in log rows.
+BLOB_REF_KEY = "$blob"
+# Client objects whose only key is BLOB_REF_KEY or ESCAPE_KEY are stored
+# wrapped as {ESCAPE_KEY: <object>}, so they are never read as references.
+ESCAPE_KEY = "$literal"
+
+
+class BlobIntegrityError(Exception):
+    """Raised when a stored blob no longer matches its content address."""
+
+
+def _compress(text: str) -> Tuple[str, bytes]:
+    raw = text.encode("utf-8")
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=settings.LOG_BLOB_ZSTD_LEVEL).compress(raw)
+    return "zlib", zlib.compress(raw)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("A log blob is zstd-compressed but the 'zstandard' package is not installed.")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def _is_ref(value: Any) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and isinstance(value.get(BLOB_REF_KEY), str)
+
+
+def _needs_escape(value: Any) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and (BLOB_REF_KEY in value or ESCAPE_KEY in value)
+
+
+def _is_escaped(value: Any) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and isinstance(value.get(ESCAPE_KEY), dict)
+
+
+def dehydrate(data: Any, blobs: Dict[str, str], min_bytes: int = settings.LOG_BLOB_MIN_BYTES) -> Any:
+    """
+    Returns a copy of a JSON value with every string of at least `min_bytes`
+    replaced by a reference to its SHA-256, collecting the strings in `blobs`.
+    The references commit to the content, so a chain hash over the
+    dehydrated value still commits to the full payload. Client objects that
+    look like a reference are escaped rather than trusted.
+    """
+    if isinstance(data, str):
+        raw = data.encode("utf-8")
+        if len(raw) < min_bytes:
+            return data
+        digest = hashlib.sha256(raw).hexdigest()
+        blobs[digest] = data
+        return {BLOB_REF_KEY: digest}
+    if isinstance(data, dict):
+        dehydrated = {key: dehydrate(value, blobs, min_bytes) for key, value in data.items()}
+        return {ESCAPE_KEY: dehydrated} if _needs_escape(data) else dehydrated
+    if isinstance(data, (list, tuple)):
+        return [dehydrate(value, blobs, min_bytes) for value in data]
+    return data
+
+
+def collect_refs(data: Any, refs: Set[str]) -> Set[str]:
+    """Adds the hash of every blob referenced in a JSON value to `refs`."""
+    if _is_ref(data):
+        refs.add(data[BLOB_REF_KEY])
+    elif _is_escaped(data):
+        for value in data[ESCAPE_KEY].values():
+            collect_refs(value, refs)
+    elif isinstance(data, dict):
+        for value in data.values():
+            collect_refs(value, refs)
+    elif isinstance(data, list):
+        for value in data:
+            collect_refs(value, refs)
+    return refs
+
+
+def _substitute(data: Any, contents: Dict[str, str]) -> Any:
+    if _is_ref(data):
+        return contents[data[BLOB_REF_KEY]]
+    if _is_escaped(data):
+        return {key: _substitute(value, contents) for key, value in data[ESCAPE_KEY].items()}
+    if isinstance(data, dict):
+        return {key: _substitute(value, contents) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_substitute(value, contents) for value in data]
+    return data
+
+
+def _add_new_blobs(db: Session | AsyncSession, blobs: Dict[str, str], existing: Set[str]) -> None:
+    for digest, text in blobs.items():
+        if digest not in existing:
+            codec, data = _compress(text)
+            db.add(LogBlob(hash=digest, codec=codec, data=data, size=len(text.encode("utf-8"))))
+
+
+def _decode_blobs(rows: Iterable[LogBlob], hashes: List[str]) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """The content of each intact blob, and why each other requested blob could not be read."""
+    contents, errors = {}, {}
+    for blob in rows:
+        try:
+            raw = _decompress(blob.codec, blob.data)
+        except RuntimeError:
+            raise
+        except Exception:  # zlib.error, zstandard.ZstdError: a corrupt frame.
+            errors[blob.hash] = f"Log blob {blob.hash} cannot be decompressed."
+            continue
+        if hashlib.sha256(raw).hexdigest() != blob.hash:
+            errors[blob.hash] = f"Log blob {blob.hash} does not match its content."
+            continue
+        contents[blob.hash] = raw.decode("utf-8")
+    for digest in set(hashes) - contents.keys() - errors.keys():
+        errors[digest] = f"Log blob {digest} is missing."
+    return contents, errors
+
+
+def _checked(decoded: Tuple[Dict[str, str], Dict[str, str]]) -> Dict[str, str]:
+    contents, errors = decoded
+    if errors:
+        raise BlobIntegrityError(" ".join(errors[digest] for digest in sorted(errors)))
+    return contents
+
+
+def store_blobs(db: Session, blobs: Dict[str, str]) -> None:
+    """
+    Adds the blobs that are not stored yet to the session (the caller commits).
+    Callers hold the log chain lock, so concurrent writers cannot race on a hash.
+    """
+    if not blobs:
+        return
+    existing = {row.hash for row in db.query(LogBlob.hash).filter(LogBlob.hash.in_(list(blobs)))}
+    _add_new_blobs(db, blobs, existing)
+
+
+def get_blob_contents(db: Session, hashes: Iterable[str]) -> Dict[str, str]:
+    """
+    Loads and decompresses blobs by hash, checking each against its address.
+    Raises BlobIntegrityError if any is missing or corrupt.
+    """
+    return _checked(read_blob_contents(db, hashes))
+
+
+def read_blob_contents(db: Session, hashes: Iterable[str]) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """
+    `get_blob_contents` that does not raise: returns the intact blobs, and an
+    error message for each missing or corrupt one, by hash.
+    """
+    hashes = list(hashes)
+    if not hashes:
+        return {}, {}
+    return _decode_blobs(db.query(LogBlob).filter(LogBlob.hash.in_(hashes)), hashes)
+
+
+def rehydrate(db: Session, *values: Any) -> Tuple[Any, ...]:
+    """
+    Returns copies of JSON values with every blob reference replaced by its
+    content, fetching all referenced blobs in one query.
+    """
+    refs: Set[str] = set()
+    for value in values:
+        collect_refs(value, refs)
+    if not refs:
+        return values
+    contents = get_blob_contents(db, refs)
+    return tuple(_substitute(value, contents) for value in values)
+
+
+# --- Async (asyncpg) variants ---
+
+async def store_blobs_async(db: AsyncSession, blobs: Dict[str, str]) -> None:
+    """
+    Async `store_blobs`.
+    """
+    if not blobs:
+        return
+    existing = set(await db.scalars(select(LogBlob.hash).where(LogBlob.hash.in_(list(blobs)))))
+    _add_new_blobs(db, blobs, existing)
+
+
+async def get_blob_contents_async(db: AsyncSession, hashes: Iterable[str]) -> Dict[str, str]:
+    """
+    Async `get_blob_contents`.
+    """
+    hashes = list(hashes)
+    if not hashes:
+        return {}
+    return _checked(_decode_blobs(await db.scalars(select(LogBlob).where(LogBlob.hash.in_(hashes))), hashes))
+
+
+async def rehydrate_async(db: AsyncSession, *values: Any) -> Tuple[Any, ...]:
+    """
+    Async `rehydrate`.
+    """
+    refs: Set[str] = set()
+    for value in values:
+        collect_refs(value, refs)
+    if not refs:
+        return values
+    contents = await get_blob_contents_async(db, refs)
+    return tuple(_substitute(value, contents) for value in values)
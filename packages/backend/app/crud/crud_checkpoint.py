@@ -0,0 +1,35 @@
+import hmac
+
+from sqlalchemy.orm import Session
+
+from app.core.security import sign_chain_checkpoint
+from app.models.checkpoint import ChainCheckpoint
+
+
+def get_latest_checkpoint(db: Session) -> ChainCheckpoint | None:
+    """
+    Fetches the newest checkpoint whose signature is valid. Checkpoints with a
+    bad signature are skipped (and reported), falling back to older ones.
+    """
+    for checkpoint in db.query(ChainCheckpoint).order_by(ChainCheckpoint.id.desc()).yield_per(100):
+        expected = sign_chain_checkpoint(checkpoint.last_log_id, checkpoint.last_log_hash, checkpoint.logs_verified)
+        if hmac.compare_digest(expected, checkpoint.signature):
+            return checkpoint
+        print(f"WARNING: Chain checkpoint {checkpoint.id} has an invalid signature and was ignored.")
+    return None
+
+
+def create_checkpoint(db: Session, *, last_log_id: int, last_log_hash: str, logs_verified: int) -> ChainCheckpoint:
+    """
+    Records a signed checkpoint for a verified prefix of the chain.
+    """
+    db_checkpoint = ChainCheckpoint(
+        last_log_id=last_log_id,
+        last_log_hash=last_log_hash,
+        logs_verified=logs_verified,
+        signature=sign_chain_checkpoint(last_log_id, last_log_hash, logs_verified),
+    )
+    db.add(db_checkpoint)
+    db.commit()
+    db.refresh(db_checkpoint)
+    return db_checkpoint
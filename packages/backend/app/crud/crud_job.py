@@ -0,0 +1,83 @@
+import uuid
+from datetime import datetime, timezone
+from typing import Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.models.job import BackgroundJob
+
+# Key of the PostgreSQL advisory lock that serialises job starts ("NVJB" in ASCII).
+BACKGROUND_JOB_LOCK_KEY = 0x4E564A42
+
+# Finished jobs kept per kind for polling.
+MAX_FINISHED_JOBS = 50
+
+ACTIVE_STATUSES = ("pending", "running")
+
+
+def as_utc(moment: datetime) -> datetime:
+    """SQLite drops the offset; every stored time is UTC."""
+    return moment.replace(tzinfo=timezone.utc) if moment.tzinfo is None else moment
+
+
+def get_job(db: Session, *, kind: str, job_id: str) -> BackgroundJob | None:
+    """
+    Fetches a job of `kind` by id.
+    """
+    job = db.get(BackgroundJob, job_id)
+    return job if job is not None and job.kind == kind else None
+
+
+def claim_job(db: Session, *, kind: str, params: dict, stale_before: datetime) -> Tuple[BackgroundJob, bool]:
+    """
+    Creates a pending job of `kind`, unless one is already pending or running,
+    in which case that one is returned. Returns (job, created).
+
+    Active jobs whose last heartbeat is older than `stale_before` lost their
+    worker; they are marked as errors and no longer block a new job. Runs
+    under an advisory lock on PostgreSQL so two workers cannot both create one.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": BACKGROUND_JOB_LOCK_KEY})
+
+    now = datetime.now(timezone.utc)
+    active = (
+        db.query(BackgroundJob)
+        .filter(BackgroundJob.kind == kind, BackgroundJob.status.in_(ACTIVE_STATUSES))
+        .order_by(BackgroundJob.started_at.desc())
+        .all()
+    )
+    for job in active:
+        if as_utc(job.heartbeat_at) >= stale_before:
+            db.commit()  # Ends the transaction, and the lock, keeping any stale jobs marked above.
+            db.refresh(job)
+            return job, False
+        job.status, job.finished_at = "error", now
+        job.message = "The worker running this job stopped before it finished."
+
+    job = BackgroundJob(id=uuid.uuid4().hex, kind=kind, status="pending", params=params, started_at=now, heartbeat_at=now)
+    db.add(job)
+
+    finished = (
+        db.query(BackgroundJob.id)
+        .filter(BackgroundJob.kind == kind, BackgroundJob.status.notin_(ACTIVE_STATUSES))
+        .order_by(BackgroundJob.started_at.desc())
+        .offset(MAX_FINISHED_JOBS)
+        .all()
+    )
+    if finished:
+        db.query(BackgroundJob).filter(BackgroundJob.id.in_([row.id for row in finished])).delete(synchronize_session=False)
+    db.commit()
+    db.refresh(job)
+    return job, True
+
+
+def update_job(db: Session, *, job_id: str, **fields) -> None:
+    """
+    Writes `fields` to a job and refreshes its heartbeat.
+    """
+    db.query(BackgroundJob).filter(BackgroundJob.id == job_id).update(
+        {**fields, "heartbeat_at": datetime.now(timezone.utc)}, synchronize_session=False
+    )
+    db.commit()
@@ -1,10 +1,22 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Tuple
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-import json
 
+from app.core.config import settings
 from app.core.security import calculate_log_hash
+from app.crud import crud_analytics, crud_blob
 from app.models import log as log_models     # This is the SQLAlchemy model
 from app.schemas import log as log_schemas   # This is the Pydantic schema
 
+# Key of the PostgreSQL advisory lock that guards the chain head ("NOVA" in ASCII).
+LOG_CHAIN_LOCK_KEY = 0x4E4F5641
+
+# How far back the chain head is first looked for (see get_chain_head_hash).
+HEAD_LOOKUP_WINDOW = timedelta(days=1)
+
 
 def get_log(db: Session, log_id: int) -> log_models.Log | None:
     """
@@ -14,6 +26,42 @@ def get_log(db: Session, log_id: int) -> log_models.Log | None:
     return db.query(log_models.Log).filter(log_models.Log.id == log_id).first()
 
 
+def stream_logs(
+    db: Session,
+    *,
+    start_id: int | None = None,
+    end_id: int | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    verdict: str | None = None,
+    yield_per: int = 1000,
+) -> Iterator[log_models.Log]:
+    """
+    Streams logs matching the filters in chain order through a server-side
+    cursor, holding at most `yield_per` rows in memory at a time.
+    """
+    query = db.query(log_models.Log)
+    if start_id is not None:
+        query = query.filter(log_models.Log.id >= start_id)
+    if end_id is not None:
+        query = query.filter(log_models.Log.id <= end_id)
+    if since is not None:
+        query = query.filter(log_models.Log.created_at >= since)
+    if until is not None:
+        query = query.filter(log_models.Log.created_at < until)
+    if verdict is not None:
+        query = query.filter(log_models.Log.verdict == verdict)
+    return query.order_by(log_models.Log.id.asc()).execution_options(stream_results=True).yield_per(yield_per)
+
+
+def get_log_payloads(db: Session, log: log_models.Log) -> tuple[dict, dict]:
+    """
+    Returns a log's request_data and response_data with every blob reference
+    replaced by its content. The row itself is left untouched.
+    """
+    return crud_blob.rehydrate(db, log.request_data, log.response_data)
+
+
 def get_last_log(db: Session) -> log_models.Log | None:
     """
     Fetches the most recent log entry from the database.
@@ -22,29 +70,133 @@ def get_last_log(db: Session) -> log_models.Log | None:
     return db.query(log_models.Log).order_by(log_models.Log.id.desc()).first()
 
 
+def get_chain_head_hash(db: Session) -> str | None:
+    """
+    Returns the hash of the most recent log entry, or None for an empty chain.
+    Reads only the indexed hash column, not the whole row.
+
+    created_at rises with id (it is stamped at insert time, under the chain
+    lock), so the head is looked for among the last day's logs first; on a
+    partitioned table that touches only the newest partitions.
+    """
+    query = db.query(log_models.Log.log_hash).order_by(log_models.Log.id.desc())
+    recent = datetime.now(timezone.utc) - HEAD_LOOKUP_WINDOW
+    head = query.filter(log_models.Log.created_at >= recent).limit(1).scalar()
+    return head if head is not None else query.limit(1).scalar()
+
+
+def lock_log_chain(db: Session) -> None:
+    """
+    Serialises chain appends across processes for the rest of the transaction.
+    On PostgreSQL this takes a transaction-scoped advisory lock; SQLite already
+    allows only one writer at a time.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": LOG_CHAIN_LOCK_KEY})
+
+
+def _chain_logs(
+    logs_in: List[log_schemas.LogCreate], previous_log_hash: str | None
+) -> Tuple[List[log_models.Log], Dict[str, str]]:
+    """
+    Builds the rows for a batch of entries, each chained to the one before,
+    and collects the payload blobs they reference.
+    """
+    db_logs = []
+    blobs = {}
+    for log_in in logs_in:
+        log_data = log_in.model_dump()
+        if settings.LOG_BLOBS_ENABLED:
+            # Large strings move to the blob table; the row keeps their SHA-256,
+            # so the chain hash below still commits to the full content.
+            log_data["request_data"] = crud_blob.dehydrate(log_data["request_data"], blobs)
+            log_data["response_data"] = crud_blob.dehydrate(log_data["response_data"], blobs)
+        # Hash the same dict that verify-chain rebuilds from the stored columns.
+        current_log_hash = calculate_log_hash(log_data=log_data, previous_log_hash=previous_log_hash)
+        db_logs.append(log_models.Log(**log_data, log_hash=current_log_hash, previous_log_hash=previous_log_hash))
+        previous_log_hash = current_log_hash
+    return db_logs, blobs
+
+
+def create_logs(db: Session, *, logs_in: List[log_schemas.LogCreate]) -> List[log_models.Log]:
+    """
+    Appends a batch of cryptographically-chained log entries in one transaction.
+
+    The chain head is read under `lock_log_chain`, so concurrent writers (in
+    this or another worker process) can never fork the chain or collide on
+    `previous_log_hash`. The rows are sent as a multi-row INSERT ... RETURNING.
+    Large payload strings are stored once in `log_blobs` and referenced by hash,
+    and the batch is added to the analytics rollups in the same transaction.
+    """
+    lock_log_chain(db)
+    db_logs, blobs = _chain_logs(logs_in, get_chain_head_hash(db))
+    crud_blob.store_blobs(db, blobs)
+    db.add_all(db_logs)
+    if settings.ANALYTICS_ROLLUPS_ENABLED:
+        # Flushing assigns created_at, which places each row in its rollup buckets.
+        db.flush()
+        crud_analytics.record_rollups(db, db_logs)
+    db.commit()
+    return db_logs
+
+
 def create_log(db: Session, *, log_in: log_schemas.LogCreate) -> log_models.Log:
     """
     Creates a new, cryptographically-chained log entry in the database.
     - Correction: Accepts the Pydantic schema 'log_schemas.LogCreate' as input.
     - Correction: Creates an instance of the SQLAlchemy model 'log_models.Log'.
+    Request handlers should go through `log_sequencer`, which batches appends.
     """
-    
-    last_log = get_last_log(db)
-    previous_log_hash = last_log.log_hash if last_log else None
-    log_data_for_hash = log_in.model_dump()
-
-    current_log_hash = calculate_log_hash(
-        log_data=json.dumps(log_data_for_hash, sort_keys=True),
-        previous_log_hash=previous_log_hash
-    )
-
-    db_log = log_models.Log(
-        **log_in.model_dump(),
-        log_hash=current_log_hash,
-        previous_log_hash=previous_log_hash,
-    )
-    db.add(db_log)
-    db.commit()
+    db_log = create_logs(db, logs_in=[log_in])[0]
     db.refresh(db_log)
+    return db_log
+
+
+
+# --- Async (asyncpg) variants, for request handlers and the log sequencer ---
+
+async def get_log_async(db: AsyncSession, log_id: int) -> log_models.Log | None:
+    """
+    Async `get_log`.
+    """
+    return await db.get(log_models.Log, log_id)
+
+
+async def get_log_payloads_async(db: AsyncSession, log: log_models.Log) -> tuple[dict, dict]:
+    """
+    Async `get_log_payloads`.
+    """
+    return await crud_blob.rehydrate_async(db, log.request_data, log.response_data)
+
+
+async def get_chain_head_hash_async(db: AsyncSession) -> str | None:
+    """
+    Async `get_chain_head_hash`.
+    """
+    query = select(log_models.Log.log_hash).order_by(log_models.Log.id.desc()).limit(1)
+    recent = datetime.now(timezone.utc) - HEAD_LOOKUP_WINDOW
+    head = await db.scalar(query.where(log_models.Log.created_at >= recent))
+    return head if head is not None else await db.scalar(query)
+
 
-    return db_log
\ No newline at end of file
+async def lock_log_chain_async(db: AsyncSession) -> None:
+    """
+    Async `lock_log_chain`.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        await db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": LOG_CHAIN_LOCK_KEY})
+
+
+async def create_logs_async(db: AsyncSession, *, logs_in: List[log_schemas.LogCreate]) -> List[log_models.Log]:
+    """
+    Async `create_logs`: the same locking, chaining and single commit per batch.
+    """
+    await lock_log_chain_async(db)
+    db_logs, blobs = _chain_logs(logs_in, await get_chain_head_hash_async(db))
+    await crud_blob.store_blobs_async(db, blobs)
+    db.add_all(db_logs)
+    if settings.ANALYTICS_ROLLUPS_ENABLED:
+        await db.flush()
+        await crud_analytics.record_rollups_async(db, db_logs)
+    await db.commit()
+    return db_logs
@@ -0,0 +1,154 @@
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app.db.session import engine
+
+# On PostgreSQL the `logs` table is range-partitioned by created_at, one
+# partition per day or month (see the partitioning migration). These helpers
+# manage those partitions; every one is a no-op on other databases.
+
+PARTITION_INTERVALS = ("day", "month")
+
+# Key of the PostgreSQL advisory lock that serialises partition maintenance ("NVMP" in ASCII).
+LOG_PARTITION_LOCK_KEY = 0x4E564D50
+
+_BOUND_PATTERN = re.compile(r"FROM \((MINVALUE|'[^']+')\) TO \((MAXVALUE|'[^']+')\)")
+
+
+@dataclass
+class Partition:
+    name: str
+    lower: Optional[datetime]  # None for MINVALUE
+    upper: Optional[datetime]  # None for MAXVALUE
+
+
+def period_start(moment: datetime, interval: str) -> datetime:
+    """The start of the partition period (UTC day or month) containing `moment`."""
+    moment = moment.astimezone(timezone.utc)
+    if interval == "day":
+        return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_period_start(moment: datetime, interval: str) -> datetime:
+    """The start of the partition period after the one containing `moment`."""
+    start = period_start(moment, interval)
+    if interval == "day":
+        return start + timedelta(days=1)
+    return (start + timedelta(days=32)).replace(day=1)
+
+
+def partition_name(start: datetime, interval: str) -> str:
+    return f"logs_p{start:%Y%m%d}" if interval == "day" else f"logs_p{start:%Y%m}"
+
+
+def is_partitioned(db: Session | Connection) -> bool:
+    """True if `logs` is a partitioned PostgreSQL table."""
+    dialect = db.get_bind().dialect if isinstance(db, Session) else db.dialect
+    if dialect.name != "postgresql":
+        return False
+    relkind = db.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('logs')")).scalar()
+    return relkind == "p"
+
+
+def _parse_bound(bound: str) -> Optional[datetime]:
+    if bound in ("MINVALUE", "MAXVALUE"):
+        return None
+    return datetime.fromisoformat(bound.strip("'")).astimezone(timezone.utc)
+
+
+def list_partitions(db: Session | Connection) -> List[Partition]:
+    """
+    Lists the partitions of `logs`, oldest first. Bounds are rendered in UTC.
+    """
+    db.execute(text("SET LOCAL TimeZone = 'UTC'"))
+    rows = db.execute(text(
+        "SELECT child.relname AS name, pg_get_expr(child.relpartbound, child.oid) AS bound "
+        "FROM pg_inherits JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE pg_inherits.inhparent = 'logs'::regclass"
+    )).all()
+    partitions = []
+    for row in rows:
+        match = _BOUND_PATTERN.search(row.bound)
+        if not match:
+            continue
+        partitions.append(Partition(row.name, _parse_bound(match.group(1)), _parse_bound(match.group(2))))
+    return sorted(partitions, key=lambda p: p.upper or datetime.max.replace(tzinfo=timezone.utc))
+
+
+def ensure_partitions(db: Session | Connection, *, interval: str, premake: int, now: datetime | None = None) -> List[str]:
+    """
+    Creates the partitions needed to hold rows up to `premake` periods past
+    the current one, continuing from the newest existing partition so the
+    ranges never overlap or leave gaps. Returns the names created. The caller commits.
+    """
+    if interval not in PARTITION_INTERVALS:
+        raise ValueError(f"Unknown log partition interval '{interval}'; expected one of {PARTITION_INTERVALS}.")
+    now = now or datetime.now(timezone.utc)
+    target = period_start(now, interval)
+    for _ in range(premake + 1):
+        target = next_period_start(target, interval)
+
+    bounded = [p.upper for p in list_partitions(db) if p.upper is not None]
+    cursor = max(bounded) if bounded else period_start(now, interval)
+    created = []
+    while cursor < target:
+        upper = next_period_start(cursor, interval)
+        name = partition_name(cursor, interval)
+        db.execute(text(
+            f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF logs '
+            f"FOR VALUES FROM ('{cursor.isoformat()}') TO ('{upper.isoformat()}')"
+        ))
+        created.append(name)
+        cursor = upper
+    return created
+
+
+def get_partition_log_range(db: Session, name: str):
+    """
+    Returns (first_log_id, last_log_id, log_count) for the rows in one partition.
+    The ids are None for an empty partition.
+    """
+    return db.execute(text(f'SELECT min(id), max(id), count(*) FROM "{name}"')).one()
+
+
+def detach_partition(name: str) -> None:
+    """
+    Detaches a partition from `logs` and drops it. DETACH ... CONCURRENTLY
+    only takes a SHARE UPDATE EXCLUSIVE lock on the parent, so appends to the
+    chain carry on meanwhile. It needs PostgreSQL 14+, no DEFAULT partition
+    (the table has none; partitions are created ahead of time instead), and
+    cannot run inside a transaction block.
+    """
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text(f'ALTER TABLE logs DETACH PARTITION "{name}" CONCURRENTLY'))
+        connection.execute(text(f'DROP TABLE "{name}"'))
+
+
+@contextmanager
+def maintenance_lock() -> Iterator[bool]:
+    """
+    Holds the partition maintenance lock, if it is free, for the enclosed
+    block. Yields whether it was acquired; it never waits. The lock is
+    session-level, held on a connection of its own, so it spans the
+    transactions that archiving commits. Always acquired on other databases.
+    """
+    if engine.dialect.name != "postgresql":
+        yield True
+        return
+    with engine.connect() as connection:
+        acquired = connection.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": LOG_PARTITION_LOCK_KEY}).scalar()
+        connection.commit()
+        try:
+            yield bool(acquired)
+        finally:
+            if acquired:
+                connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": LOG_PARTITION_LOCK_KEY})
+                connection.commit()
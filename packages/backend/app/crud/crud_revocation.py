@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.revocation import AuthRevocation
+
+
+def _prune(db: AsyncSession):
+    return db.execute(delete(AuthRevocation).where(AuthRevocation.expires_at < datetime.now(timezone.utc)))
+
+
+async def revoke_token(db: AsyncSession, *, user_id: int, jti: str, expires_at: datetime) -> AuthRevocation:
+    """Records a revoked access token, kept until the token would have expired anyway."""
+    await _prune(db)
+    revocation = AuthRevocation(user_id=user_id, jti=jti, expires_at=expires_at)
+    db.add(revocation)
+    await db.commit()
+    return revocation
+
+
+def add_user_invalidation(db: AsyncSession, *, user_id: int) -> AuthRevocation:
+    """
+    Adds (without committing) an event that drops the user's cached
+    principals on every worker. It only needs to outlive the longest cache TTL.
+    """
+    revocation = AuthRevocation(
+        user_id=user_id,
+        jti=None,
+        expires_at=datetime.now(timezone.utc) + timedelta(seconds=settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS),
+    )
+    db.add(revocation)
+    return revocation
+
+
+async def get_revocations(db: AsyncSession) -> List[AuthRevocation]:
+    """
+    Every unexpired revocation, oldest first. Callers diff by id rather than
+    asking for ids past the last one seen: ids are taken at insert, so a
+    transaction can commit a lower id after a higher one is already visible.
+    """
+    rows = await db.scalars(
+        select(AuthRevocation)
+        .where(AuthRevocation.expires_at >= datetime.now(timezone.utc))
+        .order_by(AuthRevocation.id.asc())
+    )
+    return list(rows)
@@ -0,0 +1,91 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.sketches import SourceSketch
+from app.crud.crud_analytics import as_utc
+from app.models.sketch import ThreatSketch
+
+SketchKey = Tuple[datetime, str, str]  # (window_start, threat_type, field)
+
+
+def _key(row: ThreatSketch) -> SketchKey:
+    return as_utc(row.window_start), row.threat_type, row.field
+
+
+def _merge_into(stored: SourceSketch, delta: SourceSketch) -> SourceSketch:
+    try:
+        stored.merge(delta)
+        return stored
+    except ValueError:
+        # Stored with other sketch dimensions (a changed setting): start the window over.
+        return delta
+
+
+def merge_sketches(db: Session, sketches: Dict[SketchKey, SourceSketch]) -> None:
+    """
+    Adds in-memory sketches to their stored windows and commits. Existing rows
+    are locked while they are merged, so workers flushing at the same time
+    never lose each other's counts.
+    """
+    remaining = dict(sketches)
+    while remaining:
+        rows = db.scalars(
+            select(ThreatSketch)
+            .where(tuple_(ThreatSketch.window_start, ThreatSketch.threat_type, ThreatSketch.field).in_(list(remaining)))
+            .with_for_update()
+        ).all()
+        for row in rows:
+            delta = remaining.pop(_key(row), None)
+            if delta is not None:
+                row.data = _merge_into(SourceSketch.from_bytes(row.data), delta).to_bytes()
+        if not remaining:
+            break
+        insert = sqlite.insert if db.get_bind().dialect.name == "sqlite" else postgresql.insert
+        stmt = insert(ThreatSketch).values([
+            {"window_start": window_start, "threat_type": threat_type, "field": field, "data": sketch.to_bytes()}
+            for (window_start, threat_type, field), sketch in remaining.items()
+        ]).on_conflict_do_nothing().returning(ThreatSketch.window_start, ThreatSketch.threat_type, ThreatSketch.field)
+        for window_start, threat_type, field in db.execute(stmt).all():
+            remaining.pop((as_utc(window_start), threat_type, field), None)
+        # Whatever is left was inserted by another worker in the meantime: merge into it.
+    db.commit()
+
+
+async def load_sketch(
+    db: AsyncSession, *, start: datetime, end: datetime, threat_type: str, field: str
+) -> Optional[SourceSketch]:
+    """Merges the stored windows starting in [start, end), or returns None if there are none."""
+    merged = None
+    for data in await db.scalars(
+        select(ThreatSketch.data).where(
+            ThreatSketch.window_start >= start,
+            ThreatSketch.window_start < end,
+            ThreatSketch.threat_type == threat_type,
+            ThreatSketch.field == field,
+        )
+    ):
+        sketch = SourceSketch.from_bytes(data)
+        merged = sketch if merged is None else _merge_into(merged, sketch)
+    return merged
+
+
+async def list_threat_types(db: AsyncSession, *, start: datetime, end: datetime) -> List[str]:
+    rows = await db.scalars(
+        select(ThreatSketch.threat_type)
+        .where(ThreatSketch.window_start >= start, ThreatSketch.window_start < end)
+        .distinct()
+        .order_by(ThreatSketch.threat_type)
+    )
+    return list(rows)
+
+
+def delete_sketches_before(db: Session, cutoff: datetime) -> int:
+    """Deletes the windows starting before `cutoff` and commits. Returns the number deleted."""
+    deleted = db.execute(delete(ThreatSketch).where(ThreatSketch.window_start < cutoff)).rowcount
+    db.commit()
+    return deleted
@@ -0,0 +1,106 @@
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.threat import FrozenThreat
+
+
+def get_threat(db: Session, threat_id: int) -> FrozenThreat | None:
+    """
+    Fetches a single frozen threat by its primary key.
+    """
+    return db.query(FrozenThreat).filter(FrozenThreat.id == threat_id).first()
+
+
+def get_threat_by_prompt_hash(db: Session, prompt_hash: str) -> FrozenThreat | None:
+    """
+    Fetches a frozen threat by the SHA-256 of its prompt.
+    """
+    return db.query(FrozenThreat).filter(FrozenThreat.prompt_hash == prompt_hash).first()
+
+
+def get_active_threats(db: Session, *, seen_after: datetime | None = None) -> List[FrozenThreat]:
+    """
+    Returns every active frozen threat, optionally only those seen after a cut-off.
+    """
+    query = db.query(FrozenThreat).filter(FrozenThreat.is_active.is_(True))
+    if seen_after is not None:
+        query = query.filter(FrozenThreat.last_seen >= seen_after)
+    return query.order_by(FrozenThreat.id.asc()).all()
+
+
+def list_threats(db: Session, *, skip: int = 0, limit: int = 100) -> List[FrozenThreat]:
+    """
+    Lists frozen threats (active and unfrozen), most recently seen first.
+    """
+    return db.query(FrozenThreat).order_by(FrozenThreat.last_seen.desc()).offset(skip).limit(limit).all()
+
+
+def create_threat(
+    db: Session, *, prompt_hash: str, embedding: bytes, attack_type: str, reasoning: str | None
+) -> FrozenThreat:
+    """
+    Freezes a new threat, or re-activates and refreshes an existing one with the same prompt.
+    """
+    now = datetime.now(timezone.utc)
+    db_threat = get_threat_by_prompt_hash(db, prompt_hash)
+    if db_threat:
+        db_threat.is_active = True
+        db_threat.last_seen = now
+    else:
+        db_threat = FrozenThreat(
+            prompt_hash=prompt_hash,
+            embedding=embedding,
+            attack_type=attack_type,
+            reasoning=reasoning,
+            hit_count=0,
+            first_seen=now,
+            last_seen=now,
+            is_active=True,
+        )
+        db.add(db_threat)
+    db.commit()
+    db.refresh(db_threat)
+    return db_threat
+
+
+def record_hits(db: Session, *, hits: Dict[int, int]) -> None:
+    """
+    Adds buffered hit counts (threat id -> hits) and refreshes last_seen for
+    the matched threats, in one transaction.
+    """
+    if not hits:
+        return
+    now = datetime.now(timezone.utc)
+    for threat_id, count in hits.items():
+        db.query(FrozenThreat).filter(FrozenThreat.id == threat_id).update(
+            {FrozenThreat.hit_count: FrozenThreat.hit_count + count, FrozenThreat.last_seen: now},
+            synchronize_session=False,
+        )
+    db.commit()
+
+
+def unfreeze_threat(db: Session, *, threat_id: int, user_id: int | None = None) -> FrozenThreat | None:
+    """
+    Deactivates a frozen threat, recording who did it. Returns None if it does not exist.
+    """
+    db_threat = get_threat(db, threat_id)
+    if not db_threat:
+        return None
+    db_threat.is_active = False
+    db_threat.unfrozen_by_user_id = user_id
+    db_threat.unfrozen_at = datetime.now(timezone.utc)
+    db.commit()
+    db.refresh(db_threat)
+    return db_threat
+
+
+# --- Async variants, for request handlers ---
+
+async def get_threat_async(db: AsyncSession, threat_id: int) -> FrozenThreat | None:
+    """
+    Async `get_threat`.
+    """
+    return await db.get(FrozenThreat, threat_id)
@@ -1,28 +1,62 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.security import get_password_hash
+from app.crud import crud_api_key, crud_revocation
 from app.models.user import UserCreate
 from app.schemas.user import User
 
 
-def get_user_by_email(db: Session, *, email: str) -> User | None:
+async def get_user(db: AsyncSession, *, user_id: int) -> User | None:
+    """
+    Looks up a user by their primary key.
+    """
+    return await db.get(User, user_id)
+
+
+async def get_user_by_email(db: AsyncSession, *, email: str) -> User | None:
     """
     Looks up a user by their email address.
     """
-    return db.query(User).filter(User.email == email).first()
+    return await db.scalar(select(User).where(User.email == email))
 
 
-def create_user(db: Session, *, obj_in: UserCreate) -> User:
+async def create_user(db: AsyncSession, *, obj_in: UserCreate, hashed_password: str | None = None) -> User:
     """
     Creates a new user in the database.
+    Pass `hashed_password` to hash the password off the event loop first.
     """
     # Create a database-compatible dictionary from the input data
     db_obj = User(
         email=obj_in.email,
-        hashed_password=get_password_hash(obj_in.password),
+        hashed_password=hashed_password or get_password_hash(obj_in.password),
         is_active=True,
     )
     db.add(db_obj)
-    db.commit()
-    db.refresh(db_obj)
-    return db_obj
\ No newline at end of file
+    await db.commit()
+    await db.refresh(db_obj)
+    return db_obj
+
+
+
+async def set_user_active(db: AsyncSession, *, user: User, is_active: bool) -> User:
+    """
+    Activates or deactivates a user. Also records an invalidation, and marks
+    their API keys as changed, in the same transaction, so every worker drops
+    the user's cached principals and reloads their keys.
+    """
+    user.is_active = is_active
+    crud_revocation.add_user_invalidation(db, user_id=user.id)
+    await crud_api_key.touch_user_api_keys(db, user_id=user.id)
+    await db.commit()
+    await db.refresh(user)
+    return user
+
+
+async def update_password_hash(db: AsyncSession, *, user: User, hashed_password: str) -> User:
+    """
+    Replaces a user's password hash, e.g. with one made at the current bcrypt cost.
+    """
+    user.hashed_password = hashed_password
+    await db.commit()
+    return user
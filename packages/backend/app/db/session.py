@@ -1,4 +1,6 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
@@ -10,4 +12,48 @@ engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
 # SessionLocal is a "factory" for creating new database sessions.
 # When we need to talk to the database in an API request, we will
 # create an instance of this SessionLocal class.
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# --- Async engine ---
+# Request handlers and the log sequencer talk to the database through the
+# async engine, so a query never blocks the event loop. The sync engine above
+# stays for Alembic, background threads and worker processes.
+
+
+def async_database_url(url: str) -> URL:
+    """
+    Maps DATABASE_URL onto its asyncio driver: asyncpg for PostgreSQL,
+    aiosqlite for SQLite.
+    """
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend == "postgresql":
+        return url.set(drivername="postgresql+asyncpg").update_query_dict(
+            {"prepared_statement_cache_size": str(settings.DB_STATEMENT_CACHE_SIZE)}
+        )
+    if backend == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    return url
+
+
+def _async_engine_options(url: URL) -> dict:
+    if url.get_backend_name() != "postgresql":
+        return {"pool_pre_ping": True}
+    return {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": True,
+    }
+
+
+try:
+    _async_url = async_database_url(settings.DATABASE_URL)
+    async_engine = create_async_engine(_async_url, **_async_engine_options(_async_url))
+    # Objects stay readable after commit; reloading them would need an await.
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+except ImportError as e:
+    print(f"WARNING: No async driver for DATABASE_URL ({e}); async database sessions are disabled.")
+    async_engine = None
+    AsyncSessionLocal = None
@@ -1,12 +1,100 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.api.v1.api import api_router # <-- Import the main V1 router
+from app.db.session import async_engine
+from app import services
+from app.services import ai_critics
+from app.services.api_keys import api_key_authenticator
+from app.services.cache_snapshot import CacheSnapshotter
+from app.services.embedding_service import embedding_service
+from app.services.live_metrics import live_broadcaster, live_metrics
+from app.services.log_anchorer import log_anchorer
+from app.services.log_partitions import log_partition_manager
+from app.services.log_sequencer import log_sequencer
+from app.services.password_hasher import password_hasher
+from app.services.threat_sketches import threat_sketch_tracker
+from app.services.matrix_cache_manager import MatrixCacheManager
+
+
+def _report_prewarm(prewarm: asyncio.Future) -> None:
+    # Report a failed pre-warm when it happens; the first request would otherwise hit it unannounced.
+    if not prewarm.cancelled() and prewarm.exception() is not None:
+        print(f"Pre-warm failed: {prewarm.exception()}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # --- Startup: load the LLM client, critic chains and embedder in the background ---
+    prewarm = None
+    if settings.LLM_PREWARM:
+        prewarm = asyncio.gather(asyncio.to_thread(ai_critics.prewarm), embedding_service.load())
+        prewarm.add_done_callback(_report_prewarm)
+
+    # --- Startup: construct the semantic cache and threat index ---
+    cache_manager = services.get_cache_manager()
+    threat_manager = services.get_threat_manager()
+
+    # --- Startup: load the frozen-threat index, then re-sync it in the background ---
+    if settings.THREAT_FREEZING_ENABLED:
+        threat_manager.start()
+
+    # --- Startup: warm-start the in-process semantic cache from its last snapshot ---
+    snapshotter = None
+    if settings.SEMANTIC_CACHE_SNAPSHOT_DIR and isinstance(cache_manager, MatrixCacheManager):
+        snapshotter = CacheSnapshotter(cache_manager)
+        snapshotter.warm_start()
+        snapshotter.start()
+
+    # --- Startup: seal new logs into Merkle anchors in the background ---
+    if settings.LOG_ANCHOR_ENABLED:
+        log_anchorer.start()
+
+    # --- Startup: keep log partitions ahead of time and archive expired ones ---
+    log_partition_manager.start()
+
+    # --- Startup: load the API key table, then keep it up to date ---
+    await api_key_authenticator.start()
+
+    # --- Startup: persist the threat-source sketches periodically ---
+    if settings.THREAT_SKETCHES_ENABLED:
+        threat_sketch_tracker.start()
+
+    yield
+
+    if prewarm is not None:
+        # Let the loader threads finish; a failure has already been reported.
+        await asyncio.wait([prewarm])
+    # --- Shutdown: write a final snapshot so the next rollout starts warm ---
+    if snapshotter:
+        await snapshotter.stop()
+    # Commit log entries still queued for the chain; the next start anchors them.
+    await log_anchorer.stop()
+    await log_partition_manager.stop()
+    await log_sequencer.close()
+    # Persist the sketches of the logs just committed.
+    await threat_sketch_tracker.stop()
+    # Stop pushing live analytics and free this worker's shared counter region.
+    await live_broadcaster.stop()
+    live_metrics.close()
+    await api_key_authenticator.stop()
+    await threat_manager.stop()
+    password_hasher.close()
+    # Flush any buffered vector upserts (Vertex AI CacheManager).
+    if hasattr(cache_manager, "close"):
+        await cache_manager.close()
+    if async_engine is not None:
+        await async_engine.dispose()
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description="Nova: The AI Security & Trust Gateway",
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan,
 )
 
 origins = [
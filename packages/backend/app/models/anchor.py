@@ -0,0 +1,28 @@
+from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy.sql import func
+from app.db.base_class import Base
+
+class LogAnchor(Base):
+    """
+    SQLAlchemy model for a Merkle anchor: the root of a Merkle tree over the
+    hashes of a contiguous batch of logs (first_log_id..last_log_id). Anchors
+    are chained to each other the same way logs are, so any entry can be
+    proven with an O(log n) inclusion proof against a single anchor row.
+    """
+    __tablename__ = "log_anchors"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # The batch of logs covered by this anchor, inclusive.
+    first_log_id = Column(Integer, nullable=False, unique=True, index=True)
+    last_log_id = Column(Integer, nullable=False, unique=True, index=True)
+    leaf_count = Column(Integer, nullable=False)
+
+    # RFC 6962-style Merkle root over the batch's log hashes, in id order.
+    merkle_root = Column(String, nullable=False)
+
+    # SHA-256 over the previous anchor hash, the log range and the root.
+    anchor_hash = Column(String, unique=True, nullable=False, index=True)
+    previous_anchor_hash = Column(String, unique=True, nullable=True, index=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
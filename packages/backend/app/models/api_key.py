@@ -0,0 +1,36 @@
+from sqlalchemy import JSON, Boolean, Column, DateTime, Integer, String
+from sqlalchemy.sql import func
+from app.db.base_class import Base
+
+# What an API key can be used for.
+API_KEY_SCOPES = (
+    "gateway",     # /nova-chat on behalf of the key's owner
+    "logs:write",  # POST /logs/
+)
+
+class ApiKey(Base):
+    """
+    SQLAlchemy model for an API key of a machine client. Keys look like
+    `nova_<prefix>_<secret>`: the prefix finds the row, and only a salted
+    HMAC-SHA256 of the secret is stored. The secret is 256 random bits, so
+    a fast hash is enough, unlike for passwords.
+    """
+    __tablename__ = "api_keys"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    name = Column(String, nullable=False)
+
+    prefix = Column(String, unique=True, nullable=False, index=True)
+    salt = Column(String, nullable=False)
+    key_hash = Column(String, nullable=False)
+
+    scopes = Column(JSON, nullable=False, default=list)
+    rate_limit_per_minute = Column(Integer, nullable=True)  # None: unlimited
+    is_active = Column(Boolean(), nullable=False, default=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Bumped by every change workers must pick up; they refresh rows changed since their last load.
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    # Written in batches, so it trails actual use by up to API_KEY_REFRESH_SECONDS.
+    last_used_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,34 @@
+from sqlalchemy import BigInteger, Column, DateTime, Integer, String
+from sqlalchemy.sql import func
+from app.db.base_class import Base
+
+class LogArchive(Base):
+    """
+    SQLAlchemy model for a partition of the log chain that passed the retention
+    period and was moved to a compressed NDJSON file on local disk. The row
+    keeps the chain's boundary hashes for the archived range, so verification
+    can still link the logs before and after it, and re-hash the archived
+    entries from the file.
+    """
+    __tablename__ = "log_archives"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # The partition the logs were archived from, and its time range.
+    partition_name = Column(String, nullable=False, unique=True)
+    range_start = Column(DateTime(timezone=True), nullable=True)
+    range_end = Column(DateTime(timezone=True), nullable=False)
+
+    # The archived logs, inclusive, and the chain hashes at either end.
+    first_log_id = Column(Integer, nullable=False, unique=True, index=True)
+    last_log_id = Column(Integer, nullable=False, unique=True, index=True)
+    log_count = Column(BigInteger, nullable=False)
+    first_previous_log_hash = Column(String, nullable=True)
+    last_log_hash = Column(String, nullable=False)
+
+    # The archive file, relative to LOG_ARCHIVE_DIR, and the SHA-256 of its bytes.
+    file_name = Column(String, nullable=False)
+    file_sha256 = Column(String(64), nullable=False)
+    file_size = Column(BigInteger, nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, DateTime, Integer, LargeBinary, String
+from sqlalchemy.sql import func
+from app.db.base_class import Base
+
+class LogBlob(Base):
+    """
+    SQLAlchemy model for a content-addressed log payload: a large string from
+    a log's request_data or response_data (an LLM response, a source snippet,
+    a policy), stored once and compressed. Log rows reference it by hash.
+    """
+    __tablename__ = "log_blobs"
+
+    # SHA-256 of the uncompressed UTF-8 content; doubles as the integrity check.
+    hash = Column(String(64), primary_key=True)
+
+    # "zstd" or "zlib"
+    codec = Column(String, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    size = Column(Integer, nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,25 @@
+from sqlalchemy import BigInteger, Column, DateTime, Integer, String
+from sqlalchemy.sql import func
+from app.db.base_class import Base
+
+class ChainCheckpoint(Base):
+    """
+    SQLAlchemy model for a verified prefix of the log chain: every log up to
+    and including `last_log_id` was verified, ending at `last_log_hash`.
+    Later verifications start from the newest checkpoint instead of the
+    genesis block. Each checkpoint is HMAC-signed with the app's SECRET_KEY, so
+    a database writer cannot forge one to skip tampered rows.
+    """
+    __tablename__ = "chain_checkpoints"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    last_log_id = Column(Integer, nullable=False, index=True)
+    last_log_hash = Column(String, nullable=False)
+
+    # Total number of logs in the verified prefix.
+    logs_verified = Column(BigInteger, nullable=False)
+
+    signature = Column(String, nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
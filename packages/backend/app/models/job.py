@@ -0,0 +1,27 @@
+from sqlalchemy import JSON, BigInteger, Column, DateTime, String, Text
+from app.db.base_class import Base
+
+class BackgroundJob(Base):
+    """
+    SQLAlchemy model for a long-running job (a chain verification or a rollup
+    backfill) started through the API. The worker running it updates the row
+    as it goes, so any worker can report on it, and a running row with a
+    recent `heartbeat_at` stops every worker from starting another of its kind.
+    """
+    __tablename__ = "background_jobs"
+
+    id = Column(String, primary_key=True)
+    kind = Column(String, nullable=False, index=True)
+    status = Column(String, nullable=False, default="pending")  # pending, running, then ok, failed or error
+
+    # What the job was started with, and what it found; the shape depends on `kind`.
+    params = Column(JSON, nullable=False, default=dict)
+    result = Column(JSON, nullable=True)
+    message = Column(Text, nullable=True)
+
+    progress = Column(BigInteger, nullable=False, default=0)
+    total = Column(BigInteger, nullable=True)
+
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
@@ -1,14 +1,24 @@
 from sqlalchemy import Column, Integer, String, DateTime, JSON
+from sqlalchemy.engine import make_url
 from sqlalchemy.sql import func
+from app.core.config import settings
 from app.db.base_class import Base
 
+# On PostgreSQL the table is range-partitioned by created_at (migration
+# b8d3f1a6c4e2), which makes the primary key (id, created_at). The migration
+# does nothing on SQLite, which cannot autoincrement a composite key anyway,
+# so there the key stays on id alone.
+PARTITIONED = make_url(settings.DATABASE_URL).get_backend_name() == "postgresql"
+
 class Log(Base):
     """
     SQLAlchemy model for storing cryptographically-chained log entries.
     """
     __tablename__ = "logs"
+    # ids come from one sequence and stay unique, so they alone identify a row.
+    __mapper_args__ = {"primary_key": ["id"]}
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
 
     # Core transaction details from the gateway
     request_data = Column(JSON, nullable=False)
@@ -17,20 +27,24 @@ class Log(Base):
 
     # --- V2 Columns for Immutable Chain ---
 
+    # Neither hash column is unique: a unique index on a partitioned table has
+    # to include created_at, and one on (previous_log_hash, created_at) would
+    # not stop two entries claiming the same predecessor. Forks are prevented
+    # only by the chain lock (a PostgreSQL advisory lock, see crud_log) that
+    # every append takes before reading the head; chain verification detects
+    # any that slip past it.
+
     # The SHA-256 hash of the current log entry's critical data.
     # Indexed for faster verification queries.
-    log_hash = Column(String, unique=True, nullable=False, index=True)
+    log_hash = Column(String, nullable=False, index=True)
 
     # The SHA-256 hash of the *previous* log entry, forming the chain.
     # This is nullable ONLY for the very first log (the "genesis block").
-    previous_log_hash = Column(String, unique=True, nullable=True, index=True)
+    previous_log_hash = Column(String, nullable=True, index=True)
 
     # --- End V2 Columns ---
 
     # Timestamps
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-
-
-
-
-
+    # The partitioning migration defaults created_at to clock_timestamp() on
+    # PostgreSQL, taken under the chain lock, so it rises with id.
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, primary_key=PARTITIONED)
@@ -0,0 +1,21 @@
+from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy.sql import func
+from app.db.base_class import Base
+
+class AuthRevocation(Base):
+    """
+    SQLAlchemy model for an authentication event every worker must apply to
+    its in-memory principal cache: a revoked token (`jti` set), or a change to
+    a user, such as deactivation, that invalidates their cached principals
+    (`jti` empty). Workers re-read the unexpired rows and apply the ids they
+    have not seen yet.
+    """
+    __tablename__ = "auth_revocations"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False, index=True)
+    jti = Column(String, nullable=True, index=True)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Once every token it could affect has expired the row is no longer needed.
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
@@ -0,0 +1,50 @@
+from sqlalchemy import JSON, BigInteger, Column, DateTime, String
+from app.db.base_class import Base
+
+# Per-critic outcome counters kept for every bucket, besides request_count.
+ROLLUP_COUNTERS = (
+    "request_count",
+    "cache_hits",
+    "frozen_threats",
+    "prompt_injections",
+    "policy_failures",
+    "possible_hallucinations",
+    "claims_contradicted",
+)
+
+class AnalyticsRollup(Base):
+    """
+    SQLAlchemy model for pre-aggregated gateway analytics: how many logs of
+    one verdict were written in one minute or hour, and what the critics
+    found in them. Rows are incremented in the same transaction that appends
+    the logs, so dashboards read O(buckets) rows instead of scanning `logs`.
+    """
+    __tablename__ = "analytics_rollups"
+
+    bucket_size = Column(String, primary_key=True)  # "minute" or "hour"
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+    verdict = Column(String, primary_key=True)
+
+    request_count = Column(BigInteger, nullable=False, default=0)
+    cache_hits = Column(BigInteger, nullable=False, default=0)
+    frozen_threats = Column(BigInteger, nullable=False, default=0)
+    prompt_injections = Column(BigInteger, nullable=False, default=0)
+    policy_failures = Column(BigInteger, nullable=False, default=0)
+    possible_hallucinations = Column(BigInteger, nullable=False, default=0)
+    claims_contradicted = Column(BigInteger, nullable=False, default=0)
+
+
+class StageLatencyRollup(Base):
+    """
+    SQLAlchemy model for per-stage gateway latencies: one DDSketch (see
+    app/core/ddsketch.py) per minute or hour and stage, built from the
+    `timings_ms` each gateway log records. Sketches merge, so percentiles
+    over any window are read from O(buckets) rows.
+    """
+    __tablename__ = "stage_latency_rollups"
+
+    bucket_size = Column(String, primary_key=True)  # "minute" or "hour"
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+    stage = Column(String, primary_key=True)
+
+    sketch = Column(JSON, nullable=False)  # DDSketch.to_dict(), in milliseconds
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, DateTime, LargeBinary, String
+from sqlalchemy.sql import func
+from app.db.base_class import Base
+
+class ThreatSketch(Base):
+    """
+    SQLAlchemy model for the heavy-hitter and distinct-count sketch of one
+    source field (client IP or user ID) among the requests of one threat type
+    in one hour (see SourceSketch in app/core/sketches.py). Workers merge
+    their in-memory sketches into these rows periodically; queries merge the
+    rows of a time window.
+    """
+    __tablename__ = "threat_sketches"
+
+    window_start = Column(DateTime(timezone=True), primary_key=True)
+    threat_type = Column(String, primary_key=True)  # e.g. "blocked", "attack:jailbreak", "all"
+    field = Column(String, primary_key=True)  # "source_ip" or "user_id"
+
+    data = Column(LargeBinary, nullable=False)  # SourceSketch.to_bytes()
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -0,0 +1,33 @@
+from sqlalchemy import Boolean, Column, DateTime, Integer, LargeBinary, String, Text
+from sqlalchemy.sql import func
+from app.db.base_class import Base
+
+class FrozenThreat(Base):
+    """
+    SQLAlchemy model for a "frozen" attack: the embedding of a prompt that the
+    security critic marked MALICIOUS. Near-identical prompts are blocked by
+    vector similarity instead of another LLM call.
+    """
+    __tablename__ = "frozen_threats"
+
+    id = Column(Integer, primary_key=True, index=True)
+
+    # SHA-256 of the original prompt, so the same attack is only frozen once.
+    prompt_hash = Column(String, unique=True, nullable=False, index=True)
+
+    # The prompt embedding, stored as raw float32 bytes.
+    embedding = Column(LargeBinary, nullable=False)
+
+    attack_type = Column(String, nullable=False, default="unknown")
+    reasoning = Column(Text, nullable=True)
+
+    # Matches extend an entry's life; entries unseen for THREAT_TTL_DAYS expire.
+    hit_count = Column(Integer, nullable=False, default=0)
+    first_seen = Column(DateTime(timezone=True), server_default=func.now())
+    last_seen = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Cleared by an admin "unfreeze"; the row is kept for the audit trail.
+    is_active = Column(Boolean(), nullable=False, default=True, index=True)
+    # Who cleared it last, and when.
+    unfrozen_by_user_id = Column(Integer, nullable=True)
+    unfrozen_at = Column(DateTime(timezone=True), nullable=True)
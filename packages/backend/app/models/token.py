@@ -5,4 +5,6 @@ class Token(BaseModel):
     token_type: str = "bearer"
 
 class TokenPayload(BaseModel):
-    sub: int | None = None
\ No newline at end of file
+    sub: int | None = None
+    jti: str | None = None
+    exp: int | None = None
\ No newline at end of file
@@ -1,24 +1,38 @@
+from functools import cache
+
 from app.core.config import settings
 
 # This file acts as a "smart switch" for all services.
-# It decides whether to export REAL or MOCK services based on an environment variable.
+# It decides whether to return REAL or MOCK services based on an environment variable.
+#
+# The services are built on the first call, not on import, so importing any
+# app.services module does not construct vector clients or indexes; the app
+# does it in its lifespan.
+
 
-# --- Semantic Cache Service ---
-if settings.USE_MOCK_SERVICES:
-    from .mock_cache_manager import mock_cache_manager as cache_manager
-else:
-    # This will be enabled when you build the real cache_manager.py
-    # from .cache_manager import cache_manager as cache_manager
-    print("WARNING: Real CacheManager not yet implemented. Falling back to mock.")
-    from .mock_cache_manager import mock_cache_manager as cache_manager
+@cache
+def get_cache_manager():
+    # --- Semantic Cache Service ---
+    if settings.USE_MOCK_SERVICES:
+        from .mock_cache_manager import mock_cache_manager as cache_manager
+    elif all([settings.GCP_PROJECT_ID, settings.GCP_REGION, settings.VECTOR_SEARCH_ENDPOINT_ID]):
+        from .cache_manager import cache_manager as cache_manager
+    elif settings.QDRANT_URL or settings.QDRANT_PATH:
+        from .qdrant_cache_manager import qdrant_cache_manager as cache_manager
+    elif settings.SEMANTIC_CACHE_STORAGE != "float32":
+        from .quantized_cache_manager import quantized_cache_manager as cache_manager
+    else:
+        # Neither Vertex AI nor Qdrant is configured, so serve the cache from this process.
+        from .matrix_cache_manager import matrix_cache_manager as cache_manager
+    return cache_manager
 
 
-# --- NEW: Dynamic Threat Freezing Service ---
-if settings.USE_MOCK_SERVICES:
-    # We are building the mock version now.
-    from .mock_threat_manager import mock_threat_manager as threat_manager
-else:
-    # In the future, you would build the real threat manager here.
-    # For now, we fall back to the mock to prevent crashes.
-    print("WARNING: Real ThreatManager not yet implemented. Falling back to mock.")
-    from .mock_threat_manager import mock_threat_manager as threat_manager
\ No newline at end of file
+@cache
+def get_threat_manager():
+    # --- NEW: Dynamic Threat Freezing Service ---
+    if settings.USE_MOCK_SERVICES:
+        # We are building the mock version now.
+        from .mock_threat_manager import mock_threat_manager as threat_manager
+    else:
+        from .threat_manager import threat_manager as threat_manager
+    return threat_manager
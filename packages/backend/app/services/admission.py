@@ -0,0 +1,224 @@
+import asyncio
+import math
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Deque, Dict, Optional
+
+from app.core.config import settings
+
+THROUGHPUT_SMOOTHING = 0.2  # Weight of the latest second in the throughput average.
+LATENCY_SMOOTHING = 0.1
+LIMIT_HEADROOM = 1.25       # Lets throughput, and so the limit, grow when demand does.
+
+
+class Priority(IntEnum):
+    """Admission classes, most important first."""
+    TENANT = 0       # Authenticated interactive requests.
+    BATCH = 1        # Authenticated requests marked as batch work.
+    BEST_EFFORT = 2  # Anonymous requests and /unprotected-chat.
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of admitted."""
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+@dataclass
+class _Waiter:
+    priority: Priority
+    enqueued: float
+    future: asyncio.Future = field(repr=False)
+
+
+class AdmissionController:
+    """
+    Bounds the gateway requests in flight, and queues or sheds the rest by priority.
+
+    The limit follows Little's law (in flight = throughput x latency): it is
+    the smoothed completion rate times the smoothed request latency (at least
+    `target_latency_seconds`), plus headroom. Below capacity, this is above
+    the number in flight, so nothing waits. Past capacity, the completion rate
+    stops growing, and so does the limit.
+    Requests beyond it wait in this process rather than pile onto the LLM,
+    where every request would slow down and time out together.
+
+    Waiting requests are admitted by priority, first come first served within a
+    class. When the queue holds `max_queue` requests, a new request evicts the
+    newest waiter of a lower class, or is rejected at once. As in CoDel,
+    once queueing delay has stayed above `queue_target_ms` for
+    `queue_interval_ms`, requests that waited longer than the target are
+    dropped when they reach the head of the queue. No request waits longer
+    than `max_queue_wait_seconds`.
+    """
+    def __init__(
+        self,
+        target_latency_seconds: float = settings.ADMISSION_TARGET_LATENCY_SECONDS,
+        min_limit: int = settings.ADMISSION_MIN_LIMIT,
+        max_limit: int = settings.ADMISSION_MAX_LIMIT,
+        max_queue: int = settings.ADMISSION_MAX_QUEUE,
+        max_queue_wait_seconds: float = settings.ADMISSION_MAX_QUEUE_WAIT_SECONDS,
+        queue_target_ms: float = settings.ADMISSION_QUEUE_TARGET_MS,
+        queue_interval_ms: float = settings.ADMISSION_QUEUE_INTERVAL_MS,
+    ):
+        self.target_latency = target_latency_seconds
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.max_queue_wait = max_queue_wait_seconds
+        self.queue_target = queue_target_ms / 1000
+        self.queue_interval = queue_interval_ms / 1000
+
+        self.limit = min_limit
+        self.in_flight = 0
+        self._queues: Dict[Priority, Deque[_Waiter]] = {priority: deque() for priority in Priority}
+        self._throughput = 0.0  # Completions per second, smoothed.
+        self._latency: Optional[float] = None
+        self._second = int(time.monotonic())
+        self._completed = 0     # Completions in the current second.
+        self._above_target_until: Optional[float] = None
+        self.shed: Counter = Counter()
+
+    # --- Limit ---
+
+    def _tick(self, now: float) -> None:
+        second = int(now)
+        if second == self._second:
+            return
+        # Fold in the finished second, then any idle ones since (capped: the weight decays fast).
+        for completed in [self._completed] + [0] * min(second - self._second - 1, 30):
+            self._throughput += THROUGHPUT_SMOOTHING * (completed - self._throughput)
+        self._second, self._completed = second, 0
+        # In flight at the measured latency; below the target, the target still allows for bursts.
+        latency = max(self._latency or 0.0, self.target_latency)
+        ideal = math.ceil(self._throughput * latency * LIMIT_HEADROOM)
+        self.limit = max(self.min_limit, min(self.max_limit, ideal))
+        self._grant(now)
+
+    # --- Queue ---
+
+    @property
+    def queued(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _retry_after(self) -> float:
+        # Roughly how long the queue ahead takes to drain.
+        return max(1.0, self.queued / max(self._throughput, 1.0))
+
+    def _reject(self, waiter: _Waiter, reason: str) -> None:
+        self.shed[(reason, waiter.priority.name.lower())] += 1
+        if not waiter.future.done():
+            waiter.future.set_exception(Overloaded(reason, self._retry_after()))
+
+    def _next_waiter(self, now: float) -> Optional[_Waiter]:
+        for priority in Priority:
+            queue = self._queues[priority]
+            while queue:
+                waiter = queue.popleft()
+                if waiter.future.done():
+                    continue  # Timed out or cancelled while waiting.
+                if now - waiter.enqueued < self.queue_target:
+                    self._above_target_until = None
+                    return waiter
+                if self._above_target_until is None:
+                    self._above_target_until = now + self.queue_interval
+                    return waiter
+                if now < self._above_target_until:
+                    return waiter
+                # Queueing delay has been above target for a whole interval: drop at the head.
+                self._reject(waiter, "queue_delay")
+        return None
+
+    def _grant(self, now: float) -> None:
+        while self.in_flight < self.limit:
+            waiter = self._next_waiter(now)
+            if waiter is None:
+                return
+            self.in_flight += 1
+            waiter.future.set_result(None)
+
+    def _make_room(self, priority: Priority) -> bool:
+        """Evicts the newest waiter of the lowest class below `priority`, if there is one."""
+        for lower in reversed(Priority):
+            if lower <= priority:
+                return False
+            queue = self._queues[lower]
+            while queue:
+                waiter = queue.pop()
+                if not waiter.future.done():
+                    self._reject(waiter, "evicted")
+                    return True
+        return False
+
+    async def _acquire(self, priority: Priority) -> None:
+        now = time.monotonic()
+        self._tick(now)
+        ahead = sum(len(self._queues[p]) for p in Priority if p <= priority)
+        if self.in_flight < self.limit and not ahead:
+            self.in_flight += 1
+            return
+        if self.queued >= self.max_queue and not self._make_room(priority):
+            self.shed[("queue_full", priority.name.lower())] += 1
+            raise Overloaded("queue_full", self._retry_after())
+
+        waiter = _Waiter(priority, now, asyncio.get_running_loop().create_future())
+        self._queues[priority].append(waiter)
+        try:
+            await asyncio.wait({waiter.future}, timeout=self.max_queue_wait)
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled() and waiter.future.exception() is None:
+                self._release(None)  # Granted just as the client went away.
+            waiter.future.cancel()
+            raise
+        if not waiter.future.done():
+            waiter.future.cancel()
+            self.shed[("queue_timeout", priority.name.lower())] += 1
+            raise Overloaded("queue_timeout", self._retry_after())
+        waiter.future.result()  # Raises Overloaded if it was shed.
+
+    def _release(self, latency: Optional[float]) -> None:
+        now = time.monotonic()
+        self.in_flight -= 1
+        if latency is not None:
+            self._completed += 1
+            self._latency = latency if self._latency is None else (
+                self._latency + LATENCY_SMOOTHING * (latency - self._latency)
+            )
+        self._tick(now)
+        self._grant(now)
+
+    # --- Public API ---
+
+    @asynccontextmanager
+    async def admit(self, priority: Priority):
+        """
+        Holds one in-flight slot for the enclosed request, waiting for one if
+        needed. Raises Overloaded if the request is shed instead.
+        """
+        await self._acquire(priority)
+        started = time.monotonic()
+        try:
+            yield
+        except BaseException:
+            self._release(None)  # Failures are not completions; they say nothing of capacity.
+            raise
+        self._release(time.monotonic() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        self._tick(time.monotonic())
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "queued": {priority.name.lower(): len(self._queues[priority]) for priority in Priority},
+            "throughput_per_second": round(self._throughput, 3),
+            "latency_seconds": round(self._latency, 3) if self._latency is not None else None,
+            "shed": {f"{reason}:{priority}": count for (reason, priority), count in self.shed.items()},
+        }
+
+
+admission_controller = AdmissionController()
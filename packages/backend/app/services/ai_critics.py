@@ -1,9 +1,16 @@
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.pydantic_v1 import BaseModel, Field, ValidationError
-from langchain_core.output_parsers import PydanticOutputParser , StrOutputParser
-from langchain_core.runnables import Runnable
-from langchain_google_genai import ChatGoogleGenerativeAI
-from typing import Literal, Optional, List , Any ,Dict 
+import asyncio
+import functools
+import threading
+from pydantic import BaseModel, Field, ValidationError
+from typing import TYPE_CHECKING, Literal, Optional, List , Any ,Dict 
+
+if TYPE_CHECKING:
+    from langchain_core.runnables import Runnable
+
+# LangChain's prompt and parser classes and the Gemini client take about a
+# second to import, so they are loaded by `get_model()` on first use (or by
+# the pre-warm at startup), not when this module is imported.
+ChatPromptTemplate = PydanticOutputParser = StrOutputParser = None
 
 class CriticResponse(BaseModel):
     """A standard response for all critic agents."""
@@ -64,10 +71,76 @@ class DeepfakeAnalysisConclusion(BaseModel):
     )    
 
 # --- INITIALIZIng THE CORE AI MODEL (GEMINI) ---
-model = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash", 
-    temperature=0.0
-)
+model = None
+_model_lock = threading.Lock()
+_model_loaded = False
+
+
+def get_model():
+    """
+    The shared Gemini chat model, created on first use; None if it could not
+    be created (e.g. no GOOGLE_API_KEY). Safe to call from several threads.
+    """
+    global model, _model_loaded, ChatPromptTemplate, PydanticOutputParser, StrOutputParser
+    if _model_loaded:
+        return model
+    with _model_lock:
+        if not _model_loaded:
+            from langchain_core.output_parsers import PydanticOutputParser, StrOutputParser
+            from langchain_core.prompts import ChatPromptTemplate
+            try:
+                from langchain_google_genai import ChatGoogleGenerativeAI
+                model = ChatGoogleGenerativeAI(
+                    model="gemini-2.5-flash", 
+                    temperature=0.0
+                )
+            except Exception as e:
+                print(f"Error creating the Gemini client: {e}")
+            _model_loaded = True
+    return model
+
+
+async def get_model_async():
+    """`get_model()` for request handlers: a first load runs off the event loop."""
+    if _model_loaded:
+        return model
+    return await asyncio.to_thread(get_model)
+
+
+def cached_chain(builder):
+    """
+    Builds a chain once, on first use, and reuses it: chains hold no
+    per-request state. A chain is not cached while the model is unavailable.
+    """
+    chain = None
+
+    @functools.wraps(builder)
+    def get_chain():
+        nonlocal chain
+        if chain is None:
+            if get_model() is None:
+                raise RuntimeError("The Gemini client is not configured.")
+            chain = builder()
+        return chain
+    return get_chain
+
+
+def prewarm() -> None:
+    """Loads LangChain and the model, and builds the gateway's critic chains."""
+    if get_model() is None:
+        return
+    for get_chain in (
+        get_prompt_injection_chain,
+        get_custom_policy_chain,
+        get_claim_extractor_chain,
+        get_synthesizing_verifier_chain,
+        get_hallucination_verifier_chain,
+    ):
+        try:
+            get_chain()
+        except Exception as e:
+            # The critic falls back at request time, as it would without pre-warm.
+            print(f"Could not build {get_chain.__name__}: {e}")
 
 
 # --- V1 CRITICS ---
@@ -89,7 +162,8 @@ You must analyze the user prompt for the following attack vectors:
 {format_instructions}
 """
 
-def get_prompt_injection_chain() -> Runnable:
+@cached_chain
+def get_prompt_injection_chain() -> "Runnable":
     """Builds and returns the runnable chain for the prompt injection critic."""
     parser = PydanticOutputParser(pydantic_object=SecurityCriticResponse)
     
@@ -132,7 +206,8 @@ You will be given a 'TEXT TO EVALUATE'. Analyze it and decide if it violates the
 {format_instructions}
 """
 
-def get_custom_policy_chain() -> Runnable:
+@cached_chain
+def get_custom_policy_chain() -> "Runnable":
     """Builds and returns the runnable chain for the custom policy critic."""
     parser = PydanticOutputParser(pydantic_object=PolicyCriticResponse)
     
@@ -195,7 +270,8 @@ Your response MUST be a single, minified JSON object that conforms to the follow
 """
 
 
-def get_claim_extractor_chain() -> Runnable:
+@cached_chain
+def get_claim_extractor_chain() -> "Runnable":
     """
     Builds and returns the runnable LangChain chain for the claim extractor agent.
     This chain is designed to take text as input and output a validated Pydantic object.
@@ -253,7 +329,8 @@ Your response MUST be a single, minified JSON object that conforms to the follow
 {format_instructions}
 """
 
-def get_synthesizing_verifier_chain() -> Runnable:
+@cached_chain
+def get_synthesizing_verifier_chain() -> "Runnable":
     """
     Builds and returns the runnable LangChain chain for the synthesizing verifier agent.
     """
@@ -317,7 +394,8 @@ Your response MUST be a single, minified JSON object that conforms to the follow
 {format_instructions}
 """
 
-def get_hallucination_verifier_chain() -> Runnable:
+@cached_chain
+def get_hallucination_verifier_chain() -> "Runnable":
     """
     Builds and returns the runnable LangChain chain for the hallucination verifier agent.
     """
@@ -367,7 +445,8 @@ You are a 'Persona Shaper', an expert AI copy editor. Your task is to rewrite a
 4.  Your output must ONLY be the rewritten text. Do not add any commentary, greetings, or explanations.
 """
 
-def get_persona_rewriter_chain() -> Runnable:
+@cached_chain
+def get_persona_rewriter_chain() -> "Runnable":
     """
     Builds and returns a runnable chain for rewriting text to a specific persona.
     """
@@ -414,7 +493,8 @@ You are a 'De-escalation Specialist'. You are an AI expert in empathetic communi
 5.  Your output must ONLY be the rewritten text. Do not add any commentary.
 """
 
-def get_deescalation_rewriter_chain() -> Runnable:
+@cached_chain
+def get_deescalation_rewriter_chain() -> "Runnable":
     """
     Builds and returns a runnable chain for de-escalating text.
     """
@@ -470,7 +550,8 @@ Your Output:
 Note: This source has a mixed record of reliability; consider consulting other sources.
 """
 
-def get_source_reputation_chain() -> Runnable:
+@cached_chain
+def get_source_reputation_chain() -> "Runnable":
     """
     Builds and returns a runnable chain for interpreting source reputation data.
     """
@@ -533,7 +614,8 @@ Your JSON Response:
 {format_instructions}
 """
 
-def get_deepfake_interpreter_chain() -> Runnable:
+@cached_chain
+def get_deepfake_interpreter_chain() -> "Runnable":
     """
     Builds and returns a runnable chain for interpreting deepfake analysis data.
     """
@@ -610,7 +692,8 @@ A user's query has been flagged for a potential threat. You will be given contex
 6.  Your output must ONLY be the final message. Do not add any commentary or greetings.
 """
 
-def get_educational_content_chain() -> Runnable:
+@cached_chain
+def get_educational_content_chain() -> "Runnable":
     """
     Builds and returns a runnable chain for generating educational content.
     """
@@ -693,7 +776,8 @@ Suggest 1-2 concrete, actionable steps the administrator should take *immediatel
 - Example: "2. **Review User Activity:** The activity for `user-789` should be audited, as their session correlated with multiple PII leak warnings."
 """
 
-def get_security_briefing_chain() -> Runnable:
+@cached_chain
+def get_security_briefing_chain() -> "Runnable":
     """
     Builds and returns a runnable chain for generating a security briefing.
     """
@@ -720,7 +804,7 @@ async def generate_security_briefing(log_data: List[LogEntry]) -> str:
 
     try:
         # Convert Pydantic objects to a list of dicts for clean JSON serialization
-        log_data_dicts = [log.dict() for log in log_data]
+        log_data_dicts = [log.model_dump() for log in log_data]
         log_data_json = json.dumps(log_data_dicts, indent=2)
 
         briefing_chain = get_security_briefing_chain()
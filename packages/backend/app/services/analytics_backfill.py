@@ -0,0 +1,167 @@
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional, Tuple
+
+from sqlalchemy import func
+
+from app.crud import crud_analytics
+from app.crud.crud_job import as_utc
+from app.db.session import SessionLocal
+from app.models import log as log_models
+from app.models.job import BackgroundJob
+from app.services.background_jobs import BackgroundJobRunner, JobProgress
+
+HOUR = timedelta(hours=1)
+
+
+def _to_iso(moment: Optional[datetime]) -> Optional[str]:
+    return moment.isoformat() if moment else None
+
+
+def _from_iso(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+
+@dataclass
+class BackfillJob:
+    """A background rollup backfill, polled through the API for progress."""
+    id: str
+    since: Optional[datetime]
+    until: Optional[datetime]
+    status: str  # pending, running, ok or error
+    logs_processed: int
+    rebuilt_from: Optional[datetime]
+    rebuilt_until: Optional[datetime]
+    message: Optional[str]
+    started_at: float
+    finished_at: Optional[float]
+
+    @classmethod
+    def from_row(cls, job: BackgroundJob) -> "BackfillJob":
+        result = job.result or {}
+        return cls(
+            id=job.id,
+            since=_from_iso(job.params.get("since")),
+            until=_from_iso(job.params.get("until")),
+            status=job.status,
+            logs_processed=job.progress,
+            rebuilt_from=_from_iso(result.get("rebuilt_from")),
+            rebuilt_until=_from_iso(result.get("rebuilt_until")),
+            message=job.message,
+            started_at=as_utc(job.started_at).timestamp(),
+            finished_at=as_utc(job.finished_at).timestamp() if job.finished_at else None,
+        )
+
+
+class RollupBackfiller:
+    """
+    Rebuilds the analytics rollups and stage latency sketches from the logs
+    table, e.g. for logs written before rollups existed.
+
+    Only whole, closed hours are rebuilt: a bucket is replaced in one
+    transaction, and since logs are stamped at insert time, no new log can
+    land in a closed hour while it is being rebuilt. Rebuilding is idempotent,
+    so the backfill can be re-run at any time (for example an hour after
+    deploying, to cover the hour that was still open).
+
+    Background runs are kept in the `background_jobs` table, so they can be
+    polled from any worker, and only one runs at a time across workers.
+    """
+    def __init__(self, yield_per: int = 5_000):
+        self.yield_per = yield_per
+        self._jobs = BackgroundJobRunner("rollup-backfill", self._run_job)
+
+    def backfill(
+        self,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        progress: Optional[Callable[[int], None]] = None,
+    ) -> tuple:
+        """
+        Rebuilds the rollups for every closed hour in [since, until), by
+        default from the oldest log up to the current hour. Returns the
+        (start, end) of the rebuilt span, or (None, None) if there was nothing to do.
+        """
+        progress = progress or (lambda _: None)
+        open_hour = crud_analytics.bucket_start(datetime.now(timezone.utc), "hour")
+        db = SessionLocal()
+        try:
+            if since is None:
+                since = db.query(func.min(log_models.Log.created_at)).scalar()
+                if since is None:
+                    return None, None
+            start = crud_analytics.bucket_start(since, "hour")
+            end = min(crud_analytics.bucket_start(until, "hour"), open_hour) if until else open_hour
+            if start >= end:
+                return None, None
+
+            rows = (
+                db.query(log_models.Log.created_at, log_models.Log.verdict, log_models.Log.response_data)
+                .filter(log_models.Log.created_at >= start, log_models.Log.created_at < end)
+                .order_by(log_models.Log.id.asc())
+                .execution_options(stream_results=True)
+                .yield_per(self.yield_per)
+            )
+
+            # Per hour: the counter rollups and the latency sketches of its buckets.
+            pending: Dict[datetime, Tuple[dict, dict]] = {}
+            rebuilt_until = start
+
+            def flush(limit: datetime) -> None:
+                # Replaces every bucket in [rebuilt_until, limit), hours without logs included.
+                nonlocal rebuilt_until
+                if limit <= rebuilt_until:
+                    return
+                rollups, sketches = {}, {}
+                for hour in [hour for hour in pending if hour < limit]:
+                    hour_rollups, hour_sketches = pending.pop(hour)
+                    rollups.update(hour_rollups)
+                    sketches.update(hour_sketches)
+                crud_analytics.replace_rollups(write_db, start=rebuilt_until, end=limit, rollups=rollups, sketches=sketches)
+                rebuilt_until = limit
+
+            write_db = SessionLocal()
+            try:
+                count = 0
+                for row in rows:
+                    hour = crud_analytics.bucket_start(row.created_at, "hour")
+                    hour_rollups, hour_sketches = pending.setdefault(hour, ({}, {}))
+                    crud_analytics.aggregate_rollups([row], into=hour_rollups)
+                    crud_analytics.aggregate_latency([row], into=hour_sketches)
+                    count += 1
+                    if count % self.yield_per == 0:
+                        progress(self.yield_per)
+                    # Keep an hour of slack for rows committed slightly out of created_at order.
+                    if hour - HOUR > rebuilt_until:
+                        flush(hour - HOUR)
+                progress(count % self.yield_per)
+                flush(end)
+            finally:
+                write_db.close()
+            return start, end
+        finally:
+            db.close()
+
+    # --- Background jobs ---
+
+    def _run_job(self, params: dict, progress: JobProgress) -> tuple:
+        try:
+            rebuilt_from, rebuilt_until = self.backfill(_from_iso(params["since"]), _from_iso(params["until"]), progress.add)
+        except Exception as e:
+            return "error", f"Backfill failed to run: {e}", None
+        message = "Rollups rebuilt." if rebuilt_from else "No closed hours to rebuild."
+        return "ok", message, {"rebuilt_from": _to_iso(rebuilt_from), "rebuilt_until": _to_iso(rebuilt_until)}
+
+    async def start_job(self, since: datetime | None = None, until: datetime | None = None) -> BackfillJob:
+        """
+        Starts a backfill in the background and returns its job. While a job
+        is running on any worker, the running job is returned instead of starting another.
+        """
+        return BackfillJob.from_row(await self._jobs.start({"since": _to_iso(since), "until": _to_iso(until)}))
+
+    def get_job(self, job_id: str) -> Optional[BackfillJob]:
+        job = self._jobs.get(job_id)
+        return BackfillJob.from_row(job) if job else None
+
+
+rollup_backfiller = RollupBackfiller()
@@ -0,0 +1,100 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.crud import crud_job
+from app.db.session import SessionLocal
+from app.models.job import BackgroundJob
+
+
+class JobProgress:
+    """Counters a job updates from its thread; the runner writes them out on every heartbeat."""
+    def __init__(self):
+        self.count = 0
+        self.total: Optional[int] = None
+
+    def add(self, count: int) -> None:
+        self.count += count
+
+    def set_total(self, total: int) -> None:
+        self.total = total
+
+
+# A job's work: given its params and progress, returns (status, message, result).
+JobWork = Callable[[dict, JobProgress], Tuple[str, Optional[str], Optional[dict]]]
+
+
+class BackgroundJobRunner:
+    """
+    Runs jobs of one `kind` in a thread of this worker, and keeps their state
+    in the `background_jobs` table so a job started on one worker can be
+    polled on any other, and only one job of the kind runs across all of them.
+
+    Progress is written every `heartbeat_seconds`. A running job that has not
+    written for `stale_seconds` is taken to have died with its worker, and no
+    longer stops a new one from starting.
+    """
+    def __init__(
+        self,
+        kind: str,
+        work: JobWork,
+        heartbeat_seconds: float = settings.BACKGROUND_JOB_HEARTBEAT_SECONDS,
+        stale_seconds: float = settings.BACKGROUND_JOB_STALE_SECONDS,
+    ):
+        self.kind = kind
+        self.work = work
+        self.heartbeat_seconds = heartbeat_seconds
+        self.stale_seconds = stale_seconds
+        self._background_tasks: Set[asyncio.Task] = set()
+
+    @staticmethod
+    def _with_db(operation, **kwargs):
+        db = SessionLocal()
+        try:
+            return operation(db, **kwargs)
+        finally:
+            db.close()
+
+    async def _update(self, job_id: str, **fields) -> None:
+        try:
+            await asyncio.to_thread(self._with_db, crud_job.update_job, job_id=job_id, **fields)
+        except Exception as e:
+            print(f"BackgroundJobRunner: Failed to update {self.kind} job {job_id}: {e}")
+
+    async def _run(self, job_id: str, params: dict) -> None:
+        progress = JobProgress()
+        await self._update(job_id, status="running")
+        work = asyncio.create_task(asyncio.to_thread(self.work, params, progress))
+        while not work.done():
+            await asyncio.wait({work}, timeout=self.heartbeat_seconds)
+            if not work.done():
+                await self._update(job_id, progress=progress.count, total=progress.total)
+        try:
+            status, message, result = work.result()
+        except Exception as e:
+            status, message, result = "error", f"The job failed to run: {e}", None
+        await self._update(
+            job_id, status=status, message=message, result=result,
+            progress=progress.count, total=progress.total, finished_at=datetime.now(timezone.utc),
+        )
+
+    # --- Public API ---
+
+    async def start(self, params: dict) -> BackgroundJob:
+        """
+        Starts a job in the background and returns it. While a job of this
+        kind is pending or running on any worker, that job is returned instead.
+        """
+        stale_before = datetime.now(timezone.utc) - timedelta(seconds=self.stale_seconds)
+        job, created = await asyncio.to_thread(
+            self._with_db, crud_job.claim_job, kind=self.kind, params=params, stale_before=stale_before
+        )
+        if created:
+            task = asyncio.get_running_loop().create_task(self._run(job.id, params))
+            self._background_tasks.add(task)
+            task.add_done_callback(self._background_tasks.discard)
+        return job
+
+    def get(self, job_id: str) -> Optional[BackgroundJob]:
+        return self._with_db(crud_job.get_job, kind=self.kind, job_id=job_id)
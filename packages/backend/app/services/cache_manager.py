@@ -1,66 +1,238 @@
-from google.cloud import aiplatform
-from typing import List, Optional
+import asyncio
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
 
 from app.core.config import settings
 
+
 class CacheManager:
     """
     A service class to manage interactions with the Vertex AI Vector Search index
     for the semantic cache. This class encapsulates all SDK logic.
+
+    The SDK is synchronous, so every call runs on a small dedicated thread pool
+    and the event loop never waits on a network round trip:
+
+    - Lookups are queued and coalesced: concurrent `check_cache` calls that
+      share a namespace are sent as one multi-query `find_neighbors` request.
+      A lookup that takes longer than `lookup_timeout` is treated as a miss.
+    - `add_to_cache` only appends to a buffer. A background flusher sends the
+      buffer to `MatchingEngineIndex.upsert_datapoints` when it holds
+      `upsert_batch_size` entries or every `upsert_flush_seconds`.
+
+    `index_endpoint` and `index` can be passed in (e.g. fakes exposing the same
+    methods) instead of connecting to Vertex AI from settings.
     """
-    def __init__(self):
-        
+    def __init__(
+        self,
+        index_endpoint=None,
+        index=None,
+        deployed_index_id: Optional[str] = settings.VECTOR_SEARCH_DEPLOYED_INDEX_ID,
+        max_batch_size: int = settings.VECTOR_SEARCH_MAX_BATCH_SIZE,
+        batch_wait_ms: float = settings.VECTOR_SEARCH_BATCH_WAIT_MS,
+        lookup_timeout: float = settings.VECTOR_SEARCH_TIMEOUT_SECONDS,
+        upsert_batch_size: int = settings.VECTOR_SEARCH_UPSERT_BATCH_SIZE,
+        upsert_flush_seconds: float = settings.VECTOR_SEARCH_UPSERT_FLUSH_SECONDS,
+        upsert_timeout: float = settings.VECTOR_SEARCH_UPSERT_TIMEOUT_SECONDS,
+        max_workers: int = settings.VECTOR_SEARCH_THREADS,
+    ):
+        self.deployed_index_id = deployed_index_id
+        self.max_batch_size = max_batch_size
+        self.batch_wait = batch_wait_ms / 1000
+        self.lookup_timeout = lookup_timeout
+        self.upsert_batch_size = upsert_batch_size
+        self.upsert_flush_seconds = upsert_flush_seconds
+        self.upsert_timeout = upsert_timeout
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="vector-search")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lookup_queue: Optional[asyncio.Queue] = None
+        self._lookup_worker: Optional[asyncio.Task] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._flush_now: Optional[asyncio.Event] = None
+        self._pending_upserts: List[dict] = []
+        self._searches: Set[asyncio.Task] = set()
+
+        if index_endpoint is not None:
+            self.index_endpoint, self.index = index_endpoint, index
+            return
+
         if not all([settings.GCP_PROJECT_ID, settings.GCP_REGION, settings.VECTOR_SEARCH_ENDPOINT_ID]):
             print("ERROR: GCP settings for Vector Search are not fully configured. Real CacheManager is disabled.")
             self.index_endpoint = None
+            self.index = None
             return
 
+        from google.cloud import aiplatform
+
         aiplatform.init(project=settings.GCP_PROJECT_ID, location=settings.GCP_REGION)
 
-        
         self.index_endpoint = aiplatform.MatchingEngineIndexEndpoint(
             index_endpoint_name=settings.VECTOR_SEARCH_ENDPOINT_ID
         )
-        self.deployed_index_id = settings.VECTOR_SEARCH_DEPLOYED_INDEX_ID
+        # Upserts go to the index itself, not the endpoint. Default to the index behind our deployment.
+        index_name = settings.VECTOR_SEARCH_INDEX_ID or next(
+            (deployed.index for deployed in self.index_endpoint.deployed_indexes if deployed.id == self.deployed_index_id),
+            None,
+        )
+        self.index = aiplatform.MatchingEngineIndex(index_name=index_name) if index_name else None
+        if self.index is None:
+            print("WARNING: No Vector Search index found for upserts. The REAL cache will be read-only.")
         print("CacheManager: Successfully connected to REAL Vertex AI Vector Search Endpoint.")
 
-    async def check_cache(self, embedding: List[float], similarity_threshold: float = 0.9) -> Optional[str]:
+    # --- Internal helpers ---
+
+    @staticmethod
+    def _namespace_filter(namespace: Optional[str]):
+        if not namespace:
+            return None
+        from google.cloud.aiplatform.matching_engine.matching_engine_index_endpoint import Namespace
+
+        return [Namespace("namespace", [namespace], [])]
+
+    def _ensure_workers(self) -> None:
+        """Starts the lookup and upsert workers on the running event loop (restarting them if the loop changed)."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._lookup_worker is not None and not self._lookup_worker.done():
+            return
+        self._loop = loop
+        self._lookup_queue = asyncio.Queue()
+        self._flush_now = asyncio.Event()
+        self._lookup_worker = loop.create_task(self._run_lookups())
+        self._flusher = loop.create_task(self._run_flusher())
+
+    async def _in_thread(self, func, *args):
+        return await self._loop.run_in_executor(self._executor, func, *args)
+
+    # --- Lookup coalescing ---
+
+    async def _collect_lookups(self) -> List[Tuple[List[float], Optional[str], asyncio.Future]]:
+        """Waits for one lookup, then gathers more until the batch is full or the wait expires."""
+        batch = [await self._lookup_queue.get()]
+        deadline = self._loop.time() + self.batch_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._lookup_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _find_neighbors(self, queries: List[List[float]], namespace: Optional[str]):
+        return self.index_endpoint.find_neighbors(
+            queries=queries,
+            deployed_index_id=self.deployed_index_id,
+            num_neighbors=1,
+            filter=self._namespace_filter(namespace),
+        )
+
+    async def _search_group(self, namespace: Optional[str], lookups: List[Tuple[List[float], asyncio.Future]]) -> None:
+        try:
+            results = await self._in_thread(self._find_neighbors, [query for query, _ in lookups], namespace)
+        except Exception as e:
+            print(f"Error during REAL cache check: {e}")
+            results = []
+        for position, (_, future) in enumerate(lookups):
+            if not future.done():
+                neighbours = results[position] if position < len(results) else []
+                future.set_result(neighbours[0] if neighbours else None)
+
+    async def _run_lookups(self) -> None:
+        while True:
+            batch = await self._collect_lookups()
+            # find_neighbors applies one filter to all its queries, so batch per namespace.
+            groups: Dict[Optional[str], List[Tuple[List[float], asyncio.Future]]] = defaultdict(list)
+            for query, namespace, future in batch:
+                groups[namespace].append((query, future))
+            for namespace, lookups in groups.items():
+                task = self._loop.create_task(self._search_group(namespace, lookups))
+                self._searches.add(task)
+                task.add_done_callback(self._searches.discard)
+
+    # --- Buffered upserts ---
+
+    def _upsert(self, datapoints: List[dict]) -> None:
+        self.index.upsert_datapoints(datapoints=datapoints)
+
+    async def _flush(self) -> None:
+        while self._pending_upserts:
+            # Take one chunk at a time so a cancelled flush leaves the rest buffered.
+            chunk = self._pending_upserts[:self.upsert_batch_size]
+            del self._pending_upserts[:self.upsert_batch_size]
+            try:
+                await asyncio.wait_for(self._in_thread(self._upsert, chunk), self.upsert_timeout)
+                print(f"REAL Cache ADD. Upserted {len(chunk)} entries to the cache.")
+            except Exception as e:
+                # The cache is best-effort; a failed batch is dropped rather than retried.
+                print(f"Error during REAL cache add ({len(chunk)} entries dropped): {e!r}")
+
+    async def _run_flusher(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), self.upsert_flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_now.clear()
+            await self._flush()
+
+    # --- Public API ---
+
+    async def check_cache(self, embedding: List[float], similarity_threshold: float = 0.9, namespace: Optional[str] = None) -> Optional[str]:
         """
         Performs a nearest-neighbor search to find a semantically similar entry in the cache.
+        A namespace is enforced through a Vector Search token restrict.
+        Errors and lookups slower than `lookup_timeout` are reported as a miss.
         """
         if not self.index_endpoint:
             return None
+        self._ensure_workers()
+        future = self._loop.create_future()
+        self._lookup_queue.put_nowait(([float(x) for x in embedding], namespace, future))
+        started = time.perf_counter()
         try:
-            search_results = self.index_endpoint.find_neighbors(
-                queries=[embedding],
-                deployed_index_id=self.deployed_index_id,
-                num_neighbors=1,
-            )
-            if search_results and search_results[0]:
-                best_match = search_results[0][0]
-                if best_match.distance >= similarity_threshold:
-                    print(f"REAL Cache HIT. Found similar entry '{best_match.id}' with score {best_match.distance:.4f}")
-                    return best_match.id
-            print("REAL Cache MISS.")
-            return None
-        except Exception as e:
-            print(f"Error during REAL cache check: {e}")
+            best_match = await asyncio.wait_for(asyncio.shield(future), self.lookup_timeout)
+        except asyncio.TimeoutError:
+            print(f"REAL Cache MISS (lookup timed out after {self.lookup_timeout:.2f}s).")
             return None
 
-    async def add_to_cache(self, entry_id: str, embedding: List[float]):
+        if best_match is not None and best_match.distance >= similarity_threshold:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            print(f"REAL Cache HIT. Found similar entry '{best_match.id}' with score {best_match.distance:.4f} in {elapsed_ms:.1f}ms")
+            return best_match.id
+        print("REAL Cache MISS.")
+        return None
+
+    async def add_to_cache(self, entry_id: str, embedding: List[float], namespace: Optional[str] = None):
         """
-        Adds a new prompt and its response embedding to the cache.
+        Queues a new prompt embedding for the next batched upsert.
         """
-        if not self.index_endpoint:
+        if not self.index:
             return
-        datapoint = {"id": entry_id, "embedding": embedding}
-        try:
-            self.index_endpoint.upsert_datapoints(
-                datapoints=[datapoint],
-                deployed_index_id=self.deployed_index_id
-            )
-            print(f"REAL Cache ADD. Added entry '{entry_id}' to the cache.")
-        except Exception as e:
-            print(f"Error during REAL cache add: {e}")
+        self._ensure_workers()
+        datapoint = {"datapoint_id": entry_id, "feature_vector": [float(x) for x in embedding]}
+        if namespace:
+            datapoint["restricts"] = [{"namespace": "namespace", "allow_list": [namespace]}]
+        self._pending_upserts.append(datapoint)
+        if len(self._pending_upserts) >= self.upsert_batch_size:
+            self._flush_now.set()
+
+    async def close(self) -> None:
+        """Flushes buffered upserts and stops the background workers."""
+        for task in (self._lookup_worker, self._flusher):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._lookup_worker = self._flusher = None
+        if self._loop is not None:
+            await self._flush()
+        self._executor.shutdown(wait=False)
+
 
-cache_manager = CacheManager()
\ No newline at end of file
+cache_manager = CacheManager()
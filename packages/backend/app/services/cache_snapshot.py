@@ -0,0 +1,204 @@
+import asyncio
+import json
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.matrix_cache_manager import CacheSnapshot, MatrixCacheManager
+
+try:
+    import fcntl
+except ImportError:  # Not on POSIX: one worker per snapshot directory.
+    fcntl = None
+
+INDEX_FILE = "index.json"
+LOCK_FILE = "index.lock"
+FORMAT_VERSION = 1
+
+
+def _write_atomically(path: Path, data: bytes) -> None:
+    """Writes to a temp file in the same directory, fsyncs it, then renames it into place."""
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _fsync_directory(directory: Path) -> None:
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def _directory_lock(path: Path, exclusive: bool) -> Iterator[None]:
+    """
+    Every worker snapshots to the same directory. Writers (saving, pruning)
+    hold an exclusive flock on its lock file and readers a shared one, so a
+    snapshot is never published or pruned while another worker is between
+    reading the index and mapping the vectors file it names.
+    """
+    if fcntl is None:
+        yield
+        return
+    fd = os.open(path / LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        yield
+    finally:
+        os.close(fd)  # Releases the lock.
+
+
+def save_snapshot(cache: MatrixCacheManager, directory: str) -> str:
+    """
+    Writes the cache to `directory` as a raw float32 matrix plus an index file.
+
+    The matrix goes to a new, uniquely named file first and the index is
+    replaced atomically afterwards, so a crash at any point leaves the
+    previous snapshot intact. Workers sharing the directory take turns; the
+    last one to save is the one the next start warms up from. Returns the
+    name of the vectors file written.
+    """
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+
+    snapshot = cache.snapshot()
+    vectors = np.ascontiguousarray(snapshot.vectors, dtype=np.float32)
+    vectors_file = f"vectors-{os.getpid()}-{time.time_ns()}.f32"
+
+    index = {
+        "format_version": FORMAT_VERSION,
+        "vectors_file": vectors_file,
+        "count": len(snapshot.entry_ids),
+        "dim": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+        "entry_ids": list(snapshot.entry_ids),
+        "namespaces": list(snapshot.namespaces),
+    }
+    with _directory_lock(path, exclusive=True):
+        _write_atomically(path / vectors_file, vectors.tobytes())
+        _write_atomically(path / INDEX_FILE, json.dumps(index).encode("utf-8"))
+        _fsync_directory(path)
+    return vectors_file
+
+
+def load_snapshot(directory: str) -> Optional[CacheSnapshot]:
+    """
+    Opens the latest snapshot in `directory` as a copy-on-write memory map.
+    Nothing is read into RAM up front; pages are faulted in on first use and
+    shared between workers mapping the same file. Returns None if there is
+    no usable snapshot.
+    """
+    path = Path(directory)
+    if not path.is_dir():
+        return None
+    with _directory_lock(path, exclusive=False):
+        try:
+            index = json.loads((path / INDEX_FILE).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+
+        if index.get("format_version") != FORMAT_VERSION:
+            print(f"Cache snapshot in '{directory}' has an unsupported format. Ignoring it.")
+            return None
+
+        count, dim = index["count"], index["dim"]
+        if count == 0:
+            return CacheSnapshot(vectors=np.empty((0, dim), dtype=np.float32), entry_ids=(), namespaces=())
+
+        vectors = np.memmap(path / index["vectors_file"], dtype=np.float32, mode="c", shape=(count, dim))
+    return CacheSnapshot(vectors=vectors, entry_ids=tuple(index["entry_ids"]), namespaces=tuple(index["namespaces"]))
+
+
+def prune_snapshots(directory: str, min_age_seconds: float = 60.0) -> None:
+    """
+    Deletes vectors files that the index no longer points to. Files younger
+    than `min_age_seconds` are kept, since another worker may be about to
+    publish them. Already-mapped files stay readable after deletion on POSIX.
+    """
+    path = Path(directory)
+    with _directory_lock(path, exclusive=True):
+        try:
+            current = json.loads((path / INDEX_FILE).read_text(encoding="utf-8")).get("vectors_file")
+        except (FileNotFoundError, ValueError):
+            return
+        cutoff = time.time() - min_age_seconds
+        for old_file in path.glob("vectors-*.f32"):
+            if old_file.name != current and old_file.stat().st_mtime < cutoff:
+                old_file.unlink(missing_ok=True)
+
+
+class CacheSnapshotter:
+    """
+    Periodically snapshots a MatrixCacheManager to disk, skipping clean caches,
+    and warm-starts it from the latest snapshot on startup.
+    """
+    def __init__(
+        self,
+        cache: MatrixCacheManager,
+        directory: str = settings.SEMANTIC_CACHE_SNAPSHOT_DIR,
+        interval_seconds: float = settings.SEMANTIC_CACHE_SNAPSHOT_INTERVAL_SECONDS,
+    ):
+        self.cache = cache
+        self.directory = directory
+        self.interval = interval_seconds
+        self._saved_version: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def warm_start(self) -> int:
+        """Loads the latest snapshot into the cache. Returns the number of entries restored."""
+        try:
+            snapshot = load_snapshot(self.directory)
+        except Exception as e:
+            print(f"CacheSnapshotter: Failed to load snapshot from '{self.directory}': {e}")
+            return 0
+        if snapshot is None:
+            return 0
+        self.cache.restore(snapshot)
+        self._saved_version = self.cache.version
+        print(f"CacheSnapshotter: Warm-started semantic cache with {len(self.cache)} entries.")
+        return len(self.cache)
+
+    def save(self) -> bool:
+        """Writes a snapshot if the cache changed since the last one. Returns True if written."""
+        version = self.cache.version
+        if version == self._saved_version:
+            return False
+        save_snapshot(self.cache, self.directory)
+        prune_snapshots(self.directory, min_age_seconds=max(2 * self.interval, 60.0))
+        self._saved_version = version
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.save)
+            except Exception as e:
+                print(f"CacheSnapshotter: Failed to write snapshot: {e}")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stops the periodic task and writes a final snapshot."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await asyncio.to_thread(self.save)
+        except Exception as e:
+            print(f"CacheSnapshotter: Failed to write final snapshot: {e}")
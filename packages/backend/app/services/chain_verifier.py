@@ -0,0 +1,390 @@
+import gzip
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import func
+
+from app.core.config import settings
+from app.core.security import calculate_log_hash
+from app.crud import crud_archive, crud_checkpoint
+from app.crud.crud_job import as_utc
+from app.db.session import SessionLocal
+from app.models import log as log_models
+from app.models.job import BackgroundJob
+from app.services.background_jobs import BackgroundJobRunner, JobProgress
+
+
+@dataclass
+class RangeResult:
+    """The outcome of verifying the logs with ids in [start_id, end_id]."""
+    start_id: int
+    end_id: int
+    logs_checked: int = 0
+    first_log_id: Optional[int] = None
+    first_previous_hash: Optional[str] = None
+    last_log_id: Optional[int] = None
+    last_hash: Optional[str] = None
+    broken_log_id: Optional[int] = None
+    message: Optional[str] = None
+
+
+@dataclass
+class VerificationOutcome:
+    ok: bool
+    logs_checked: int
+    message: str
+    broken_log_id: Optional[int] = None
+
+
+def _check_rows(
+    rows: Iterable, result: RangeResult, yield_per: int, progress: Optional[Callable[[int], None]]
+) -> RangeResult:
+    """Checks each row's hash, and each link to the row before it, in id order."""
+    for row in rows:
+        if result.first_log_id is None:
+            result.first_log_id, result.first_previous_hash = row.id, row.previous_log_hash
+        elif row.previous_log_hash != result.last_hash:
+            result.broken_log_id, result.message = row.id, f"Chain link broken at log ID {row.id}."
+            return result
+
+        log_data_for_hash = {
+            "request_data": row.request_data,
+            "response_data": row.response_data,
+            "verdict": row.verdict,
+        }
+        if calculate_log_hash(log_data_for_hash, row.previous_log_hash) != row.log_hash:
+            result.broken_log_id, result.message = row.id, f"Data tampering detected at log ID {row.id}."
+            return result
+
+        result.last_log_id, result.last_hash = row.id, row.log_hash
+        result.logs_checked += 1
+        if progress and result.logs_checked % yield_per == 0:
+            progress(yield_per)
+    if progress:
+        progress(result.logs_checked % yield_per)
+    return result
+
+
+def verify_range(
+    start_id: int,
+    end_id: int,
+    yield_per: int = settings.LOG_VERIFY_YIELD_PER,
+    progress: Optional[Callable[[int], None]] = None,
+) -> RangeResult:
+    """
+    Verifies every log with an id in [start_id, end_id]: each row's hash, and
+    each link to the row before it inside the range. The link into the first
+    row is left to the caller, which stitches consecutive ranges together.
+
+    Rows are streamed with a server-side cursor, `yield_per` at a time, and
+    only the hashed columns are loaded. Safe to run in a worker process.
+    """
+    db = SessionLocal()
+    try:
+        rows = (
+            db.query(
+                log_models.Log.id,
+                log_models.Log.request_data,
+                log_models.Log.response_data,
+                log_models.Log.verdict,
+                log_models.Log.log_hash,
+                log_models.Log.previous_log_hash,
+            )
+            .filter(log_models.Log.id >= start_id, log_models.Log.id <= end_id)
+            .order_by(log_models.Log.id.asc())
+            .execution_options(stream_results=True)
+            .yield_per(yield_per)
+        )
+        return _check_rows(rows, RangeResult(start_id=start_id, end_id=end_id), yield_per, progress)
+    finally:
+        db.close()
+
+
+def _archived_rows(path: Path, start_id: int, end_id: int) -> Iterable[SimpleNamespace]:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get("type") == "log" and start_id <= record["id"] <= end_id:
+                yield SimpleNamespace(**record)
+
+
+def verify_archive_file(
+    path: Path,
+    start_id: int,
+    end_id: int,
+    file_sha256: Optional[str] = None,
+    yield_per: int = settings.LOG_VERIFY_YIELD_PER,
+    progress: Optional[Callable[[int], None]] = None,
+) -> RangeResult:
+    """
+    Verifies the logs with an id in [start_id, end_id] from an archive file
+    (gzipped NDJSON in the export format) the same way `verify_range` does
+    from the table, after checking the file against `file_sha256` if given.
+    """
+    result = RangeResult(start_id=start_id, end_id=end_id)
+    if not path.exists():
+        result.broken_log_id, result.message = start_id, f"Archive file {path.name} for log IDs {start_id}-{end_id} is missing."
+        return result
+    if file_sha256 is not None and crud_archive.file_sha256(path) != file_sha256:
+        result.broken_log_id, result.message = start_id, f"Archive file {path.name} does not match its recorded SHA-256."
+        return result
+    return _check_rows(_archived_rows(path, start_id, end_id), result, yield_per, progress)
+
+
+def verify_archive(
+    archive_id: int,
+    start_id: int,
+    end_id: int,
+    yield_per: int = settings.LOG_VERIFY_YIELD_PER,
+    progress: Optional[Callable[[int], None]] = None,
+) -> RangeResult:
+    """
+    Verifies the part of an archived partition with ids in [start_id, end_id].
+    """
+    db = SessionLocal()
+    try:
+        archive = crud_archive.get_archive(db, archive_id)
+    finally:
+        db.close()
+    return verify_archive_file(
+        crud_archive.archive_path(archive.file_name), start_id, end_id, archive.file_sha256, yield_per, progress
+    )
+
+
+def _verify_segment(
+    start_id: int,
+    end_id: int,
+    archive_id: Optional[int],
+    yield_per: int,
+    progress: Optional[Callable[[int], None]] = None,
+) -> RangeResult:
+    if archive_id is None:
+        return verify_range(start_id, end_id, yield_per, progress)
+    return verify_archive(archive_id, start_id, end_id, yield_per, progress)
+
+
+def _verify_segment_in_worker(start_id: int, end_id: int, archive_id: Optional[int], yield_per: int) -> RangeResult:
+    # Runs in a freshly spawned process, which opens its own connection pool.
+    return _verify_segment(start_id, end_id, archive_id, yield_per)
+
+
+@dataclass
+class VerificationJob:
+    """A background verification, polled through the API for progress."""
+    id: str
+    full: bool
+    status: str  # pending, running, ok, failed or error
+    logs_checked: int
+    logs_total: Optional[int]
+    message: Optional[str]
+    broken_log_id: Optional[int]
+    started_at: float
+    finished_at: Optional[float]
+
+    @classmethod
+    def from_row(cls, job: BackgroundJob) -> "VerificationJob":
+        return cls(
+            id=job.id,
+            full=job.params.get("full", False),
+            status=job.status,
+            logs_checked=job.progress,
+            logs_total=job.total,
+            message=job.message,
+            broken_log_id=(job.result or {}).get("broken_log_id"),
+            started_at=as_utc(job.started_at).timestamp(),
+            finished_at=as_utc(job.finished_at).timestamp() if job.finished_at else None,
+        )
+
+
+class ChainVerifier:
+    """
+    Verifies the immutable log chain incrementally and in parallel.
+
+    - Incremental (default): starts from the newest signed checkpoint and
+      only verifies logs appended since. The checkpointed row itself is
+      re-read to catch truncation or rewriting of the chain head.
+    - Full: re-verifies from the genesis block.
+
+    Either way, the id span to verify is split into ranges of
+    `chunk_size` ids, plus one range per archived partition, which is
+    re-verified from its file. A single range is verified in-process; more
+    are fanned out to a process pool of `workers` and their boundaries
+    stitched together.
+    A signed checkpoint is written after every successful run.
+
+    Background runs are kept in the `background_jobs` table, so they can be
+    polled from any worker, and only one runs at a time across workers.
+
+    Rows covered by a checkpoint are not re-hashed by incremental runs; use a
+    full verification (or a Merkle inclusion proof) to re-check old entries.
+    """
+    def __init__(
+        self,
+        workers: int = settings.LOG_VERIFY_WORKERS,
+        chunk_size: int = settings.LOG_VERIFY_CHUNK_SIZE,
+        yield_per: int = settings.LOG_VERIFY_YIELD_PER,
+    ):
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.yield_per = yield_per
+        self._jobs = BackgroundJobRunner("verify-chain", self._run_job)
+
+    # --- Verification ---
+
+    def _ranges(self, start_id: int, end_id: int) -> List[tuple]:
+        return [
+            (range_start, min(range_start + self.chunk_size - 1, end_id))
+            for range_start in range(start_id, end_id + 1, self.chunk_size)
+        ]
+
+    def _segments(self, start_id: int, end_id: int, archives: List) -> List[tuple]:
+        """Splits [start_id, end_id] into (start, end, archive_id) ranges; archive_id is None for live rows."""
+        segments, cursor = [], start_id
+        for archive in archives:
+            if archive.first_log_id > end_id:
+                break
+            if archive.first_log_id > cursor:
+                segments += [(start, end, None) for start, end in self._ranges(cursor, archive.first_log_id - 1)]
+            segments.append((max(cursor, archive.first_log_id), min(archive.last_log_id, end_id), archive.id))
+            cursor = archive.last_log_id + 1
+        if cursor <= end_id:
+            segments += [(start, end, None) for start, end in self._ranges(cursor, end_id)]
+        return segments
+
+    def _verify_ranges(self, ranges: List[tuple], progress: Callable[[int], None]) -> List[RangeResult]:
+        if len(ranges) == 1 or self.workers <= 1:
+            return [_verify_segment(start, end, archive_id, self.yield_per, progress) for start, end, archive_id in ranges]
+
+        # "spawn" avoids forking a process that holds DB connections and server threads.
+        context = multiprocessing.get_context("spawn")
+        results: Dict[int, RangeResult] = {}
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as pool:
+            futures = {
+                pool.submit(_verify_segment_in_worker, start, end, archive_id, self.yield_per): position
+                for position, (start, end, archive_id) in enumerate(ranges)
+            }
+            for future in as_completed(futures):
+                if future.cancelled():
+                    continue
+                result = future.result()
+                results[futures[future]] = result
+                progress(result.logs_checked)
+                if result.broken_log_id is not None:
+                    # Ranges after a break are moot; drop those that have not started.
+                    for pending, position in futures.items():
+                        if position > futures[future]:
+                            pending.cancel()
+        return [results[position] for position in sorted(results)]
+
+    @staticmethod
+    def _stitch(
+        results: List[RangeResult], previous_hash: Optional[str], is_genesis: bool
+    ) -> Optional[VerificationOutcome]:
+        """Checks the links between consecutive ranges. Returns a failed outcome, or None if all link up."""
+        checked = 0
+        for result in results:
+            if result.first_log_id is not None:
+                if is_genesis and result.first_previous_hash is not None:
+                    return VerificationOutcome(False, checked, "Chain broken: Genesis block has a previous_log_hash.", result.first_log_id)
+                if not is_genesis and result.first_previous_hash != previous_hash:
+                    return VerificationOutcome(False, checked, f"Chain link broken at log ID {result.first_log_id}.", result.first_log_id)
+                is_genesis = False
+            if result.broken_log_id is not None:
+                return VerificationOutcome(False, checked + result.logs_checked, result.message, result.broken_log_id)
+            if result.last_hash is not None:
+                previous_hash = result.last_hash
+            checked += result.logs_checked
+        return None
+
+    def verify(
+        self,
+        full: bool = False,
+        progress: Optional[Callable[[int], None]] = None,
+        on_total: Optional[Callable[[int], None]] = None,
+    ) -> VerificationOutcome:
+        """
+        Verifies the chain, from the genesis block if `full`, otherwise from the
+        newest valid checkpoint. Records a new checkpoint on success.
+        `progress` receives counts of verified logs as they complete; `on_total`,
+        if given, receives the number of logs to verify (at the cost of a count query).
+        """
+        progress = progress or (lambda _: None)
+        db = SessionLocal()
+        try:
+            checkpoint = None if full else crud_checkpoint.get_latest_checkpoint(db)
+            if checkpoint:
+                current_hash = db.query(log_models.Log.log_hash).filter(log_models.Log.id == checkpoint.last_log_id).scalar()
+                if current_hash is None:
+                    # The checkpointed row may have been archived since; its archive ends on it.
+                    archive = crud_archive.get_archive_for_log(db, checkpoint.last_log_id)
+                    if archive and archive.last_log_id == checkpoint.last_log_id:
+                        current_hash = archive.last_log_hash
+                if current_hash != checkpoint.last_log_hash:
+                    return VerificationOutcome(
+                        False, 0, f"Data tampering detected at log ID {checkpoint.last_log_id}.", checkpoint.last_log_id
+                    )
+            start_after = checkpoint.last_log_id if checkpoint else 0
+            archives = crud_archive.list_archives(db, after_log_id=start_after)
+            max_id = db.query(func.max(log_models.Log.id)).scalar()
+            if archives:
+                max_id = max(max_id or 0, archives[-1].last_log_id)
+            if on_total:
+                live = db.query(func.count(log_models.Log.id)).filter(log_models.Log.id > start_after).scalar()
+                on_total(live + sum(archive.log_count for archive in archives))
+        finally:
+            db.close()
+
+        previously_verified = checkpoint.logs_verified if checkpoint else 0
+        if max_id is None or max_id <= start_after:
+            if previously_verified == 0:
+                return VerificationOutcome(True, 0, "Log chain is empty.")
+            return VerificationOutcome(True, 0, f"No new logs since checkpoint at log ID {start_after}.")
+
+        results = self._verify_ranges(self._segments(start_after + 1, max_id, archives), progress)
+        failure = self._stitch(results, checkpoint.last_log_hash if checkpoint else None, is_genesis=checkpoint is None)
+        if failure:
+            return failure
+
+        logs_checked = sum(result.logs_checked for result in results)
+        last = next((result for result in reversed(results) if result.last_log_id is not None), None)
+        if last is not None:
+            db = SessionLocal()
+            try:
+                crud_checkpoint.create_checkpoint(
+                    db,
+                    last_log_id=last.last_log_id,
+                    last_log_hash=last.last_hash,
+                    logs_verified=previously_verified + logs_checked,
+                )
+            finally:
+                db.close()
+        return VerificationOutcome(True, logs_checked, "Log chain integrity verified.")
+
+    # --- Background jobs ---
+
+    def _run_job(self, params: dict, progress: JobProgress) -> tuple:
+        try:
+            outcome = self.verify(full=params["full"], progress=progress.add, on_total=progress.set_total)
+        except Exception as e:
+            return "error", f"Verification failed to run: {e}", None
+        progress.count = outcome.logs_checked
+        return ("ok" if outcome.ok else "failed"), outcome.message, {"broken_log_id": outcome.broken_log_id}
+
+    async def start_job(self, full: bool = False) -> VerificationJob:
+        """
+        Starts a verification in the background and returns its job. While a job
+        is running on any worker, the running job is returned instead of starting another.
+        """
+        return VerificationJob.from_row(await self._jobs.start({"full": full}))
+
+    def get_job(self, job_id: str) -> Optional[VerificationJob]:
+        job = self._jobs.get(job_id)
+        return VerificationJob.from_row(job) if job else None
+
+
+chain_verifier = ChainVerifier()
@@ -0,0 +1,176 @@
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.embeddings import get_embedder
+
+
+class EmbeddingService:
+    """
+    A shared, micro-batching front end for an embedder backend.
+
+    Concurrent `embed()` calls are queued and flushed to the backend as one
+    batch when `max_batch_size` requests are waiting or `max_wait_ms` has
+    passed since the first one arrived, whichever comes first. Results are
+    kept in an LRU cache keyed by the SHA-256 of the text, so repeated prompts
+    never reach the backend. All vectors are returned as read-only float32
+    arrays, ready for matrix search.
+
+    Without an `embedder`, the one selected by EMBEDDING_BACKEND is built on
+    first use, since some backends import large libraries or load a model.
+    """
+    def __init__(
+        self,
+        embedder=None,
+        max_batch_size: int = settings.EMBEDDING_BATCH_SIZE,
+        max_wait_ms: float = settings.EMBEDDING_BATCH_WAIT_MS,
+        cache_size: int = settings.EMBEDDING_CACHE_SIZE,
+    ):
+        self._embedder = embedder
+        self._embedder_lock = threading.Lock()
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.cache_size = cache_size
+
+        self._cache: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._inflight: Dict[bytes, asyncio.Future] = {}
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            with self._embedder_lock:
+                if self._embedder is None:
+                    self._embedder = get_embedder()
+        return self._embedder
+
+    async def load(self) -> None:
+        """Builds the embedder off the event loop, e.g. while the app starts."""
+        if self._embedder is None:
+            await asyncio.to_thread(lambda: self.embedder)
+
+    @staticmethod
+    def _key(text: str) -> bytes:
+        return hashlib.sha256(text.encode("utf-8")).digest()
+
+    # --- LRU cache ---
+
+    def _cache_get(self, key: bytes) -> Optional[np.ndarray]:
+        with self._cache_lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+            return vector
+
+    def _cache_put(self, key: bytes, vector: np.ndarray) -> None:
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._cache[key] = vector
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    # --- Batching worker ---
+
+    def _ensure_worker(self) -> None:
+        """Starts the batching worker on the running event loop (restarting it if the loop changed)."""
+        loop = asyncio.get_running_loop()
+        if self._worker is not None and self._loop is loop and not self._worker.done():
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._inflight = {}
+        self._worker = loop.create_task(self._run())
+
+    async def _collect_batch(self) -> List[Tuple[bytes, str, asyncio.Future]]:
+        """Waits for one request, then gathers more until the batch is full or the wait expires."""
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect_batch()
+            try:
+                await self.load()
+                vectors = await self.embedder.embed([text for _, text, _ in batch])
+                vectors = np.asarray(vectors, dtype=np.float32)
+                if vectors.ndim != 2 or len(vectors) != len(batch):
+                    raise ValueError(
+                        f"The embedder returned {vectors.shape} for a batch of {len(batch)} texts."
+                    )
+            except Exception as e:
+                print(f"EmbeddingService: Failed to embed a batch of {len(batch)} texts: {e}")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (key, _, future), vector in zip(batch, vectors):
+                vector.flags.writeable = False
+                self._cache_put(key, vector)
+                if not future.done():
+                    future.set_result(vector)
+
+    # --- Public API ---
+
+    async def embed(self, text: str) -> np.ndarray:
+        """
+        Returns the float32 embedding of a single text, batched with any
+        other requests that arrive within the batching window.
+        """
+        key = self._key(text)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
+        self._ensure_worker()
+        # Concurrent requests for the same text share one queued embedding.
+        future = self._inflight.get(key)
+        if future is None:
+            future = self._loop.create_future()
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+            self._inflight[key] = future
+            self._queue.put_nowait((key, text, future))
+        return await asyncio.shield(future)
+
+    async def embed_many(self, texts: List[str]) -> np.ndarray:
+        """
+        Returns a (len(texts), dim) float32 matrix. Texts are queued individually
+        so they share batches with concurrent callers.
+        """
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        vectors = await asyncio.gather(*(self.embed(text) for text in texts))
+        return np.stack(vectors)
+
+    async def close(self) -> None:
+        """Stops the batching worker."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+
+
+embedding_service = EmbeddingService()
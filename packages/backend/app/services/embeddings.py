@@ -0,0 +1,89 @@
+import asyncio
+import hashlib
+import re
+from typing import List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+
+
+class HashingEmbedder:
+    """
+    A local, dependency-free embedder based on signed feature hashing of word
+    unigrams and bigrams. It needs no model download or network call, so it
+    suits local development and tests; paraphrases score lower than with a
+    learned model.
+    """
+    TOKEN_PATTERN = re.compile(r"\w+")
+
+    def __init__(self, dim: int = settings.EMBEDDING_DIM):
+        self.dim = dim
+
+    def _features(self, text: str) -> List[str]:
+        tokens = self.TOKEN_PATTERN.findall(text.lower())
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+    def embed_sync(self, texts: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+                matrix[row, digest % self.dim] += 1.0 if (digest >> 63) else -1.0
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0.0] = 1.0
+        return matrix / norms
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """Returns a (len(texts), dim) float32 matrix of unit-length embeddings."""
+        return self.embed_sync(texts)
+
+
+class GoogleEmbedder:
+    """
+    A remote embedder backed by the Gemini embeddings API.
+    """
+    def __init__(self, model: str = settings.EMBEDDING_MODEL):
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+        self.client = GoogleGenerativeAIEmbeddings(model=model, google_api_key=settings.GOOGLE_API_KEY)
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """Returns a (len(texts), dim) float32 matrix of embeddings."""
+        vectors = await self.client.aembed_documents(texts)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+class SentenceTransformerEmbedder:
+    """
+    A local CPU embedder using a sentence-transformers model. The optional
+    `sentence-transformers` package is imported on construction, and encoding
+    runs in a worker thread so it does not block the event loop.
+    """
+    def __init__(self, model: str = settings.EMBEDDING_LOCAL_MODEL):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model, device="cpu")
+
+    def embed_sync(self, texts: List[str]) -> np.ndarray:
+        vectors = self.model.encode(texts, batch_size=len(texts), normalize_embeddings=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """Returns a (len(texts), dim) float32 matrix of unit-length embeddings."""
+        return await asyncio.to_thread(self.embed_sync, texts)
+
+
+EMBEDDERS = {
+    "hashing": HashingEmbedder,
+    "google": GoogleEmbedder,
+    "sentence-transformers": SentenceTransformerEmbedder,
+}
+
+
+def get_embedder(backend: Optional[str] = None):
+    """Builds the embedder selected by EMBEDDING_BACKEND (or the given backend name)."""
+    backend = backend or settings.EMBEDDING_BACKEND
+    if backend not in EMBEDDERS:
+        raise ValueError(f"Unknown EMBEDDING_BACKEND '{backend}'. Expected one of {tuple(EMBEDDERS)}.")
+    return EMBEDDERS[backend]()
@@ -0,0 +1,312 @@
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+
+from app.core.config import settings
+from app.crud.crud_analytics import log_counters
+
+try:
+    import fcntl
+except ImportError:  # Not on POSIX: counters stay per process.
+    fcntl = None
+
+LIVE_COUNTERS = (
+    "request_count",
+    "blocked_requests",
+    "cache_hits",
+    "frozen_threats",
+    "prompt_injections",
+    "policy_failures",
+    "possible_hallucinations",
+    "claims_contradicted",
+)
+LIVE_STAGES = (
+    "embedding",
+    "threat_lookup",
+    "cache_lookup",
+    "inbound_check",
+    "llm",
+    "claim_extraction",
+    "hallucination_check",
+    "web_search",
+    "claim_verification",
+    "policy_check",
+    "logging",
+    "total",  # Request start to log append, as stored in the log.
+)
+
+# One per-second slot is a row of int64:
+#   [epoch second, *LIVE_COUNTERS, (calls, total microseconds) per stage in LIVE_STAGES]
+_COUNTER_COLUMN = {name: 1 + i for i, name in enumerate(LIVE_COUNTERS)}
+_STAGE_COLUMN = {stage: 1 + len(LIVE_COUNTERS) + 2 * i for i, stage in enumerate(LIVE_STAGES)}
+SLOT_WIDTH = 1 + len(LIVE_COUNTERS) + 2 * len(LIVE_STAGES)
+
+# The shared file starts with this header, then one pid per worker region,
+# then the regions: (max_workers, window_seconds, SLOT_WIDTH) int64.
+_MAGIC = 0x4E4F56414C495645  # "NOVALIVE"
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class LiveMetrics:
+    """
+    Per-second gateway counters and stage latencies in ring buffers, for
+    the live analytics channel.
+
+    Each process owns one region of `window_seconds` slots; slot `s % window`
+    holds second `s`, and is reset in place the first time a new second lands
+    on it. Only the owning process's event loop writes to a region, so
+    updates need no locks. With several workers on one host, the regions live in one
+    memory-mapped file (`shared_file`, on tmpfs by default). Each worker claims
+    a free region, or the region of a worker that has exited, under a file lock
+    at startup, and readers sum every region. Without a usable shared file the
+    counters cover this process only.
+    """
+    def __init__(
+        self,
+        window_seconds: int = settings.LIVE_ANALYTICS_WINDOW_SECONDS,
+        max_workers: int = settings.LIVE_ANALYTICS_MAX_WORKERS,
+        shared_file: str = settings.LIVE_ANALYTICS_SHARED_FILE,
+    ):
+        self.window = window_seconds
+        self.max_workers = max_workers
+        self.shared_file = shared_file
+        self._pid: Optional[int] = None
+        self._regions: Optional[np.ndarray] = None  # (workers, window, SLOT_WIDTH)
+        self._own: Optional[np.ndarray] = None      # This process's region.
+        self._pids: Optional[np.ndarray] = None
+        self._region_index: Optional[int] = None
+
+    # --- Shared memory ---
+
+    def _header(self) -> np.ndarray:
+        return np.array([_MAGIC, self.max_workers, self.window, SLOT_WIDTH], dtype=np.int64)
+
+    def _attach_shared(self) -> bool:
+        header = self._header()
+        pid_offset = header.nbytes
+        region_offset = pid_offset + 8 * self.max_workers
+        size = region_offset + 8 * self.max_workers * self.window * SLOT_WIDTH
+
+        fd = os.open(self.shared_file, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                # A new file, or one laid out by a differently configured build: start over.
+                if os.fstat(fd).st_size != size or not np.array_equal(
+                    np.fromfile(self.shared_file, dtype=np.int64, count=len(header)), header
+                ):
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, size)
+                    os.pwrite(fd, header.tobytes(), 0)
+                pids = np.memmap(self.shared_file, dtype=np.int64, mode="r+", offset=pid_offset, shape=(self.max_workers,))
+                regions = np.memmap(
+                    self.shared_file, dtype=np.int64, mode="r+", offset=region_offset,
+                    shape=(self.max_workers, self.window, SLOT_WIDTH),
+                )
+                free = [i for i, pid in enumerate(pids) if pid == 0 or not _pid_alive(int(pid))]
+                if not free:
+                    print(f"LiveMetrics: All {self.max_workers} shared regions are taken; keeping counters per process.")
+                    return False
+                # A reclaimed region keeps its slots: they are tagged with their
+                # second, so the exited worker's recent counts still add up.
+                self._region_index = free[0]
+                pids[self._region_index] = os.getpid()
+                self._pids, self._regions, self._own = pids, regions, regions[self._region_index]
+                return True
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    def _attach(self) -> None:
+        """Sets up this process's region; re-run after a fork, since a child needs its own."""
+        self._pid = os.getpid()
+        self._region_index = self._pids = None
+        if self.shared_file and fcntl is not None and os.path.isdir(os.path.dirname(self.shared_file) or "."):
+            try:
+                if self._attach_shared():
+                    return
+            except OSError as e:
+                print(f"LiveMetrics: Could not map {self.shared_file} ({e}); keeping counters per process.")
+        self._regions = np.zeros((1, self.window, SLOT_WIDTH), dtype=np.int64)
+        self._own = self._regions[0]
+
+    def close(self) -> None:
+        """Releases this process's shared region for the next worker."""
+        if self._pids is not None and self._pid == os.getpid():
+            self._pids[self._region_index] = 0
+        self._pid = self._regions = self._own = self._pids = self._region_index = None
+
+    def _slot(self, second: int) -> np.ndarray:
+        if self._pid != os.getpid():
+            self._attach()
+        slot = self._own[second % self.window]
+        if slot[0] != second:
+            slot[1:] = 0
+            slot[0] = second
+        return slot
+
+    # --- Recording ---
+
+    def record_log(self, verdict: str, response_data: Dict[str, Any] | None) -> None:
+        """Counts one appended log, with the same critic outcomes as the analytics rollups."""
+        slot = self._slot(int(time.time()))
+        for name, value in log_counters(verdict, response_data).items():
+            slot[_COUNTER_COLUMN[name]] += value
+        slot[_COUNTER_COLUMN["blocked_requests"]] += verdict == "BLOCKED"
+
+    def observe(self, stage: str, seconds: float) -> None:
+        """Records how long one run of a gateway stage took."""
+        slot = self._slot(int(time.time()))
+        column = _STAGE_COLUMN[stage]
+        slot[column] += 1
+        slot[column + 1] += int(seconds * 1_000_000)
+
+    # --- Reading ---
+
+    def read(self, start: int, end: int) -> List[Dict[str, Any]]:
+        """
+        Returns the seconds in [start, end), summed over every worker, as
+        compact points: {"t": second, "c": {counter: n}, "l": {stage: [calls, mean ms]}},
+        with zero counters and idle stages left out.
+        Seconds that have left the ring come back empty.
+        """
+        if self._pid != os.getpid():
+            self._attach()
+        start = max(start, end - self.window)
+        if start >= end:
+            return []
+        seconds = np.arange(start, end, dtype=np.int64)
+        rows = self._regions[:, seconds % self.window, :]
+        current = rows[:, :, 0] == seconds[None, :]
+        totals = (rows[:, :, 1:] * current[:, :, None]).sum(axis=0)
+
+        points = []
+        for second, row in zip(seconds.tolist(), totals.tolist()):
+            point: Dict[str, Any] = {"t": second}
+            counters = {name: row[column - 1] for name, column in _COUNTER_COLUMN.items() if row[column - 1]}
+            if counters:
+                point["c"] = counters
+            stages = {
+                stage: [row[column - 1], round(row[column] / row[column - 1] / 1000, 3)]
+                for stage, column in _STAGE_COLUMN.items() if row[column - 1]
+            }
+            if stages:
+                point["l"] = stages
+            points.append(point)
+        return points
+
+
+class StageTimings:
+    """
+    Times the stages of one gateway request. Every stage goes to the live
+    counters as it finishes, and `finish()` returns the timing vector stored
+    in the request's log (milliseconds, stages that did not run left out),
+    which the latency rollups are built from.
+    """
+    def __init__(self, metrics: LiveMetrics):
+        self.metrics = metrics
+        self.started = time.perf_counter()
+        self.timings_ms: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, stage: str):
+        """Times the enclosed block as `stage`."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.timings_ms[stage] = round(elapsed * 1000, 2)
+            self.metrics.observe(stage, elapsed)
+
+    async def run(self, stage: str, awaitable):
+        """Awaits `awaitable` as `stage`; for timing coroutines run concurrently."""
+        with self.stage(stage):
+            return await awaitable
+
+    def finish(self) -> Dict[str, float]:
+        """The timing vector for the log, with the total so far."""
+        elapsed = time.perf_counter() - self.started
+        self.metrics.observe("total", elapsed)
+        return {**self.timings_ms, "total": round(elapsed * 1000, 2)}
+
+
+class LiveMetricsBroadcaster:
+    """
+    Fans the live counters out to WebSocket subscribers.
+
+    One task per process wakes every `tick_seconds`, reads the seconds that
+    have completed since its last tick once, and queues the same delta message
+    for every subscriber. A subscriber that falls `queue_size` ticks behind
+    loses its oldest pending tick rather than holding the others back.
+    """
+    def __init__(
+        self,
+        metrics: LiveMetrics,
+        tick_seconds: float = settings.LIVE_ANALYTICS_TICK_SECONDS,
+        queue_size: int = 16,
+    ):
+        self.metrics = metrics
+        self.tick = tick_seconds
+        self.queue_size = queue_size
+        self.next_second = int(time.time())  # The first second not pushed yet.
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def _publish(self, message: Dict[str, Any]) -> None:
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.tick)
+            now = int(time.time())
+            if now > self.next_second:
+                seconds = self.metrics.read(self.next_second, now)
+                self.next_second = now
+                self._publish({"type": "delta", "seconds": seconds})
+
+    def subscribe(self) -> asyncio.Queue:
+        """
+        Registers a subscriber. Its queue receives every tick from
+        `next_second` (read at subscription time) onwards.
+        """
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self.next_second = int(time.time())
+            self._task = loop.create_task(self._run())
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+live_metrics = LiveMetrics()
+live_broadcaster = LiveMetricsBroadcaster(live_metrics)
@@ -0,0 +1,63 @@
+import asyncio
+from typing import Optional
+
+from app.core.config import settings
+from app.crud import crud_anchor
+from app.db.session import SessionLocal
+
+
+class LogAnchorer:
+    """
+    Periodically seals new logs into Merkle anchors.
+
+    Every `interval_seconds` it anchors each full batch of `batch_size`
+    unanchored logs, and a partial batch once its oldest entry is older than
+    `max_age_seconds`, so quiet periods are still anchored promptly.
+    """
+    def __init__(
+        self,
+        batch_size: int = settings.LOG_ANCHOR_BATCH_SIZE,
+        max_age_seconds: float = settings.LOG_ANCHOR_MAX_AGE_SECONDS,
+        interval_seconds: float = settings.LOG_ANCHOR_INTERVAL_SECONDS,
+    ):
+        self.batch_size = batch_size
+        self.max_age_seconds = max_age_seconds
+        self.interval = interval_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    def anchor_pending(self) -> int:
+        """Anchors whatever is due. Returns the number of anchors created."""
+        db = SessionLocal()
+        try:
+            anchors = crud_anchor.create_pending_anchors(
+                db, batch_size=self.batch_size, max_age_seconds=self.max_age_seconds
+            )
+            for anchor in anchors:
+                print(f"LogAnchorer: Anchored logs {anchor.first_log_id}-{anchor.last_log_id} (root {anchor.merkle_root[:12]}...).")
+            return len(anchors)
+        finally:
+            db.close()
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await asyncio.to_thread(self.anchor_pending)
+            except Exception as e:
+                print(f"LogAnchorer: Failed to anchor logs: {e}")
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+log_anchorer = LogAnchorer()
@@ -0,0 +1,215 @@
+import io
+import json
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.core.merkle import merkle_root
+from app.crud import crud_blob, crud_log
+from app.db.session import SessionLocal
+from app.models import log as log_models
+
+EXPORT_FORMAT_VERSION = 2
+
+# Media types of the supported export formats.
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+@dataclass
+class ExportFilters:
+    start_id: Optional[int] = None
+    end_id: Optional[int] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    verdict: Optional[str] = None
+
+    @property
+    def contiguous(self) -> bool:
+        """True if the export is an unbroken stretch of the chain, so links between rows can be checked too."""
+        return self.verdict is None and self.since is None and self.until is None
+
+    def to_json(self) -> dict:
+        return {key: value.isoformat() if isinstance(value, datetime) else value for key, value in asdict(self).items()}
+
+
+def arrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _refs(log: log_models.Log) -> Set[str]:
+    return crud_blob.collect_refs(log.request_data, set()) | crud_blob.collect_refs(log.response_data, set())
+
+
+def _chunks(
+    filters: ExportFilters, chunk_size: int
+) -> Iterator[Tuple[List[log_models.Log], Dict[str, str], Dict[int, str]]]:
+    """
+    Streams matching logs from a server-side cursor in lists of `chunk_size`,
+    each with the content of every intact payload blob its rows reference, and
+    an error for each row that references a missing or corrupt blob.
+    """
+    db = SessionLocal()
+
+    def with_blobs(chunk):
+        refs = set().union(*(_refs(log) for log in chunk))
+        blobs, blob_errors = crud_blob.read_blob_contents(db, refs)
+        errors = {}
+        for log in chunk:
+            failed = sorted(_refs(log) & blob_errors.keys())
+            if failed:
+                errors[log.id] = " ".join(blob_errors[digest] for digest in failed)
+        return chunk, blobs, errors
+
+    try:
+        chunk = []
+        for log in crud_log.stream_logs(db, yield_per=chunk_size, **asdict(filters)):
+            chunk.append(log)
+            if len(chunk) == chunk_size:
+                yield with_blobs(chunk)
+                chunk = []
+        if chunk:
+            yield with_blobs(chunk)
+    finally:
+        db.close()
+
+
+def _created_at(log: log_models.Log) -> Optional[datetime]:
+    # SQLite returns naive timestamps; they are stored in UTC.
+    if log.created_at is None or log.created_at.tzinfo:
+        return log.created_at
+    return log.created_at.replace(tzinfo=timezone.utc)
+
+
+def _chunk_summary(chunk: List[log_models.Log]) -> dict:
+    """Chain metadata that lets a receiver check a chunk on its own."""
+    return {
+        "type": "chunk",
+        "first_log_id": chunk[0].id,
+        "last_log_id": chunk[-1].id,
+        "count": len(chunk),
+        "previous_log_hash": chunk[0].previous_log_hash,
+        "last_log_hash": chunk[-1].log_hash,
+        "merkle_root": merkle_root([log.log_hash for log in chunk]),
+    }
+
+
+def _dumps(record: dict) -> bytes:
+    return json.dumps(record, sort_keys=True, default=str).encode("utf-8") + b"\n"
+
+
+def stream_ndjson(filters: ExportFilters, chunk_size: int = settings.LOG_EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Streams logs as NDJSON: a header line, then per chunk one "blob" line per
+    payload blob its rows reference, one "log" line per entry, and a "chunk"
+    line with the chunk's chain hashes and Merkle root; then a closing
+    "footer" line. Log lines hold payloads as stored, with large strings as
+    {"$blob": sha256} references (and client objects that would look like
+    one wrapped as {"$literal": object}), and carry their own `log_hash` and
+    `previous_log_hash`, so each entry can be re-hashed with
+    `calculate_log_hash` and each blob checked against its SHA-256 by the
+    receiver. A log whose blobs are missing or corrupt is still exported, and
+    followed by an "error" line saying which.
+    """
+    yield _dumps({
+        "type": "header",
+        "format_version": EXPORT_FORMAT_VERSION,
+        "filters": filters.to_json(),
+        "contiguous": filters.contiguous,
+    })
+    chunks = logs = errors = 0
+    for chunk, blobs, blob_errors in _chunks(filters, chunk_size):
+        lines = [_dumps({"type": "blob", "hash": digest, "content": content}) for digest, content in blobs.items()]
+        for log in chunk:
+            lines.append(_dumps({
+                "type": "log",
+                "id": log.id,
+                "created_at": _created_at(log).isoformat() if log.created_at else None,
+                "request_data": log.request_data,
+                "response_data": log.response_data,
+                "verdict": log.verdict,
+                "log_hash": log.log_hash,
+                "previous_log_hash": log.previous_log_hash,
+            }))
+            if log.id in blob_errors:
+                lines.append(_dumps({"type": "error", "log_id": log.id, "detail": blob_errors[log.id]}))
+        errors += len(blob_errors)
+        lines.append(_dumps(_chunk_summary(chunk)))
+        chunks, logs = chunks + 1, logs + len(chunk)
+        yield b"".join(lines)
+    yield _dumps({"type": "footer", "chunks": chunks, "logs": logs, "errors": errors})
+
+
+def stream_arrow(filters: ExportFilters, chunk_size: int = settings.LOG_EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Streams logs as an Arrow IPC stream with one record batch per chunk.
+    request_data and response_data are canonical (sorted-key) JSON strings as
+    stored, with large strings as {"$blob": sha256} references (look-alike
+    client objects wrapped as {"$literal": object}); each row's
+    `blobs` column maps the hashes it references (first use in the batch) to
+    their content. Each batch carries the log_hash and previous_log_hash
+    columns of its rows, and an `error` column, set on rows whose blobs are
+    missing or corrupt.
+    Requires the optional `pyarrow` package.
+    """
+    import pyarrow as pa
+
+    schema = pa.schema(
+        [
+            ("id", pa.int64()),
+            ("created_at", pa.timestamp("us", tz="UTC")),
+            ("request_data", pa.string()),
+            ("response_data", pa.string()),
+            ("verdict", pa.string()),
+            ("log_hash", pa.string()),
+            ("previous_log_hash", pa.string()),
+            ("blobs", pa.map_(pa.string(), pa.string())),
+            ("error", pa.string()),
+        ],
+        metadata={
+            "format_version": str(EXPORT_FORMAT_VERSION),
+            "filters": json.dumps(filters.to_json()),
+            "contiguous": json.dumps(filters.contiguous),
+        },
+    )
+
+    sink = io.BytesIO()
+
+    def drain() -> bytes:
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    with pa.ipc.new_stream(sink, schema) as writer:
+        yield drain()  # The schema message.
+        for chunk, blobs, blob_errors in _chunks(filters, chunk_size):
+            # Attach each intact blob to the first row of the batch that references it.
+            row_blobs, attached = [], set()
+            for log in chunk:
+                refs = _refs(log) & blobs.keys()
+                row_blobs.append([(digest, blobs[digest]) for digest in sorted(refs - attached)])
+                attached |= refs
+            writer.write_batch(pa.record_batch(
+                [
+                    [log.id for log in chunk],
+                    [_created_at(log) for log in chunk],
+                    [json.dumps(log.request_data, sort_keys=True) for log in chunk],
+                    [json.dumps(log.response_data, sort_keys=True) for log in chunk],
+                    [log.verdict for log in chunk],
+                    [log.log_hash for log in chunk],
+                    [log.previous_log_hash for log in chunk],
+                    row_blobs,
+                    [blob_errors.get(log.id) for log in chunk],
+                ],
+                schema=schema,
+            ))
+            yield drain()
+    yield drain()  # The end-of-stream marker.
@@ -0,0 +1,218 @@
+import asyncio
+import gzip
+import os
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.crud import crud_anchor, crud_archive, crud_checkpoint, crud_partition
+from app.db.session import SessionLocal
+from app.models import log as log_models
+from app.services.chain_verifier import verify_archive_file
+from app.services.log_export import ExportFilters, stream_ndjson
+
+
+class LogPartitionManager:
+    """
+    Maintains the time partitions of the `logs` table on PostgreSQL.
+
+    - Keeps `premake` partitions ready past the current one, so appends never
+      hit a missing range.
+    - With a retention period set, moves each partition whose whole range is
+      older than `retention_days` to a gzipped NDJSON file (the export format)
+      in LOG_ARCHIVE_DIR, records its boundary hashes in `log_archives`, and
+      drops it. Chain verification then re-checks those logs from the file.
+
+    Every worker runs the maintenance loop, but a PostgreSQL advisory lock
+    lets only one at a time do the work; the others skip that run.
+
+    Partitions are archived oldest first, and only once every log in them is
+    anchored, covered by a signed checkpoint, and not the chain head.
+    Does nothing if `logs` is not partitioned (e.g. on SQLite).
+    """
+    def __init__(
+        self,
+        interval: str = settings.LOG_PARTITION_INTERVAL,
+        premake: int = settings.LOG_PARTITION_PREMAKE,
+        retention_days: int = settings.LOG_RETENTION_DAYS,
+        maintenance_interval_seconds: float = settings.LOG_PARTITION_MAINTENANCE_INTERVAL_SECONDS,
+    ):
+        self.interval = interval
+        self.premake = premake
+        self.retention_days = retention_days
+        self.maintenance_interval = maintenance_interval_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    # --- Partition creation ---
+
+    def ensure_partitions(self) -> int:
+        """Creates any partitions due. Returns the number created."""
+        db = SessionLocal()
+        try:
+            if not crud_partition.is_partitioned(db):
+                return 0
+            created = crud_partition.ensure_partitions(db, interval=self.interval, premake=self.premake)
+            db.commit()
+            for name in created:
+                print(f"LogPartitionManager: Created partition {name}.")
+            return len(created)
+        finally:
+            db.close()
+
+    # --- Retention ---
+
+    def _archivable(self, db: Session, name: str, first_log_id: int, last_log_id: int, log_count: int) -> bool:
+        head_id = db.query(func.max(log_models.Log.id)).scalar()
+        if last_log_id >= head_id:
+            print(f"LogPartitionManager: Keeping {name}; it holds the chain head.")
+            return False
+        anchor = crud_anchor.get_last_anchor(db)
+        if anchor is None or anchor.last_log_id < last_log_id:
+            print(f"LogPartitionManager: Keeping {name} until all its logs are anchored.")
+            return False
+        checkpoint = crud_checkpoint.get_latest_checkpoint(db)
+        if checkpoint is None or checkpoint.last_log_id < last_log_id:
+            print(f"LogPartitionManager: Keeping {name} until the chain is verified past log ID {last_log_id}.")
+            return False
+        # Archives are id ranges; a log in another partition inside this one's range would be lost from it.
+        in_range = (
+            db.query(func.count(log_models.Log.id))
+            .filter(log_models.Log.id >= first_log_id, log_models.Log.id <= last_log_id)
+            .scalar()
+        )
+        if in_range != log_count:
+            print(f"LogPartitionManager: Keeping {name}; its log IDs overlap another partition.")
+            return False
+        return True
+
+    def _write_archive(self, name: str, first_log_id: int, last_log_id: int) -> Path:
+        """Writes the logs to `<name>.ndjson.gz` in the archive directory. Returns its path."""
+        path = crud_archive.archive_path(f"{name}.ndjson.gz")
+        os.makedirs(path.parent, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        with open(tmp_path, "wb") as raw:
+            with gzip.GzipFile(filename=path.name, mode="wb", fileobj=raw) as f:
+                for piece in stream_ndjson(ExportFilters(start_id=first_log_id, end_id=last_log_id)):
+                    f.write(piece)
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_path, path)
+        return path
+
+    @staticmethod
+    def _drop(db: Session, name: str) -> None:
+        # End our own transaction first: a concurrent detach waits for every
+        # transaction that has touched the partition, including this one.
+        db.commit()
+        crud_partition.detach_partition(name)
+
+    def archive_partition(self, db: Session, partition: crud_partition.Partition) -> bool:
+        """
+        Archives and drops one partition. Returns False if it has to stay for
+        now, which also holds back every newer partition.
+        """
+        if crud_archive.get_archive_for_partition(db, partition.name):
+            # Archived on an earlier run that stopped before dropping it.
+            self._drop(db, partition.name)
+            return True
+
+        first_log_id, last_log_id, log_count = crud_partition.get_partition_log_range(db, partition.name)
+        if not log_count:
+            self._drop(db, partition.name)
+            print(f"LogPartitionManager: Dropped empty partition {partition.name}.")
+            return True
+        if not self._archivable(db, partition.name, first_log_id, last_log_id, log_count):
+            return False
+
+        path = self._write_archive(partition.name, first_log_id, last_log_id)
+        file_sha256 = crud_archive.file_sha256(path)
+        first_previous_log_hash = db.query(log_models.Log.previous_log_hash).filter(log_models.Log.id == first_log_id).scalar()
+        last_log_hash = db.query(log_models.Log.log_hash).filter(log_models.Log.id == last_log_id).scalar()
+
+        # Re-read the file before the rows go: it must hold exactly this stretch of the chain.
+        result = verify_archive_file(path, first_log_id, last_log_id, file_sha256)
+        if (
+            result.broken_log_id is not None
+            or result.logs_checked != log_count
+            or result.first_previous_hash != first_previous_log_hash
+            or result.last_hash != last_log_hash
+        ):
+            print(f"LogPartitionManager: Archive of {partition.name} failed verification ({result.message}); keeping the partition.")
+            return False
+
+        crud_archive.create_archive(
+            db,
+            partition_name=partition.name,
+            range_start=partition.lower,
+            range_end=partition.upper,
+            first_log_id=first_log_id,
+            last_log_id=last_log_id,
+            log_count=log_count,
+            first_previous_log_hash=first_previous_log_hash,
+            last_log_hash=last_log_hash,
+            file_name=path.name,
+            file_sha256=file_sha256,
+            file_size=path.stat().st_size,
+        )
+        self._drop(db, partition.name)
+        print(f"LogPartitionManager: Archived {log_count} logs ({first_log_id}-{last_log_id}) from {partition.name} to {path.name}.")
+        return True
+
+    def archive_expired(self, now: datetime | None = None) -> int:
+        """Archives every partition past the retention period. Returns the number archived."""
+        if self.retention_days <= 0:
+            return 0
+        cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=self.retention_days)
+        db = SessionLocal()
+        try:
+            if not crud_partition.is_partitioned(db):
+                return 0
+            expired = [p for p in crud_partition.list_partitions(db) if p.upper is not None and p.upper <= cutoff]
+            db.commit()
+            archived = 0
+            for partition in expired:
+                if not self.archive_partition(db, partition):
+                    break
+                archived += 1
+            return archived
+        finally:
+            db.close()
+
+    # --- Background maintenance ---
+
+    def maintain(self) -> None:
+        # Every worker runs this loop; one at a time creates, archives and drops partitions.
+        with crud_partition.maintenance_lock() as acquired:
+            if not acquired:
+                print("LogPartitionManager: Another worker is maintaining the partitions; skipping this run.")
+                return
+            self.ensure_partitions()
+            self.archive_expired()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.maintain)
+            except Exception as e:
+                print(f"LogPartitionManager: Partition maintenance failed: {e}")
+            await asyncio.sleep(self.maintenance_interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+log_partition_manager = LogPartitionManager()
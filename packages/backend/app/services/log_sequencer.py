@@ -0,0 +1,140 @@
+import asyncio
+from typing import List, Optional, Tuple
+
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+from app.core.config import settings
+from app.crud import crud_log
+from app.db.session import AsyncSessionLocal, SessionLocal
+from app.models import log as log_models
+from app.schemas import log as log_schemas
+from app.services.live_metrics import live_metrics
+from app.services.threat_sketches import threat_sketch_tracker
+
+
+class LogSequencer:
+    """
+    The single writer for the immutable log chain.
+
+    Request handlers `await append(log_in)` instead of inserting directly. A
+    worker task drains the queue in batches of up to `max_batch_size` (waiting
+    at most `max_wait_ms` for a batch to fill) and appends each batch with
+    `crud_log.create_logs_async`: one advisory lock, one head read, one
+    multi-row INSERT and one commit per batch, over the async engine so the
+    event loop never waits on the database. While a batch is being written the next
+    one accumulates, so throughput grows with load instead of being capped at
+    one round trip per log.
+
+    A batch the database rejects is split in half and each half retried, so
+    one bad entry (e.g. a NaN that PostgreSQL's json type refuses) fails only
+    its own request. Connection errors fail the whole batch at once.
+    """
+    def __init__(
+        self,
+        max_batch_size: int = settings.LOG_BATCH_SIZE,
+        max_wait_ms: float = settings.LOG_BATCH_WAIT_MS,
+    ):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def _ensure_worker(self) -> None:
+        """Starts the writer on the running event loop (restarting it if the loop changed)."""
+        loop = asyncio.get_running_loop()
+        if self._worker is not None and self._loop is loop and not self._worker.done():
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._worker = loop.create_task(self._run())
+
+    async def _collect_batch(self) -> List[Optional[Tuple[log_schemas.LogCreate, asyncio.Future]]]:
+        """
+        Waits for one entry, then gathers more until the batch is full, the wait
+        expires, or the shutdown marker (None) is reached.
+        """
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size and batch[-1] is not None:
+            # Take whatever is already queued without yielding to the loop.
+            while len(batch) < self.max_batch_size and batch[-1] is not None and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            timeout = deadline - self._loop.time()
+            if len(batch) >= self.max_batch_size or batch[-1] is None or timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    @staticmethod
+    def _write_sync(logs_in: List[log_schemas.LogCreate]) -> List[log_models.Log]:
+        # Keep attributes loaded after commit so the rows stay readable once the session closes.
+        db = SessionLocal(expire_on_commit=False)
+        try:
+            return crud_log.create_logs(db, logs_in=logs_in)
+        finally:
+            db.close()
+
+    async def _write(self, logs_in: List[log_schemas.LogCreate]) -> List[log_models.Log]:
+        if AsyncSessionLocal is None:
+            # No async driver installed: fall back to the sync engine in a worker thread.
+            return await asyncio.to_thread(self._write_sync, logs_in)
+        async with AsyncSessionLocal() as db:
+            return await crud_log.create_logs_async(db, logs_in=logs_in)
+
+    async def _write_batch(self, batch: List[Tuple[log_schemas.LogCreate, asyncio.Future]]) -> None:
+        try:
+            db_logs = await self._write([log_in for log_in, _ in batch])
+        except Exception as e:
+            if len(batch) > 1 and not isinstance(e, (OperationalError, InterfaceError)):
+                middle = len(batch) // 2
+                await self._write_batch(batch[:middle])
+                await self._write_batch(batch[middle:])
+                return
+            print(f"LogSequencer: Failed to append {len(batch)} log entries: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (log_in, future), db_log in zip(batch, db_logs):
+            live_metrics.record_log(log_in.verdict, log_in.response_data)
+            if settings.THREAT_SKETCHES_ENABLED:
+                threat_sketch_tracker.record_log(log_in.request_data, log_in.verdict, log_in.response_data)
+            if not future.done():
+                future.set_result(db_log)
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect_batch()
+            entries = [entry for entry in batch if entry is not None]
+            if entries:
+                await self._write_batch(entries)
+            if len(entries) < len(batch):  # close() was called.
+                return
+
+    # --- Public API ---
+
+    async def append(self, log_in: log_schemas.LogCreate) -> log_models.Log:
+        """
+        Appends one entry to the log chain and returns the stored row once its
+        batch has been committed.
+        """
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self._queue.put_nowait((log_in, future))
+        return await future
+
+    async def close(self) -> None:
+        """Stops the writer after committing everything queued before the call."""
+        if self._worker is None or self._worker.done():
+            return
+        self._queue.put_nowait(None)
+        await self._worker
+        self._worker = None
+
+
+log_sequencer = LogSequencer()
@@ -0,0 +1,69 @@
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from app.core.config import settings
+
+ThrottleKey = Tuple[str, str]
+
+
+class LoginThrottle:
+    """
+    Limits failed logins per account and per client IP, in memory.
+
+    A key's first failure opens a window of `window_seconds`; once it has
+    `max_failures` failures in that window, further attempts are refused
+    until the window ends, before any database lookup or password hash. A
+    successful login clears the account's count. At most `max_keys` keys are
+    kept, dropping the least recently failed. Counts are per worker process,
+    so with N workers an attacker gets at most N times the limit.
+    """
+    def __init__(
+        self,
+        max_failures_per_account: int = settings.AUTH_LOGIN_MAX_FAILURES_PER_ACCOUNT,
+        max_failures_per_ip: int = settings.AUTH_LOGIN_MAX_FAILURES_PER_IP,
+        window_seconds: float = settings.AUTH_LOGIN_FAILURE_WINDOW_SECONDS,
+        max_keys: int = 100_000,
+    ):
+        self.limits = {"account": max_failures_per_account, "ip": max_failures_per_ip}
+        self.window = window_seconds
+        self.max_keys = max_keys
+        # key -> (window start, failures), oldest failure first.
+        self._failures: "OrderedDict[ThrottleKey, Tuple[float, int]]" = OrderedDict()
+
+    @staticmethod
+    def _keys(account: str, ip: str | None):
+        yield ("account", account.strip().lower())
+        if ip:
+            yield ("ip", ip)
+
+    def retry_after(self, account: str, ip: str | None) -> Optional[float]:
+        """Seconds until the account and IP may try again, or None if they may now."""
+        now = time.monotonic()
+        wait = 0.0
+        for key in self._keys(account, ip):
+            entry = self._failures.get(key)
+            if entry is None:
+                continue
+            started, failures = entry
+            if now - started >= self.window:
+                del self._failures[key]
+            elif failures >= self.limits[key[0]]:
+                wait = max(wait, started + self.window - now)
+        return wait or None
+
+    def record_failure(self, account: str, ip: str | None) -> None:
+        now = time.monotonic()
+        for key in self._keys(account, ip):
+            started, failures = self._failures.pop(key, (now, 0))
+            if now - started >= self.window:
+                started, failures = now, 0
+            self._failures[key] = (started, failures + 1)
+        while len(self._failures) > self.max_keys:
+            self._failures.popitem(last=False)
+
+    def reset(self, account: str) -> None:
+        self._failures.pop(("account", account.strip().lower()), None)
+
+
+login_throttle = LoginThrottle()
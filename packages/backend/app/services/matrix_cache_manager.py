@@ -0,0 +1,344 @@
+import asyncio
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class CacheSnapshot:
+    """
+    A consistent, point-in-time copy of the cache contents.
+    Row `i` of `vectors` is the normalised embedding stored for `entry_ids[i]`
+    in namespace `namespaces[i]`.
+    """
+    vectors: np.ndarray
+    entry_ids: Tuple[str, ...]
+    namespaces: Tuple[Optional[str], ...]
+
+
+class MatrixCacheManager:
+    """
+    An in-process semantic cache backed by a single contiguous float32 matrix.
+
+    Every stored embedding is L2-normalised on insert, so a lookup is one
+    matrix multiplication (cosine similarity) followed by `argpartition` to
+    pull out the top-k rows. The matrix grows by doubling, is bounded by
+    `capacity`, and evicts the least recently (LRU) or least frequently (LFU)
+    used entry once full. Entries may be tagged with a namespace; a lookup in
+    a namespace only considers entries from that namespace. All public methods
+    are thread-safe.
+    """
+    EVICTION_POLICIES = ("lru", "lfu")
+
+    def __init__(
+        self,
+        capacity: int = settings.SEMANTIC_CACHE_CAPACITY,
+        eviction_policy: str = settings.SEMANTIC_CACHE_EVICTION_POLICY,
+        initial_rows: int = 1024,
+    ):
+        if capacity <= 0:
+            raise ValueError("capacity must be a positive integer.")
+        if eviction_policy not in self.EVICTION_POLICIES:
+            raise ValueError(f"eviction_policy must be one of {self.EVICTION_POLICIES}.")
+
+        self.capacity = capacity
+        self.eviction_policy = eviction_policy
+        self._initial_rows = max(1, min(initial_rows, capacity))
+
+        self._lock = threading.RLock()
+        self._dim: Optional[int] = None
+        self._vectors: Optional[np.ndarray] = None  # (allocated_rows, dim), float32
+        self._last_used = np.zeros(0, dtype=np.int64)
+        self._hit_counts = np.zeros(0, dtype=np.int64)
+        self._namespace_codes = np.zeros(0, dtype=np.int32)
+        self._size = 0
+        self._clock = 0
+        self.version = 0  # Bumped on every mutation, so snapshotters can skip clean caches.
+
+        self._entry_ids: List[str] = []   # row -> entry_id
+        self._rows: Dict[str, int] = {}   # entry_id -> row
+        self._namespace_names: List[Optional[str]] = [None]  # code -> namespace, 0 = none
+        self._namespace_lookup: Dict[str, int] = {}          # namespace -> code
+
+    def __len__(self) -> int:
+        return self._size
+
+    # --- Internal helpers ---
+
+    @staticmethod
+    def _normalise(embeddings) -> np.ndarray:
+        """Converts input to a 2-D float32 array with unit-length rows."""
+        matrix = np.array(embeddings, dtype=np.float32, ndmin=2)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0.0] = 1.0
+        matrix /= norms
+        return matrix
+
+    def _ensure_room(self, dim: int) -> None:
+        """Allocates or grows (by doubling) the backing arrays. Caller holds the lock."""
+        if self._vectors is None:
+            self._dim = dim
+            self._vectors = np.empty((self._initial_rows, dim), dtype=np.float32)
+            self._last_used = np.zeros(self._initial_rows, dtype=np.int64)
+            self._hit_counts = np.zeros(self._initial_rows, dtype=np.int64)
+            self._namespace_codes = np.zeros(self._initial_rows, dtype=np.int32)
+            return
+
+        if dim != self._dim:
+            raise ValueError(f"Embedding dimension {dim} does not match cache dimension {self._dim}.")
+
+        allocated = self._vectors.shape[0]
+        if self._size < allocated or allocated >= self.capacity:
+            return
+
+        new_rows = min(max(allocated * 2, self._initial_rows), self.capacity)
+        vectors = np.empty((new_rows, dim), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        self._vectors = vectors
+        self._last_used = np.resize(self._last_used, new_rows)
+        self._hit_counts = np.resize(self._hit_counts, new_rows)
+        self._namespace_codes = np.resize(self._namespace_codes, new_rows)
+
+    def _namespace_code(self, namespace: Optional[str]) -> int:
+        """Returns the integer code for a namespace, registering it if new. Caller holds the lock."""
+        if namespace is None:
+            return 0
+        code = self._namespace_lookup.get(namespace)
+        if code is None:
+            code = len(self._namespace_names)
+            self._namespace_names.append(namespace)
+            self._namespace_lookup[namespace] = code
+        return code
+
+    def _select_victim(self) -> int:
+        """Picks the row to evict according to the eviction policy. Caller holds the lock."""
+        if self.eviction_policy == "lfu":
+            # Least hits first; ties broken by least recent use.
+            hits = self._hit_counts[:self._size]
+            candidates = np.flatnonzero(hits == hits.min())
+            return int(candidates[np.argmin(self._last_used[candidates])])
+        return int(np.argmin(self._last_used[:self._size]))
+
+    def _put(self, entry_id: str, vector: np.ndarray, namespace: Optional[str] = None) -> None:
+        """Inserts or overwrites a single normalised row. Caller holds the lock."""
+        self._clock += 1
+        self.version += 1
+
+        row = self._rows.get(entry_id)
+        if row is None:
+            self._ensure_room(vector.shape[0])
+            if self._size < self.capacity:
+                row = self._size
+                self._size += 1
+                self._entry_ids.append(entry_id)
+            else:
+                row = self._select_victim()
+                del self._rows[self._entry_ids[row]]
+                self._entry_ids[row] = entry_id
+            self._rows[entry_id] = row
+            self._hit_counts[row] = 0
+        elif vector.shape[0] != self._dim:
+            raise ValueError(f"Embedding dimension {vector.shape[0]} does not match cache dimension {self._dim}.")
+
+        self._vectors[row] = vector
+        self._last_used[row] = self._clock
+        self._namespace_codes[row] = self._namespace_code(namespace)
+
+    def _touch(self, rows: Sequence[int]) -> None:
+        """Records cache hits for LRU/LFU bookkeeping. Caller holds the lock."""
+        for row in rows:
+            self._clock += 1
+            self._last_used[row] = self._clock
+            self._hit_counts[row] += 1
+
+    def _search_rows(
+        self, queries: np.ndarray, k: int, namespace: Optional[str] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns (rows, scores), each of shape (num_queries, k), sorted by
+        descending similarity. Rows outside the namespace score -inf.
+        Caller holds the lock and guarantees size > 0.
+        """
+        k = min(k, self._size)
+        scores = queries @ self._vectors[:self._size].T  # (num_queries, size)
+        if namespace is not None:
+            code = self._namespace_lookup.get(namespace, -1)
+            scores[:, self._namespace_codes[:self._size] != code] = -np.inf
+
+        if k == 1:
+            top = np.argmax(scores, axis=1)[:, None]
+        elif k < self._size:
+            top = np.argpartition(scores, -k, axis=1)[:, -k:]
+        else:
+            top = np.broadcast_to(np.arange(self._size), scores.shape).copy()
+
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+    # --- Public, synchronous API ---
+
+    def add(self, entry_id: str, embedding: Sequence[float], namespace: Optional[str] = None) -> None:
+        """Adds or replaces a single entry."""
+        vector = self._normalise(embedding)[0]
+        with self._lock:
+            self._put(entry_id, vector, namespace)
+
+    def add_batch(self, entry_ids: Sequence[str], embeddings, namespace: Optional[str] = None) -> None:
+        """Adds or replaces many entries with a single normalisation pass."""
+        if len(entry_ids) == 0:
+            return
+        vectors = self._normalise(embeddings)
+        if vectors.shape[0] != len(entry_ids):
+            raise ValueError("entry_ids and embeddings must have the same length.")
+        with self._lock:
+            for entry_id, vector in zip(entry_ids, vectors):
+                self._put(entry_id, vector, namespace)
+
+    def remove(self, entry_id: str) -> bool:
+        """Removes an entry, moving the last row into its slot. Returns False if absent."""
+        with self._lock:
+            row = self._rows.pop(entry_id, None)
+            if row is None:
+                return False
+            last = self._size - 1
+            if row != last:
+                moved_id = self._entry_ids[last]
+                self._vectors[row] = self._vectors[last]
+                self._last_used[row] = self._last_used[last]
+                self._hit_counts[row] = self._hit_counts[last]
+                self._namespace_codes[row] = self._namespace_codes[last]
+                self._entry_ids[row] = moved_id
+                self._rows[moved_id] = row
+            self._entry_ids.pop()
+            self._size = last
+            self.version += 1
+            return True
+
+    def clear(self) -> None:
+        """Drops every entry but keeps the allocated matrix for reuse."""
+        with self._lock:
+            self._size = 0
+            self._entry_ids.clear()
+            self._rows.clear()
+            self.version += 1
+
+    def restore(self, snapshot: CacheSnapshot) -> None:
+        """
+        Replaces the cache contents with a snapshot. The snapshot's vector array
+        is adopted as the backing matrix without copying, so a copy-on-write
+        `np.memmap` keeps serving from shared pages until the cache has to grow.
+        Vectors are assumed to be normalised already.
+        """
+        count = min(len(snapshot.entry_ids), self.capacity)
+        with self._lock:
+            self.clear()
+            if count == 0:
+                return
+            self._dim = snapshot.vectors.shape[1]
+            self._vectors = snapshot.vectors[:count]
+            self._last_used = np.zeros(count, dtype=np.int64)
+            self._hit_counts = np.zeros(count, dtype=np.int64)
+            self._namespace_codes = np.array(
+                [self._namespace_code(namespace) for namespace in snapshot.namespaces[:count]], dtype=np.int32
+            )
+            self._entry_ids = list(snapshot.entry_ids[:count])
+            self._rows = {entry_id: row for row, entry_id in enumerate(self._entry_ids)}
+            self._size = count
+
+    def search(self, embeddings, k: int = 1, namespace: Optional[str] = None) -> List[List[Tuple[str, float]]]:
+        """
+        Finds the k most similar entries for each query embedding.
+
+        Args:
+            embeddings: A single embedding or a 2-D batch of embeddings.
+            k: The number of neighbours to return per query.
+            namespace: If given, only entries added under this namespace are considered.
+
+        Returns:
+            One list of (entry_id, cosine_similarity) pairs per query, best first.
+        """
+        queries = self._normalise(embeddings)
+        with self._lock:
+            if self._size == 0:
+                return [[] for _ in range(queries.shape[0])]
+            if queries.shape[1] != self._dim:
+                raise ValueError(f"Query dimension {queries.shape[1]} does not match cache dimension {self._dim}.")
+            rows, scores = self._search_rows(queries, k, namespace)
+            return [
+                [
+                    (self._entry_ids[row], float(score))
+                    for row, score in zip(row_list, score_list)
+                    if score != -np.inf
+                ]
+                for row_list, score_list in zip(rows.tolist(), scores.tolist())
+            ]
+
+    def lookup_batch(
+        self, embeddings, similarity_threshold: float = 0.9, namespace: Optional[str] = None
+    ) -> List[Optional[str]]:
+        """
+        Returns the best matching entry_id for each query, or None when the best
+        score is below the threshold. Hits are counted for eviction purposes.
+        """
+        queries = self._normalise(embeddings)
+        with self._lock:
+            if self._size == 0:
+                return [None] * queries.shape[0]
+            if queries.shape[1] != self._dim:
+                raise ValueError(f"Query dimension {queries.shape[1]} does not match cache dimension {self._dim}.")
+            rows, scores = self._search_rows(queries, 1, namespace)
+            best_rows, best_scores = rows[:, 0], scores[:, 0]
+            hit_mask = best_scores >= similarity_threshold
+            self._touch(best_rows[hit_mask].tolist())
+            return [
+                self._entry_ids[row] if hit else None
+                for row, hit in zip(best_rows.tolist(), hit_mask.tolist())
+            ]
+
+    def snapshot(self) -> CacheSnapshot:
+        """Returns a consistent copy of the stored vectors and their entry ids."""
+        with self._lock:
+            if self._vectors is None:
+                return CacheSnapshot(vectors=np.empty((0, 0), dtype=np.float32), entry_ids=(), namespaces=())
+            return CacheSnapshot(
+                vectors=self._vectors[:self._size].copy(),
+                entry_ids=tuple(self._entry_ids),
+                namespaces=tuple(self._namespace_names[code] for code in self._namespace_codes[:self._size].tolist()),
+            )
+
+    # --- Async API (same interface as CacheManager / MockCacheManager) ---
+
+    async def check_cache(
+        self, embedding: List[float], similarity_threshold: float = 0.9, namespace: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Finds a semantically similar entry in the cache. The matrix multiply runs
+        in a worker thread (numpy releases the GIL) so large caches do not stall
+        the event loop.
+        """
+        results = await asyncio.to_thread(self.lookup_batch, [embedding], similarity_threshold, namespace)
+        return results[0]
+
+    async def check_cache_batch(
+        self, embeddings: List[List[float]], similarity_threshold: float = 0.9, namespace: Optional[str] = None
+    ) -> List[Optional[str]]:
+        """
+        Looks up many prompts with a single matrix multiplication.
+        """
+        if len(embeddings) == 0:
+            return []
+        return await asyncio.to_thread(self.lookup_batch, embeddings, similarity_threshold, namespace)
+
+    async def add_to_cache(self, entry_id: str, embedding: List[float], namespace: Optional[str] = None):
+        """
+        Adds a new prompt embedding to the cache, evicting an entry if it is full.
+        """
+        self.add(entry_id, embedding, namespace)
+
+
+matrix_cache_manager = MatrixCacheManager()
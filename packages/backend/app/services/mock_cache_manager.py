@@ -9,13 +9,13 @@ class MockCacheManager:
     """
     def __init__(self):
       
-        self._cache = {} # Stores entry_id -> embedding
+        self._cache = {} # Stores entry_id -> (namespace, embedding)
         
         print("="*80)
         print("WARNING: Using STATEFUL MOCK CacheManager. This is for local dev only.")
         print("="*80)
 
-    async def check_cache(self, embedding: List[float], similarity_threshold: float = 0.9) -> Optional[str]:
+    async def check_cache(self, embedding: List[float], similarity_threshold: float = 0.9, namespace: Optional[str] = None) -> Optional[str]:
         """
         (Mock) Simulates checking the cache. It now iterates through its
         in-memory store and performs a simple similarity check.
@@ -29,7 +29,9 @@ class MockCacheManager:
         best_match_id = None
         highest_similarity = -1.0
 
-        for entry_id, stored_embedding_list in self._cache.items():
+        for entry_id, (stored_namespace, stored_embedding_list) in self._cache.items():
+            if stored_namespace != namespace:
+                continue
             stored_vector = np.array(stored_embedding_list)
             
             similarity = np.dot(query_vector, stored_vector)
@@ -45,13 +47,13 @@ class MockCacheManager:
         print(f"MOCK Cache MISS. Best match score was {highest_similarity:.4f} (below threshold of {similarity_threshold})")
         return None
 
-    async def add_to_cache(self, entry_id: str, embedding: List[float]):
+    async def add_to_cache(self, entry_id: str, embedding: List[float], namespace: Optional[str] = None):
         """
         (Mock) Simulates adding to the cache. It now stores the entry in its
         in-memory dictionary.
         """
         print(f"MOCK Cache ADD. Added entry '{entry_id}' to the cache.")
-        self._cache[entry_id] = embedding
+        self._cache[entry_id] = (namespace, embedding)
 
 
 mock_cache_manager = MockCacheManager()
\ No newline at end of file
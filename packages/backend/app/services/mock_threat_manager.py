@@ -1,16 +1,28 @@
-from typing import List
+from typing import List, Optional
 
 class MockThreatManager:
     """
     A mock version of the Dynamic Threat Freezing service for local development.
-    This class has the same methods as the real ThreatManager would, but does nothing.
+    This class has the same methods as the real ThreatManager, but does nothing.
     """
     def __init__(self):
         print("="*80)
         print("WARNING: Using MOCK ThreatManager. No threats will be saved.")
         print("="*80)
 
-    async def add_to_threat_db(self, embedding: List[float]):
+    def start(self) -> None:
+        """(Mock) There is no index to keep in sync."""
+
+    async def stop(self) -> None:
+        pass
+
+    async def check_threat(self, embedding: List[float]):
+        """
+        (Mock) Simulates a threat lookup. Nothing is ever frozen, so it never matches.
+        """
+        return None
+
+    async def add_to_threat_db(self, embedding: List[float], attack_type: str = "unknown", reasoning: Optional[str] = None, prompt: Optional[str] = None):
         """
         (Mock) Simulates adding a malicious embedding to the threat database.
         """
@@ -18,5 +30,11 @@ class MockThreatManager:
         
         pass
 
+    async def unfreeze(self, threat_id: int, user_id: Optional[int] = None) -> bool:
+        """
+        (Mock) Simulates unfreezing a threat. There is nothing to unfreeze.
+        """
+        return False
+
 
-mock_threat_manager = MockThreatManager()
\ No newline at end of file
+mock_threat_manager = MockThreatManager()
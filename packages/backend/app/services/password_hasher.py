@@ -0,0 +1,75 @@
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional, Tuple
+
+from app.core import security
+from app.core.config import settings
+
+
+class PasswordHasherSaturated(Exception):
+    """Raised when more password hashes are waiting than the queue limit allows."""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt for signup and login in a dedicated process pool.
+
+    bcrypt is deliberately slow, so hashing on the default thread pool lets
+    a login storm take the threads every sync endpoint runs on. Here at most
+    `workers` hashes run at once, in their own processes, and at most
+    `queue_limit` more wait for one; anything beyond that is rejected straight
+    away with `PasswordHasherSaturated` instead of queueing.
+    """
+    def __init__(
+        self,
+        workers: int = settings.AUTH_HASH_WORKERS,
+        queue_limit: int = settings.AUTH_HASH_QUEUE_LIMIT,
+    ):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_limit = queue_limit
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # Spawn rather than fork: the server process has threads and an event loop.
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def _run(self, func, *args):
+        if self._pending >= self.workers + self.queue_limit:
+            raise PasswordHasherSaturated()
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._get_executor(), func, *args)
+        except BrokenProcessPool:
+            print("PasswordHasher: A hashing process died; starting a new pool.")
+            self._executor = None
+            raise
+        finally:
+            self._pending -= 1
+
+    @property
+    def pending(self) -> int:
+        """Hashes running or waiting."""
+        return self._pending
+
+    async def hash(self, password: str) -> str:
+        return await self._run(security.get_password_hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """Whether the password matches, and a new hash if the stored one is outdated."""
+        return await self._run(security.verify_and_update_password, password, hashed_password)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
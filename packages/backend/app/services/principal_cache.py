@@ -0,0 +1,124 @@
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Optional, Set, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.crud import crud_revocation, crud_user
+from app.models.user import User
+from app.schemas.user import User as SQLAlchemyUser
+
+PrincipalKey = Tuple[int, str]
+
+
+def token_id(token: str, jti: str | None) -> str:
+    """The token's `jti`, or a digest of the token for ones issued without it."""
+    return jti or hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+class PrincipalCache:
+    """
+    Authenticated principals by (user id, token id), so a request carrying a
+    token seen in the last `ttl_seconds` skips the user lookup.
+
+    An entry lives for `ttl_seconds`, or until its token expires if that
+    comes first, and is evicted least recently used beyond `max_size`.
+    Revoked token ids are held in memory until their tokens expire, and
+    checked on every request. Revocations and user invalidations (e.g.
+    deactivation) are written to `auth_revocations`; at most every
+    `sync_interval_seconds` each worker re-reads the unexpired ones and
+    applies those it has not seen, and the worker handling the change applies
+    it immediately.
+    """
+    def __init__(
+        self,
+        ttl_seconds: float = settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS,
+        max_size: int = settings.AUTH_PRINCIPAL_CACHE_SIZE,
+        sync_interval_seconds: float = settings.AUTH_REVOCATION_SYNC_SECONDS,
+    ):
+        self.ttl = ttl_seconds
+        self.max_size = max_size
+        self.sync_interval = sync_interval_seconds
+        # key -> (monotonic deadline, principal)
+        self._entries: "OrderedDict[PrincipalKey, Tuple[float, User]]" = OrderedDict()
+        self._revoked: Dict[str, datetime] = {}  # jti -> token expiry
+        self._applied_revocation_ids: Set[int] = set()
+        self._last_sync = float("-inf")
+
+    # --- Revocation synchronisation ---
+
+    async def maybe_sync(self, db: AsyncSession) -> None:
+        if time.monotonic() - self._last_sync < self.sync_interval:
+            return
+        self._last_sync = time.monotonic()
+        try:
+            revocations = await crud_revocation.get_revocations(db)
+        except Exception as e:
+            print(f"PrincipalCache: Failed to sync revocations: {e}")
+            return
+        for revocation in revocations:
+            if revocation.id in self._applied_revocation_ids:
+                continue
+            if revocation.jti:
+                self._apply_revocation(revocation.user_id, revocation.jti, revocation.expires_at)
+            else:
+                self.invalidate_user(revocation.user_id)
+        # Expired revocations are no longer returned, so this stays as small as the table.
+        self._applied_revocation_ids = {revocation.id for revocation in revocations}
+        now = datetime.now(timezone.utc)
+        self._revoked = {jti: expires for jti, expires in self._revoked.items() if expires >= now}
+
+    def _apply_revocation(self, user_id: int, jti: str, expires_at: datetime) -> None:
+        if expires_at.tzinfo is None:  # SQLite drops the offset.
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        self._revoked[jti] = expires_at
+        self._entries.pop((user_id, jti), None)
+
+    # --- Public API ---
+
+    def is_revoked(self, jti: str | None) -> bool:
+        return jti is not None and jti in self._revoked
+
+    def get(self, key: PrincipalKey) -> Optional[User]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        deadline, principal = entry
+        if deadline < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return principal
+
+    def put(self, key: PrincipalKey, principal: User, expires_at: datetime | None = None) -> None:
+        ttl = self.ttl
+        if expires_at is not None:
+            ttl = min(ttl, (expires_at - datetime.now(timezone.utc)).total_seconds())
+        if ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, principal)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Drops every cached principal of `user_id` in this worker."""
+        for key in [key for key in self._entries if key[0] == user_id]:
+            del self._entries[key]
+
+    async def revoke_token(self, db: AsyncSession, *, user_id: int, jti: str, expires_at: datetime) -> None:
+        """Revokes a token in every worker: here at once, elsewhere on their next sync."""
+        await crud_revocation.revoke_token(db, user_id=user_id, jti=jti, expires_at=expires_at)
+        self._apply_revocation(user_id, jti, expires_at)
+
+    async def set_user_active(self, db: AsyncSession, *, user: SQLAlchemyUser, is_active: bool) -> SQLAlchemyUser:
+        """(De)activates a user in every worker: here at once, elsewhere on their next sync."""
+        user = await crud_user.set_user_active(db, user=user, is_active=is_active)
+        self.invalidate_user(user.id)
+        return user
+
+
+principal_cache = PrincipalCache()
@@ -0,0 +1,213 @@
+import uuid
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from qdrant_client import AsyncQdrantClient, models
+
+from app.core.config import settings
+
+DISTANCES = {
+    "cosine": models.Distance.COSINE,
+    "dot": models.Distance.DOT,
+    "euclid": models.Distance.EUCLID,
+    "manhattan": models.Distance.MANHATTAN,
+}
+
+
+class QdrantCacheManager:
+    """
+    A semantic cache backed by a Qdrant HNSW index.
+
+    Runs against the Qdrant service from docker-compose (QDRANT_URL) or, with
+    QDRANT_PATH, in Qdrant's embedded local mode with no server at all. Note
+    that embedded mode answers queries by exact scan, so the HNSW settings
+    (m, ef_construct, hnsw_ef) only take effect against a Qdrant server.
+
+    Each point stores the caller's entry_id, an optional namespace and an
+    optional payload, so a hit can be served without a second lookup.
+    """
+    def __init__(
+        self,
+        url: Optional[str] = settings.QDRANT_URL,
+        path: Optional[str] = settings.QDRANT_PATH,
+        collection_name: str = settings.QDRANT_COLLECTION,
+        distance: str = settings.QDRANT_DISTANCE,
+        hnsw_m: int = settings.QDRANT_HNSW_M,
+        hnsw_ef_construct: int = settings.QDRANT_HNSW_EF_CONSTRUCT,
+        hnsw_ef: int = settings.QDRANT_HNSW_EF,
+        upsert_batch_size: int = settings.QDRANT_UPSERT_BATCH_SIZE,
+    ):
+        if distance not in DISTANCES:
+            raise ValueError(f"distance must be one of {tuple(DISTANCES)}.")
+
+        if url:
+            self.client = AsyncQdrantClient(url=url)
+        else:
+            # Embedded mode: persisted to `path`, or purely in memory.
+            self.client = AsyncQdrantClient(path=path) if path else AsyncQdrantClient(location=":memory:")
+
+        self.collection_name = collection_name
+        self.distance = DISTANCES[distance]
+        self.hnsw_config = models.HnswConfigDiff(m=hnsw_m, ef_construct=hnsw_ef_construct)
+        self.search_params = models.SearchParams(hnsw_ef=hnsw_ef)
+        self.upsert_batch_size = upsert_batch_size
+        self._collection_ready = False
+
+        print(f"QdrantCacheManager: Using collection '{collection_name}' ({'server' if url else 'embedded'} mode).")
+
+    @staticmethod
+    def _point_id(entry_id: str) -> str:
+        """Qdrant only accepts integers or UUIDs as point ids, so derive a stable UUID."""
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, entry_id))
+
+    async def _ensure_collection(self, dim: int) -> None:
+        """Creates the collection on first write, sized to the first embedding seen."""
+        if self._collection_ready:
+            return
+        if not await self.client.collection_exists(self.collection_name):
+            await self.client.create_collection(
+                collection_name=self.collection_name,
+                vectors_config=models.VectorParams(size=dim, distance=self.distance),
+                hnsw_config=self.hnsw_config,
+            )
+            await self.client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name="namespace",
+                field_schema=models.PayloadSchemaType.KEYWORD,
+            )
+        self._collection_ready = True
+
+    @staticmethod
+    def _namespace_filter(namespace: Optional[str]) -> Optional[models.Filter]:
+        if namespace is None:
+            return None
+        return models.Filter(must=[models.FieldCondition(key="namespace", match=models.MatchValue(value=namespace))])
+
+    async def search(
+        self,
+        embedding: List[float],
+        k: int = 1,
+        similarity_threshold: Optional[float] = None,
+        namespace: Optional[str] = None,
+    ) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """
+        Returns up to k (entry_id, score, payload) tuples, best first.
+        The threshold is applied by Qdrant in the direction of the distance
+        metric (higher-is-better for cosine/dot, lower-is-better for euclid/manhattan).
+        """
+        if not self._collection_ready and not await self.client.collection_exists(self.collection_name):
+            return []
+        self._collection_ready = True
+
+        response = await self.client.query_points(
+            collection_name=self.collection_name,
+            query=[float(x) for x in embedding],
+            query_filter=self._namespace_filter(namespace),
+            limit=k,
+            score_threshold=similarity_threshold,
+            search_params=self.search_params,
+            with_payload=True,
+        )
+        return [(point.payload["entry_id"], point.score, point.payload) for point in response.points]
+
+    async def search_batch(
+        self,
+        embeddings: List[List[float]],
+        k: int = 1,
+        similarity_threshold: Optional[float] = None,
+        namespace: Optional[str] = None,
+    ) -> List[List[Tuple[str, float, Dict[str, Any]]]]:
+        """
+        Runs many searches in a single request to Qdrant.
+        """
+        if len(embeddings) == 0:
+            return []
+        if not self._collection_ready and not await self.client.collection_exists(self.collection_name):
+            return [[] for _ in embeddings]
+        self._collection_ready = True
+
+        query_filter = self._namespace_filter(namespace)
+        requests = [
+            models.QueryRequest(
+                query=[float(x) for x in embedding],
+                filter=query_filter,
+                limit=k,
+                score_threshold=similarity_threshold,
+                params=self.search_params,
+                with_payload=True,
+            )
+            for embedding in embeddings
+        ]
+        responses = await self.client.query_batch_points(collection_name=self.collection_name, requests=requests)
+        return [
+            [(point.payload["entry_id"], point.score, point.payload) for point in response.points]
+            for response in responses
+        ]
+
+    async def check_cache(
+        self, embedding: List[float], similarity_threshold: float = 0.9, namespace: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Performs an approximate nearest-neighbour search for a similar cached entry.
+        """
+        try:
+            matches = await self.search(
+                embedding, k=1, similarity_threshold=similarity_threshold, namespace=namespace
+            )
+        except Exception as e:
+            print(f"Error during Qdrant cache check: {e}")
+            return None
+        return matches[0][0] if matches else None
+
+    async def add_to_cache(
+        self,
+        entry_id: str,
+        embedding: List[float],
+        namespace: Optional[str] = None,
+        payload: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Adds (or replaces) a single entry and its payload.
+        """
+        await self.add_batch([(entry_id, embedding, payload)], namespace=namespace)
+
+    async def add_batch(
+        self,
+        entries: Sequence[Tuple[str, List[float], Optional[Dict[str, Any]]]],
+        namespace: Optional[str] = None,
+    ):
+        """
+        Upserts many (entry_id, embedding, payload) entries in chunks of
+        `upsert_batch_size`, without waiting for indexing to finish.
+        """
+        if not entries:
+            return
+        try:
+            await self._ensure_collection(len(entries[0][1]))
+            points = [
+                models.PointStruct(
+                    id=self._point_id(entry_id),
+                    vector=[float(x) for x in embedding],
+                    payload={**(payload or {}), "entry_id": entry_id, "namespace": namespace},
+                )
+                for entry_id, embedding, payload in entries
+            ]
+            for start in range(0, len(points), self.upsert_batch_size):
+                await self.client.upsert(
+                    collection_name=self.collection_name,
+                    points=points[start:start + self.upsert_batch_size],
+                    wait=False,
+                )
+        except Exception as e:
+            print(f"Error during Qdrant cache add: {e}")
+
+    async def remove(self, entry_id: str):
+        """
+        Deletes a single entry from the collection.
+        """
+        await self.client.delete(
+            collection_name=self.collection_name,
+            points_selector=models.PointIdsList(points=[self._point_id(entry_id)]),
+        )
+
+
+qdrant_cache_manager = QdrantCacheManager()
@@ -0,0 +1,405 @@
+import asyncio
+import os
+import sys
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+# Rows are scored in blocks so decoding never materialises the whole cache in float32.
+SCORE_BLOCK_ROWS = 65_536
+
+
+# --- Codecs ---
+
+class Float16Codec:
+    """Half-precision storage: 2 bytes per dimension, effectively exact for cosine scores."""
+    name = "float16"
+    trained = True
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.code_width = dim
+        self.dtype = np.float16
+
+    def train(self, vectors: np.ndarray) -> None:
+        pass
+
+    def encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+
+    def scores(self, queries: np.ndarray, codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+        return queries @ codes.astype(np.float32).T
+
+
+class Int8Codec:
+    """
+    Symmetric int8 scalar quantisation with one float32 scale per vector:
+    1 byte per dimension plus 4 bytes per entry. Needs no training.
+    """
+    name = "int8"
+    trained = True
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.code_width = dim
+        self.dtype = np.int8
+
+    def train(self, vectors: np.ndarray) -> None:
+        pass
+
+    def encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0.0] = 1.0
+        codes = np.rint(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    def scores(self, queries: np.ndarray, codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+        return (queries @ codes.astype(np.float32).T) * scales
+
+
+class ProductQuantizationCodec:
+    """
+    Product quantisation: each vector is split into `subspaces` chunks and every
+    chunk is replaced by the id of its nearest of 256 trained centroids, so an
+    entry costs `subspaces` bytes. Queries are scored with asymmetric distance
+    computation (the query stays in float32 and is compared against centroid
+    look-up tables).
+    """
+    name = "pq"
+    centroids_per_subspace = 256
+
+    def __init__(self, dim: int, subspaces: int = settings.SEMANTIC_CACHE_PQ_SUBSPACES, iterations: int = 20):
+        self.dim = dim
+        self.subspaces = subspaces
+        self.sub_dim = -(-dim // subspaces)  # Ceiling division; vectors are zero-padded.
+        self.padded_dim = self.sub_dim * subspaces
+        self.iterations = iterations
+        self.code_width = subspaces
+        self.dtype = np.uint8
+        self.centroids: Optional[np.ndarray] = None  # (subspaces, 256, sub_dim)
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        """Returns a (subspaces, n, sub_dim) view of zero-padded vectors."""
+        if self.padded_dim != self.dim:
+            vectors = np.pad(vectors, ((0, 0), (0, self.padded_dim - self.dim)))
+        return vectors.reshape(len(vectors), self.subspaces, self.sub_dim).transpose(1, 0, 2)
+
+    def train(self, vectors: np.ndarray) -> None:
+        rng = np.random.default_rng(0)
+        parts = self._split(vectors.astype(np.float32))
+        k = min(self.centroids_per_subspace, len(vectors))
+        centroids = np.zeros((self.subspaces, self.centroids_per_subspace, self.sub_dim), dtype=np.float32)
+        for s, part in enumerate(parts):
+            centres = part[rng.choice(len(part), size=k, replace=False)].copy()
+            for _ in range(self.iterations):
+                assignment = self._nearest(part, centres)
+                counts = np.bincount(assignment, minlength=k)
+                sums = np.zeros_like(centres)
+                np.add.at(sums, assignment, part)
+                filled = counts > 0  # Empty clusters keep their previous centre.
+                centres[filled] = sums[filled] / counts[filled, None]
+            centroids[s, :k] = centres
+            # Unused slots (tiny training sets) repeat a real centroid so they never win a tie wrongly.
+            centroids[s, k:] = centres[0]
+        self.centroids = centroids
+
+    @staticmethod
+    def _nearest(part: np.ndarray, centres: np.ndarray) -> np.ndarray:
+        distances = (part ** 2).sum(axis=1)[:, None] - 2 * part @ centres.T + (centres ** 2).sum(axis=1)[None, :]
+        return distances.argmin(axis=1)
+
+    def encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        parts = self._split(vectors.astype(np.float32))
+        codes = np.empty((len(vectors), self.subspaces), dtype=np.uint8)
+        for s, part in enumerate(parts):
+            codes[:, s] = self._nearest(part, self.centroids[s])
+        return codes, np.ones(len(vectors), dtype=np.float32)
+
+    def scores(self, queries: np.ndarray, codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+        # Look-up tables: each query chunk against every centroid, laid out (subspaces, 256, queries)
+        # so that gathering by code yields contiguous rows.
+        tables = np.ascontiguousarray(np.einsum("sqd,scd->scq", self._split(queries), self.centroids))
+        indices = np.ascontiguousarray(codes.T, dtype=np.intp)
+        scores = np.zeros((len(codes), len(queries)), dtype=np.float32)
+        for s in range(self.subspaces):
+            scores += tables[s][indices[s]]
+        return scores.T
+
+
+CODECS = {
+    "float16": Float16Codec,
+    "int8": Int8Codec,
+    "pq": ProductQuantizationCodec,
+}
+
+
+class QuantizedCacheManager:
+    """
+    An in-process semantic cache that stores compressed embeddings.
+
+    Lookups score every entry with the codec's approximate similarity, take the
+    best `rerank_candidates`, and re-rank them with exact float32 vectors read
+    from a disk-backed `np.memmap` in `rerank_dir`, so the similarity threshold
+    is applied to exact scores. Without a `rerank_dir` the approximate scores
+    are used directly, which is only advisable for float16: int8 and pq refuse
+    to run that way unless `allow_approximate_scores` is set, since near-threshold
+    matches would be served or missed on the codec's error.
+
+    PQ needs training data: entries are kept in float32 and searched exactly
+    until `pq_train_size` have arrived, then the codebooks are trained on a
+    sample of that size and every staged entry is encoded.
+
+    Supports namespaces and LRU eviction like MatrixCacheManager. All public
+    methods are thread-safe.
+    """
+    def __init__(
+        self,
+        codec: str = "int8",
+        capacity: int = settings.SEMANTIC_CACHE_CAPACITY,
+        rerank_dir: Optional[str] = settings.SEMANTIC_CACHE_RERANK_DIR,
+        rerank_candidates: int = settings.SEMANTIC_CACHE_RERANK_CANDIDATES,
+        pq_train_size: int = settings.SEMANTIC_CACHE_PQ_TRAIN_SIZE,
+        initial_rows: int = 1024,
+        allow_approximate_scores: bool = False,
+    ):
+        if codec not in CODECS:
+            raise ValueError(f"codec must be one of {tuple(CODECS)}.")
+        if codec != "float16" and not rerank_dir and not allow_approximate_scores:
+            raise ValueError(
+                f"The {codec} codec needs a rerank_dir (SEMANTIC_CACHE_RERANK_DIR) so the threshold is applied to exact scores."
+            )
+        self.codec_name = codec
+        self.capacity = capacity
+        self.rerank_dir = rerank_dir
+        self.rerank_candidates = rerank_candidates
+        self.pq_train_size = pq_train_size
+        self._initial_rows = max(1, min(initial_rows, capacity))
+
+        self._lock = threading.RLock()
+        self._codec = None
+        self._dim: Optional[int] = None
+        self._codes: Optional[np.ndarray] = None
+        self._scales = np.zeros(0, dtype=np.float32)
+        self._last_used = np.zeros(0, dtype=np.int64)
+        self._namespace_codes = np.zeros(0, dtype=np.int32)
+        self._exact: Optional[np.ndarray] = None     # (capacity, dim) float32 memmap for re-ranking
+        self._staging: Dict[int, np.ndarray] = {}    # row -> float32 vector, until PQ is trained
+        self._size = 0
+        self._clock = 0
+
+        self._entry_ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._namespace_lookup: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def vector_bytes_per_entry(self) -> float:
+        """Array memory per entry: codes plus the scale, last-used and namespace columns."""
+        if self._codec is None:
+            return 0.0
+        code_bytes = self._codec.code_width * np.dtype(self._codec.dtype).itemsize
+        return code_bytes + self._scales.itemsize + self._last_used.itemsize + self._namespace_codes.itemsize
+
+    @property
+    def bytes_per_entry(self) -> float:
+        """
+        Resident memory per stored entry: the arrays, plus the entry's id string,
+        its list slot and its share of the id -> row dict. Excludes the on-disk
+        re-rank store. Walks every id, so it is meant for benchmarks, not hot paths.
+        """
+        with self._lock:
+            if self._size == 0:
+                return self.vector_bytes_per_entry
+            id_bytes = sum(sys.getsizeof(entry_id) for entry_id in self._entry_ids) / self._size
+            list_slot = sys.getsizeof(self._entry_ids) / len(self._entry_ids)
+            dict_share = sys.getsizeof(self._rows) / len(self._rows)
+            return self.vector_bytes_per_entry + id_bytes + list_slot + dict_share
+
+    # --- Internal helpers ---
+
+    @staticmethod
+    def _normalise(embeddings) -> np.ndarray:
+        matrix = np.array(embeddings, dtype=np.float32, ndmin=2)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0.0] = 1.0
+        matrix /= norms
+        return matrix
+
+    def _initialise(self, dim: int) -> None:
+        """Creates the codec, code arrays and re-rank store on first insert. Caller holds the lock."""
+        self._dim = dim
+        self._codec = CODECS[self.codec_name](dim)
+        rows = self._initial_rows
+        self._codes = np.zeros((rows, self._codec.code_width), dtype=self._codec.dtype)
+        self._scales = np.ones(rows, dtype=np.float32)
+        self._last_used = np.zeros(rows, dtype=np.int64)
+        self._namespace_codes = np.zeros(rows, dtype=np.int32)
+        if self.rerank_dir:
+            # One sparse file per worker: only pages that are written or read take up disk and page cache.
+            os.makedirs(self.rerank_dir, exist_ok=True)
+            path = os.path.join(self.rerank_dir, f"rerank-{os.getpid()}.f32")
+            self._exact = np.memmap(path, dtype=np.float32, mode="w+", shape=(self.capacity, dim))
+
+    def _grow(self) -> None:
+        allocated = len(self._codes)
+        if self._size < allocated or allocated >= self.capacity:
+            return
+        rows = min(allocated * 2, self.capacity)
+        codes = np.zeros((rows, self._codec.code_width), dtype=self._codec.dtype)
+        codes[:allocated] = self._codes
+        self._codes = codes
+        self._scales = np.resize(self._scales, rows)
+        self._last_used = np.resize(self._last_used, rows)
+        self._namespace_codes = np.resize(self._namespace_codes, rows)
+
+    def _namespace_code(self, namespace: Optional[str]) -> int:
+        if namespace is None:
+            return 0
+        return self._namespace_lookup.setdefault(namespace, len(self._namespace_lookup) + 1)
+
+    def _store(self, rows: List[int], vectors: np.ndarray) -> None:
+        """Encodes vectors into their rows, or stages them until PQ is trained. Caller holds the lock."""
+        if self._exact is not None:
+            self._exact[rows] = vectors
+
+        if not self._codec.trained:
+            for row, vector in zip(rows, vectors):
+                self._staging[row] = vector
+            if len(self._staging) >= self.pq_train_size:
+                staged_rows = list(self._staging)
+                staged = np.stack([self._staging[row] for row in staged_rows])
+                sample = np.random.default_rng(0).choice(len(staged), size=self.pq_train_size, replace=False)
+                self._codec.train(staged[sample])
+                self._codes[staged_rows], self._scales[staged_rows] = self._codec.encode(staged)
+                self._staging.clear()
+                print(f"QuantizedCacheManager: Trained PQ codebooks on {self.pq_train_size} of {len(staged_rows)} entries.")
+            return
+
+        self._codes[rows], self._scales[rows] = self._codec.encode(vectors)
+
+    def _allocate_row(self, entry_id: str) -> int:
+        row = self._rows.get(entry_id)
+        if row is not None:
+            return row
+        self._grow()
+        if self._size < self.capacity:
+            row = self._size
+            self._size += 1
+            self._entry_ids.append(entry_id)
+        else:
+            row = int(np.argmin(self._last_used[:self._size]))
+            del self._rows[self._entry_ids[row]]
+            self._staging.pop(row, None)
+            self._entry_ids[row] = entry_id
+        self._rows[entry_id] = row
+        return row
+
+    def _approximate_scores(self, queries: np.ndarray) -> np.ndarray:
+        """Approximate (num_queries, size) similarities, decoded block by block."""
+        scores = np.empty((len(queries), self._size), dtype=np.float32)
+        for start in range(0, self._size, SCORE_BLOCK_ROWS):
+            stop = min(start + SCORE_BLOCK_ROWS, self._size)
+            if self._codec.trained:
+                scores[:, start:stop] = self._codec.scores(queries, self._codes[start:stop], self._scales[start:stop])
+            else:
+                block = np.stack([self._staging[row] for row in range(start, stop)])
+                scores[:, start:stop] = queries @ block.T
+        return scores
+
+    def _best_matches(self, queries: np.ndarray, namespace: Optional[str]) -> List[Tuple[int, float]]:
+        """Returns (row, score) of the best match per query, re-ranked exactly when possible."""
+        scores = self._approximate_scores(queries)
+        if namespace is not None:
+            code = self._namespace_lookup.get(namespace, -1)
+            scores[:, self._namespace_codes[:self._size] != code] = -np.inf
+
+        candidates = min(self.rerank_candidates, self._size)
+        results = []
+        for query, query_scores in zip(queries, scores):
+            top = np.argpartition(query_scores, -candidates)[-candidates:]
+            top = top[query_scores[top] != -np.inf]
+            if len(top) == 0:
+                results.append((-1, -np.inf))
+                continue
+            if self._exact is not None:
+                top = np.sort(top)  # Ascending rows keep memmap reads sequential.
+                exact = self._exact[top] @ query
+                best = int(np.argmax(exact))
+                results.append((int(top[best]), float(exact[best])))
+            else:
+                best = int(top[np.argmax(query_scores[top])])
+                results.append((best, float(query_scores[best])))
+        return results
+
+    # --- Public, synchronous API ---
+
+    def add(self, entry_id: str, embedding: Sequence[float], namespace: Optional[str] = None) -> None:
+        self.add_batch([entry_id], [embedding], namespace)
+
+    def add_batch(self, entry_ids: Sequence[str], embeddings, namespace: Optional[str] = None) -> None:
+        if len(entry_ids) == 0:
+            return
+        vectors = self._normalise(embeddings)
+        with self._lock:
+            if self._codec is None:
+                self._initialise(vectors.shape[1])
+            elif vectors.shape[1] != self._dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match cache dimension {self._dim}.")
+            rows = []
+            for entry_id in entry_ids:
+                self._clock += 1
+                row = self._allocate_row(entry_id)
+                self._last_used[row] = self._clock
+                self._namespace_codes[row] = self._namespace_code(namespace)
+                rows.append(row)
+            self._store(rows, vectors)
+
+    def lookup_batch(
+        self, embeddings, similarity_threshold: float = 0.9, namespace: Optional[str] = None
+    ) -> List[Optional[str]]:
+        queries = self._normalise(embeddings)
+        with self._lock:
+            if self._size == 0:
+                return [None] * len(queries)
+            results = []
+            for row, score in self._best_matches(queries, namespace):
+                if row >= 0 and score >= similarity_threshold:
+                    self._clock += 1
+                    self._last_used[row] = self._clock
+                    results.append(self._entry_ids[row])
+                else:
+                    results.append(None)
+            return results
+
+    # --- Async API (same interface as the other cache managers) ---
+
+    async def check_cache(
+        self, embedding: List[float], similarity_threshold: float = 0.9, namespace: Optional[str] = None
+    ) -> Optional[str]:
+        results = await asyncio.to_thread(self.lookup_batch, [embedding], similarity_threshold, namespace)
+        return results[0]
+
+    async def check_cache_batch(
+        self, embeddings: List[List[float]], similarity_threshold: float = 0.9, namespace: Optional[str] = None
+    ) -> List[Optional[str]]:
+        if len(embeddings) == 0:
+            return []
+        return await asyncio.to_thread(self.lookup_batch, embeddings, similarity_threshold, namespace)
+
+    async def add_to_cache(self, entry_id: str, embedding: List[float], namespace: Optional[str] = None):
+        self.add(entry_id, embedding, namespace)
+
+
+# The services switch only imports this instance when SEMANTIC_CACHE_STORAGE names a codec.
+quantized_cache_manager = (
+    QuantizedCacheManager(codec=settings.SEMANTIC_CACHE_STORAGE) if settings.SEMANTIC_CACHE_STORAGE in CODECS else None
+)
@@ -0,0 +1,374 @@
+import hashlib
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+try:
+    import fcntl
+except ImportError:  # Not on POSIX: only the in-memory store is available.
+    fcntl = None
+
+# Every key holds three floats: (tokens, last refill) for a token bucket, or
+# (window start, current count, previous count) for a sliding-window quota.
+State = Tuple[float, float, float]
+
+
+@dataclass(frozen=True)
+class Bucket:
+    """One token bucket a request draws `cost` from."""
+    key: str
+    capacity: float
+    rate: float  # Tokens refilled per second.
+    cost: float = 1.0
+
+
+class BucketStore:
+    """
+    Where bucket and quota state lives. Subclasses provide per-key state and
+    may extend the lock; the bucket arithmetic is shared.
+
+    Every read-modify-write runs under `locked()`. It always holds a thread
+    lock: sync dependencies such as `deps.get_api_key` run on FastAPI's
+    thread pool, so several threads of one worker update the store at once.
+    """
+    def __init__(self):
+        self._thread_lock = threading.Lock()
+
+    @contextmanager
+    def locked(self):
+        with self._thread_lock:
+            yield
+
+    def get(self, key: str) -> Optional[State]:
+        raise NotImplementedError
+
+    def put(self, key: str, state: State) -> None:
+        raise NotImplementedError
+
+    # --- Token buckets ---
+
+    def _level(self, bucket: Bucket, now: float) -> float:
+        state = self.get(bucket.key)
+        if state is None:
+            return bucket.capacity
+        tokens, last, _ = state
+        return min(bucket.capacity, tokens + (now - last) * bucket.rate)
+
+    def take(self, buckets: Sequence[Bucket], now: float) -> Tuple[bool, List[float], float]:
+        """
+        Draws from every bucket, or from none if any is short. Returns whether
+        it did, each bucket's remaining tokens, and how long until the
+        shortest one could cover its cost.
+        """
+        with self.locked():
+            levels = [self._level(bucket, now) for bucket in buckets]
+            # A cost above the capacity could never be paid; charge a full bucket instead.
+            costs = [min(bucket.cost, bucket.capacity) for bucket in buckets]
+            waits = [
+                (cost - level) / bucket.rate if level < cost else 0.0
+                for bucket, level, cost in zip(buckets, levels, costs)
+            ]
+            allowed = not any(waits)
+            if allowed:
+                levels = [level - cost for level, cost in zip(levels, costs)]
+                for bucket, level in zip(buckets, levels):
+                    self.put(bucket.key, (level, now, 0.0))
+            return allowed, levels, max(waits, default=0.0)
+
+    def adjust(self, bucket: Bucket, amount: float, now: float) -> None:
+        """
+        Draws `amount` more (or returns it, if negative) after the fact. A
+        bucket may go into debt, down to minus its capacity.
+        """
+        with self.locked():
+            level = self._level(bucket, now) - amount
+            self.put(bucket.key, (min(bucket.capacity, max(-bucket.capacity, level)), now, 0.0))
+
+    # --- Sliding-window quotas ---
+
+    def _window(self, key: str, window: float, now: float) -> Tuple[float, float, float]:
+        start = math.floor(now / window) * window
+        state = self.get(key)
+        if state is None or state[0] < start - window:
+            return start, 0.0, 0.0
+        if state[0] < start:
+            return start, 0.0, state[1]
+        return state
+
+    def usage(self, key: str, window: float, now: float) -> float:
+        """
+        Usage over the last `window` seconds: this fixed window's count plus
+        the previous one's, weighted by how much of it the sliding window still covers.
+        """
+        with self.locked():
+            start, current, previous = self._window(key, window, now)
+        return current + previous * (1 - (now - start) / window)
+
+    def record(self, key: str, window: float, amount: float, now: float) -> None:
+        with self.locked():
+            start, current, previous = self._window(key, window, now)
+            self.put(key, (start, max(0.0, current + amount), previous))
+
+
+class MemoryBucketStore(BucketStore):
+    """
+    State in a dict, for one worker, under the thread lock alone. Keeps at
+    most `max_keys` keys, dropping the least recently used.
+    """
+    def __init__(self, max_keys: int = 100_000):
+        super().__init__()
+        self.max_keys = max_keys
+        self._states: "OrderedDict[str, State]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[State]:
+        return self._states.get(key)
+
+    def put(self, key: str, state: State) -> None:
+        self._states[key] = state
+        self._states.move_to_end(key)
+        if len(self._states) > self.max_keys:
+            self._states.popitem(last=False)
+
+
+_SLOT = np.dtype([("key", "<u8"), ("a", "<f8"), ("b", "<f8"), ("c", "<f8"), ("touched", "<f8")])
+_PROBES = 8
+
+
+class SharedBucketStore(BucketStore):
+    """
+    State in a memory-mapped hash table (`path`, on tmpfs), shared by the
+    workers on one host under an flock: an update is a few memory
+    accesses and two system calls, with no network hop. The threads of one
+    worker share its open file, which an flock does not tell apart, so they
+    take the thread lock first.
+
+    Keys are 64-bit BLAKE2b hashes, placed by linear probing over
+    `_PROBES` slots. When those are all taken, the least recently touched
+    one is reused, so a full table forgets idle clients first.
+    """
+    def __init__(self, path: str, slots: int):
+        super().__init__()
+        self.path = path
+        self.slots = slots
+        self._pid: Optional[int] = None
+        self._fd: Optional[int] = None
+        self._table: Optional[np.ndarray] = None
+
+    def _open(self) -> None:
+        size = self.slots * _SLOT.itemsize
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(fd).st_size != size:
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, size)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        self._fd, self._pid = fd, os.getpid()
+        self._table = np.memmap(self.path, dtype=_SLOT, mode="r+", shape=(self.slots,))
+
+    @contextmanager
+    def locked(self):
+        with self._thread_lock:
+            if self._pid != os.getpid():
+                self._open()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        # 0 marks an empty slot.
+        return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little") or 1
+
+    def _find(self, key_hash: int) -> Tuple[int, bool]:
+        first = key_hash % self.slots
+        oldest = first
+        for probe in range(_PROBES):
+            index = (first + probe) % self.slots
+            slot_key = int(self._table[index]["key"])
+            if slot_key == key_hash:
+                return index, True
+            if slot_key == 0:
+                return index, False
+            if self._table[index]["touched"] < self._table[oldest]["touched"]:
+                oldest = index
+        return oldest, False
+
+    def get(self, key: str) -> Optional[State]:
+        index, found = self._find(self._hash(key))
+        if not found:
+            return None
+        slot = self._table[index]
+        return float(slot["a"]), float(slot["b"]), float(slot["c"])
+
+    def put(self, key: str, state: State) -> None:
+        key_hash = self._hash(key)
+        index, _ = self._find(key_hash)
+        self._table[index] = (key_hash, *state, time.time())
+
+
+@dataclass
+class RateLimitTicket:
+    """What an admitted gateway request was charged, to settle once its LLM usage is known."""
+    token_buckets: List[Bucket] = field(default_factory=list)
+    quota_key: Optional[str] = None
+    estimated_tokens: int = 0
+    headers: Dict[str, str] = field(default_factory=dict)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a gateway request is over one of its callers' limits."""
+    def __init__(self, detail: str, retry_after: float, headers: Dict[str, str]):
+        super().__init__(detail)
+        self.detail = detail
+        self.retry_after = retry_after
+        self.headers = {**headers, "Retry-After": str(max(1, math.ceil(retry_after)))}
+
+
+# (requests per minute, LLM tokens per minute) by caller kind; 0 disables a limit.
+def _default_limits() -> Dict[str, Tuple[int, int]]:
+    return {
+        "api_key": (settings.RATE_LIMIT_API_KEY_REQUESTS_PER_MINUTE, settings.RATE_LIMIT_API_KEY_LLM_TOKENS_PER_MINUTE),
+        "user": (settings.RATE_LIMIT_USER_REQUESTS_PER_MINUTE, settings.RATE_LIMIT_USER_LLM_TOKENS_PER_MINUTE),
+        "ip": (settings.RATE_LIMIT_IP_REQUESTS_PER_MINUTE, settings.RATE_LIMIT_IP_LLM_TOKENS_PER_MINUTE),
+    }
+
+
+QUOTA_WINDOW_SECONDS = 86400
+
+
+class RateLimiter:
+    """
+    Token-bucket rate limits for the gateway, per API key, user and client
+    IP, on both request count and LLM tokens, plus a sliding 24-hour LLM
+    token quota per tenant (the API key's or token's user, else the IP).
+
+    A request's LLM tokens are not known until the model answers, so it is
+    charged an estimate up front, and `settle` corrects the buckets and the
+    quota with the usage the model reports. All state is in `store`: in this
+    process by default, or in a shared memory-mapped table for every worker
+    on the host.
+    """
+    def __init__(
+        self,
+        store: BucketStore,
+        limits: Optional[Dict[str, Tuple[int, int]]] = None,
+        daily_llm_tokens: int = settings.RATE_LIMIT_LLM_TOKENS_PER_DAY,
+        estimated_completion_tokens: int = settings.RATE_LIMIT_ESTIMATED_COMPLETION_TOKENS,
+    ):
+        self.store = store
+        self.limits = limits or _default_limits()
+        self.daily_llm_tokens = daily_llm_tokens
+        self.estimated_completion_tokens = estimated_completion_tokens
+
+    @staticmethod
+    def per_minute(key: str, limit: float, cost: float = 1.0) -> Bucket:
+        """A bucket holding a minute's worth of `limit`, refilled continuously."""
+        return Bucket(key=key, capacity=limit, rate=limit / 60, cost=cost)
+
+    def estimate_llm_tokens(self, prompt: str) -> int:
+        # About four characters per token, plus a typical completion.
+        return math.ceil(len(prompt) / 4) + self.estimated_completion_tokens
+
+    @staticmethod
+    def _headers(bucket: Bucket, remaining: float) -> Dict[str, str]:
+        return {
+            "RateLimit-Limit": str(int(bucket.capacity)),
+            "RateLimit-Remaining": str(max(0, math.floor(remaining))),
+            "RateLimit-Reset": str(math.ceil(max(0.0, bucket.capacity - remaining) / bucket.rate)),
+        }
+
+    def check_requests(self, key: str, requests_per_minute: int) -> Dict[str, str]:
+        """
+        Counts one request against a single per-minute limit, e.g. an API
+        key's own. Returns the rate-limit headers, or raises RateLimitExceeded.
+        """
+        bucket = self.per_minute(key, requests_per_minute)
+        allowed, (remaining,), retry_after = self.store.take([bucket], time.time())
+        headers = self._headers(bucket, remaining)
+        if not allowed:
+            raise RateLimitExceeded("Rate limit exceeded", retry_after, headers)
+        return headers
+
+    def admit(self, callers: Sequence[Tuple[str, str]], prompt: str) -> RateLimitTicket:
+        """
+        Admits a gateway request from `callers`, e.g. [("user", "7"), ("ip", "10.0.0.1")],
+        charging each one request and the estimated LLM tokens of `prompt`.
+        API keys only get LLM token buckets here: their requests are already
+        counted, against their own limit, when the key is checked. The
+        tenant whose daily quota is charged is the user, if any, else the IP.
+        Raises RateLimitExceeded if any limit would be exceeded.
+        """
+        now = time.time()
+        estimate = self.estimate_llm_tokens(prompt)
+        request_buckets, token_buckets = [], []
+        for kind, identity in callers:
+            requests, tokens = self.limits.get(kind, (0, 0))
+            if requests and kind != "api_key":
+                request_buckets.append(self.per_minute(f"req:{kind}:{identity}", requests))
+            if tokens:
+                token_buckets.append(self.per_minute(f"llm:{kind}:{identity}", tokens, cost=estimate))
+
+        ticket = RateLimitTicket(token_buckets=token_buckets, estimated_tokens=estimate)
+        tenant = next((caller for caller in callers if caller[0] == "user"), None) or next(
+            (caller for caller in callers if caller[0] == "ip"), None
+        )
+        if self.daily_llm_tokens and tenant:
+            ticket.quota_key = f"quota:{tenant[0]}:{tenant[1]}"
+            used = self.store.usage(ticket.quota_key, QUOTA_WINDOW_SECONDS, now)
+            if used + estimate > self.daily_llm_tokens:
+                # The sliding window frees usage gradually; an hour is a fair hint.
+                raise RateLimitExceeded("Daily LLM token quota exceeded", 3600, {})
+
+        buckets = request_buckets + token_buckets
+        allowed, remaining, retry_after = self.store.take(buckets, now)
+        if request_buckets:
+            # Report the request limit closest to running out.
+            index = min(range(len(request_buckets)), key=lambda i: remaining[i])
+            ticket.headers = self._headers(request_buckets[index], remaining[index])
+        if not allowed:
+            raise RateLimitExceeded("Rate limit exceeded", retry_after, ticket.headers)
+        if ticket.quota_key:
+            self.store.record(ticket.quota_key, QUOTA_WINDOW_SECONDS, estimate, now)
+        return ticket
+
+    def settle(self, ticket: RateLimitTicket, llm_tokens: Optional[int]) -> None:
+        """
+        Replaces a request's estimated LLM tokens with what it used (0 for
+        one answered from cache). With None, e.g. a model that reports no
+        usage, the estimate stands.
+        """
+        if llm_tokens is None:
+            return
+        delta = llm_tokens - ticket.estimated_tokens
+        if not delta:
+            return
+        now = time.time()
+        for bucket in ticket.token_buckets:
+            self.store.adjust(bucket, delta, now)
+        if ticket.quota_key:
+            self.store.record(ticket.quota_key, QUOTA_WINDOW_SECONDS, delta, now)
+        ticket.estimated_tokens = llm_tokens
+
+
+def _default_store() -> BucketStore:
+    if settings.RATE_LIMIT_BACKEND == "shared":
+        if fcntl is not None and os.path.isdir(os.path.dirname(settings.RATE_LIMIT_SHARED_FILE) or "."):
+            return SharedBucketStore(settings.RATE_LIMIT_SHARED_FILE, settings.RATE_LIMIT_SHARED_SLOTS)
+        print(f"RateLimiter: Cannot share {settings.RATE_LIMIT_SHARED_FILE}; keeping rate limits per process.")
+    return MemoryBucketStore()
+
+
+rate_limiter = RateLimiter(_default_store())
@@ -0,0 +1,210 @@
+import asyncio
+import hashlib
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.crud import crud_threat
+from app.db.session import SessionLocal
+from app.services.matrix_cache_manager import MatrixCacheManager
+
+
+@dataclass(frozen=True)
+class ThreatMatch:
+    """A prompt that matched a frozen attack."""
+    threat_id: int
+    attack_type: str
+    similarity: float
+
+
+class ThreatManager:
+    """
+    The Dynamic Threat Freezing service.
+
+    Embeddings of prompts the security critic marked MALICIOUS are persisted
+    to the `frozen_threats` table and held in an in-process vector index, so
+    near-identical follow-up prompts are blocked at index-lookup latency
+    instead of paying for another LLM call.
+
+    A background task started with the app rebuilds the index from the
+    database every `sync_interval_seconds`, off the request path, which
+    picks up threats frozen by other workers, admin unfreezes, and expiry of
+    entries not seen for `ttl_days`. Matches are counted in memory and
+    written by the same task just before each rebuild, refreshing each
+    matched entry's last_seen, so active campaigns stay frozen.
+    """
+    def __init__(
+        self,
+        similarity_threshold: float = settings.THREAT_SIMILARITY_THRESHOLD,
+        ttl_days: int = settings.THREAT_TTL_DAYS,
+        sync_interval_seconds: float = settings.THREAT_SYNC_INTERVAL_SECONDS,
+        capacity: int = settings.THREAT_INDEX_CAPACITY,
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.ttl = timedelta(days=ttl_days)
+        self.sync_interval = sync_interval_seconds
+        self.capacity = capacity
+
+        self._index = MatrixCacheManager(capacity=capacity, eviction_policy="lfu")
+        self._attack_types: Dict[int, str] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._pending_hits: Counter = Counter()  # threat id -> matches not yet written
+
+    # --- Index synchronisation ---
+
+    def _reload(self) -> None:
+        """Rebuilds the index from all active, unexpired threats in the database."""
+        db = SessionLocal()
+        try:
+            cutoff = datetime.now(timezone.utc) - self.ttl
+            threats = crud_threat.get_active_threats(db, seen_after=cutoff)
+        finally:
+            db.close()
+
+        index = MatrixCacheManager(capacity=self.capacity, eviction_policy="lfu")
+        if threats:
+            index.add_batch(
+                [str(threat.id) for threat in threats],
+                np.stack([np.frombuffer(threat.embedding, dtype=np.float32) for threat in threats]),
+            )
+        # Swap both references at once; in-flight lookups keep using the old index.
+        self._index, self._attack_types = index, {threat.id: threat.attack_type for threat in threats}
+
+    async def sync(self) -> None:
+        """Rebuilds the index from the database, in a worker thread."""
+        try:
+            await asyncio.to_thread(self._reload)
+        except Exception as e:
+            print(f"ThreatManager: Failed to sync the threat index: {e}")
+
+    def _write_hits(self, hits: Dict[int, int]) -> None:
+        db = SessionLocal()
+        try:
+            crud_threat.record_hits(db, hits=hits)
+        finally:
+            db.close()
+
+    async def flush_hits(self) -> None:
+        """Writes the hit counts buffered since the last flush, in a worker thread."""
+        hits, self._pending_hits = self._pending_hits, Counter()
+        if not hits:
+            return
+        try:
+            await asyncio.to_thread(self._write_hits, dict(hits))
+        except Exception as e:
+            print(f"ThreatManager: Failed to record {sum(hits.values())} hits on {len(hits)} threats: {e}")
+
+    async def _run(self) -> None:
+        while True:
+            await self.flush_hits()
+            await self.sync()
+            await asyncio.sleep(self.sync_interval)
+
+    def start(self) -> None:
+        """Loads the index now and keeps it in sync in the background."""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush_hits()
+
+    # --- Public API ---
+
+    async def check_threat(self, embedding: List[float]) -> Optional[ThreatMatch]:
+        """
+        Returns the closest frozen threat if it is within the similarity threshold.
+        The search runs in a worker thread, like the semantic cache's.
+        """
+        index, attack_types = self._index, self._attack_types
+        try:
+            matches = (await asyncio.to_thread(index.search, [embedding], 1))[0]
+        except ValueError as e:  # E.g. an embedding of another dimension than the index.
+            print(f"ThreatManager: Failed to search the threat index: {e}")
+            return None
+        if not matches or matches[0][1] < self.similarity_threshold:
+            return None
+
+        entry_id, similarity = matches[0]
+        threat_id = int(entry_id)
+        self._pending_hits[threat_id] += 1
+        print(f"ThreatManager: Prompt matched frozen threat {threat_id} with score {similarity:.4f}")
+        return ThreatMatch(
+            threat_id=threat_id,
+            attack_type=attack_types.get(threat_id, "unknown"),
+            similarity=similarity,
+        )
+
+    async def add_to_threat_db(
+        self,
+        embedding: List[float],
+        attack_type: str = "unknown",
+        reasoning: Optional[str] = None,
+        prompt: Optional[str] = None,
+    ):
+        """
+        Freezes a malicious prompt: persists its embedding and adds it to the local index.
+        """
+        vector = np.asarray(embedding, dtype=np.float32)
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8") if prompt is not None else vector.tobytes()).hexdigest()
+
+        def persist():
+            db = SessionLocal()
+            try:
+                threat = crud_threat.create_threat(
+                    db,
+                    prompt_hash=prompt_hash,
+                    embedding=vector.tobytes(),
+                    attack_type=attack_type,
+                    reasoning=reasoning,
+                )
+                return threat.id
+            finally:
+                db.close()
+
+        try:
+            threat_id = await asyncio.to_thread(persist)
+        except Exception as e:
+            print(f"ThreatManager: Failed to freeze threat: {e}")
+            return None
+
+        try:
+            self._index.add(str(threat_id), vector)
+        except ValueError as e:  # E.g. an embedding of another dimension than the index.
+            print(f"ThreatManager: Froze threat {threat_id} but could not index it: {e}")
+            return threat_id
+        self._attack_types[threat_id] = attack_type
+        print(f"ThreatManager: Froze threat {threat_id} ({attack_type}).")
+        return threat_id
+
+    async def unfreeze(self, threat_id: int, user_id: Optional[int] = None) -> bool:
+        """
+        Deactivates a frozen threat, on behalf of `user_id`, and removes it
+        from the local index. Other workers drop it on their next sync.
+        """
+        def deactivate():
+            db = SessionLocal()
+            try:
+                return crud_threat.unfreeze_threat(db, threat_id=threat_id, user_id=user_id) is not None
+            finally:
+                db.close()
+
+        found = await asyncio.to_thread(deactivate)
+        if found:
+            print(f"ThreatManager: Threat {threat_id} unfrozen by user {user_id}.")
+        self._index.remove(str(threat_id))
+        self._attack_types.pop(threat_id, None)
+        return found
+
+
+threat_manager = ThreatManager()
@@ -0,0 +1,165 @@
+import asyncio
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.sketches import SourceSketch
+from app.crud import crud_sketch
+from app.crud.crud_analytics import bucket_start
+from app.db.session import SessionLocal
+
+SOURCE_FIELDS = ("source_ip", "user_id")
+PRUNE_INTERVAL_SECONDS = 3600
+
+
+# The attack vectors the security critic classifies (see ai_critics), by a
+# keyword of their slug. Attack types are free text from an LLM, so anything
+# else counts as "other": one sketch key per type, however it is phrased.
+ATTACK_TYPE_KEYWORDS = {
+    "hijack": "instruction_hijacking",
+    "leak": "prompt_leaking",
+    "role": "malicious_role_playing",
+    "code": "code_injection",
+}
+
+
+def attack_type_key(value: str | None) -> str:
+    """Maps an attack type to one of ATTACK_TYPE_KEYWORDS' values, "unknown" or "other"."""
+    slug = re.sub(r"[^a-z0-9]+", "_", (value or "").lower()).strip("_")
+    if not slug or slug in ("unknown", "none"):
+        return "unknown"
+    return next((key for keyword, key in ATTACK_TYPE_KEYWORDS.items() if keyword in slug), "other")
+
+
+def threat_types(verdict: str, response_data: Dict[str, Any] | None) -> List[str]:
+    """
+    The threat types a log counts towards. Every request counts as "all";
+    blocks also count as "blocked" and "attack:<attack type>", from a fixed set.
+    """
+    data = response_data or {}
+    types = ["all"]
+    if verdict == "BLOCKED":
+        types += ["blocked", f"attack:{attack_type_key(str(data.get('attack_type') or ''))}"]
+    outbound = data.get("outbound_check")
+    if isinstance(outbound, dict) and outbound.get("verdict") == "FAIL":
+        types.append("policy_violation")
+    hallucination = data.get("hallucination_check")
+    if isinstance(hallucination, dict) and hallucination.get("verdict") == "POSSIBLE_HALLUCINATION":
+        types.append("possible_hallucination")
+    return types
+
+
+class ThreatSketchTracker:
+    """
+    Streaming heavy-hitter and distinct-count analytics over the sources of
+    each threat type, without GROUP BY scans over `logs`.
+
+    Every appended log is added, in memory, to one SourceSketch per (hour,
+    threat type, source field): a Count-Min Sketch with a top-k list and a
+    HyperLogLog, all of fixed size. Every `flush_interval` seconds the
+    in-memory sketches are merged into `threat_sketches` and reset, so memory stays
+    bounded and every worker's counts end up in the same rows. Queries merge
+    the stored hours of a window plus this worker's unflushed sketches, so other
+    workers' most recent requests show up within one flush interval.
+    """
+    def __init__(
+        self,
+        flush_interval_seconds: float = settings.THREAT_SKETCH_FLUSH_INTERVAL_SECONDS,
+        retention_days: int = settings.THREAT_SKETCH_RETENTION_DAYS,
+    ):
+        self.flush_interval = flush_interval_seconds
+        self.retention_days = retention_days
+        self._pending: Dict[crud_sketch.SketchKey, SourceSketch] = {}
+        self._last_prune = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def new_sketch() -> SourceSketch:
+        return SourceSketch(
+            width=settings.THREAT_SKETCH_WIDTH,
+            depth=settings.THREAT_SKETCH_DEPTH,
+            k=settings.THREAT_SKETCH_TOP_K,
+            precision=settings.THREAT_SKETCH_HLL_PRECISION,
+        )
+
+    def record_log(self, request_data: Dict[str, Any], verdict: str, response_data: Dict[str, Any] | None) -> None:
+        """Adds one appended log's client IP and user ID to its threat types' sketches."""
+        sources = [(field, request_data.get(field)) for field in SOURCE_FIELDS]
+        sources = [(field, str(value)) for field, value in sources if value]
+        if not sources:
+            return
+        window = bucket_start(datetime.now(timezone.utc), "hour")
+        for threat_type in threat_types(verdict, response_data):
+            for field, value in sources:
+                key = (window, threat_type, field)
+                sketch = self._pending.get(key)
+                if sketch is None:
+                    sketch = self._pending[key] = self.new_sketch()
+                sketch.add(value)
+
+    # --- Persistence ---
+
+    def _persist(self, pending: Dict[crud_sketch.SketchKey, SourceSketch]) -> None:
+        db = SessionLocal()
+        try:
+            if pending:
+                crud_sketch.merge_sketches(db, pending)
+            if self.retention_days > 0 and time.monotonic() - self._last_prune > PRUNE_INTERVAL_SECONDS:
+                crud_sketch.delete_sketches_before(db, datetime.now(timezone.utc) - timedelta(days=self.retention_days))
+                self._last_prune = time.monotonic()
+        finally:
+            db.close()
+
+    async def flush(self) -> None:
+        """Merges the in-memory sketches into the database and starts new ones."""
+        pending, self._pending = self._pending, {}
+        try:
+            await asyncio.to_thread(self._persist, pending)
+        except Exception as e:
+            print(f"ThreatSketchTracker: Failed to persist {len(pending)} sketches: {e}")
+            # Keep the counts for the next flush, merged with anything recorded since.
+            for key, sketch in pending.items():
+                newer = self._pending.get(key)
+                if newer is not None:
+                    sketch.merge(newer)
+                self._pending[key] = sketch
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    # --- Queries ---
+
+    async def query(self, db, *, start: datetime, end: datetime, threat_type: str, field: str) -> SourceSketch:
+        """
+        The merged sketch of `field` among `threat_type` requests in the hours
+        overlapping [start, end). The cost depends on the number of hours, not
+        on the number of requests.
+        """
+        start = bucket_start(start, "hour")
+        merged = await crud_sketch.load_sketch(db, start=start, end=end, threat_type=threat_type, field=field)
+        merged = merged or self.new_sketch()
+        for (window, pending_type, pending_field), sketch in list(self._pending.items()):
+            if pending_type == threat_type and pending_field == field and start <= window < end:
+                merged.merge(sketch)
+        return merged
+
+
+threat_sketch_tracker = ThreatSketchTracker()
@@ -1,9 +1,7 @@
 from app.services.external.serper_client import serper_client 
-from langchain_core.tools import tool
 from typing import List
 import asyncio
 
-@tool
 async def web_search(query: str) -> List[str]:
     """
     Performs a web search using the Serper API and returns a list of clean
@@ -38,3 +36,12 @@ async def web_search(query: str) -> List[str]:
         print(f"An error occurred while processing search results: {e}")
         return []
 
+
+def get_web_search_tool():
+    """
+    `web_search` as a LangChain tool, for agents. Built on demand: importing
+    langchain_core.tools pulls in LangSmith, which is slow to import, and the
+    gateway awaits `web_search` directly.
+    """
+    from langchain_core.tools import tool
+    return tool(web_search)
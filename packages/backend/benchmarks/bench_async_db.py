@@ -0,0 +1,155 @@
+# PURPOSE:
+# Compares the gateway's database read path (a cached-log lookup: fetch the
+# row, then rehydrate its payload blobs) over two session types, under a burst
+# of concurrent requests:
+#   - sync: SessionLocal in a pool of 40 threads, the size of FastAPI's
+#     threadpool for sync dependencies,
+#   - async: AsyncSessionLocal (asyncpg) on the event loop.
+# For each it reports throughput, the peak number of lookups in flight at the
+# database, and the worst event-loop stall.
+#
+# The assertions live in tests/test_async_db.py; this reports the numbers.
+#
+# On PostgreSQL, --db-latency-ms adds a pg_sleep per lookup to stand in for a
+# remote database; that is where the thread pool caps concurrency.
+#   poetry run python -m benchmarks.bench_async_db --seed 1000
+#   poetry run python -m benchmarks.bench_async_db --concurrency 500 --db-latency-ms 5
+#
+# WARNING: --seed appends real rows to the log chain in DATABASE_URL.
+
+import argparse
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from sqlalchemy import func, text
+
+# Also runnable as a plain script: make 'from app...' resolve to this backend.
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.crud import crud_log
+from app.db.session import AsyncSessionLocal, SessionLocal, engine
+from app.models import log as log_models
+from app.schemas import log as log_schemas
+
+FASTAPI_THREADPOOL_SIZE = 40
+
+
+class InFlight:
+    def __init__(self):
+        self.current = self.peak = 0
+
+    def __enter__(self):
+        self.current += 1
+        self.peak = max(self.peak, self.current)
+
+    def __exit__(self, *exc):
+        self.current -= 1
+
+
+def seed(count: int) -> None:
+    db = SessionLocal()
+    try:
+        crud_log.create_logs(db, logs_in=[
+            log_schemas.LogCreate(
+                request_data={"prompt": f"benchmark prompt {i}", "policy": "Default policy: Be helpful and harmless."},
+                response_data={"llm_response": f"benchmark response {i} " * 40, "inbound_check": {"verdict": "SAFE"}},
+                verdict="ALLOWED",
+            )
+            for i in range(count)
+        ])
+    finally:
+        db.close()
+
+
+async def max_loop_stall(stop: asyncio.Event) -> float:
+    """Ticks every millisecond and returns the worst lateness seen, in milliseconds."""
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.001)
+        worst = max(worst, (time.perf_counter() - started - 0.001) * 1000)
+    return worst
+
+
+def sleep_sql(latency_ms: float):
+    if latency_ms <= 0 or engine.dialect.name != "postgresql":
+        return None
+    return text(f"SELECT pg_sleep({latency_ms / 1000})")
+
+
+async def burst(lookup, log_ids) -> tuple:
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(max_loop_stall(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(lookup(log_id) for log_id in log_ids))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    return len(log_ids) / elapsed, await ticker
+
+
+async def run(args) -> None:
+    db = SessionLocal()
+    try:
+        max_id = db.query(func.max(log_models.Log.id)).scalar()
+    finally:
+        db.close()
+    if not max_id:
+        raise SystemExit("The logs table is empty; run with --seed first.")
+    log_ids = [1 + (i * 7919) % max_id for i in range(args.concurrency)]
+    delay = sleep_sql(args.db_latency_ms)
+
+    # --- Sync sessions on a thread pool ---
+    in_flight = InFlight()
+    pool = ThreadPoolExecutor(max_workers=FASTAPI_THREADPOOL_SIZE)
+
+    def sync_lookup_blocking(log_id: int):
+        with in_flight:
+            db = SessionLocal()
+            try:
+                if delay is not None:
+                    db.execute(delay)
+                log = crud_log.get_log(db, log_id)
+                return log and crud_log.get_log_payloads(db, log)
+            finally:
+                db.close()
+
+    async def sync_lookup(log_id: int):
+        return await asyncio.get_running_loop().run_in_executor(pool, sync_lookup_blocking, log_id)
+
+    rate, stall = await burst(sync_lookup, log_ids)
+    pool.shutdown()
+    print(f"sync  ({FASTAPI_THREADPOOL_SIZE} threads): {rate:>8.0f} lookups/s, peak {in_flight.peak:>4} in flight, worst loop stall {stall:.1f} ms")
+
+    # --- Async sessions on the event loop ---
+    if AsyncSessionLocal is None:
+        raise SystemExit("No async driver installed for DATABASE_URL.")
+    in_flight = InFlight()
+
+    async def async_lookup(log_id: int):
+        with in_flight:
+            async with AsyncSessionLocal() as db:
+                if delay is not None:
+                    await db.execute(delay)
+                log = await crud_log.get_log_async(db, log_id)
+                return log and await crud_log.get_log_payloads_async(db, log)
+
+    rate, stall = await burst(async_lookup, log_ids)
+    print(f"async (event loop):  {rate:>8.0f} lookups/s, peak {in_flight.peak:>4} in flight, worst loop stall {stall:.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Sync vs async session throughput for the gateway's log lookups.")
+    parser.add_argument("--concurrency", type=int, default=300)
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="pg_sleep per lookup (PostgreSQL only).")
+    parser.add_argument("--seed", type=int, default=0, help="Append this many logs first (scratch databases only).")
+    args = parser.parse_args()
+    if args.seed:
+        seed(args.seed)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# PURPOSE:
+# Measures chained log write throughput: one crud_log.create_log per entry
+# versus the group-committing LogSequencer under concurrent appends, then
+# checks that every entry written links to the previous one.
+#
+# WARNING: this appends real rows to the log chain in DATABASE_URL. Point it at
+# a scratch database, e.g. a migrated local Postgres or a throwaway SQLite file:
+#   DATABASE_URL=sqlite:////tmp/bench_logs.db poetry run python -m benchmarks.bench_log_sequencer --create-tables
+#   poetry run python -m benchmarks.bench_log_sequencer --entries 20000 --concurrency 500
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Also runnable as a plain script: make 'from app...' resolve to this backend.
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.core.security import calculate_log_hash
+from app.crud import crud_log
+from app.db.base_class import Base
+from app.db.session import SessionLocal, engine
+from app.models import log as log_models
+from app.schemas import log as log_schemas
+from app.services.log_sequencer import LogSequencer
+
+
+def make_entry(i: int) -> log_schemas.LogCreate:
+    return log_schemas.LogCreate(
+        request_data={"prompt": f"benchmark prompt {i}", "policy": "Default policy: Be helpful and harmless."},
+        response_data={"llm_response": f"benchmark response {i}", "inbound_check": {"verdict": "SAFE"}},
+        verdict="ALLOWED",
+    )
+
+
+def bench_sequential(count: int) -> float:
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        for i in range(count):
+            crud_log.create_log(db, log_in=make_entry(i))
+        return count / (time.perf_counter() - started)
+    finally:
+        db.close()
+
+
+async def bench_sequencer(count: int, concurrency: int, batch_size: int) -> float:
+    sequencer = LogSequencer(max_batch_size=batch_size)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def append(i: int):
+        async with semaphore:
+            await sequencer.append(make_entry(i))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(append(i) for i in range(count)))
+    rate = count / (time.perf_counter() - started)
+    await sequencer.close()
+    return rate
+
+
+def verify_tail(count: int) -> None:
+    db = SessionLocal()
+    try:
+        logs = db.query(log_models.Log).order_by(log_models.Log.id.desc()).limit(count + 1).all()[::-1]
+    finally:
+        db.close()
+    for previous, current in zip(logs, logs[1:]):
+        data = {"request_data": current.request_data, "response_data": current.response_data, "verdict": current.verdict}
+        assert current.previous_log_hash == previous.log_hash, f"Chain link broken at log ID {current.id}"
+        assert calculate_log_hash(data, current.previous_log_hash) == current.log_hash, f"Hash mismatch at log ID {current.id}"
+    print(f"verified: last {len(logs) - 1} links are intact")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Chained log write throughput benchmark.")
+    parser.add_argument("--entries", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--create-tables", action="store_true", help="Create missing tables first (scratch databases only).")
+    args = parser.parse_args()
+
+    if args.create_tables:
+        Base.metadata.create_all(engine, tables=[log_models.Log.__table__])
+
+    sequential = bench_sequential(min(args.entries, 1000))
+    print(f"create_log, one at a time: {sequential:>9.0f} logs/s")
+    grouped = asyncio.run(bench_sequencer(args.entries, args.concurrency, args.batch_size))
+    print(f"LogSequencer, {args.concurrency} concurrent: {grouped:>9.0f} logs/s")
+    verify_tail(args.entries + min(args.entries, 1000) - 1)
+
+
+if __name__ == "__main__":
+    main()
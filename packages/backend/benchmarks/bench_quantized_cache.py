@@ -0,0 +1,109 @@
+# PURPOSE:
+# Compares the compressed storage codecs of QuantizedCacheManager against exact
+# float32 search: resident memory per entry, recall@1, agreement of cache hits
+# at the similarity threshold, and lookup latency.
+#
+# Queries are noisy copies of stored entries (a re-phrased prompt), drawn from
+# clustered data so that near neighbours compete as they do in real traffic.
+#
+# Run from packages/backend (the .env file must be present, as for the app):
+#   poetry run python -m benchmarks.bench_quantized_cache
+#   poetry run python -m benchmarks.bench_quantized_cache --size 1000000 --dim 768 --codecs int8 pq
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Also runnable as a plain script: make 'from app...' resolve to this backend.
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.services.matrix_cache_manager import MatrixCacheManager
+from app.services.quantized_cache_manager import CODECS, QuantizedCacheManager
+
+
+def clustered_vectors(size: int, dim: int, rng: np.random.Generator, clusters: int = 256) -> np.ndarray:
+    centres = rng.standard_normal((clusters, dim), dtype=np.float32)
+    vectors = centres[rng.integers(0, clusters, size)] + 0.5 * rng.standard_normal((size, dim), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def noisy_queries(vectors: np.ndarray, count: int, noise: float, rng: np.random.Generator) -> np.ndarray:
+    picked = vectors[rng.integers(0, len(vectors), count)]
+    queries = picked + noise * rng.standard_normal(picked.shape, dtype=np.float32) / np.sqrt(vectors.shape[1])
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def fill(cache, vectors: np.ndarray) -> float:
+    started = time.perf_counter()
+    chunk = 50_000
+    for start in range(0, len(vectors), chunk):
+        stop = min(start + chunk, len(vectors))
+        cache.add_batch([str(i) for i in range(start, stop)], vectors[start:stop])
+    return time.perf_counter() - started
+
+
+def lookup(cache, queries: np.ndarray, threshold: float, batch_size: int):
+    """Returns (results, mean latency per query in ms)."""
+    results = []
+    started = time.perf_counter()
+    for start in range(0, len(queries), batch_size):
+        results.extend(cache.lookup_batch(queries[start:start + batch_size], similarity_threshold=threshold))
+    return results, (time.perf_counter() - started) * 1000 / len(queries)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Quantised semantic cache memory and recall benchmark.")
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--noise", type=float, default=0.3, help="Query perturbation; 0.3 gives ~0.96 similarity.")
+    parser.add_argument("--threshold", type=float, default=0.95)
+    parser.add_argument("--codecs", nargs="+", default=list(CODECS), choices=list(CODECS))
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    vectors = clustered_vectors(args.size, args.dim, rng)
+    queries = noisy_queries(vectors, args.queries, args.noise, rng)
+
+    exact = MatrixCacheManager(capacity=args.size, initial_rows=args.size)
+    fill(exact, vectors)
+    exact_best, _ = lookup(exact, queries, -1.0, args.batch_size)
+    exact_hits, exact_ms = lookup(exact, queries, args.threshold, args.batch_size)
+    exact_bytes = args.dim * 4 + 8 + 4 + 4  # float32 row plus last-used, hit-count and namespace columns
+    del exact
+
+    print(f"{args.size} entries, {args.dim} dims, {args.queries} queries, threshold {args.threshold}")
+    print(f"{'storage':>16} {'vec B/ent':>9} {'ratio':>6} {'recall@1':>9} {'hit agree':>10} {'ms/q':>8} {'build (s)':>10}")
+    print(f"{'float32':>16} {exact_bytes:>9} {1.0:>6.1f} {1.0:>9.3f} {1.0:>10.3f} {exact_ms:>8.3f} {'-':>10}")
+
+    with tempfile.TemporaryDirectory() as rerank_dir:
+        for codec in args.codecs:
+            for rerank in (False, True):
+                cache = QuantizedCacheManager(
+                    codec=codec,
+                    capacity=args.size,
+                    rerank_dir=rerank_dir if rerank else None,
+                    initial_rows=args.size,
+                    allow_approximate_scores=True,
+                )
+                build_seconds = fill(cache, vectors)
+                best, _ = lookup(cache, queries, -1.0, args.batch_size)
+                hits, ms = lookup(cache, queries, args.threshold, args.batch_size)
+
+                recall = np.mean([a == b for a, b in zip(best, exact_best)])
+                agreement = np.mean([a == b for a, b in zip(hits, exact_hits)])
+                label = f"{codec}+rerank" if rerank else codec
+                print(
+                    f"{label:>16} {cache.vector_bytes_per_entry:>9.0f} {exact_bytes / cache.vector_bytes_per_entry:>6.1f} "
+                    f"{recall:>9.3f} {agreement:>10.3f} {ms:>8.3f} {build_seconds:>10.2f}"
+                )
+                del cache
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# PURPOSE:
+# Measures lookup latency of the in-process MatrixCacheManager at different
+# cache sizes, for single-prompt and batched lookups.
+#
+# Run from packages/backend (the .env file must be present, as for the app):
+#   poetry run python -m benchmarks.bench_semantic_cache
+#   poetry run python -m benchmarks.bench_semantic_cache --sizes 10000 100000 --dim 384
+#
+# Note: 1M entries at 768 dimensions needs ~3 GB of RAM for the float32 matrix.
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Also runnable as a plain script: make 'from app...' resolve to this backend.
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from app.services.matrix_cache_manager import MatrixCacheManager
+
+
+def build_cache(size: int, dim: int, rng: np.random.Generator) -> MatrixCacheManager:
+    cache = MatrixCacheManager(capacity=size, initial_rows=size)
+    chunk = 50_000
+    for start in range(0, size, chunk):
+        stop = min(start + chunk, size)
+        vectors = rng.standard_normal((stop - start, dim), dtype=np.float32)
+        cache.add_batch([f"entry-{i}" for i in range(start, stop)], vectors)
+    return cache
+
+
+def time_lookups(cache: MatrixCacheManager, queries: np.ndarray, batch_size: int) -> float:
+    """Returns the mean latency per query in milliseconds."""
+    started = time.perf_counter()
+    for start in range(0, len(queries), batch_size):
+        cache.lookup_batch(queries[start:start + batch_size], similarity_threshold=0.9)
+    return (time.perf_counter() - started) * 1000 / len(queries)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Semantic cache lookup benchmark.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    print(f"{'entries':>10} {'build (s)':>10} {'single (ms/q)':>14} {'batched (ms/q)':>15}")
+    for size in args.sizes:
+        started = time.perf_counter()
+        cache = build_cache(size, args.dim, rng)
+        build_seconds = time.perf_counter() - started
+
+        queries = rng.standard_normal((args.queries, args.dim), dtype=np.float32)
+        time_lookups(cache, queries[:2], 1)  # warm-up
+        single = time_lookups(cache, queries, 1)
+        batched = time_lookups(cache, queries, args.batch_size)
+        print(f"{size:>10} {build_seconds:>10.2f} {single:>14.3f} {batched:>15.3f}")
+        del cache
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# PURPOSE:
+# Measures worker cold start in fresh interpreters, the way a new replica
+# boots: the time to import app.main, then the time for the FastAPI lifespan
+# to finish starting up (the worker is ready to serve). With --prewarm it also
+# waits for the background pre-warm (LangChain, the Gemini client, critic
+# chains and the embedder), which runs alongside the first requests.
+#
+# Which modules stay unloaded is asserted in tests/test_startup.py; this times it.
+# The medians are checked against a budget, and the script exits non-zero when
+# one is exceeded, so it can guard against import-time regressions in CI:
+#   poetry run python -m benchmarks.bench_startup
+#   poetry run python -m benchmarks.bench_startup --runs 10 --import-budget-ms 1500 --ready-budget-ms 500
+#
+# The lifespan connects to DATABASE_URL and starts the background services, so
+# point it at a migrated scratch database.
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+# The child imports app.main, so it runs in this backend whatever the caller's directory.
+BACKEND = Path(__file__).resolve().parents[1]
+
+CHILD = """
+import asyncio, json, time
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+
+async def boot():
+    async with app.main.app.router.lifespan_context(app.main.app):
+        ready = time.perf_counter()
+        warm = ready
+        if {prewarm}:
+            from app.services import ai_critics
+            from app.services.embedding_service import embedding_service
+            while not ai_critics._model_loaded or embedding_service._embedder is None:
+                await asyncio.sleep(0.01)
+            warm = time.perf_counter()
+    return ready, warm
+
+ready, warm = asyncio.run(boot())
+print(json.dumps({{"import": imported - started, "ready": ready - imported, "prewarm": warm - imported}}))
+"""
+
+
+def run_once(prewarm: bool) -> dict:
+    env = {**os.environ, "PYTHONWARNINGS": "ignore", "LLM_PREWARM": str(prewarm)}
+    result = subprocess.run([sys.executable, "-c", CHILD.format(prewarm=prewarm)], capture_output=True, text=True, env=env, cwd=BACKEND)
+    if result.returncode != 0:
+        raise SystemExit(f"Startup failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Worker cold-start benchmark with a regression budget.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--prewarm", action="store_true", help="Also time the background pre-warm.")
+    parser.add_argument("--import-budget-ms", type=float, default=2000.0)
+    parser.add_argument("--ready-budget-ms", type=float, default=1000.0)
+    args = parser.parse_args()
+
+    runs = [run_once(args.prewarm) for _ in range(args.runs)]
+    medians = {key: 1000 * statistics.median(run[key] for run in runs) for key in runs[0]}
+    print(f"import app.main:        {medians['import']:8.0f} ms (budget {args.import_budget_ms:.0f} ms)")
+    print(f"lifespan startup:       {medians['ready']:8.0f} ms (budget {args.ready_budget_ms:.0f} ms)")
+    if args.prewarm:
+        print(f"pre-warm done after:    {medians['prewarm']:8.0f} ms")
+
+    over = [
+        name for name, median, budget in (
+            ("import", medians["import"], args.import_budget_ms),
+            ("lifespan startup", medians["ready"], args.ready_budget_ms),
+        ) if median > budget
+    ]
+    if over:
+        raise SystemExit(f"Over budget: {', '.join(over)}")
+    print("Within budget.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# PURPOSE:
+# Reports what importing a module costs, per module, from `python -X importtime`
+# run in a fresh interpreter: the slowest imports by cumulative time (the module
+# and everything it pulled in first) and by self time, and the total per
+# top-level package. Use it to find what to defer when worker boot slows down.
+#   poetry run python -m benchmarks.profile_imports
+#   poetry run python -m benchmarks.profile_imports --module app.api.v1.gateway --top 40
+
+import argparse
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# The child imports from app, so it runs in this backend whatever the caller's directory.
+BACKEND = Path(__file__).resolve().parents[1]
+
+
+def import_times(module: str) -> List[Tuple[str, int, int, int]]:
+    """(module, depth, self us, cumulative us) for every module the import loaded, in load order."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env={**os.environ, "PYTHONWARNINGS": "ignore"}, cwd=BACKEND,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # The header line.
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-module import-time profile.")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+
+    rows = import_times(args.module)
+    total = next(cumulative for name, _, _, cumulative in rows if name == args.module)
+    print(f"import {args.module}: {total / 1000:.0f} ms, {len(rows)} modules\n")
+
+    print(f"Slowest by cumulative time (top {args.top}):")
+    for name, depth, _, cumulative in sorted(rows, key=lambda row: -row[3])[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {'  ' * depth}{name}")
+
+    print(f"\nSlowest by self time (top {args.top}):")
+    for name, _, self_us, _ in sorted(rows, key=lambda row: -row[2])[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {name}")
+
+    packages: Dict[str, int] = defaultdict(int)
+    for name, _, self_us, _ in rows:
+        packages[name.split(".")[0]] += self_us
+    print("\nSelf time by top-level package:")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {100 * self_us / total:5.1f}%  {package}")
+
+
+if __name__ == "__main__":
+    main()
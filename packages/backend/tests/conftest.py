@@ -0,0 +1,73 @@
+import os
+import tempfile
+
+# Settings are read at import time, so the test environment has to be in place
+# before anything from `app` is imported. Values already in the environment win,
+# e.g. DATABASE_URL pointing at a scratch database.
+_scratch = tempfile.mkdtemp(prefix="nova-tests-")
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "30")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_scratch}/nova.db")
+os.environ.setdefault("PROJECT_NAME", "Nova")
+os.environ.setdefault("API_V1_STR", "/api/v1")
+os.environ.setdefault("SERPER_API_KEY", "test")
+os.environ.setdefault("GOOGLE_API_KEY", "test")
+os.environ.setdefault("LLM_PREWARM", "false")
+os.environ.setdefault("LIVE_ANALYTICS_SHARED_FILE", f"{_scratch}/live-analytics")
+os.environ.setdefault("RATE_LIMIT_SHARED_FILE", f"{_scratch}/rate-limits")
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def db_engine():
+    """The sync engine, with every table the models declare created."""
+    from app.db.base_class import Base
+    from app.db.session import engine
+    # Register every model on Base.metadata, as alembic/env.py does.
+    from app.schemas.user import User  # noqa: F401
+    # The SQLAlchemy Log lives in app.models; app.schemas.log is its pydantic schema.
+    from app.models.log import Log  # noqa: F401
+    from app.models.threat import FrozenThreat  # noqa: F401
+    from app.models.anchor import LogAnchor  # noqa: F401
+    from app.models.checkpoint import ChainCheckpoint  # noqa: F401
+    from app.models.blob import LogBlob  # noqa: F401
+    from app.models.archive import LogArchive  # noqa: F401
+    from app.models.rollup import AnalyticsRollup, StageLatencyRollup  # noqa: F401
+    from app.models.sketch import ThreatSketch  # noqa: F401
+    from app.models.revocation import AuthRevocation  # noqa: F401
+    from app.models.api_key import ApiKey  # noqa: F401
+    from app.models.job import BackgroundJob  # noqa: F401
+
+    Base.metadata.create_all(engine)
+    return engine
+
+
+@pytest.fixture
+def client(db_engine):
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def make_user(db_engine):
+    """Creates an active user and returns (user id, bearer headers for a fresh token)."""
+    import uuid
+
+    from app.core.security import create_access_token
+    from app.db.session import SessionLocal
+    from app.schemas.user import User
+
+    def make_user():
+        db = SessionLocal()
+        try:
+            user = User(email=f"{uuid.uuid4().hex}@example.com", hashed_password="not-a-real-hash", is_active=True)
+            db.add(user)
+            db.commit()
+            return user.id, {"Authorization": f"Bearer {create_access_token(user.id)}"}
+        finally:
+            db.close()
+    return make_user
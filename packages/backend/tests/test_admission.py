@@ -0,0 +1,73 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from jose import jwt
+
+from app.api.v1 import deps
+from app.core import security
+from app.core.config import settings
+from app.db.session import AsyncSessionLocal
+from app.services.admission import AdmissionController, Overloaded, Priority
+from app.services.principal_cache import principal_cache
+
+
+def settle(controller: AdmissionController, completions: int, latency: float) -> None:
+    """Folds one second with `completions` requests of `latency` seconds into the limit."""
+    controller._completed, controller._latency = completions, latency
+    controller._tick(controller._second + 1)
+
+
+def test_limit_follows_the_measured_latency():
+    controller = AdmissionController(target_latency_seconds=0.1, min_limit=1, max_limit=10_000)
+
+    # 20 completions/s at 2 s each means 40 in flight: the limit leaves room above that.
+    settle(controller, 100, 2.0)
+    assert controller._throughput == 20.0
+    assert controller.limit == 50
+
+    # Faster than the target, the target sets the limit.
+    fast = AdmissionController(target_latency_seconds=0.1, min_limit=1, max_limit=10_000)
+    settle(fast, 100, 0.01)
+    assert fast.limit == 3
+
+
+def test_waiters_are_admitted_by_priority():
+    async def run():
+        controller = AdmissionController(min_limit=1, max_limit=1, max_queue=2, max_queue_wait_seconds=1.0)
+        order = []
+
+        async def request(priority: Priority, hold: asyncio.Event | None = None):
+            async with controller.admit(priority):
+                order.append(priority)
+                if hold is not None:
+                    await hold.wait()
+
+        hold = asyncio.Event()
+        first = asyncio.create_task(request(Priority.TENANT, hold))
+        await asyncio.sleep(0)
+        waiting = [asyncio.create_task(request(priority)) for priority in (Priority.BEST_EFFORT, Priority.TENANT)]
+        await asyncio.sleep(0)
+        # The queue is full: a batch request evicts the best-effort waiter.
+        batch = asyncio.create_task(request(Priority.BATCH))
+        await asyncio.sleep(0)
+        hold.set()
+        results = await asyncio.gather(first, *waiting, batch, return_exceptions=True)
+
+        assert isinstance(results[1], Overloaded) and results[1].reason == "evicted"
+        assert order == [Priority.TENANT, Priority.TENANT, Priority.BATCH]
+
+    asyncio.run(run())
+
+
+def test_revoked_tokens_are_admitted_as_anonymous(db_engine):
+    async def run():
+        token = security.create_access_token(42)
+        claims = jwt.decode(token, settings.SECRET_KEY, algorithms=[security.ALGORITHM])
+        async with AsyncSessionLocal() as db:
+            assert await deps.get_optional_user_id(token=token, api_key=None, db=db) == "42"
+            await principal_cache.revoke_token(
+                db, user_id=42, jti=claims["jti"], expires_at=datetime.now(timezone.utc) + timedelta(minutes=5)
+            )
+            assert await deps.get_optional_user_id(token=token, api_key=None, db=db) is None
+
+    asyncio.run(run())
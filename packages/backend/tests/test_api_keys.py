@@ -0,0 +1,75 @@
+import asyncio
+
+from sqlalchemy import select
+
+from app.crud import crud_api_key
+from app.db.session import AsyncSessionLocal
+from app.models.api_key import ApiKey
+from app.services.api_keys import ApiKeyAuthenticator
+
+
+def log_entry():
+    return {"request_data": {"prompt": "from a machine client"}, "response_data": {}, "verdict": "ALLOWED"}
+
+
+def test_keys_are_scoped_and_revoked_at_once(client, make_user):
+    _, headers = make_user()
+    response = client.post("/api/v1/api-keys/", headers=headers, json={"name": "shipper", "scopes": ["logs:write"]})
+    assert response.status_code == 201
+    created = response.json()
+    assert created["key"].split("_")[1] == created["prefix"]
+
+    assert client.post("/api/v1/logs/", headers={"X-API-Key": created["key"]}, json=log_entry()).status_code == 201
+    gateway_only = client.post("/api/v1/api-keys/", headers=headers, json={"name": "chat", "scopes": ["gateway"]}).json()
+    assert client.post("/api/v1/logs/", headers={"X-API-Key": gateway_only["key"]}, json=log_entry()).status_code == 403
+    unknown = client.post("/api/v1/api-keys/", headers=headers, json={"name": "x", "scopes": ["admin"]})
+    assert unknown.status_code == 400
+
+    assert [key["id"] for key in client.get("/api/v1/api-keys/", headers=headers).json()] == [gateway_only["id"], created["id"]]
+    revoked = client.delete(f"/api/v1/api-keys/{created['id']}", headers=headers)
+    assert revoked.status_code == 200 and revoked.json()["is_active"] is False
+    assert client.post("/api/v1/logs/", headers={"X-API-Key": created["key"]}, json=log_entry()).status_code == 401
+
+    # Another user's key is not theirs to revoke.
+    _, other_headers = make_user()
+    assert client.delete(f"/api/v1/api-keys/{gateway_only['id']}", headers=other_headers).status_code == 404
+
+
+def test_authenticator_refreshes_incrementally_and_batches_last_used(make_user, monkeypatch):
+    user_id, _ = make_user()
+
+    async def run():
+        async with AsyncSessionLocal() as db:
+            first, first_key = await crud_api_key.create_api_key(db, user_id=user_id, name="a", scopes=["gateway"])
+        authenticator = ApiKeyAuthenticator(refresh_seconds=60)
+        loads = []
+        load = authenticator._load
+        monkeypatch.setattr(authenticator, "_load", lambda since: loads.append(since) or load(since))
+
+        await authenticator.refresh()
+        assert loads == [None]  # The first load reads every key.
+        assert authenticator.authenticate(first_key).id == first.id
+        prefix = first_key.split("_")[1]
+        assert authenticator.authenticate(f"nova_{prefix}_wrong-secret") is None
+        assert authenticator.authenticate("not-a-key") is None
+
+        async with AsyncSessionLocal() as db:
+            second, second_key = await crud_api_key.create_api_key(db, user_id=user_id, name="b", scopes=["gateway"])
+        await authenticator.refresh()
+        assert loads[1] is not None  # Only keys changed since (a margin before) the last one seen.
+        assert authenticator.authenticate(second_key).id == second.id
+
+        writes = []
+        record = crud_api_key.record_last_used
+        monkeypatch.setattr(crud_api_key, "record_last_used", lambda db, last_used: writes.append(dict(last_used)) or record(db, last_used))
+        authenticator.authenticate(first_key)
+        await authenticator.flush_last_used()
+        assert [set(batch) for batch in writes] == [{first.id, second.id}]  # One write for every key used.
+        await authenticator.flush_last_used()
+        assert len(writes) == 1
+
+        async with AsyncSessionLocal() as db:
+            used = (await db.scalars(select(ApiKey.last_used_at).where(ApiKey.id.in_([first.id, second.id])))).all()
+        assert all(used)
+
+    asyncio.run(run())
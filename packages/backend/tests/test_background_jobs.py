@@ -0,0 +1,58 @@
+import asyncio
+import hashlib
+from datetime import datetime, timedelta, timezone
+
+from app.crud import crud_job
+from app.db.session import SessionLocal
+from app.models.log import Log
+from app.services.analytics_backfill import RollupBackfiller
+
+
+def test_a_job_blocks_others_of_its_kind_until_it_goes_stale(db_engine):
+    db = SessionLocal()
+    try:
+        now = datetime.now(timezone.utc)
+        job, created = crud_job.claim_job(db, kind="test-claim", params={"n": 1}, stale_before=now - timedelta(minutes=1))
+        assert created and job.status == "pending"
+
+        same, created = crud_job.claim_job(db, kind="test-claim", params={"n": 2}, stale_before=now - timedelta(minutes=1))
+        assert not created and same.id == job.id
+        other, created = crud_job.claim_job(db, kind="test-other", params={}, stale_before=now - timedelta(minutes=1))
+        assert created
+
+        # No heartbeat since before `stale_before`: its worker is gone.
+        replacement, created = crud_job.claim_job(db, kind="test-claim", params={"n": 3}, stale_before=now + timedelta(minutes=1))
+        assert created and replacement.id != job.id
+        db.expire_all()
+        dead = crud_job.get_job(db, kind="test-claim", job_id=job.id)
+        assert dead.status == "error" and dead.finished_at is not None
+        assert crud_job.get_job(db, kind="test-other", job_id=job.id) is None
+    finally:
+        db.close()
+
+
+def test_backfill_jobs_can_be_polled_from_another_worker(db_engine):
+    since = (datetime.now(timezone.utc) - timedelta(days=30)).replace(minute=0, second=0, microsecond=0)
+    db = SessionLocal()
+    try:
+        db.add(Log(
+            request_data={"prompt": "backfill job"}, response_data={"llm_response": "ok"}, verdict="ALLOWED",
+            log_hash=hashlib.sha256(b"backfill job").hexdigest(), previous_log_hash=None, created_at=since + timedelta(minutes=5),
+        ))
+        db.commit()
+    finally:
+        db.close()
+    first_worker, second_worker = RollupBackfiller(), RollupBackfiller()
+
+    async def run():
+        job = await first_worker.start_job(since=since, until=since + timedelta(hours=2))
+        assert (await second_worker.start_job()).id == job.id
+        while second_worker.get_job(job.id).status in ("pending", "running"):
+            await asyncio.sleep(0.01)
+        return job
+
+    job = asyncio.run(run())
+    polled = second_worker.get_job(job.id)
+    assert polled.status == "ok", polled.message
+    assert polled.logs_processed == 1
+    assert (polled.since, polled.rebuilt_from, polled.rebuilt_until) == (since, since, since + timedelta(hours=2))
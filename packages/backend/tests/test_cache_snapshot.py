@@ -0,0 +1,71 @@
+import threading
+
+import numpy as np
+
+from app.services.cache_snapshot import CacheSnapshotter, load_snapshot, prune_snapshots, save_snapshot
+from app.services.matrix_cache_manager import MatrixCacheManager
+
+DIM = 16
+
+
+def vectors(count: int, seed: int) -> np.ndarray:
+    matrix = np.random.default_rng(seed).standard_normal((count, DIM)).astype(np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def test_warm_start_maps_the_snapshot_until_the_cache_grows(tmp_path):
+    saved = vectors(8, seed=1)
+    cache = MatrixCacheManager(capacity=100, initial_rows=8)
+    cache.add_batch([f"old-{i}" for i in range(8)], saved, namespace="ns")
+    snapshotter = CacheSnapshotter(cache, directory=str(tmp_path), interval_seconds=60)
+    assert snapshotter.save() and not snapshotter.save()  # Nothing changed since.
+    on_disk = np.array(load_snapshot(str(tmp_path)).vectors)
+
+    restarted = MatrixCacheManager(capacity=100, initial_rows=8)
+    assert CacheSnapshotter(restarted, directory=str(tmp_path)).warm_start() == 8
+    assert isinstance(restarted._vectors, np.memmap)
+    assert restarted.lookup_batch(saved[:3], namespace="ns") == ["old-0", "old-1", "old-2"]
+
+    # The snapshot is full, so the next entry grows the cache onto the heap.
+    fresh = vectors(4, seed=2)
+    restarted.add_batch([f"new-{i}" for i in range(4)], fresh)
+    assert not isinstance(restarted._vectors, np.memmap)
+    assert restarted.lookup_batch([saved[7], fresh[3]]) == ["old-7", "new-3"]
+    assert restarted.lookup_batch([saved[7], fresh[3]], namespace="ns") == ["old-7", None]
+
+    # Copy-on-write: nothing the restarted cache did reached the file.
+    np.testing.assert_array_equal(np.asarray(load_snapshot(str(tmp_path)).vectors), on_disk)
+
+
+def test_workers_sharing_a_directory_never_load_a_pruned_snapshot(tmp_path):
+    directory, errors = str(tmp_path), []
+
+    def writer(seed: int):
+        cache = MatrixCacheManager(capacity=64)
+        try:
+            for round_ in range(20):
+                cache.add_batch([f"{seed}-{round_}-{i}" for i in range(4)], vectors(4, seed * 100 + round_))
+                save_snapshot(cache, directory)
+                prune_snapshots(directory, min_age_seconds=0)
+        except Exception as e:
+            errors.append(e)
+
+    def reader():
+        try:
+            for _ in range(100):
+                snapshot = load_snapshot(directory)
+                if snapshot is not None:
+                    assert len(snapshot.vectors) == len(snapshot.entry_ids)
+                    np.asarray(snapshot.vectors).sum()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(seed,)) for seed in range(3)]
+    threads += [threading.Thread(target=reader) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(list(tmp_path.glob("vectors-*.f32"))) == 1
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.security import calculate_log_hash
+from app.crud import crud_checkpoint
+from app.db.base_class import Base
+from app.models.log import Log
+from app.services import background_jobs, chain_verifier as chain_verifier_module
+from app.services.chain_verifier import ChainVerifier
+
+
+@pytest.fixture
+def chain_db(db_engine, tmp_path, monkeypatch):
+    """A database of its own, so the chain is not shared with other tests' logs."""
+    engine = create_engine(f"sqlite:///{tmp_path}/chain.db")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)
+    monkeypatch.setattr(chain_verifier_module, "SessionLocal", session)
+    monkeypatch.setattr(background_jobs, "SessionLocal", session)
+    yield session
+    engine.dispose()
+
+
+def entry(i: int) -> dict:
+    return {"request_data": {"prompt": f"chain {i}"}, "response_data": {"llm_response": "ok"}, "verdict": "ALLOWED"}
+
+
+def append_logs(session, count: int) -> None:
+    db = session()
+    try:
+        previous = db.query(Log.log_hash).order_by(Log.id.desc()).limit(1).scalar()
+        for i in range(count):
+            log_hash = calculate_log_hash(entry(i), previous)
+            db.add(Log(**entry(i), log_hash=log_hash, previous_log_hash=previous))
+            previous = log_hash
+        db.commit()
+    finally:
+        db.close()
+
+
+def rechain(session, from_id: int, previous: str) -> None:
+    """Rewrites every log from `from_id` on into a valid chain hanging off `previous`."""
+    db = session()
+    try:
+        for log in db.query(Log).filter(Log.id >= from_id).order_by(Log.id.asc()):
+            data = {"request_data": log.request_data, "response_data": log.response_data, "verdict": log.verdict}
+            log.previous_log_hash, log.log_hash = previous, calculate_log_hash(data, previous)
+            previous = log.log_hash
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_incremental_runs_start_from_the_latest_checkpoint(chain_db):
+    verifier = ChainVerifier(workers=1, chunk_size=100)
+    append_logs(chain_db, 5)
+    assert verifier.verify().logs_checked == 5
+
+    append_logs(chain_db, 3)
+    outcome = verifier.verify()
+    assert outcome.ok and outcome.logs_checked == 3
+    db = chain_db()
+    try:
+        checkpoint = crud_checkpoint.get_latest_checkpoint(db)
+        assert (checkpoint.last_log_id, checkpoint.logs_verified) == (8, 8)
+        assert verifier.verify().message == "No new logs since checkpoint at log ID 8."
+
+        # Rows behind the checkpoint are only re-hashed by a full run...
+        db.query(Log).filter(Log.id == 2).update({"verdict": "BLOCKED"})
+        db.commit()
+        assert verifier.verify().ok
+        assert verifier.verify(full=True).broken_log_id == 2
+
+        # ...but the checkpointed row itself is re-read every time.
+        db.query(Log).filter(Log.id == 8).update({"log_hash": "rewritten"})
+        db.commit()
+        assert verifier.verify().message == "Data tampering detected at log ID 8."
+    finally:
+        db.close()
+
+
+def test_links_between_ranges_are_stitched(chain_db):
+    verifier = ChainVerifier(workers=1, chunk_size=3)
+    append_logs(chain_db, 10)
+    assert verifier.verify(full=True).logs_checked == 10
+
+    # Each range [1-3], [4-6], ... is internally consistent; only the 3 -> 4 link is broken.
+    rechain(chain_db, 4, previous="f" * 64)
+    outcome = verifier.verify(full=True)
+    assert not outcome.ok
+    assert (outcome.broken_log_id, outcome.logs_checked) == (4, 3)
+    assert outcome.message == "Chain link broken at log ID 4."
+
+
+def test_jobs_are_shared_by_every_worker(chain_db):
+    append_logs(chain_db, 4)
+    first_worker, second_worker = ChainVerifier(workers=1), ChainVerifier(workers=1)
+
+    async def run():
+        job = await first_worker.start_job(full=True)
+        # The other worker sees the running job instead of starting its own.
+        assert (await second_worker.start_job()).id == job.id
+        while second_worker.get_job(job.id).status in ("pending", "running"):
+            await asyncio.sleep(0.01)
+        return job
+
+    job = asyncio.run(run())
+    polled = second_worker.get_job(job.id)
+    assert (polled.status, polled.full, polled.logs_checked, polled.logs_total) == ("ok", True, 4, 4)
+    assert polled.finished_at >= polled.started_at
+    assert second_worker.get_job("no-such-job") is None
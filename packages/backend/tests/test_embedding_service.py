@@ -0,0 +1,81 @@
+import asyncio
+
+import numpy as np
+
+from app.services.embedding_service import EmbeddingService
+from app.services.embeddings import HashingEmbedder
+
+
+class StubEmbedder:
+    """Records each batch it is asked for; `fail` or `drop` break the next batch."""
+    def __init__(self):
+        self.batches = []
+        self.fail = None
+        self.drop = 0
+        self.hashing = HashingEmbedder(dim=16)
+
+    async def embed(self, texts):
+        self.batches.append(list(texts))
+        if self.fail is not None:
+            error, self.fail = self.fail, None
+            raise error
+        vectors = self.hashing.embed_sync(texts)
+        drop, self.drop = self.drop, 0
+        return vectors[:len(vectors) - drop]
+
+
+def make_service(**kwargs):
+    embedder = StubEmbedder()
+    return embedder, EmbeddingService(embedder=embedder, **{"max_batch_size": 8, "max_wait_ms": 20, "cache_size": 100, **kwargs})
+
+
+def test_concurrent_requests_are_coalesced_into_batches():
+    embedder, service = make_service()
+
+    async def run():
+        texts = [f"prompt {i}" for i in range(20)]
+        # Every text twice: duplicates share one queued embedding.
+        vectors = await asyncio.gather(*(service.embed(text) for text in texts + texts))
+        again = await service.embed("prompt 3")  # From the cache.
+        await service.close()
+        return texts, vectors, again
+
+    texts, vectors, again = asyncio.run(run())
+    assert [len(batch) for batch in embedder.batches] == [8, 8, 4]
+    expected = HashingEmbedder(dim=16).embed_sync(texts)
+    np.testing.assert_allclose(np.stack(vectors[:20]), expected, rtol=1e-6)
+    assert vectors[20] is vectors[0]
+    assert again is vectors[3] and not again.flags.writeable
+
+
+def test_backend_errors_reach_every_caller_of_the_batch():
+    embedder, service = make_service()
+
+    async def run():
+        embedder.fail = RuntimeError("backend down")
+        results = await asyncio.gather(*(service.embed(f"text {i}") for i in range(3)), return_exceptions=True)
+        recovered = await service.embed("text 0")  # The worker carries on with the next batch.
+        await service.close()
+        return results, recovered
+
+    results, recovered = asyncio.run(run())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert recovered.shape == (16,)
+
+
+def test_short_results_fail_the_batch_instead_of_hanging():
+    embedder, service = make_service()
+
+    async def run():
+        embedder.drop = 1
+        texts = [f"short {i}" for i in range(4)]
+        results = await asyncio.wait_for(
+            asyncio.gather(*(service.embed(text) for text in texts), return_exceptions=True), timeout=2
+        )
+        await service.close()
+        return results
+
+    results = asyncio.run(run())
+    assert len(embedder.batches) == 1
+    assert all(isinstance(result, ValueError) for result in results)
+    assert "batch of 4 texts" in str(results[0])
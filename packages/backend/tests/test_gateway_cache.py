@@ -0,0 +1,100 @@
+import hashlib
+import json
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from langchain_core.language_models.chat_models import SimpleChatModel
+
+from app.api.v1 import gateway
+from app.main import app
+from app.services import ai_critics
+
+# Every critic is a real chain (prompt | model | PydanticOutputParser); only
+# the chat model is fake, answering each critic by its system prompt.
+CRITIC_ANSWERS = {
+    "Prompt Injection Security Critic": {"verdict": "SAFE", "reasoning": "Benign question.", "confidence_score": 0.97, "attack_type": "none"},
+    "Policy Compliance Critic": {"verdict": "PASS", "reasoning": "Complies.", "confidence_score": 0.9},
+    "precision linguistic analyst": {"claim": None},
+    "Hallucination Verifier": {"verdict": "LOOKS_GOOD", "reasoning": "Nothing fabricated.", "confidence_score": 0.8},
+}
+
+
+class FakeGemini(SimpleChatModel):
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-gemini"
+
+    def _call(self, messages, stop=None, run_manager=None, **kwargs) -> str:
+        self.calls += 1
+        for marker, answer in CRITIC_ANSWERS.items():
+            if marker in messages[0].content:
+                return json.dumps(answer)
+        return "Paris is the capital of France."
+
+
+def fake_embedding(prompt: str):
+    seed = int.from_bytes(hashlib.sha256(prompt.encode("utf-8")).digest()[:8], "big")
+    return np.random.default_rng(seed).standard_normal(64).astype(np.float32).tolist()
+
+
+@pytest.fixture
+def client(db_engine, monkeypatch):
+    ai_critics.get_model()
+    fake = FakeGemini()
+    monkeypatch.setattr(ai_critics, "model", fake)
+    # Chains capture the model when built; rebuild them around the fake.
+    for get_chain in (
+        ai_critics.get_prompt_injection_chain,
+        ai_critics.get_custom_policy_chain,
+        ai_critics.get_claim_extractor_chain,
+        ai_critics.get_hallucination_verifier_chain,
+    ):
+        monkeypatch.setattr(ai_critics, get_chain.__name__, ai_critics.cached_chain(get_chain.__wrapped__))
+
+    async def embed_prompt(prompt):
+        return fake_embedding(prompt)
+    monkeypatch.setattr(gateway, "embed_prompt", embed_prompt)
+
+    with TestClient(app) as client:
+        client.fake_model = fake
+        yield client
+
+
+def test_critic_parsers_produce_the_gateway_response_models():
+    ai_critics.get_model()
+    parser = ai_critics.PydanticOutputParser(pydantic_object=ai_critics.SecurityCriticResponse)
+    parsed = parser.parse(json.dumps(CRITIC_ANSWERS["Prompt Injection Security Critic"]))
+
+    assert isinstance(parsed, ai_critics.SecurityCriticResponse)
+    assert gateway.GatewayResponse(
+        llm_response="x",
+        inbound_check=parsed,
+        outbound_check=ai_critics.PolicyCriticResponse(**CRITIC_ANSWERS["Policy Compliance Critic"]),
+        hallucination_check=ai_critics.HallucinationVerdict(**CRITIC_ANSWERS["Hallucination Verifier"]),
+    ).inbound_check.verdict == "SAFE"
+
+
+def test_repeated_prompt_is_served_from_the_semantic_cache(client):
+    body = {"prompt": "What is the capital of France? (cache test)", "policy": "Be helpful."}
+
+    first = client.post("/api/v1/nova-chat", json=body)
+    assert first.status_code == 200, first.text
+    assert first.json()["cached"] is False
+    calls_after_first = client.fake_model.calls
+    assert calls_after_first == 5  # Inbound critic, primary LLM, claims, hallucination, policy.
+
+    second = client.post("/api/v1/nova-chat", json=body)
+    assert second.status_code == 200, second.text
+    served = second.json()
+    assert served["cached"] is True
+    assert client.fake_model.calls == calls_after_first  # No LLM call at all.
+    assert served["llm_response"] == first.json()["llm_response"]
+    assert served["inbound_check"] == first.json()["inbound_check"]
+    assert served["hallucination_check"]["verdict"] == "LOOKS_GOOD"
+
+    # The cache is scoped to the policy.
+    other_policy = client.post("/api/v1/nova-chat", json={**body, "policy": "Be terse."})
+    assert other_policy.json()["cached"] is False
@@ -0,0 +1,105 @@
+import json
+
+import pyarrow as pa
+import pytest
+
+from app.crud import crud_blob
+from app.db.session import SessionLocal
+from app.models.blob import LogBlob
+from app.models.log import Log
+
+LARGE = "A long LLM response. " * 100
+
+
+def test_dehydrate_escapes_client_objects_that_look_like_references():
+    payload = {
+        "prompt": {"$blob": "abc"},
+        "nested": [{"$literal": {"$blob": "def"}}],
+        "answer": LARGE,
+        "fine": {"$blob": "abc", "other": 1},
+    }
+    blobs = {}
+    stored = crud_blob.dehydrate(payload, blobs)
+
+    assert stored["prompt"] == {"$literal": {"$blob": "abc"}}
+    assert stored["nested"] == [{"$literal": {"$literal": {"$literal": {"$blob": "def"}}}}]
+    assert stored["fine"] == payload["fine"]
+    assert crud_blob.collect_refs(stored, set()) == set(blobs)  # Only the real blob.
+    assert crud_blob._substitute(stored, blobs) == payload
+
+
+def create_log(client, headers, request_data):
+    response = client.post("/api/v1/logs/", headers=headers, json={
+        "request_data": request_data,
+        "response_data": {"llm_response": LARGE},
+        "verdict": "ALLOWED",
+    })
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def export(client, headers, log_id, format="ndjson"):
+    response = client.get("/api/v1/logs/export", headers=headers, params={"format": format, "start_id": log_id, "end_id": log_id})
+    assert response.status_code == 200
+    return response.content
+
+
+def test_look_alike_payloads_round_trip_through_report_and_export(client, make_user):
+    _, headers = make_user()
+    log_id = create_log(client, headers, {"prompt": {"$blob": "abc"}})
+
+    report = client.get(f"/api/v1/logs/{log_id}/report", headers=headers)
+    assert report.status_code == 200
+    assert report.json()["request_data"] == {"prompt": {"$blob": "abc"}}
+
+    lines = [json.loads(line) for line in export(client, headers, log_id).splitlines()]
+    assert [line["type"] for line in lines] == ["header", "blob", "log", "chunk", "footer"]
+    assert lines[-1]["errors"] == 0
+
+
+def test_corrupt_blobs_are_reported_per_log(client, make_user):
+    _, headers = make_user()
+    text = f"A response nobody else wrote. {'x' * 400}"
+    log_id = create_log(client, headers, {"prompt": "hello", "context": text})
+
+    db = SessionLocal()
+    try:
+        refs = crud_blob.collect_refs(db.get(Log, log_id).request_data, set())
+        assert len(refs) == 1
+        codec, data = crud_blob._compress("A tampered response.")
+        db.query(LogBlob).filter(LogBlob.hash.in_(refs)).update({LogBlob.codec: codec, LogBlob.data: data}, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+    report = client.get(f"/api/v1/logs/{log_id}/report", headers=headers)
+    assert report.status_code == 409
+    assert "cannot be restored" in report.json()["detail"]
+
+    lines = [json.loads(line) for line in export(client, headers, log_id).splitlines()]
+    assert [line["type"] for line in lines] == ["header", "blob", "log", "error", "chunk", "footer"]
+    assert lines[3]["log_id"] == log_id and "does not match its content" in lines[3]["detail"]
+    assert lines[-1]["errors"] == 1
+
+    table = pa.ipc.open_stream(export(client, headers, log_id, format="arrow")).read_all()
+    assert table.column("id").to_pylist() == [log_id]
+    assert "does not match its content" in table.column("error").to_pylist()[0]
+
+
+def test_undecodable_blobs_are_integrity_errors(db_engine):
+    db = SessionLocal()
+    try:
+        text = f"Stored, then overwritten with garbage. {'y' * 400}"
+        blobs = {}
+        ref = crud_blob.dehydrate(text, blobs)
+        crud_blob.store_blobs(db, blobs)
+        db.commit()
+        db.query(LogBlob).filter(LogBlob.hash == ref["$blob"]).update({LogBlob.data: b"garbage"}, synchronize_session=False)
+        db.commit()
+
+        contents, errors = crud_blob.read_blob_contents(db, [ref["$blob"]])
+        assert contents == {} and "cannot be decompressed" in errors[ref["$blob"]]
+        with pytest.raises(crud_blob.BlobIntegrityError):
+            crud_blob.get_blob_contents(db, [ref["$blob"]])
+    finally:
+        db.close()
@@ -0,0 +1,37 @@
+from contextlib import contextmanager
+
+from app.crud import crud_partition
+from app.services.log_partitions import LogPartitionManager
+
+
+class RecordingManager(LogPartitionManager):
+    def __init__(self):
+        super().__init__(retention_days=30)
+        self.calls = []
+
+    def ensure_partitions(self) -> int:
+        self.calls.append("ensure")
+        return 0
+
+    def archive_expired(self, now=None) -> int:
+        self.calls.append("archive")
+        return 0
+
+
+def test_maintenance_runs_under_the_lock(db_engine):
+    manager = RecordingManager()
+    with crud_partition.maintenance_lock() as acquired:
+        assert acquired  # Not PostgreSQL: nothing to contend for.
+    manager.maintain()
+    assert manager.calls == ["ensure", "archive"]
+
+
+def test_maintenance_is_skipped_while_another_worker_holds_the_lock(monkeypatch):
+    @contextmanager
+    def held_elsewhere():
+        yield False
+
+    monkeypatch.setattr(crud_partition, "maintenance_lock", held_elsewhere)
+    manager = RecordingManager()
+    manager.maintain()
+    assert manager.calls == []
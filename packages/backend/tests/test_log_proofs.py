@@ -0,0 +1,57 @@
+from app.crud import crud_anchor
+from app.db.session import SessionLocal
+from app.models.log import Log
+
+
+def create_log(client, headers, prompt):
+    response = client.post("/api/v1/logs/", headers=headers, json={
+        "request_data": {"prompt": prompt},
+        "response_data": {"llm_response": "ok"},
+        "verdict": "ALLOWED",
+    })
+    assert response.status_code == 201, response.text
+    return response.json()["id"]
+
+
+def anchor_everything():
+    db = SessionLocal()
+    try:
+        return crud_anchor.create_pending_anchors(db, batch_size=10_000, max_age_seconds=0)
+    finally:
+        db.close()
+
+
+def test_inclusion_proofs_verify_against_their_anchor(client, make_user):
+    _, headers = make_user()
+    log_ids = [create_log(client, headers, f"proof {i}") for i in range(5)]
+    assert len(anchor_everything()) == 1
+
+    for log_id in log_ids:
+        proof = client.get(f"/api/v1/logs/{log_id}/proof", headers=headers).json()
+        verdict = client.post("/api/v1/logs/verify-proof/", headers=headers, json={
+            "log_hash": proof["log_hash"],
+            "leaf_index": proof["leaf_index"],
+            "tree_size": proof["tree_size"],
+            "audit_path": proof["audit_path"],
+            "merkle_root": proof["anchor"]["merkle_root"],
+            "anchor_id": proof["anchor"]["id"],
+        }).json()
+        assert verdict["valid"], verdict
+
+
+def test_no_proof_is_built_from_a_partly_archived_batch(client, make_user):
+    _, headers = make_user()
+    archived_id, log_id = create_log(client, headers, "archived"), create_log(client, headers, "kept")
+    anchor_everything()
+
+    # What is left once the partition holding the start of the batch has been dropped.
+    db = SessionLocal()
+    try:
+        db.query(Log).filter(Log.id == archived_id).delete()
+        db.commit()
+    finally:
+        db.close()
+
+    response = client.get(f"/api/v1/logs/{log_id}/proof", headers=headers)
+    assert response.status_code == 410
+    assert "archived" in response.json()["detail"]
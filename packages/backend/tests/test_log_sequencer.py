@@ -0,0 +1,85 @@
+import asyncio
+
+from sqlalchemy.exc import DataError, OperationalError
+
+from app.schemas import log as log_schemas
+from app.services.log_sequencer import LogSequencer
+
+
+def make_entry(i: int, **request_data) -> log_schemas.LogCreate:
+    return log_schemas.LogCreate(
+        request_data={"prompt": f"sequencer test prompt {i}", **request_data},
+        response_data={"llm_response": f"response {i}"},
+        verdict="ALLOWED",
+    )
+
+
+def recording(sequencer: LogSequencer, fail=lambda logs_in: None):
+    """Wraps the sequencer's writes, recording each batch size and raising what `fail` returns."""
+    sizes = []
+    write = sequencer._write
+
+    async def _write(logs_in):
+        sizes.append(len(logs_in))
+        error = fail(logs_in)
+        if error is not None:
+            raise error
+        return await write(logs_in)
+    sequencer._write = _write
+    return sizes
+
+
+def assert_chained(db_logs):
+    db_logs = sorted(db_logs, key=lambda log: log.id)
+    assert len({log.id for log in db_logs}) == len(db_logs)
+    for previous, current in zip(db_logs, db_logs[1:]):
+        if current.id == previous.id + 1:
+            assert current.previous_log_hash == previous.log_hash
+
+
+def test_concurrent_appends_are_group_committed_into_one_chain(db_engine):
+    async def run():
+        sequencer = LogSequencer(max_batch_size=32, max_wait_ms=5)
+        sizes = recording(sequencer)
+        db_logs = await asyncio.gather(*(sequencer.append(make_entry(i)) for i in range(100)))
+        await sequencer.close()
+        return db_logs, sizes
+
+    db_logs, sizes = asyncio.run(run())
+    assert sum(sizes) == 100 and len(sizes) <= 5
+    assert [log.request_data["prompt"] for log in db_logs] == [f"sequencer test prompt {i}" for i in range(100)]
+    assert_chained(db_logs)
+
+
+def test_a_rejected_entry_fails_only_its_own_append(db_engine):
+    def reject_poison(logs_in):
+        if any(log_in.request_data.get("poison") for log_in in logs_in):
+            return DataError("INSERT INTO logs ...", {}, Exception("invalid input syntax for type json"))
+
+    async def run():
+        sequencer = LogSequencer(max_batch_size=16, max_wait_ms=20)
+        sizes = recording(sequencer, reject_poison)
+        entries = [make_entry(i, poison=(i == 5)) for i in range(16)]
+        results = await asyncio.gather(*(sequencer.append(entry) for entry in entries), return_exceptions=True)
+        await sequencer.close()
+        return results, sizes
+
+    results, sizes = asyncio.run(run())
+    assert isinstance(results[5], DataError)
+    stored = [result for i, result in enumerate(results) if i != 5]
+    assert all(not isinstance(result, Exception) for result in stored)
+    assert_chained(stored)
+    assert sizes[0] == 16 and len(sizes) <= 2 * 4 + 1  # Bisected down to the bad entry.
+
+
+def test_connection_errors_fail_the_whole_batch_without_retries(db_engine):
+    async def run():
+        sequencer = LogSequencer(max_batch_size=8, max_wait_ms=20)
+        sizes = recording(sequencer, lambda logs_in: OperationalError("SELECT 1", {}, Exception("connection refused")))
+        results = await asyncio.gather(*(sequencer.append(make_entry(i)) for i in range(8)), return_exceptions=True)
+        await sequencer.close()
+        return results, sizes
+
+    results, sizes = asyncio.run(run())
+    assert all(isinstance(result, OperationalError) for result in results)
+    assert sizes == [8]
@@ -0,0 +1,97 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.services.matrix_cache_manager import MatrixCacheManager
+
+
+def unit(seed: int, dim: int = 32) -> np.ndarray:
+    vector = np.random.default_rng(seed).standard_normal(dim).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_lookup_hits_near_duplicates_and_misses_unrelated_prompts():
+    cache = MatrixCacheManager(capacity=100, initial_rows=4)
+    cache.add_batch([f"entry-{i}" for i in range(50)], [unit(i) for i in range(50)])
+
+    near = unit(7) + 0.05 * unit(1000)
+    assert cache.lookup_batch([near, unit(2000)], similarity_threshold=0.9) == ["entry-7", None]
+    assert len(cache) == 50
+
+
+def test_search_returns_k_neighbours_best_first():
+    cache = MatrixCacheManager(capacity=10)
+    cache.add("a", [1.0, 0.0])
+    cache.add("b", [0.8, 0.6])
+    cache.add("c", [0.0, 1.0])
+
+    [results] = cache.search([1.0, 0.1], k=2)
+    assert [entry_id for entry_id, _ in results] == ["a", "b"]
+    assert results[0][1] > results[1][1]
+
+
+def test_namespaces_are_isolated():
+    cache = MatrixCacheManager(capacity=10)
+    cache.add("strict", unit(1), namespace="policy-a")
+    assert cache.lookup_batch([unit(1)], namespace="policy-b") == [None]
+    assert cache.lookup_batch([unit(1)], namespace="policy-a") == ["strict"]
+
+
+def test_lru_evicts_the_least_recently_used_entry():
+    cache = MatrixCacheManager(capacity=2, eviction_policy="lru")
+    cache.add("old", unit(1))
+    cache.add("young", unit(2))
+    cache.lookup_batch([unit(1)])  # "old" is now the most recently used.
+    cache.add("new", unit(3))
+
+    assert cache.lookup_batch([unit(1), unit(2), unit(3)]) == ["old", None, "new"]
+
+
+def test_lfu_evicts_the_least_frequently_used_entry():
+    cache = MatrixCacheManager(capacity=2, eviction_policy="lfu")
+    cache.add("popular", unit(1))
+    cache.add("rare", unit(2))
+    for _ in range(3):
+        cache.lookup_batch([unit(1)])
+    cache.lookup_batch([unit(2)])
+    cache.add("new", unit(3))
+
+    assert cache.lookup_batch([unit(1), unit(2)]) == ["popular", None]
+
+
+def test_remove_moves_the_last_row_into_the_gap():
+    cache = MatrixCacheManager(capacity=10)
+    cache.add_batch(["a", "b", "c"], [unit(1), unit(2), unit(3)])
+
+    assert cache.remove("a") is True
+    assert cache.remove("a") is False
+    assert cache.lookup_batch([unit(1), unit(2), unit(3)]) == [None, "b", "c"]
+
+
+def test_snapshot_round_trips_through_restore():
+    cache = MatrixCacheManager(capacity=10)
+    cache.add("a", unit(1), namespace="ns")
+    cache.add("b", unit(2))
+
+    restored = MatrixCacheManager(capacity=10)
+    restored.restore(cache.snapshot())
+    assert restored.lookup_batch([unit(1)], namespace="ns") == ["a"]
+    assert restored.lookup_batch([unit(2)]) == ["b"]
+
+
+def test_dimension_mismatch_is_rejected():
+    cache = MatrixCacheManager(capacity=10)
+    cache.add("a", unit(1, dim=8))
+    with pytest.raises(ValueError):
+        cache.add("b", unit(1, dim=16))
+
+
+def test_async_api_matches_the_sync_lookup():
+    cache = MatrixCacheManager(capacity=10)
+
+    async def run():
+        await cache.add_to_cache("a", unit(1).tolist())
+        return await cache.check_cache(unit(1).tolist()), await cache.check_cache_batch([unit(1), unit(2)])
+
+    assert asyncio.run(run()) == ("a", ["a", None])
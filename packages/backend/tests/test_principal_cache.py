@@ -0,0 +1,76 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from jose import jwt
+from sqlalchemy import func, select
+
+from app.core import security
+from app.core.config import settings
+
+from app.db.session import AsyncSessionLocal
+from app.models.revocation import AuthRevocation
+from app.services.principal_cache import PrincipalCache
+
+
+async def insert_revocation(**fields) -> None:
+    async with AsyncSessionLocal() as db:
+        db.add(AuthRevocation(expires_at=datetime.now(timezone.utc) + timedelta(hours=1), **fields))
+        await db.commit()
+
+
+async def sync(cache: PrincipalCache) -> None:
+    async with AsyncSessionLocal() as db:
+        await cache.maybe_sync(db)
+
+
+def test_revocations_committed_out_of_id_order_are_applied(db_engine):
+    async def run():
+        cache = PrincipalCache(sync_interval_seconds=0)
+        async with AsyncSessionLocal() as db:
+            next_id = (await db.scalar(select(func.max(AuthRevocation.id))) or 0) + 1
+
+        # Two writers take ids next_id and next_id + 1; the second commits first.
+        await insert_revocation(id=next_id + 1, user_id=1, jti="committed-first")
+        await sync(cache)
+        assert cache.is_revoked("committed-first") and not cache.is_revoked("committed-second")
+
+        await insert_revocation(id=next_id, user_id=2, jti="committed-second")
+        await sync(cache)
+        assert cache.is_revoked("committed-second")
+
+    asyncio.run(run())
+
+
+def test_user_invalidations_are_applied_once(db_engine):
+    async def run():
+        cache = PrincipalCache(sync_interval_seconds=0)
+        await insert_revocation(user_id=7, jti=None)
+
+        cache.put((7, "before"), object())
+        await sync(cache)
+        assert cache.get((7, "before")) is None
+
+        # Signing in again after the invalidation caches a fresh principal, which the next sync keeps.
+        principal = object()
+        cache.put((7, "after"), principal)
+        await sync(cache)
+        assert cache.get((7, "after")) is principal
+
+    asyncio.run(run())
+
+
+def test_deactivating_an_account_locks_out_its_cached_token_at_once(client, make_user):
+    _, headers = make_user()
+    assert client.get("/api/v1/api-keys/", headers=headers).status_code == 200  # Caches the principal.
+
+    assert client.post("/api/v1/deactivate", headers=headers).status_code == 204
+    response = client.get("/api/v1/api-keys/", headers=headers)
+    assert response.status_code == 400 and response.json()["detail"] == "Inactive user"
+
+
+def test_logout_refuses_tokens_without_an_expiry(client, make_user):
+    user_id, _ = make_user()
+    token = jwt.encode({"sub": str(user_id), "jti": "no-expiry"}, settings.SECRET_KEY, algorithm=security.ALGORITHM)
+
+    response = client.post("/api/v1/logout", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 400
@@ -0,0 +1,45 @@
+import asyncio
+
+import numpy as np
+
+from app.services.qdrant_cache_manager import QdrantCacheManager
+
+DIM = 32
+
+
+def unit(vector: np.ndarray) -> list:
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def test_embedded_memory_mode_round_trip():
+    rng = np.random.default_rng(0)
+    a, b, c = rng.standard_normal((3, DIM))
+    near_a = unit(a + 0.05 * rng.standard_normal(DIM))
+
+    async def run():
+        cache = QdrantCacheManager(url=None, path=None, collection_name="test_round_trip")
+        # Nothing is created until the first write.
+        assert await cache.check_cache(unit(a)) is None
+        assert await cache.search_batch([unit(a), unit(b)]) == [[], []]
+
+        await cache.add_to_cache("a", unit(a), namespace="policy-1", payload={"verdict": "ALLOWED"})
+        await cache.add_batch([("b", unit(b), None), ("c", unit(c), None)], namespace="policy-2")
+
+        assert await cache.check_cache(near_a, similarity_threshold=0.9) == "a"
+        assert await cache.check_cache(near_a, similarity_threshold=0.99999) is None
+        (entry_id, score, payload), = await cache.search(near_a, k=1)
+        assert entry_id == "a" and 0.9 < score < 1.0 and payload["verdict"] == "ALLOWED"
+
+        # The namespace filter only considers entries written under the same policy.
+        assert await cache.check_cache(near_a, similarity_threshold=0.9, namespace="policy-2") is None
+        assert await cache.check_cache(near_a, similarity_threshold=0.9, namespace="policy-1") == "a"
+        results = await cache.search_batch([unit(b), unit(c)], namespace="policy-2", similarity_threshold=0.99)
+        assert [[match[0] for match in matches] for matches in results] == [["b"], ["c"]]
+
+        # Re-adding an entry replaces its point, and removed entries stop matching.
+        await cache.add_to_cache("a", unit(a), namespace="policy-1")
+        assert len(await cache.search(unit(a), k=10)) == 3
+        await cache.remove("a")
+        assert await cache.check_cache(unit(a), similarity_threshold=0.9) is None
+
+    asyncio.run(run())
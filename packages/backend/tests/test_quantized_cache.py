@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from app.services.matrix_cache_manager import MatrixCacheManager
+from app.services.quantized_cache_manager import QuantizedCacheManager
+
+SIZE, DIM, QUERIES, THRESHOLD = 3000, 192, 200, 0.95
+
+
+@pytest.fixture(scope="module")
+def data():
+    # Clustered entries, and queries that are re-phrasings (noisy copies) of
+    # stored ones at ~0.96 similarity, so near neighbours compete.
+    rng = np.random.default_rng(42)
+    centres = rng.standard_normal((64, DIM), dtype=np.float32)
+    vectors = centres[rng.integers(0, 64, SIZE)] + 0.5 * rng.standard_normal((SIZE, DIM), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    picked = vectors[rng.integers(0, SIZE, QUERIES)]
+    queries = picked + 0.3 * rng.standard_normal(picked.shape, dtype=np.float32) / np.sqrt(DIM)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    exact = MatrixCacheManager(capacity=SIZE, initial_rows=SIZE)
+    exact.add_batch([str(i) for i in range(SIZE)], vectors)
+    return vectors, queries, exact.lookup_batch(queries, -1.0), exact.lookup_batch(queries, THRESHOLD)
+
+
+@pytest.mark.parametrize("codec, rerank, max_bytes", [
+    ("float16", False, DIM * 2 + 16),
+    ("int8", True, DIM + 16),
+    ("pq", True, 96 + 16),
+])
+def test_compressed_codecs_match_exact_search(data, tmp_path, codec, rerank, max_bytes):
+    vectors, queries, exact_best, exact_hits = data
+    cache = QuantizedCacheManager(
+        codec=codec, capacity=SIZE, rerank_dir=str(tmp_path) if rerank else None,
+        pq_train_size=1000, initial_rows=256,
+    )
+    cache.add_batch([str(i) for i in range(SIZE)], vectors)
+
+    best = cache.lookup_batch(queries, -1.0)
+    hits = cache.lookup_batch(queries, THRESHOLD)
+    assert np.mean([a == b for a, b in zip(best, exact_best)]) >= 0.97
+    assert np.mean([a == b for a, b in zip(hits, exact_hits)]) >= 0.97
+    assert cache.vector_bytes_per_entry <= max_bytes < DIM * 4
+    # The id string, list slot and dict entry are resident too.
+    assert cache.bytes_per_entry > cache.vector_bytes_per_entry + 50
+
+
+def test_int8_and_pq_refuse_approximate_thresholds_without_a_rerank_dir():
+    for codec in ("int8", "pq"):
+        with pytest.raises(ValueError, match="rerank_dir"):
+            QuantizedCacheManager(codec=codec, rerank_dir=None)
+    QuantizedCacheManager(codec="int8", rerank_dir=None, allow_approximate_scores=True)
+    QuantizedCacheManager(codec="float16", rerank_dir=None)
+
+
+def test_pq_searches_staged_entries_exactly_until_trained(tmp_path):
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((50, DIM), dtype=np.float32)
+    cache = QuantizedCacheManager(codec="pq", capacity=100, rerank_dir=str(tmp_path), pq_train_size=1000)
+    cache.add_batch([str(i) for i in range(50)], vectors)
+
+    assert cache.lookup_batch(vectors[:5], 0.999) == ["0", "1", "2", "3", "4"]
+
+
+def test_namespaces_and_lru_eviction(tmp_path):
+    rng = np.random.default_rng(2)
+    a, b, c = rng.standard_normal((3, DIM), dtype=np.float32)
+    cache = QuantizedCacheManager(codec="int8", capacity=2, rerank_dir=str(tmp_path))
+    cache.add("a", a, namespace="policy-a")
+    cache.add("b", b, namespace="policy-a")
+
+    assert cache.lookup_batch([a], namespace="policy-b") == [None]
+    assert cache.lookup_batch([a], namespace="policy-a") == ["a"]  # "b" is now the least recently used.
+    cache.add("c", c, namespace="policy-a")
+    assert cache.lookup_batch([a, b, c], namespace="policy-a") == ["a", None, "c"]
@@ -0,0 +1,120 @@
+import sys
+import threading
+import time
+
+import pytest
+
+from app.services.rate_limiter import (
+    QUOTA_WINDOW_SECONDS,
+    Bucket,
+    MemoryBucketStore,
+    RateLimiter,
+    RateLimitExceeded,
+    SharedBucketStore,
+    fcntl,
+)
+
+needs_flock = pytest.mark.skipif(fcntl is None, reason="the shared store needs fcntl")
+
+
+@pytest.fixture(params=["memory", "shared"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryBucketStore()
+    if fcntl is None:
+        pytest.skip("the shared store needs fcntl")
+    return SharedBucketStore(str(tmp_path / "rate-limits"), slots=1024)
+
+
+def test_buckets_refill_continuously(store):
+    bucket = RateLimiter.per_minute("req:user:1", 60)  # 60 tokens, one per second.
+    for _ in range(60):
+        assert store.take([bucket], 1000.0)[0]
+    allowed, (remaining,), retry_after = store.take([bucket], 1000.0)
+    assert not allowed and remaining == pytest.approx(0.0) and retry_after == pytest.approx(1.0)
+
+    assert store.take([bucket], 1001.5)[0]
+    allowed, (remaining,), _ = store.take([bucket], 1001.5)
+    assert allowed is False and remaining == pytest.approx(0.5)
+    # Refilling stops at the capacity.
+    assert store.take([bucket], 5000.0)[1] == [pytest.approx(59.0)]
+
+
+def test_take_draws_from_every_bucket_or_none(store):
+    roomy = Bucket(key="roomy", capacity=10, rate=1)
+    tight = Bucket(key="tight", capacity=1, rate=0.1)
+    assert store.take([roomy, tight], 0.0)[0]
+    allowed, remaining, retry_after = store.take([roomy, tight], 0.0)
+    assert not allowed and retry_after == pytest.approx(10.0)
+    assert remaining == [pytest.approx(9.0), pytest.approx(0.0)]
+    assert store.take([roomy], 0.0)[1] == [pytest.approx(8.0)]  # The refused draw took nothing.
+
+
+def test_settle_replaces_the_estimate_and_allows_bounded_debt(store):
+    limiter = RateLimiter(store, limits={"user": (0, 1000), "ip": (0, 0)}, daily_llm_tokens=0, estimated_completion_tokens=100)
+    ticket = limiter.admit([("user", "7")], "x" * 400)  # 100 prompt + 100 completion tokens.
+    assert ticket.estimated_tokens == 200
+    bucket = ticket.token_buckets[0]
+    assert store.get(bucket.key)[0] == pytest.approx(800)
+
+    limiter.settle(ticket, 5000)  # Far more than estimated: the bucket goes into debt, at most its capacity.
+    assert store.get(bucket.key)[0] == pytest.approx(-1000, abs=1)
+    limiter.settle(ticket, 0)  # Answered from cache after all: everything charged comes back.
+    assert store.get(bucket.key)[0] == pytest.approx(1000)
+
+
+def test_daily_quota_slides_across_windows(store):
+    limiter = RateLimiter(store, limits={"user": (0, 0)}, daily_llm_tokens=1000, estimated_completion_tokens=0)
+    day = QUOTA_WINDOW_SECONDS
+    store.record("quota:user:1", day, 800, 5 * day)
+    assert store.usage("quota:user:1", day, 5 * day) == pytest.approx(800)
+    # A quarter into the next window, three quarters of the previous one still count.
+    store.record("quota:user:1", day, 100, 6.25 * day)
+    assert store.usage("quota:user:1", day, 6.25 * day) == pytest.approx(100 + 600)
+    # Two windows on, it has all expired.
+    assert store.usage("quota:user:1", day, 8.5 * day) == 0
+
+    store.record("quota:user:2", day, 990, time.time())
+    with pytest.raises(RateLimitExceeded, match="quota"):
+        limiter.admit([("user", "2")], "a prompt well over ten tokens long, say fifty characters")
+
+
+def test_concurrent_threads_never_overdraw_a_bucket(store):
+    previous = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # Switch threads as often as possible.
+    try:
+        bucket = Bucket(key="contended", capacity=200, rate=1e-9)
+        allowed = []
+
+        def worker():
+            allowed.extend(store.take([bucket], 0.0)[0] for _ in range(100))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(previous)
+    assert sum(allowed) == 200
+
+
+@needs_flock
+def test_shared_store_probes_past_collisions_and_reuses_the_stalest_slot(tmp_path, monkeypatch):
+    path = str(tmp_path / "rate-limits")
+    store = SharedBucketStore(path, slots=16)
+    # Every key hashes to slot 3 of 16.
+    monkeypatch.setattr(SharedBucketStore, "_hash", staticmethod(lambda key: 3 + 16 * (1 + int(key))))
+    with store.locked():
+        for i in range(8):
+            store.put(str(i), (float(i), 0.0, 0.0))
+        assert [store.get(str(i))[0] for i in range(8)] == [float(i) for i in range(8)]
+        store.put("1", (10.0, 0.0, 0.0))  # Refresh key 1; key 0 is now the stalest.
+        # The probe window (slots 3-10) is full: a ninth key replaces key 0.
+        store.put("8", (8.0, 0.0, 0.0))
+        assert store.get("0") is None and store.get("8")[0] == 8.0 and store.get("1")[0] == 10.0
+
+    # Another worker mapping the same file sees the same state.
+    other = SharedBucketStore(path, slots=16)
+    with other.locked():
+        assert other.get("8")[0] == 8.0
@@ -0,0 +1,55 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+# Loaded on first use or by the lifespan pre-warm, never by importing the app.
+LAZY_MODULES = [
+    "langchain_core",
+    "langchain_google_genai",
+    "langsmith",
+    "google.cloud.aiplatform",
+    "sentence_transformers",
+]
+
+
+def test_importing_the_app_leaves_heavy_dependencies_unloaded():
+    # A fresh interpreter: this one has imported half the app already.
+    child = f"import json, sys, app.main; print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))"
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", child], cwd=BACKEND, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == []
+
+
+def test_service_accessors_return_one_instance():
+    from app import services
+    from app.services.threat_manager import ThreatManager
+
+    assert isinstance(services.get_threat_manager(), ThreatManager)
+    assert services.get_threat_manager() is services.get_threat_manager()
+
+
+def test_a_failed_prewarm_is_reported_when_it_fails(monkeypatch, capsys):
+    import asyncio
+
+    from app import main
+
+    def broken():
+        raise RuntimeError("no credentials")
+
+    monkeypatch.setattr(main.settings, "LLM_PREWARM", True)
+    monkeypatch.setattr(main.ai_critics, "prewarm", broken)
+
+    async def run():
+        async with main.lifespan(main.app):
+            for _ in range(100):
+                if "Pre-warm failed: no credentials" in capsys.readouterr().out:
+                    return True
+                await asyncio.sleep(0.01)
+        return False
+
+    assert asyncio.run(run())
@@ -0,0 +1,70 @@
+from collections import Counter
+
+import numpy as np
+
+from app.core.sketches import SourceSketch
+from app.services.threat_sketches import ThreatSketchTracker, threat_types
+
+
+def build(items) -> SourceSketch:
+    sketch = SourceSketch(width=256, depth=4, k=5, precision=10)
+    for item in items:
+        sketch.add(item)
+    return sketch
+
+
+def stream(seed: int, size: int = 5_000):
+    # A few heavy hitters over a long tail, like the sources of one attack type.
+    rng = np.random.default_rng(seed)
+    heavy = [f"10.0.0.{i}" for i in range(5)]
+    return [heavy[i % 5] if rng.random() < 0.3 else f"198.51.{rng.integers(256)}.{rng.integers(256)}" for i in range(size)]
+
+
+def test_attack_types_from_the_critic_fold_into_a_fixed_set():
+    def attack(attack_type):
+        return [t for t in threat_types("BLOCKED", {"attack_type": attack_type}) if t.startswith("attack:")]
+
+    assert attack("Instruction Hijacking") == ["attack:instruction_hijacking"]
+    assert attack("prompt-leaking attempt") == ["attack:prompt_leaking"]
+    assert attack("Malicious Role-Playing (DAN)") == ["attack:malicious_role_playing"]
+    assert attack(None) == attack("none") == ["attack:unknown"]
+    assert attack("Some novel ✨ technique") == ["attack:other"]
+    assert threat_types("ALLOWED", {"attack_type": "Code Injection"}) == ["all"]
+
+
+def test_free_text_attack_types_keep_the_number_of_sketches_bounded():
+    tracker = ThreatSketchTracker()
+    for i in range(500):
+        tracker.record_log({"source_ip": "203.0.113.9"}, "BLOCKED", {"attack_type": f"made-up attack #{i}"})
+    assert {threat_type for _, threat_type, _ in tracker._pending} == {"all", "blocked", "attack:other"}
+
+
+def test_merged_sketches_match_one_built_from_both_streams():
+    a, b = stream(1), stream(2)
+    merged = build(a)
+    merged.merge(build(b))
+    combined = build(a + b)
+
+    np.testing.assert_array_equal(merged.cms.table, combined.cms.table)
+    np.testing.assert_array_equal(merged.hll.registers, combined.hll.registers)
+    assert merged.cms.total == len(a) + len(b)
+    truth = Counter(a + b)
+    assert [item for item, _ in merged.top.ranked()] == [item for item, _ in truth.most_common(5)]
+    for item, estimate in merged.top.ranked():
+        assert truth[item] <= estimate <= truth[item] + merged.cms.error_bound
+    assert abs(merged.hll.estimate() - len(truth)) <= 3 * merged.hll.relative_error * len(truth)
+
+
+def test_sketches_survive_a_bytes_round_trip():
+    sketch = build(stream(3))
+    restored = SourceSketch.from_bytes(sketch.to_bytes())
+
+    np.testing.assert_array_equal(restored.cms.table, sketch.cms.table)
+    np.testing.assert_array_equal(restored.hll.registers, sketch.hll.registers)
+    assert (restored.cms.total, restored.top.k, restored.top.ranked()) == (sketch.cms.total, sketch.top.k, sketch.top.ranked())
+    assert restored.hll.estimate() == sketch.hll.estimate()
+
+    # A restored sketch keeps counting and merging like the original.
+    restored.add("10.0.0.0")
+    restored.merge(build(["10.0.0.0"]))
+    assert restored.cms.estimate("10.0.0.0") == sketch.cms.estimate("10.0.0.0") + 2
@@ -0,0 +1,160 @@
+import asyncio
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List
+
+import numpy as np
+import pytest
+
+from app.services.cache_manager import CacheManager
+
+
+@dataclass
+class FakeNeighbor:
+    """Mirrors the `id` and `distance` fields of the SDK's MatchNeighbor."""
+    id: str
+    distance: float
+
+
+class FakeIndexEndpoint:
+    """A blocking, in-memory stand-in for MatchingEngineIndexEndpoint."""
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.vectors: Dict[str, np.ndarray] = {}
+        self.requests: List[tuple] = []  # (number of queries, filter) per find_neighbors call
+        self.lock = threading.Lock()
+
+    def find_neighbors(self, queries, deployed_index_id, num_neighbors=1, filter=None):
+        time.sleep(self.latency)  # Blocks, as the real SDK does.
+        with self.lock:
+            self.requests.append((len(queries), filter))
+            ids, vectors = list(self.vectors), list(self.vectors.values())
+        if not ids:
+            return [[] for _ in queries]
+        scores = np.asarray(queries, dtype=np.float32) @ np.stack(vectors).T
+        return [[FakeNeighbor(id=ids[j], distance=float(scores[i, j]))] for i, j in enumerate(scores.argmax(axis=1))]
+
+
+class FakeIndex:
+    """A stand-in for MatchingEngineIndex whose upserts land in the fake endpoint."""
+    def __init__(self, endpoint: FakeIndexEndpoint):
+        self.endpoint = endpoint
+        self.batch_sizes: List[int] = []
+
+    def upsert_datapoints(self, datapoints):
+        time.sleep(self.endpoint.latency)
+        with self.endpoint.lock:
+            for datapoint in datapoints:
+                self.endpoint.vectors[datapoint["datapoint_id"]] = np.asarray(datapoint["feature_vector"], dtype=np.float32)
+            self.batch_sizes.append(len(datapoints))
+
+
+def unit_vectors(count: int, dim: int = 64) -> np.ndarray:
+    vectors = np.random.default_rng(42).standard_normal((count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    # The real filter is a google-cloud Namespace; pass the name through instead.
+    monkeypatch.setattr(CacheManager, "_namespace_filter", staticmethod(lambda namespace: namespace))
+    endpoint = FakeIndexEndpoint(latency=0.02)
+    return endpoint, FakeIndex(endpoint)
+
+
+def make_cache(fake, **kwargs) -> CacheManager:
+    endpoint, index = fake
+    options = dict(deployed_index_id="fake", max_batch_size=32, batch_wait_ms=5, lookup_timeout=1.0,
+                   upsert_batch_size=100, upsert_flush_seconds=0.05)
+    return CacheManager(index_endpoint=endpoint, index=index, **{**options, **kwargs})
+
+
+async def max_loop_stall(stop: asyncio.Event) -> float:
+    """Ticks every millisecond and returns the worst lateness seen, in seconds."""
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.001)
+        worst = max(worst, time.perf_counter() - started - 0.001)
+    return worst
+
+
+def test_upserts_are_buffered_and_flushed_in_batches(fake):
+    endpoint, index = fake
+    vectors = unit_vectors(250)
+
+    async def run():
+        cache = make_cache(fake)
+        started = time.perf_counter()
+        for i, vector in enumerate(vectors):
+            await cache.add_to_cache(str(i), vector)
+        enqueue_seconds = time.perf_counter() - started
+        await asyncio.sleep(0.3)
+        await cache.close()
+        return enqueue_seconds
+
+    # Enqueueing never waits on a round trip; the flusher sends full batches, then the remainder.
+    assert asyncio.run(run()) < endpoint.latency
+    assert index.batch_sizes == [100, 100, 50]
+    assert len(endpoint.vectors) == 250
+
+
+def test_concurrent_lookups_are_coalesced_without_stalling_the_loop(fake):
+    endpoint, _ = fake
+    vectors = unit_vectors(200)
+    endpoint.vectors = {str(i): vector for i, vector in enumerate(vectors)}
+    picked = np.random.default_rng(0).integers(0, 200, 64)
+
+    async def run():
+        cache = make_cache(fake)
+        stop = asyncio.Event()
+        ticker = asyncio.create_task(max_loop_stall(stop))
+        results = await asyncio.gather(*(cache.check_cache(vectors[i], similarity_threshold=0.99) for i in picked))
+        stop.set()
+        stall = await ticker
+        await cache.close()
+        return results, stall
+
+    results, stall = asyncio.run(run())
+    assert results == [str(i) for i in picked]
+    assert len(endpoint.requests) <= 4  # 64 lookups in batches of up to 32.
+    assert sum(count for count, _ in endpoint.requests) == 64
+    assert stall < endpoint.latency  # The blocking SDK calls run on the thread pool.
+
+
+def test_lookups_are_batched_per_namespace(fake):
+    endpoint, _ = fake
+    vectors = unit_vectors(4)
+    endpoint.vectors = {str(i): vector for i, vector in enumerate(vectors)}
+
+    async def run():
+        cache = make_cache(fake)
+        await asyncio.gather(
+            cache.check_cache(vectors[0], namespace="a"),
+            cache.check_cache(vectors[1], namespace="b"),
+            cache.check_cache(vectors[2], namespace="a"),
+        )
+        await cache.close()
+
+    asyncio.run(run())
+    assert sorted(endpoint.requests) == [(1, "b"), (2, "a")]
+
+
+def test_slow_lookups_fail_open_to_a_miss(fake):
+    endpoint, _ = fake
+    vectors = unit_vectors(1)
+    endpoint.vectors = {"0": vectors[0]}
+    endpoint.latency = 0.5
+
+    async def run():
+        cache = make_cache(fake, lookup_timeout=0.05)
+        started = time.perf_counter()
+        result = await cache.check_cache(vectors[0], similarity_threshold=0.99)
+        elapsed = time.perf_counter() - started
+        await cache.close()
+        return result, elapsed
+
+    result, elapsed = asyncio.run(run())
+    assert result is None
+    assert elapsed < 0.25